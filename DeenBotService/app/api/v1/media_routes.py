@@ -1,7 +1,9 @@
-from fastapi import APIRouter, File, UploadFile, Request, Depends, HTTPException
+from fastapi import APIRouter, File, Form, UploadFile, Request, Depends, HTTPException
 from app.models.user import (
     User,
 )  # Assuming User model is needed, or remove if only ID is used
+import asyncio
+import hashlib
 import uuid
 import os
 import logging
@@ -9,11 +11,18 @@ import shutil
 import re
 from app.dependencies.rag_chat import generate_answer_with_rag
 from app.dependencies.fatwallm_rag import (
-    transcribe_uploaded_audio,
-    vectorize_transcription_with_chroma,
+    transcribe_and_vectorize_audio,
+    vectorize_youtube_captions,
     get_translated_answer_with_context,
     save_question_to_history,
+    whisper_model_size,
 )
+from app.dependencies.ingestion import transcription_path
+from app.dependencies.youtube_index import job_key, youtube_index
+from app.dependencies.upload_index import upload_index
+from app.dependencies.job_queue import JobContext, JobFailed, job_queue
+from app.dependencies.media_cache import media_cache, upload_key
+from app.dependencies.captions import CAPTIONS_MODE, caption_stats
 from app.dependencies.title_generator import extract_topic_from_transcription
 import yt_dlp
 from pytube import YouTube
@@ -40,10 +49,139 @@ os.environ["PATH"] += os.pathsep + FFMPEG_PATH
 logger.info(f"Added FFmpeg path: {FFMPEG_PATH}")
 
 
+def _check_transcription(transcription: str, fallback_message: str) -> None:
+    """Fail the job with the transcription's own error message, if it is one."""
+    # Check for specific error messages from transcription
+    if "مساحة كافية على القرص" in transcription:
+        logger.error(f"Disk space error during transcription: {transcription}")
+        raise JobFailed(transcription)  # Insufficient Storage
+    if "خطأ في تقسيم الملف" in transcription:
+        logger.error(f"Audio splitting error during transcription: {transcription}")
+        raise JobFailed(transcription)
+    if (
+        not transcription
+        or transcription.strip() == ""
+        or "تعذر تحويل" in transcription
+        or "حدث خطأ" in transcription
+    ):
+        logger.error(f"Transcription failed: {transcription}")
+        raise JobFailed(
+            transcription
+            if transcription and "تعذر تحويل" in transcription
+            else fallback_message
+        )
+
+
+async def _transcribe_while_indexing(
+    ctx: JobContext,
+    audio_path: str,
+    on_queryable,
+    *,
+    fast_mode: bool,
+    start: float,
+    end: float,
+    failure_message: str,
+    force_refresh: bool = False,
+):
+    """
+    Transcribe ``audio_path`` while its chunks are being indexed.
+
+    ``await on_queryable(transcription_id)`` runs as soon as the first chunks
+    are searchable, while Whisper is still working on the rest; its return
+    value (the early conversation id) is passed back so the handler can
+    reuse it.  If the transcription then fails, the job fails with
+    ``failure_message`` (or the transcription's own error) and the early
+    conversation is deleted rather than left over a partial index.
+
+    Returns (transcription, transcription_id, early conversation id).
+    """
+    loop = asyncio.get_running_loop()
+    first_batch = asyncio.Event()
+    queryable_ids = []
+
+    def notify(transcription_id: str) -> None:
+        queryable_ids.append(transcription_id)
+        loop.call_soon_threadsafe(first_batch.set)
+
+    pipeline = asyncio.ensure_future(
+        ctx.run(
+            transcribe_and_vectorize_audio,
+            audio_path,
+            fast_mode=fast_mode,
+            progress_callback=ctx.stage_progress("transcribe", start, end),
+            on_first_batch=notify,
+            force_refresh=force_refresh,
+        )
+    )
+    waiter = asyncio.ensure_future(first_batch.wait())
+    try:
+        await asyncio.wait({pipeline, waiter}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        waiter.cancel()
+
+    early = None
+    try:
+        if first_batch.is_set() and not pipeline.done():
+            early = await on_queryable(queryable_ids[0])
+        transcription, transcription_id = await pipeline
+        _check_transcription(transcription, failure_message)
+        if transcription_id is None:
+            raise JobFailed(transcription)
+    except Exception:
+        if early:
+            await _delete_conversation(early)
+        raise
+    return transcription, transcription_id, early
+
+
+async def _delete_conversation(conversation_id) -> None:
+    """Delete a conversation opened early by a job that then failed."""
+    try:
+        from sqlalchemy import delete
+        from app.models.conversation import Conversation
+        from app.models.message import Message
+        from app.database import SessionLocal
+
+        conv_uuid = uuid.UUID(str(conversation_id))
+        async with SessionLocal() as db:
+            await db.execute(delete(Message).where(Message.conversation_id == conv_uuid))
+            await db.execute(delete(Conversation).where(Conversation.id == conv_uuid))
+            await db.commit()
+        logger.info(f"Deleted conversation {conversation_id} of a failed job")
+    except Exception as e:
+        logger.error(f"Error deleting conversation {conversation_id}: {e}")
+
+
+async def _rename_conversation(conversation_id, title: str) -> None:
+    """Replace the provisional title of a conversation opened before the end."""
+    try:
+        from app.models.conversation import Conversation
+        from app.database import SessionLocal
+
+        async with SessionLocal() as db:
+            conversation = await db.get(Conversation, uuid.UUID(str(conversation_id)))
+            if conversation is not None:
+                conversation.title = title
+                await db.commit()
+    except Exception as e:
+        logger.error(f"Error renaming conversation {conversation_id}: {e}")
+
+
+def _job_accepted(job_id: str) -> dict:
+    return {
+        "success": True,
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": f"/api/v1/media/jobs/{job_id}",
+    }
+
+
 @router.post("/upload-media")
-async def upload_media_file(file: UploadFile = File(...)):
+async def upload_media_file(file: UploadFile = File(...), force_refresh: bool = Form(False)):
     """
-    Upload an audio/video file (mp3, wav, mp4), transcribe it, and save for later questions.
+    Upload an audio/video file (mp3, wav, mp4) and queue it for transcription.
+    Returns a job id; poll /api/v1/media/jobs/{job_id} for progress and the result.
+    An audio transcribed before is reused unless "force_refresh" is true.
     """
     allowed_types = [
         "audio/mpeg",
@@ -60,149 +198,254 @@ async def upload_media_file(file: UploadFile = File(...)):
             "error": "File type not allowed. Please upload MP3, WAV, or MP4 files only."
         }
 
-    # Create temp directory if it doesn't exist
-    if not os.path.exists("temp_media"):
-        os.makedirs("temp_media")
-
-    # Save file to disk using chunked reading for large files
-    file_path = f"temp_media/{file.filename}"
+    # Receive the file in the media cache's staging area, hashing it as it
+    # comes: it is then stored under its content address
+    extension = os.path.splitext(file.filename or "")[1]
+    staged_path = media_cache.staging_path(prefix="upload_", suffix=extension)
+    digest = hashlib.sha256()
     try:
-        with open(file_path, "wb") as f:
+        with open(staged_path, "wb") as f:
             # Read file in chunks to handle large files
             chunk_size = 1024 * 1024  # 1MB chunks
             while True:
                 chunk = await file.read(chunk_size)
                 if not chunk:
                     break
+                digest.update(chunk)
                 f.write(chunk)
     except Exception as e:
         logger.error(f"Error saving file: {e}")
+        try:
+            os.remove(staged_path)
+        except OSError:
+            # Must not hide the write error
+            pass
         return {"error": f"Error saving file: {str(e)}"}
 
     # Log file details
-    file_size = os.path.getsize(file_path)
+    file_size = os.path.getsize(staged_path)
     logger.info(
-        f"Uploaded file: {file_path}, Size: {file_size} bytes, Type: {content_type}"
+        f"Uploaded file: {file.filename}, Size: {file_size} bytes, Type: {content_type}"
     )
 
     if file_size < 1000:  # Less than 1KB
+        os.remove(staged_path)
         return {"error": "الملف صغير جدًا أو فارغ. يرجى تحميل ملف صالح."}
 
-    # Transcribe the audio
+    # Pinned until the job is done with it
+    cache_key = upload_key(digest.hexdigest())
+    file_path = await asyncio.get_running_loop().run_in_executor(
+        None, lambda: media_cache.commit(staged_path, cache_key, pin=True)
+    )
     try:
-        logger.info(f"Starting transcription for {file_path}...")
-        transcription = transcribe_uploaded_audio(file_path)
+        job_id = await job_queue.submit(
+            "upload",
+            {
+                "file_path": file_path,
+                "filename": file.filename,
+                "cache_key": cache_key,
+                "force_refresh": force_refresh,
+            },
+        )
+    except Exception as e:
+        logger.error(f"Error queuing media upload: {e}")
+        media_cache.unpin(cache_key)
+        return {"error": f"حدث خطأ أثناء معالجة الملف: {str(e)}"}
+    # The pin taken on commit is now the job's
+    _upload_pins.add(job_id)
+    return _job_accepted(job_id)
 
-        # Check for specific error messages from transcription
-        if "مساحة كافية على القرص" in transcription:
-            logger.error(
-                f"Disk space error during transcription for {file_path}: {transcription}"
-            )
-            raise HTTPException(
-                status_code=507, detail=transcription
-            )  # Insufficient Storage
-        if "خطأ في تقسيم الملف" in transcription:
-            logger.error(
-                f"Audio splitting error during transcription for {file_path}: {transcription}"
-            )
-            raise HTTPException(status_code=500, detail=transcription)
-        if (
-            not transcription
-            or transcription.strip() == ""
-            or "تعذر تحويل" in transcription
-            or "حدث خطأ" in transcription
-        ):
-            logger.error(f"Transcription failed for {file_path}: {transcription}")
-            raise HTTPException(
-                status_code=500,
-                detail=(
-                    transcription
-                    if transcription and "تعذر تحويل" in transcription
-                    else "تعذر تحويل الملف الصوتي إلى نص. يرجى المحاولة مرة أخرى باستخدام ملف آخر."
-                ),
+
+async def _create_upload_conversation(title: str, transcription_id: str):
+    """Create a guest conversation bound to the transcription of an upload."""
+    # Créer automatiquement une conversation liée à ce context_id
+    try:
+        # Importer ici pour éviter les imports circulaires
+        from app.models.conversation import Conversation
+        from app.database import SessionLocal
+
+        # Créer un UUID par défaut pour l'utilisateur invité
+        # Utiliser un UUID fixe pour l'utilisateur "guest" pour la cohérence
+        guest_user_uuid = uuid.UUID("00000000-0000-0000-0000-000000000001")
+
+        # Créer une nouvelle conversation avec le context_id dans la base de données
+        async with SessionLocal() as db:
+            new_conversation = Conversation(
+                user_id=guest_user_uuid,  # Utiliser un UUID valide pour l'utilisateur invité
+                title=title,
+                context_id=transcription_id,
             )
-            logger.error("Transcription failed or returned empty result")
-            return {
-                "error": "تعذر تحويل الملف الصوتي إلى نص. يرجى المحاولة مرة أخرى باستخدام ملف آخر."
-            }
 
-        # Store the transcription for later retrieval
-        transcription_id = vectorize_transcription_with_chroma(transcription)
+            db.add(new_conversation)
+            await db.commit()
+            await db.refresh(new_conversation)
 
-        # Extract the topic from the transcription
-        topic = "الدروس الإسلامية"
-        try:
-            topic = extract_topic_from_transcription(transcription)
-            logger.info(f"Extracted topic: {topic}")
-        except Exception as e:
-            logger.error(f"Error extracting topic: {e}")
+            conversation_id = str(new_conversation.id)
+            logger.info(
+                f"Conversation créée automatiquement: {conversation_id} avec context_id: {transcription_id}"
+            )
+            return conversation_id
+    except Exception as e:
+        logger.error(
+            f"Erreur lors de la création automatique de la conversation: {e}"
+        )
+        return None
 
-        # Créer automatiquement une conversation liée à ce context_id
-        try:
-            # Importer ici pour éviter les imports circulaires
-            import httpx
-            import uuid
-            from app.models.conversation import Conversation
-            from app.database import SessionLocal
 
-            # Créer un titre basé sur le topic extrait
-            title = f"🎧 {topic}" if topic else "🎧 Transcription audio"
+async def _lookup_uploaded_audio(fingerprint, model_size: str):
+    """Return the reusable `UploadTranscript` entry for the same audio, if any."""
+    try:
+        from app.database import SessionLocal
 
-            # Créer un UUID par défaut pour l'utilisateur invité
-            # Utiliser un UUID fixe pour l'utilisateur "guest" pour la cohérence
-            guest_user_uuid = uuid.UUID("00000000-0000-0000-0000-000000000001")
+        async with SessionLocal() as db:
+            return await upload_index.lookup(db, fingerprint, model_size=model_size)
+    except Exception as e:
+        logger.error(f"Error looking up uploaded audio: {e}")
+        return None
 
-            # Créer une nouvelle conversation avec le context_id dans la base de données
-            async with SessionLocal() as db:
-                new_conversation = Conversation(
-                    user_id=guest_user_uuid,  # Utiliser un UUID valide pour l'utilisateur invité
-                    title=title,
-                    context_id=transcription_id,
-                )
 
-                db.add(new_conversation)
-                await db.commit()
-                await db.refresh(new_conversation)
+async def _record_uploaded_audio(
+    fingerprint, transcription_id: str, model_size: str, title: str, filename: str
+) -> None:
+    try:
+        from app.database import SessionLocal
 
-                conversation_id = new_conversation.id
-                logger.info(
-                    f"Conversation créée automatiquement: {conversation_id} avec context_id: {transcription_id}"
-                )
-        except Exception as e:
-            logger.error(
-                f"Erreur lors de la création automatique de la conversation: {e}"
+        async with SessionLocal() as db:
+            await upload_index.record(
+                db, fingerprint, transcription_id, model_size=model_size, title=title, filename=filename
             )
-            conversation_id = None
+    except Exception as e:
+        logger.error(f"Error recording uploaded audio {filename}: {e}")
 
-        # Return success with transcription and topic
-        preview = (
-            transcription[:200] + "..." if len(transcription) > 200 else transcription
-        )
-        logger.info(
-            f"Transcription successful. ID: {transcription_id}, Length: {len(transcription)}"
-        )
 
+# Upload jobs whose media cache pin was taken by upload_media_file
+_upload_pins = set()
+
+
+async def _run_upload_job(ctx: JobContext, payload: dict) -> dict:
+    """Transcribe and vectorise an uploaded file, open a conversation, then title it."""
+    cache_key = payload.get("cache_key")
+    if cache_key and ctx.job_id not in _upload_pins:
+        # Pins live in memory: a job resumed after a restart (or claimed by
+        # another process) pins its file itself
+        media_cache.pin(cache_key)
+    _upload_pins.discard(ctx.job_id)
+    try:
+        return await _process_upload(ctx, payload)
+    finally:
+        # The upload stays cached (a re-upload hits it) but may now be evicted
+        if cache_key:
+            media_cache.unpin(cache_key)
+
+
+async def _process_upload(ctx: JobContext, payload: dict) -> dict:
+    file_path = payload["file_path"]
+    if not os.path.exists(file_path):
+        raise JobFailed("الملف لم يعد متوفرًا. يرجى تحميله مرة أخرى.")
+    model_size = whisper_model_size(fast_mode=True)
+    force_refresh = bool(payload.get("force_refresh"))
+
+    # The same lecture uploaded again (renamed or re-encoded) reuses its
+    # earlier transcription instead of going through Whisper
+    ctx.progress("fingerprint", 1)
+    fingerprint = await ctx.run(upload_index.fingerprint, file_path)
+    cached = (
+        await _lookup_uploaded_audio(fingerprint, model_size)
+        if fingerprint and not force_refresh
+        else None
+    )
+    if cached is not None:
+        topic = cached.title or "الدروس الإسلامية"
+        conversation_id = await _create_upload_conversation(f"🎧 {topic}", cached.transcription_id)
         return {
             "success": True,
             "message": "تمت معالجة الملف بنجاح",
-            "transcription_id": transcription_id,
-            "conversation_id": conversation_id,  # Retourner l'ID de la conversation créée
-            "transcription_preview": preview,
+            "transcription_id": cached.transcription_id,
+            "conversation_id": conversation_id,
+            "transcription_preview": _read_transcription_preview(cached.transcription_id),
             "topic": topic,
+            "cached": True,
         }
 
+    async def open_conversation(transcription_id: str):
+        # The first chunks are indexed: the conversation can already be used
+        conversation_id = await _create_upload_conversation(
+            "🎧 Transcription audio", transcription_id
+        )
+        await ctx.publish(
+            {
+                "success": True,
+                "partial": True,
+                "message": "جاري تحويل الملف، يمكنك طرح أسئلتك حول الجزء المعالج",
+                "transcription_id": transcription_id,
+                "conversation_id": conversation_id,
+            }
+        )
+        return conversation_id
+
+    # Transcribe the audio and store it for later retrieval as it goes
+    logger.info(f"Starting transcription for {file_path}...")
+    ctx.progress("transcribe", 5)
+    transcription, transcription_id, conversation_id = await _transcribe_while_indexing(
+        ctx,
+        file_path,
+        open_conversation,
+        fast_mode=True,
+        start=5,
+        end=85,
+        failure_message="تعذر تحويل الملف الصوتي إلى نص. يرجى المحاولة مرة أخرى باستخدام ملف آخر.",
+        force_refresh=force_refresh,
+    )
+
+    # Extract the topic from the transcription
+    ctx.progress("title", 85)
+    topic = "الدروس الإسلامية"
+    try:
+        topic = await ctx.run(extract_topic_from_transcription, transcription)
+        logger.info(f"Extracted topic: {topic}")
     except Exception as e:
-        logger.error(f"Media upload error: {e}")
-        return {"error": f"حدث خطأ أثناء معالجة الملف: {str(e)}"}
-    finally:
-        # Clean up the uploaded file to save space
-        try:
-            if os.path.exists(file_path):
-                # Don't delete immediately as it might be needed for debugging
-                # os.remove(file_path)
-                pass
-        except Exception as e:
-            logger.error(f"Error cleaning up file: {e}")
+        logger.error(f"Error extracting topic: {e}")
+
+    # Créer un titre basé sur le topic extrait
+    ctx.progress("conversation", 95)
+    title = f"🎧 {topic}" if topic else "🎧 Transcription audio"
+    if conversation_id:
+        await _rename_conversation(conversation_id, title)
+    else:
+        conversation_id = await _create_upload_conversation(title, transcription_id)
+    if fingerprint is not None:
+        await _record_uploaded_audio(
+            fingerprint, transcription_id, model_size, topic, payload.get("filename")
+        )
+
+    # Return success with transcription and topic
+    preview = (
+        transcription[:200] + "..." if len(transcription) > 200 else transcription
+    )
+    logger.info(
+        f"Transcription successful. ID: {transcription_id}, Length: {len(transcription)}"
+    )
+
+    return {
+        "success": True,
+        "message": "تمت معالجة الملف بنجاح",
+        "transcription_id": transcription_id,
+        "conversation_id": conversation_id,  # Retourner l'ID de la conversation créée
+        "transcription_preview": preview,
+        "topic": topic,
+    }
+
+
+@router.get("/jobs/{job_id}")
+async def get_media_job(job_id: str):
+    """
+    Status of a queued media job: stage, percent complete, ETA and, once
+    finished, the result (transcription_id, conversation_id, ...) or error.
+    """
+    status = await job_queue.get_status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return status
 
 
 @router.post("/ask")
@@ -235,10 +478,97 @@ async def ask_about_media(request: Request):
         return {"error": f"Error generating answer: {str(e)}"}
 
 
+YOUTUBE_WELCOME_MESSAGE = "تم استخراج محتوى الفيديو بنجاح يمكنك الآن طرح أسئلتك، وسأجيبك فقط من المعلومات الموجودة في هذا الفيديو."
+
+
+async def _create_youtube_conversation(title: str, transcription_id: str):
+    """Create a guest conversation bound to ``transcription_id`` with a welcome message."""
+    conversation_id = None
+    try:
+        from app.models.conversation import Conversation
+        from app.models.message import Message
+        from app.database import SessionLocal  # Using async session
+
+        async with SessionLocal() as db:
+            # Use fixed guest UUID for consistency
+            guest_user_uuid = uuid.UUID("00000000-0000-0000-0000-000000000001")
+            new_conversation = Conversation(
+                user_id=guest_user_uuid,
+                title=title,
+                context_id=transcription_id,
+            )
+
+            db.add(new_conversation)
+            await db.commit()
+            await db.refresh(new_conversation)
+
+            conversation_id = new_conversation.id
+            logger.info(
+                f"Conversation created automatically for YouTube: {conversation_id} with context_id: {transcription_id}"
+            )
+
+            # Add welcome message
+            welcome_message_obj = Message(
+                conversation_id=conversation_id,
+                user_id=None,  # Assistant messages now use NULL for user_id
+                question="",
+                answer=YOUTUBE_WELCOME_MESSAGE,
+            )
+
+            db.add(welcome_message_obj)
+            await db.commit()
+            logger.info(
+                f"Welcome message added to YouTube conversation {conversation_id}"
+            )
+
+    except Exception as e:
+        logger.error(f"Error creating conversation automatically: {e}")
+
+    return conversation_id
+
+
+def _read_transcription_preview(transcription_id: str, length: int = 200) -> str:
+    """First ``length`` characters of a stored transcript, for cached responses."""
+    try:
+        with open(transcription_path(transcription_id), "r", encoding="utf-8") as f:
+            preview = f.read(length + 1)
+    except OSError:
+        return ""
+    return preview[:length] + "..." if len(preview) > length else preview
+
+
+async def _lookup_processed_video(video_id: str, model_size: str):
+    """Return the reusable `YouTubeTranscript` entry for ``video_id``, if any."""
+    try:
+        from app.database import SessionLocal
+
+        async with SessionLocal() as db:
+            return await youtube_index.lookup(db, video_id, model_size=model_size)
+    except Exception as e:
+        logger.error(f"Error looking up processed video {video_id}: {e}")
+        return None
+
+
+async def _record_processed_video(
+    video_id: str, transcription_id: str, model_size: str, title: str
+) -> None:
+    try:
+        from app.database import SessionLocal
+
+        async with SessionLocal() as db:
+            await youtube_index.record(
+                db, video_id, transcription_id, model_size=model_size, title=title
+            )
+    except Exception as e:
+        logger.error(f"Error recording processed video {video_id}: {e}")
+
+
 @router.post("/process-youtube")
 async def process_youtube(request: Request):
     """
-    Process a YouTube URL and extract audio for transcription.
+    Queue a YouTube URL for download and transcription.
+    Returns a job id, or the existing context immediately when the video was
+    already processed (pass "force_refresh": true to re-process).
     """
     data = await request.json()
     youtube_url = data.get("youtube_url", "")
@@ -263,132 +593,201 @@ async def process_youtube(request: Request):
     if not match:
         return {"error": "رابط يوتيوب غير صالح"}
 
+    # Reuse the transcript of a video that was already processed with the
+    # same model and pipeline version, unless the caller asks to re-process
+    video_id = match.group(5)
+    force_refresh = bool(data.get("force_refresh", False))
+    model_size = whisper_model_size(fast_mode=False)
+    if not force_refresh:
+        cached = await _lookup_processed_video(video_id, model_size)
+        if cached is not None:
+            title = requesttitle or cached.title or "درس إسلامي من يوتيوب"
+            conversation_id = await _create_youtube_conversation(
+                title, cached.transcription_id
+            )
+            return {
+                "success": True,
+                "message": "تم معالجة الفيديو بنجاح",
+                "transcription_id": cached.transcription_id,
+                "conversation_id": conversation_id,
+                "transcription_preview": _read_transcription_preview(
+                    cached.transcription_id
+                ),
+                "topic": cached.title or title,
+                "title": requesttitle,
+                "cached": True,
+            }
+
+    try:
+        # Concurrent requests for the same video share one job (and its
+        # transcription) instead of each downloading and transcribing it
+        job_id, attached = await job_queue.submit_once(
+            "youtube",
+            {
+                "youtube_url": youtube_url,
+                "video_id": video_id,
+                "title": requesttitle,
+                "model_size": model_size,
+                "force_refresh": force_refresh,
+            },
+            None if force_refresh else job_key(video_id, model_size),
+        )
+    except Exception as e:
+        logger.error(f"Error queuing YouTube processing: {e}")
+        return {"error": f"حدث خطأ أثناء معالجة فيديو يوتيوب: {str(e)}"}
+    response = _job_accepted(job_id)
+    if attached:
+        # The job's conversation belongs to the first submitter: the client
+        # opens its own one over the same transcription
+        response["attached"] = True
+    return response
+
+
+async def _download_and_transcribe(
+    ctx: JobContext,
+    youtube_processor,
+    youtube_url: str,
+    requesttitle,
+    *,
+    bulk: bool = False,
+    force_refresh: bool = False,
+):
+    """Download a video's audio and transcribe it while indexing (the Whisper path).
+
+    Returns (transcription, transcription_id, early conversation id, download metadata);
+    bulk ingestion opens no early conversation.  A forced refresh downloads and
+    transcribes again instead of using the cached audio and transcript.
+    """
+    # Captions were not enough: reserve the memory of the Whisper models now
+    await ctx.reserve_whisper(ctx.payload.get("model_size") or whisper_model_size(fast_mode=False))
+
+    # Process YouTube URL to get audio file (captions were already tried)
+    ctx.progress("download", 5)
+    audio_path, metadata = await ctx.run(
+        youtube_processor.process_youtube_url,
+        youtube_url,
+        use_captions=False,
+        force_refresh=force_refresh,
+    )
+    logger.info(f"Processed YouTube audio metadata: {metadata}")
+    if not audio_path:
+        raise JobFailed(
+            "تعذر تنزيل الفيديو. تأكد من أن الرابط صحيح والفيديو متاح."
+        )
+
+    async def open_conversation(transcription_id: str):
+        if bulk:
+            return None
+        # The first chunks are indexed: the conversation can already be used
+        conversation_id = await _create_youtube_conversation(
+            requesttitle or "درس إسلامي من يوتيوب", transcription_id
+        )
+        conversation_id = str(conversation_id) if conversation_id else None
+        await ctx.publish(
+            {
+                "success": True,
+                "partial": True,
+                "message": "جاري تحويل الفيديو، يمكنك طرح أسئلتك حول الجزء المعالج",
+                "transcription_id": transcription_id,
+                "conversation_id": conversation_id,
+                "title": requesttitle,
+            }
+        )
+        return conversation_id
+
+    # Transcribe the audio and store it for later retrieval as it goes
+    logger.info(f"Transcribing YouTube audio from {audio_path}...")
+    ctx.progress("transcribe", 15)
+    transcription, transcription_id, conversation_id = await _transcribe_while_indexing(
+        ctx,
+        audio_path,
+        open_conversation,
+        fast_mode=False,  # Use 'base' model for better accuracy
+        start=15,
+        end=88,
+        failure_message="تعذر تحويل الفيديو إلى نص. يرجى المحاولة مرة أخرى باستخدام فيديو آخر.",
+        force_refresh=force_refresh,
+    )
+
+    return transcription, transcription_id, conversation_id, metadata
+
+
+async def _run_youtube_job(ctx: JobContext, payload: dict) -> dict:
+    """Download, transcribe, vectorise and title a YouTube video."""
+    youtube_url = payload["youtube_url"]
+    video_id = payload["video_id"]
+    requesttitle = payload.get("title")
+    model_size = payload.get("model_size") or whisper_model_size(fast_mode=False)
+    # Playlist ingestion only fills the index; users open their own conversations
+    bulk = bool(payload.get("bulk"))
+    force_refresh = bool(payload.get("force_refresh"))
+
     youtube_processor = (
         None  # Define youtube_processor here to ensure it's available in finally block
     )
     try:
-        logger.info(f"Starting synchronous processing of YouTube video: {youtube_url}")
+        logger.info(f"Starting background processing of YouTube video: {youtube_url}")
 
         # Initialize YouTube processor
         youtube_processor = YouTubeProcessor()
 
-        # Process YouTube URL to get audio file
-        audio_path, metadata = youtube_processor.process_youtube_url(youtube_url)
-        logger.info(f"Processed YouTube audio metadata: {metadata}")
-        if not audio_path:
-            # No need to call cleanup here as it will be called in finally
-            return {
-                "error": "تعذر تنزيل الفيديو. تأكد من أن الرابط صحيح والفيديو متاح."
-            }
-
-        # Transcribe the audio
-        logger.info(f"Transcribing YouTube audio from {audio_path}...")
-
-        transcription = transcribe_uploaded_audio(
-            audio_path, fast_mode=False
-        )  # Use 'base' model for better accuracy
-
-        # Clean up the audio file (will be handled by finally)
-        # youtube_processor.cleanup() # Moved to finally
-
-        # Check for specific error messages from transcription
-        if "مساحة كافية على القرص" in transcription:
-            logger.error(
-                f"Disk space error during YouTube transcription: {transcription}"
+        # Captions first: a good enough track makes download and Whisper unnecessary
+        transcription = transcription_id = conversation_id = None
+        metadata = {}
+        if CAPTIONS_MODE not in ("0", "false", "no"):
+            ctx.progress("captions", 2)
+            transcription, transcription_id, caption_reason = await ctx.run(
+                vectorize_youtube_captions,
+                youtube_processor,
+                youtube_url,
+                video_id,
+                force_refresh=force_refresh,
             )
-            # youtube_processor.cleanup() # Ensure cleanup before raising
-            raise HTTPException(
-                status_code=507, detail=transcription
-            )  # Insufficient Storage
-        if "خطأ في تقسيم الملف" in transcription:
-            logger.error(
-                f"Audio splitting error during YouTube transcription: {transcription}"
+            caption_stats.record(transcription_id is not None, caption_reason)
+            if transcription_id is not None:
+                metadata["transcript_source"] = "captions"
+                logger.info(f"Indexed captions of {video_id} as {transcription_id}, skipping Whisper")
+
+        if transcription_id is None:
+            transcription, transcription_id, conversation_id, metadata = await _download_and_transcribe(
+                ctx,
+                youtube_processor,
+                youtube_url,
+                requesttitle,
+                bulk=bulk,
+                force_refresh=force_refresh,
             )
-            # youtube_processor.cleanup()
-            raise HTTPException(status_code=500, detail=transcription)
-        if (
-            not transcription
-            or transcription.strip() == ""
-            or "تعذر تحويل" in transcription
-            or "حدث خطأ" in transcription
-        ):
-            logger.error(f"YouTube transcription failed: {transcription}")
-            # youtube_processor.cleanup()
-            raise HTTPException(
-                status_code=500,
-                detail=(
-                    transcription
-                    if transcription and "تعذر تحويل" in transcription
-                    else "تعذر تحويل الفيديو إلى نص. يرجى المحاولة مرة أخرى باستخدام فيديو آخر."
-                ),
-            )
-            logger.error("YouTube transcription failed or returned empty result")
-            return {
-                "error": "تعذر تحويل الفيديو إلى نص. يرجى المحاولة مرة أخرى باستخدام فيديو آخر."
-            }
-
-        logger.info(f"Transcription successful. Length: {len(transcription)}")
 
-        # Store the transcription for later retrieval
-        transcription_id = vectorize_transcription_with_chroma(transcription)
-        logger.info(f"Transcription vectorized with ID: {transcription_id}")
+        logger.info(f"Transcription vectorized with ID: {transcription_id}, length: {len(transcription)}")
 
         # Extract the topic from the transcription to be used as a title
+        ctx.progress("title", 88)
         title = "درس إسلامي من يوتيوب"  # Default title
         try:
             # Get the user's language preference from headers or default to Arabic
             lang = "ar"  # Default to Arabic
-            generated_title = extract_topic_from_transcription(transcription, lang)
+            generated_title = await ctx.run(
+                extract_topic_from_transcription, transcription, lang
+            )
             if generated_title:
                 title = generated_title
             logger.info(f"Generated intelligent title from YouTube video: {title}")
         except Exception as e:
             logger.error(f"Error generating title from YouTube video: {e}")
 
-        # Create a conversation associated with this context
-        conversation_id = None
-        try:
-            from app.models.conversation import Conversation
-            from app.models.message import Message
-            from app.database import SessionLocal  # Using async session
-
-            async with SessionLocal() as db:
-                # Use fixed guest UUID for consistency
-                guest_user_uuid = uuid.UUID("00000000-0000-0000-0000-000000000001")
-                new_conversation = Conversation(
-                    user_id=guest_user_uuid,
-                    title=requesttitle or title,
-                    context_id=transcription_id,
-                )
-
-                db.add(new_conversation)
-                await db.commit()
-                await db.refresh(new_conversation)
-
-                conversation_id = new_conversation.id
-                logger.info(
-                    f"Conversation created automatically for YouTube: {conversation_id} with context_id: {transcription_id}"
-                )
-
-                # Add welcome message
-                welcome_question = ""
-                welcome_message_text = "تم استخراج محتوى الفيديو بنجاح يمكنك الآن طرح أسئلتك، وسأجيبك فقط من المعلومات الموجودة في هذا الفيديو."
-
-                welcome_message_obj = Message(
-                    conversation_id=conversation_id,
-                    user_id=None,  # Assistant messages now use NULL for user_id
-                    question=welcome_question,
-                    answer=welcome_message_text,
-                )
-
-                db.add(welcome_message_obj)
-                await db.commit()
-                logger.info(
-                    f"Welcome message added to YouTube conversation {conversation_id}"
-                )
-
-        except Exception as e:
-            logger.error(f"Error creating conversation automatically: {e}")
+        # Remember this video so repeat requests skip the whole pipeline
+        ctx.progress("conversation", 95)
+        await _record_processed_video(video_id, transcription_id, model_size, title)
+
+        # Create a conversation associated with this context, or give the
+        # early one its final title
+        if conversation_id:
+            if not requesttitle:
+                await _rename_conversation(conversation_id, title)
+        elif not bulk:
+            conversation_id = await _create_youtube_conversation(
+                requesttitle or title, transcription_id
+            )
 
         # Return success result
         topic = title  # Ensure topic is defined for the response
@@ -396,7 +795,7 @@ async def process_youtube(request: Request):
             "success": True,
             "message": "تم معالجة الفيديو بنجاح",
             "transcription_id": transcription_id,
-            "conversation_id": conversation_id,
+            "conversation_id": str(conversation_id) if conversation_id else None,
             "transcription_preview": (
                 transcription[:200] + "..."
                 if len(transcription) > 200
@@ -404,11 +803,20 @@ async def process_youtube(request: Request):
             ),
             "topic": topic,
             "title": requesttitle,  # Include the generated intelligent title
+            # Format, bytes, time to first byte and re-encode CPU of the download
+            "download": metadata.get("download"),
+            "transcript_source": metadata.get("transcript_source", "whisper"),
         }
-
-    except Exception as e:
-        logger.error(f"YouTube processing error: {e}")
-        return {"error": f"حدث خطأ أثناء معالجة فيديو يوتيوب: {str(e)}"}
     finally:
         if youtube_processor:
             youtube_processor.cleanup()
+
+
+job_queue.register(
+    "upload",
+    _run_upload_job,
+    whisper_model=lambda payload: whisper_model_size(fast_mode=True),
+)
+# Most videos are served from their captions: the Whisper memory is only
+# reserved when a job falls back to it (_download_and_transcribe)
+job_queue.register("youtube", _run_youtube_job)
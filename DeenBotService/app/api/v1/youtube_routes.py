@@ -10,6 +10,12 @@ import re
 import time
 from pathlib import Path
 
+from app.database import SessionLocal
+from app.dependencies.auth import TokenData, get_admin_user
+from app.dependencies.fatwallm_rag import whisper_model_size
+from app.dependencies.playlist_ingestion import playlist_ingestor
+from app.dependencies.youtube_index import job_key, youtube_index
+
 router = APIRouter()
 
 # Logger setup
@@ -34,6 +40,10 @@ class YouTubeSearchResponse(BaseModel):
     total_results: int
     next_page_token: Optional[str] = None
 
+class PlaylistIngestionRequest(BaseModel):
+    playlist_ids: Optional[List[str]] = None  # Default: all HASANIYA_PLAYLISTS
+    dry_run: bool = False
+
 # List of playlist IDs for الدروس الحسنية
 HASANIYA_PLAYLISTS = [
     'PLffkxBSUUPe2lDC0Ace2tY7njZ-MZW7Ai',  # Main playlist
@@ -223,6 +233,15 @@ async def fetch_videos_from_playlist(youtube, playlist_id: str) -> List[Dict[str
         return []
 
 
+async def fetch_playlists_videos(youtube, playlist_ids: List[str]) -> List[Dict[str, Any]]:
+    """Videos of all ``playlist_ids`` (cached playlist data), each video once"""
+    videos = {}
+    for playlist_id in playlist_ids:
+        for video in await fetch_videos_from_playlist(youtube, playlist_id):
+            videos.setdefault(video["id"], video)
+    return list(videos.values())
+
+
 @router.get("/search", response_model=YouTubeSearchResponse)
 async def search_youtube_videos(
     q: str = Query(..., description="Search query"),
@@ -383,3 +402,67 @@ async def get_video_details(
     except Exception as e:
         logger.error(f"Unexpected error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
+
+
+@router.post("/ingest-playlists")
+async def ingest_playlists(
+    request: Optional[PlaylistIngestionRequest] = None,
+    youtube = Depends(get_youtube_client),
+    admin: TokenData = Depends(get_admin_user)
+):
+    """
+    Transcribe and index every video of the Hasaniya playlists in the background,
+    so users opening a lesson get a conversation at once. Videos already indexed
+    are skipped; bulk jobs run a few at a time during off-peak hours.
+    Pass "dry_run": true to only list the videos that would be ingested.
+    """
+    request = request or PlaylistIngestionRequest()
+    if playlist_ingestor.is_running():
+        return {"started": False, **playlist_ingestor.status()}
+
+    videos = await fetch_playlists_videos(youtube, request.playlist_ids or HASANIYA_PLAYLISTS)
+    model_size = whisper_model_size(fast_mode=False)
+    async with SessionLocal() as db:
+        indexed = await youtube_index.indexed_video_ids(
+            db, (video["id"] for video in videos), model_size=model_size
+        )
+    jobs = [
+        (
+            video["id"],
+            job_key(video["id"], model_size),
+            {
+                "youtube_url": f"https://www.youtube.com/watch?v={video['id']}",
+                "video_id": video["id"],
+                "model_size": model_size,
+                "bulk": True,
+            },
+        )
+        for video in videos
+        if video["id"] not in indexed
+    ]
+    logger.info(
+        f"Playlist ingestion requested by {admin.sub}: {len(videos)} videos, "
+        f"{len(videos) - len(jobs)} already indexed"
+    )
+    if request.dry_run:
+        return {
+            "started": False,
+            "total": len(videos),
+            "skipped": len(videos) - len(jobs),
+            "video_ids": [video_id for video_id, _, _ in jobs],
+        }
+    started = playlist_ingestor.start(jobs, skipped=len(videos) - len(jobs))
+    return {"started": started, **playlist_ingestor.status()}
+
+
+@router.get("/ingest-playlists")
+async def get_playlist_ingestion(admin: TokenData = Depends(get_admin_user)):
+    """Progress of the current or last playlist ingestion"""
+    return playlist_ingestor.status()
+
+
+@router.delete("/ingest-playlists")
+async def stop_playlist_ingestion(admin: TokenData = Depends(get_admin_user)):
+    """Stop submitting playlist videos; jobs already submitted still finish"""
+    logger.info(f"Playlist ingestion stopped by {admin.sub}")
+    return {"stopped": playlist_ingestor.stop(), **playlist_ingestor.status()}
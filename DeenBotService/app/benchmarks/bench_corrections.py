@@ -0,0 +1,119 @@
+"""bench_corrections.py - Compare the compiled correction engine with the old loops.
+
+Builds a synthetic transcript of about 200k characters from Arabic lecture
+vocabulary (including every misrecognised spelling of the correction
+tables), cleans it with the previous ``clean_transcription`` implementation
+(one regex or replace pass per table entry and prayer context) and with
+``transcript_corrections.clean_transcription``, compares their output and
+reports the best time of each.  Pass a transcript file to
+benchmark real text instead.
+
+Run from ``DeenBotService``::
+
+    python -m app.benchmarks.bench_corrections --characters 200000
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import time
+from typing import Callable, Tuple
+
+from app.dependencies.transcript_corrections import (
+    ARABIC_CORRECTIONS,
+    ARABIC_PHRASES,
+    PRAYER_CONTEXTS,
+    clean_transcription,
+)
+
+FILLER_WORDS = ["في", "من", "على", "هذا", "الذي", "قال", "الله", "النبي", "محمد", "الرسول", "كان",
+                "الصلاة", "السلام", "الإسلام", "وسلم", "عليه", "يعني", "um", "[00:12.5]"]
+DELIMITERS = [" ", " ", " ", " ", " ", ". ", "، ", "؟ ", "\n"]
+
+
+def legacy_clean_transcription(text: str) -> str:
+    """``AudioProcessor.clean_transcription`` before the tables were compiled."""
+    if not text:
+        return text
+    text = re.sub(r'\b(um|uh|ah|like|you know)\b', '', text, flags=re.IGNORECASE)
+    text = re.sub(r'\s+', ' ', text).strip()
+    text = re.sub(r'\[[\d:.]+\]', '', text)
+    for phrase, correction in sorted(ARABIC_PHRASES.items(), key=lambda x: len(x[0]), reverse=True):
+        text = text.replace(phrase, correction)
+    for error, correction in ARABIC_CORRECTIONS.items():
+        pattern = r'\b' + re.escape(error) + r'\b'
+        text = re.sub(pattern, correction, text)
+    for context in PRAYER_CONTEXTS:
+        if context in text:
+            pattern = r'\b(سلام)\b(?=[^\n.،؟!]*\b' + re.escape(context) + r'\b)'
+            text = re.sub(pattern, "صلاة", text)
+            if context in text and "سلام" in text:
+                before_pattern = context + r'[^\n.،؟!]*سلام'
+                matches = re.findall(before_pattern, text)
+                for match in matches:
+                    fixed = match.replace("سلام", "صلاة")
+                    text = text.replace(match, fixed)
+    prophet_contexts = ["النبي", "محمد", "الرسول", "صلى", "وسلم"]
+    for context in prophet_contexts:
+        if context in text:
+            text = text.replace("صلى الله على", "صلى الله عليه")
+    text = text.replace("أُمة", "أمة")
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text
+
+
+def synthetic_transcript(characters: int, seed: int = 0) -> str:
+    """Random lecture-like text built from the table keys and common words."""
+    rng = random.Random(seed)
+    vocabulary = (
+        list(ARABIC_CORRECTIONS) + list(ARABIC_PHRASES) + PRAYER_CONTEXTS
+        + ["سلام", "سلى", "اللة", "علية", "صلى الله على", "أُمة"] + FILLER_WORDS * 3
+    )
+    parts, length = [], 0
+    while length < characters:
+        word = rng.choice(vocabulary)
+        parts.append(word)
+        parts.append(rng.choice(DELIMITERS))
+        length += len(word) + 1
+    return "".join(parts)
+
+
+def best_time(clean: Callable[[str], str], text: str, repeat: int) -> Tuple[float, str]:
+    best, result = float("inf"), ""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = clean(text)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("transcript", nargs="?", help="Transcript file (default: synthetic text)")
+    parser.add_argument("--characters", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.transcript:
+        with open(args.transcript, encoding="utf-8") as f:
+            text = f.read()
+    else:
+        text = synthetic_transcript(args.characters)
+
+    legacy_seconds, legacy_text = best_time(legacy_clean_transcription, text, args.repeat)
+    compiled_seconds, compiled_text = best_time(clean_transcription, text, args.repeat)
+    print(f"Transcript: {len(text)} characters")
+    print(f"Per-pattern loops: {legacy_seconds * 1000:.1f} ms")
+    print(f"Compiled engine:   {compiled_seconds * 1000:.1f} ms "
+          f"({legacy_seconds / max(compiled_seconds, 1e-9):.1f}x faster)")
+    print(f"Identical output:  {legacy_text == compiled_text}")
+    if legacy_text != compiled_text and legacy_text.replace("سلام", "صلاة") == compiled_text.replace("سلام", "صلاة"):
+        # The old loop's global str.replace misses an occurrence when one
+        # match is a substring of another
+        skipped = legacy_text.count("سلام") - compiled_text.count("سلام")
+        print(f"  only difference: {skipped} 'سلام' after a prayer word that the old loop left unchanged")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""bench_retrieval.py - Compare Chroma and numpy retrieval latency.
+
+For a transcription already in ``media_transcripts``, runs the same questions
+through Chroma's filtered similarity search and through the in-memory numpy
+index, and reports latency percentiles plus how many of Chroma's top-k chunks
+the numpy engine also returns.  Query embeddings are computed once up front
+so that only the search itself is timed.
+
+Run from the directory holding ``chroma_index``::
+
+    python -m app.benchmarks.bench_retrieval --transcription-id trans_xxx
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import time
+from typing import Dict, List
+
+from app.dependencies.embedding_registry import get_embeddings
+from app.dependencies.ingestion import TRANSCRIPTIONS_DIR
+from app.dependencies.numpy_index import numpy_index
+from app.dependencies.vector_store import vector_store
+
+DEFAULT_QUESTIONS = [
+    "ما هي أركان الإسلام؟",
+    "ما حكم الصلاة في السفر؟",
+    "كيف يكون الوضوء الصحيح؟",
+    "ما هي شروط الزكاة؟",
+    "ما فضل الصيام؟",
+    "What does the lecture say about patience?",
+]
+
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        "p50_ms": round(statistics.median(ordered) * 1000, 3),
+        "p95_ms": round(ordered[int(0.95 * (len(ordered) - 1))] * 1000, 3),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+    }
+
+
+def _largest_transcription() -> str:
+    files = [
+        os.path.join(TRANSCRIPTIONS_DIR, name)
+        for name in os.listdir(TRANSCRIPTIONS_DIR)
+        if name.endswith(".txt")
+    ]
+    if not files:
+        raise SystemExit(f"No transcriptions found in {TRANSCRIPTIONS_DIR}")
+    largest = max(files, key=os.path.getsize)
+    return os.path.basename(largest)[: -len(".txt")]
+
+
+def run(transcription_id: str, k: int, iterations: int) -> None:
+    embeddings = get_embeddings()
+    vectors = [embeddings.inner.embed_query(q) for q in DEFAULT_QUESTIONS]
+    collection = vector_store.get_collection()
+
+    start = time.perf_counter()
+    matrix = numpy_index.get(transcription_id)
+    cold_load = time.perf_counter() - start
+    if not len(matrix):
+        raise SystemExit(f"No vectors indexed for {transcription_id}")
+
+    chroma_times: List[float] = []
+    numpy_times: List[float] = []
+    overlap: List[float] = []
+    for _ in range(iterations):
+        for vector in vectors:
+            start = time.perf_counter()
+            chroma = collection.query(
+                query_embeddings=[vector],
+                n_results=k,
+                where={"transcription_id": transcription_id},
+                include=["metadatas"],
+            )
+            chroma_times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            hits = numpy_index.search(transcription_id, vector, k)
+            numpy_times.append(time.perf_counter() - start)
+
+            expected = {m["chunk_index"] for m in chroma["metadatas"][0]}
+            found = {metadata["chunk_index"] for _, metadata, _ in hits}
+            overlap.append(len(expected & found) / max(1, len(expected)))
+
+    print(f"transcription: {transcription_id} ({len(matrix)} chunks, k={k})")
+    print(f"numpy cold load: {cold_load * 1000:.1f} ms ({matrix.nbytes} bytes)")
+    print(f"chroma: {_percentiles(chroma_times)}")
+    print(f"numpy:  {_percentiles(numpy_times)}")
+    print(f"top-{k} overlap with chroma: {statistics.fmean(overlap):.3f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transcription-id", help="Defaults to the largest stored transcript")
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+    run(args.transcription_id or _largest_transcription(), args.k, args.iterations)
+
+
+if __name__ == "__main__":
+    main()
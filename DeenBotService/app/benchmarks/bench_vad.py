@@ -0,0 +1,112 @@
+"""bench_vad.py - Measure what VAD chunking skips and how much time it saves.
+
+For each audio file, transcribes the streamed decode twice with the same
+Whisper model: once in fixed 5-minute windows (the previous behaviour) and
+once in VAD chunks cut at pauses with long silences removed.  Reports the
+fraction of audio skipped and the wall-clock speed-up per file and over the
+whole corpus.  ``--skip-transcription`` only runs the segmentation, which
+is enough to measure the skipped fraction on a large corpus quickly.
+
+Run from ``DeenBotService``::
+
+    python -m app.benchmarks.bench_vad lectures/*.mp3 --model base
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Dict, Iterable, Tuple
+
+import numpy as np
+
+from app.dependencies.audio_stream import audio_decoder
+from app.dependencies.vad import VAD_READ_SECONDS, SpeechSegmenter
+from app.dependencies.whisper_pool import whisper_pool
+
+FIXED_WINDOW_SECONDS = 300.0
+
+
+def _timed_transcription(model, samples: Iterable[np.ndarray], language: str) -> Tuple[float, int]:
+    start = time.perf_counter()
+    characters = 0
+    for audio in samples:
+        if model is not None:
+            characters += len(model.transcribe(audio, language=language, fp16=False)["text"])
+    return time.perf_counter() - start, characters
+
+
+def bench_file(path: str, model, language: str) -> Dict[str, float]:
+    segmenter = SpeechSegmenter()
+    fixed_seconds, fixed_chars = _timed_transcription(
+        model,
+        (w.samples for w in audio_decoder.windows(path, FIXED_WINDOW_SECONDS)),
+        language,
+    )
+    vad_seconds, vad_chars = _timed_transcription(
+        model,
+        (c.samples for c in segmenter.chunks(audio_decoder.windows(path, VAD_READ_SECONDS))),
+        language,
+    )
+    stats = segmenter.stats()
+    return {
+        "audio_seconds": stats["audio_seconds"],
+        "speech_seconds": stats["speech_seconds"],
+        "skipped_fraction": stats["skipped_fraction"] or 0.0,
+        "fixed_wall_seconds": fixed_seconds,
+        "vad_wall_seconds": vad_seconds,
+        "fixed_characters": fixed_chars,
+        "vad_characters": vad_chars,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("files", nargs="+", help="Audio or video files of the corpus")
+    parser.add_argument("--model", default="base", help="Whisper model size")
+    parser.add_argument("--language", default="ar")
+    parser.add_argument(
+        "--skip-transcription",
+        action="store_true",
+        help="Only segment the audio (measures the skipped fraction, not the speed-up)",
+    )
+    args = parser.parse_args()
+
+    model = None if args.skip_transcription else whisper_pool.acquire(args.model)
+    totals = {"audio": 0.0, "speech": 0.0, "fixed": 0.0, "vad": 0.0}
+    try:
+        for path in args.files:
+            result = bench_file(path, model, args.language)
+            totals["audio"] += result["audio_seconds"]
+            totals["speech"] += result["speech_seconds"]
+            totals["fixed"] += result["fixed_wall_seconds"]
+            totals["vad"] += result["vad_wall_seconds"]
+            line = (
+                f"{path}: {result['audio_seconds']:.0f}s audio, "
+                f"{100 * result['skipped_fraction']:.1f}% skipped"
+            )
+            if model is not None:
+                speedup = result["fixed_wall_seconds"] / max(result["vad_wall_seconds"], 1e-9)
+                line += (
+                    f", fixed {result['fixed_wall_seconds']:.1f}s vs VAD "
+                    f"{result['vad_wall_seconds']:.1f}s ({speedup:.2f}x), "
+                    f"{result['fixed_characters']} vs {result['vad_characters']} characters"
+                )
+            print(line)
+    finally:
+        if model is not None:
+            whisper_pool.release(args.model)
+
+    if totals["audio"]:
+        print(
+            f"\nCorpus: {len(args.files)} files, {totals['audio'] / 3600:.2f}h audio, "
+            f"{100 * (1 - totals['speech'] / totals['audio']):.1f}% skipped"
+        )
+        if model is not None and totals["vad"]:
+            print(
+                f"Wall clock: fixed {totals['fixed']:.1f}s, VAD {totals['vad']:.1f}s, "
+                f"speed-up {totals['fixed'] / totals['vad']:.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
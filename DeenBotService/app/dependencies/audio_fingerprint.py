@@ -0,0 +1,147 @@
+"""audio_fingerprint.py - Cheap content fingerprints of audio files.
+
+The same lecture is often uploaded again under another filename, or
+re-encoded (MP4 -> MP3, another bitrate), so neither the filename nor a hash
+of the bytes identifies it.  ``compute_fingerprint`` decodes three short
+samples of the file (around 10%, 50% and 90% of its duration) to 8 kHz mono
+PCM and derives, every 50 ms, 8 bits that encode whether the energy
+difference between adjacent frequency bands rises or falls over time.  Those
+bits survive re-encoding, resampling and gain changes, while two different
+lectures disagree on about half of them; ``bit_error_rate`` compares two
+fingerprints, tolerating a small time shift.
+
+Typical usage::
+
+    from app.dependencies.audio_fingerprint import bit_error_rate, compute_fingerprint
+
+    fingerprint = compute_fingerprint(path)
+    same = abs(fingerprint.duration - other.duration) < 2 and bit_error_rate(
+        fingerprint.bits, other.bits
+    ) <= AUDIO_FINGERPRINT_MAX_BER
+"""
+from __future__ import annotations
+
+import logging
+import os
+import subprocess
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+
+from app.dependencies.audio_stream import ffmpeg_executable, probe_duration
+
+logger = logging.getLogger(__name__)
+
+# Constants
+# Seconds of audio decoded at each of the sampled positions
+AUDIO_FINGERPRINT_SAMPLE_SECONDS = float(os.getenv("AUDIO_FINGERPRINT_SAMPLE_SECONDS", "20"))
+# Fraction of differing bits below which two fingerprints are the same audio
+AUDIO_FINGERPRINT_MAX_BER = float(os.getenv("AUDIO_FINGERPRINT_MAX_BER", "0.3"))
+FINGERPRINT_RATE = 8000
+# Long overlapping frames keep the bits stable under small time shifts
+FRAME_SECONDS = 0.4
+HOP_SECONDS = 0.05
+# 9 log-spaced bands give 8 band differences: one byte per frame
+BANDS = 9
+MIN_HZ = 250.0
+MAX_HZ = 3500.0
+SAMPLE_POSITIONS = (0.1, 0.5, 0.9)
+# Frames of shift tried when comparing (encoder delay, trimmed padding)
+MAX_SHIFT_FRAMES = 2
+
+
+@dataclass
+class AudioFingerprint:
+    duration: float
+    # (frames, BANDS - 1) booleans
+    bits: np.ndarray
+
+    @property
+    def hex(self) -> str:
+        return np.packbits(self.bits.astype(bool), axis=1).tobytes().hex()
+
+    @classmethod
+    def from_hex(cls, duration: float, value: str) -> "AudioFingerprint":
+        packed = np.frombuffer(bytes.fromhex(value), dtype=np.uint8).reshape(-1, 1)
+        return cls(duration, np.unpackbits(packed, axis=1).astype(bool))
+
+
+def fingerprint_bits(samples: np.ndarray, rate: int = FINGERPRINT_RATE) -> np.ndarray:
+    """Sub-fingerprint bits of mono float ``samples``, one row per hop."""
+    frame = int(FRAME_SECONDS * rate)
+    hop = int(HOP_SECONDS * rate)
+    if len(samples) < frame + hop:
+        return np.zeros((0, BANDS - 1), dtype=bool)
+    count = 1 + (len(samples) - frame) // hop
+    indices = np.arange(frame)[None, :] + hop * np.arange(count)[:, None]
+    spectrum = np.abs(np.fft.rfft(samples[indices] * np.hanning(frame), axis=1)) ** 2
+    freqs = np.fft.rfftfreq(frame, 1.0 / rate)
+    edges = np.geomspace(MIN_HZ, MAX_HZ, BANDS + 1)
+    bands = np.stack(
+        [spectrum[:, (freqs >= low) & (freqs < high)].sum(axis=1) for low, high in zip(edges[:-1], edges[1:])],
+        axis=1,
+    )
+    energy = np.log(bands + 1e-10)
+    band_diff = energy[:, :-1] - energy[:, 1:]
+    return (band_diff[1:] - band_diff[:-1]) > 0
+
+
+def bit_error_rate(a: np.ndarray, b: np.ndarray, max_shift: int = MAX_SHIFT_FRAMES) -> float:
+    """Smallest fraction of differing bits of ``a`` and ``b`` over small time shifts."""
+    best = 1.0
+    for shift in range(-max_shift, max_shift + 1):
+        left = a[max(shift, 0):]
+        right = b[max(-shift, 0):]
+        overlap = min(len(left), len(right))
+        if overlap == 0:
+            continue
+        best = min(best, float(np.mean(left[:overlap] != right[:overlap])))
+    return best
+
+
+def _decode_sample(path: str, start: float, seconds: float) -> np.ndarray:
+    result = subprocess.run(
+        [
+            ffmpeg_executable(),
+            "-v", "error",
+            "-nostdin",
+            # Input seeking: only the sampled part is decoded
+            "-ss", f"{start:.2f}",
+            "-t", f"{seconds:.2f}",
+            "-i", path,
+            "-ac", "1",
+            "-ar", str(FINGERPRINT_RATE),
+            "-f", "s16le",
+            "-",
+        ],
+        capture_output=True,
+        check=True,
+        timeout=120,
+    )
+    return np.frombuffer(result.stdout, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def sample_starts(duration: float, seconds: float = AUDIO_FINGERPRINT_SAMPLE_SECONDS) -> List[float]:
+    """Start times of the decoded samples; the whole file if it is short."""
+    if duration <= seconds * len(SAMPLE_POSITIONS):
+        return [0.0]
+    return [max(0.0, duration * position - seconds / 2) for position in SAMPLE_POSITIONS]
+
+
+def compute_fingerprint(path: str) -> Optional[AudioFingerprint]:
+    """Fingerprint of the audio in ``path``, or ``None`` if it cannot be decoded."""
+    duration = probe_duration(path)
+    if not duration:
+        return None
+    starts = sample_starts(duration)
+    seconds = duration if starts == [0.0] else AUDIO_FINGERPRINT_SAMPLE_SECONDS
+    try:
+        parts = [fingerprint_bits(_decode_sample(path, start, seconds)) for start in starts]
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.warning(f"Could not fingerprint {path}: {e}")
+        return None
+    bits = np.concatenate(parts)
+    if not len(bits):
+        return None
+    return AudioFingerprint(duration, bits)
@@ -1,13 +1,35 @@
 import os
+import math
 import tempfile
 import whisper
-from pydub import AudioSegment
 import re
 import string
 import logging
-from typing import List, Dict, Any, Tuple, Optional
+from typing import List, Dict, Any, Tuple, Optional, Callable
 import uuid
 import subprocess # Added for CalledProcessError
+from concurrent.futures.process import BrokenProcessPool
+
+from app.dependencies.whisper_pool import whisper_pool
+from app.dependencies.transcription_pool import transcription_pool
+from app.dependencies.vad import VAD_ENABLED, VAD_READ_SECONDS, speech_segmenter
+from app.dependencies.audio_stream import (
+    AUDIO_STREAMING_DECODE,
+    AudioDecodeError,
+    audio_decoder,
+    ffmpeg_executable,
+    probe_duration,
+    source_fingerprint,
+)
+from app.dependencies.transcription_checkpoints import transcription_checkpoints
+from app.dependencies.transcript_corrections import clean_transcription
+from app.dependencies.language_id import (
+    AUTO_LANGUAGE,
+    LANGUAGE_ID_DEFAULT,
+    TRANSCRIBE_LANGUAGE,
+    detect_language,
+    language_stats,
+)
 
 # Configure logging
 
@@ -41,35 +63,60 @@ os.environ["FFPROBE_BINARY"] = os.path.join(ffmpeg_path, "ffprobe.exe")
 class AudioProcessor:
     """Audio processor class for handling audio transcription with chunking."""
     
-    def __init__(self, model_size: str = "base"):
+    def __init__(self, model_size: str = "base", progress_callback: Optional[Callable[[int, int], None]] = None,
+                 chunk_callback: Optional[Callable[[Dict[str, Any]], None]] = None):
         """
         Initialize the audio processor.
         
         Args:
             model_size: Size of the Whisper model to use ('tiny', 'base', 'small', 'medium', 'large')
+            progress_callback: Optional callable receiving (chunks_done, total_chunks) during transcription
+            chunk_callback: Optional callable receiving each chunk transcription as soon as it is done
         """
         self.model_size = model_size
+        self.progress_callback = progress_callback
+        self.chunk_callback = chunk_callback
         self.model = None
+        # Size of the model currently borrowed from the shared pool
+        self._borrowed_size = None
+        # Held around every decoding call on the shared model
+        self._model_lock = None
         self.temp_dir = None
+        # Fingerprint of the source being processed and the checkpoint run
+        # of the current chunk layout (see transcription_checkpoints)
+        self._source_fingerprint = None
+        self._checkpoint = None
         # Set chunk size to 5 minutes for efficient processing of longer files
         self.chunk_size_ms = 300000  # 5 minutes
         # Maximum audio duration supported (in hours)
         self.max_duration_hours = 3  # Support up to 3 hour videos
     
     def load_model(self):
-        """Load the Whisper model if not already loaded."""
+        """Borrow the Whisper model from the shared pool if not already borrowed."""
         if self.model is None:
-            logger.info(f"Loading {self.model_size} Whisper model...")
+            logger.info(f"Borrowing {self.model_size} Whisper model from pool...")
             try:
-                self.model = whisper.load_model(self.model_size)
-                logger.info(f"Model {self.model_size} loaded successfully")
+                self.model = whisper_pool.acquire(self.model_size)
+                self._borrowed_size = self.model_size
+                self._model_lock = whisper_pool.inference_lock(self.model_size)
+                logger.info(f"Model {self.model_size} ready")
             except Exception as e:
                 logger.error(f"Error loading model: {e}")
                 # Fall back to tiny model if the requested one fails
                 if self.model_size != "tiny":
                     logger.info("Falling back to tiny model")
                     self.model_size = "tiny"
-                    self.model = whisper.load_model("tiny")
+                    self.model = whisper_pool.acquire("tiny")
+                    self._borrowed_size = "tiny"
+                    self._model_lock = whisper_pool.inference_lock("tiny")
+    
+    def release_model(self):
+        """Return the borrowed Whisper model to the shared pool."""
+        if self._borrowed_size is not None:
+            whisper_pool.release(self._borrowed_size)
+            self._borrowed_size = None
+        self.model = None
+        self._model_lock = None
     
     def setup_temp_directory(self):
         """Create a temporary directory for audio chunks if needed."""
@@ -80,7 +127,10 @@ class AudioProcessor:
     
     def split_audio(self, audio_path: str) -> List[str]:
         """
-        Split an audio file into smaller chunks.
+        Split an audio file into smaller chunk files.
+        Files of every size go through the same single FFmpeg pass, so memory
+        stays bounded whatever the duration (pydub used to decode files under
+        100MB entirely into memory).
         
         Args:
             audio_path: Path to the audio file
@@ -101,74 +151,10 @@ class AudioProcessor:
                 logger.error(f"Audio file too small: {audio_path}")
                 return []
             
-            # For very large files, use direct FFmpeg chunking instead of loading into memory
-            # Check if file is very large (over 100MB)
-            is_large_file = os.path.getsize(audio_path) > 100 * 1024 * 1024  # 100MB
-            
-            if is_large_file:
-                logger.info("Large file detected. Using direct FFmpeg chunking instead of loading into memory")
-                return self._split_large_file_with_ffmpeg(audio_path, temp_dir)
-            
-            # For smaller files, use standard pydub approach
-            try:
-                audio = AudioSegment.from_file(audio_path)
-            except Exception as e:
-                logger.error(f"Error loading audio with pydub: {e}")
-                # Try to convert the file to a universal format first
-                unique_id = uuid.uuid4().hex[:8]
-                converted_path = os.path.join(temp_dir, f"converted_{unique_id}.wav")
-                
-                # Use ffmpeg directly
-                import subprocess
-                try:
-                    ffmpeg_cmd = [
-                        os.path.join(ffmpeg_path, "ffmpeg.exe"),
-                        "-i", audio_path,
-                        "-ar", "16000",  # Sample rate
-                        "-ac", "1",      # Mono
-                        "-c:a", "pcm_s16le",  # 16-bit PCM
-                        converted_path
-                    ]
-                    logger.info(f"Running FFmpeg command: {' '.join(ffmpeg_cmd)}")
-                    subprocess.run(ffmpeg_cmd, check=True)
-                    
-                    if os.path.exists(converted_path):
-                        logger.info(f"Successfully converted to {converted_path}")
-                        
-                        # For big files, use direct FFmpeg chunking
-                        if os.path.getsize(converted_path) > 100 * 1024 * 1024:  # 100MB
-                            return self._split_large_file_with_ffmpeg(converted_path, temp_dir)
-                        
-                        audio = AudioSegment.from_wav(converted_path)
-                    else:
-                        logger.error("Conversion failed, output file not created")
-                        return []
-                except Exception as conv_error:
-                    logger.error(f"FFmpeg conversion error: {conv_error}")
-                    return []
-            
-            logger.info(f"Audio duration: {len(audio)/1000} seconds")
-            
-            # Split the audio into chunks
-            chunk_paths = []
-            for i, start_time in enumerate(range(0, len(audio), self.chunk_size_ms)):
-                # Extract chunk
-                end_time = min(start_time + self.chunk_size_ms, len(audio))
-                chunk = audio[start_time:end_time]
-                
-                # Generate unique filename for the chunk
-                chunk_path = os.path.join(temp_dir, f"chunk_{i+1}_{uuid.uuid4().hex[:8]}.wav")
-                chunk.export(chunk_path, format="wav")
-                
-                # Verify the chunk was created successfully
-                if os.path.exists(chunk_path) and os.path.getsize(chunk_path) > 1000:
-                    chunk_paths.append(chunk_path)
-                    logger.info(f"Saved chunk {i+1}: {chunk_path}")
-                else:
-                    logger.warning(f"Failed to create valid chunk at {chunk_path}")
-            
-            return chunk_paths
+            return self._split_with_ffmpeg(audio_path, temp_dir)
             
+        except AudioSplittingError:
+            raise
         except Exception as e:
             if isinstance(e, OSError) and e.errno == 28:
                 logger.error(f"Disk space error during audio splitting: {e}")
@@ -181,9 +167,11 @@ class AudioProcessor:
                 logger.error(traceback.format_exc())
                 raise AudioSplittingError(f"Failed to split audio: {e}") from e
             
-    def _split_large_file_with_ffmpeg(self, audio_path: str, temp_dir: str) -> List[str]:
+    def _split_with_ffmpeg(self, audio_path: str, temp_dir: str) -> List[str]:
         """
-        Split large audio file using direct FFmpeg commands without loading into memory.
+        Split an audio file in a single FFmpeg pass without loading it into memory.
+        The source is opened and decoded once and the segment muxer writes
+        every chunk, instead of one seeking FFmpeg process per chunk.
         Optimized for very long videos (1-2 hours).
         
         Args:
@@ -194,157 +182,332 @@ class AudioProcessor:
             List of paths to the chunk files
         """
         import subprocess
+        import time
         
         try:
-            # First get duration with ffprobe
-            ffprobe_cmd = [
-                os.path.join(ffmpeg_path, "ffprobe.exe"),
-                "-v", "error",
-                "-show_entries", "format=duration",
-                "-of", "default=noprint_wrappers=1:nokey=1",
-                audio_path
-            ]
-            
-            result = subprocess.run(ffprobe_cmd, capture_output=True, text=True, check=True)
-            duration = float(result.stdout.strip())
-            logger.info(f"Audio duration from ffprobe: {duration} seconds")
+            # Duration comes from the shared ffprobe cache
+            duration = probe_duration(audio_path)
             
             # Verify the file is within our max duration
             max_duration_sec = self.max_duration_hours * 3600
-            if duration > max_duration_sec:
+            if duration and duration > max_duration_sec:
                 logger.warning(f"Audio duration ({duration} seconds) exceeds maximum supported duration ({max_duration_sec} seconds). Will process anyway but performance may be affected.")
             
-            # Calculate number of chunks
             chunk_duration_sec = self.chunk_size_ms / 1000  # Convert ms to seconds
-            num_chunks = max(1, int(duration / chunk_duration_sec) + 1)  # Add one to account for partial chunks
+            expected_chunks = math.ceil(duration / chunk_duration_sec) if duration else "?"
+            logger.info(f"Splitting audio into {expected_chunks} chunks of {chunk_duration_sec} seconds each in a single pass")
+            
+            # Unique prefix so several splits can share a directory
+            prefix = f"chunk_{uuid.uuid4().hex[:8]}_"
+            ffmpeg_cmd = [
+                ffmpeg_executable(),
+                "-nostdin",
+                "-loglevel", "error",
+                "-i", audio_path,
+                "-vn",
+                "-ar", "16000",  # Sample rate
+                "-ac", "1",      # Mono channel
+                "-c:a", "pcm_s16le",  # 16-bit PCM 
+                "-f", "segment",
+                "-segment_time", f"{chunk_duration_sec}",
+                "-reset_timestamps", "1",
+                "-y",             # Overwrite output files
+                os.path.join(temp_dir, f"{prefix}%04d.wav")
+            ]
             
-            logger.info(f"Splitting audio into {num_chunks} chunks of {chunk_duration_sec} seconds each")
+            start = time.perf_counter()
+            subprocess.run(ffmpeg_cmd, check=True, capture_output=True)
+            elapsed = time.perf_counter() - start
             
+            # Segment numbers are zero-padded, so name order is chunk order
             chunk_paths = []
-            for i in range(num_chunks):
-                start_time = i * chunk_duration_sec
-                
-                # Skip if we're past the end of the file
-                if start_time >= duration:
-                    break
-                    
-                # Generate unique chunk path
-                chunk_path = os.path.join(temp_dir, f"chunk_{i+1}_{uuid.uuid4().hex[:8]}.wav")
-                
-                # FFmpeg command to extract segment
-                ffmpeg_cmd = [
-                    os.path.join(ffmpeg_path, "ffmpeg.exe"),
-                    "-ss", f"{start_time}",
-                    "-t", f"{chunk_duration_sec}",
-                    "-i", audio_path,
-                    "-ar", "16000",  # Sample rate
-                    "-ac", "1",      # Mono channel
-                    "-c:a", "pcm_s16le",  # 16-bit PCM 
-                    "-y",             # Overwrite output files
-                    chunk_path
-                ]
-                
-                # Add progress logging
-                if i % 10 == 0 or i == num_chunks - 1:
-                    logger.info(f"Processing chunk {i+1}/{num_chunks} at timestamp {start_time:.2f}s")
-                
-                subprocess.run(ffmpeg_cmd, check=True)
-                
+            for name in sorted(n for n in os.listdir(temp_dir) if n.startswith(prefix)):
+                chunk_path = os.path.join(temp_dir, name)
                 # Verify the chunk was created successfully
-                if os.path.exists(chunk_path) and os.path.getsize(chunk_path) > 1000:
+                if os.path.getsize(chunk_path) > 1000:
                     chunk_paths.append(chunk_path)
-                    if i % 10 == 0 or i == num_chunks - 1:
-                        logger.info(f"Saved chunk {i+1}/{num_chunks}: {chunk_path}")
                 else:
                     logger.warning(f"Failed to create valid chunk at {chunk_path}")
             
+            audio_decoder.record_split(len(chunk_paths), elapsed)
+            logger.info(
+                f"Saved {len(chunk_paths)} chunks in {elapsed:.1f}s "
+                f"({len(chunk_paths) / elapsed if elapsed else 0:.2f} segments/sec)"
+            )
             return chunk_paths
             
         except subprocess.CalledProcessError as e:
-            logger.error(f"FFmpeg command failed during large file chunking: {e}")
+            logger.error(f"FFmpeg command failed during chunking: {e}")
             import traceback
             logger.error(traceback.format_exc())
             raise AudioSplittingError(f"FFmpeg command failed: {e.stderr.decode() if e.stderr else str(e)}") from e
         except Exception as e:
+            if isinstance(e, OSError) and e.errno == 28:
+                raise DiskSpaceError(f"No space left on device during audio splitting: {e}") from e
             logger.error(f"Error in direct FFmpeg chunking: {e}")
             import traceback
             logger.error(traceback.format_exc())
-            raise AudioSplittingError(f"Failed to split large audio file with FFmpeg: {e}") from e
+            raise AudioSplittingError(f"Failed to split audio file with FFmpeg: {e}") from e
     
-    def transcribe_chunks(self, chunk_paths: List[str], language: str = "ar") -> List[Dict[str, Any]]:
+    def _open_checkpoint(self, language: str, layout: str) -> None:
+        """Select the checkpoint run of the source for this chunk layout."""
+        self._checkpoint = None
+        if self._source_fingerprint:
+            self._checkpoint = transcription_checkpoints.open(
+                self._source_fingerprint, self.model_size, language, layout
+            )
+
+    def _resume_chunk(self, chunk_idx: int) -> Optional[Dict[str, Any]]:
+        """The checkpointed transcription of a chunk from an interrupted run, if any."""
+        if self._checkpoint is None:
+            return None
+        return self._checkpoint.get(chunk_idx)
+
+    def _chunk_settled(self, entry: Dict[str, Any], done: int, total_chunks: int) -> Dict[str, Any]:
+        """Checkpoint a finished chunk and report it (success or error) to the callbacks."""
+        if self._checkpoint is not None and not entry.get("resumed"):
+            self._checkpoint.save(entry)
+        if self.chunk_callback:
+            self.chunk_callback(entry)
+        if self.progress_callback:
+            self.progress_callback(done, total_chunks)
+        return entry
+
+    def _chunk_language(self, audio, language: str) -> Tuple[str, Optional[float]]:
+        """The language to decode a chunk in: ``language``, or the detected one for "auto"."""
+        if language != AUTO_LANGUAGE:
+            return language, None
+        try:
+            with self._model_lock:
+                detected, probability = detect_language(self.model, audio)
+        except Exception as e:
+            logger.warning(f"Language identification failed, decoding as {LANGUAGE_ID_DEFAULT}: {e}")
+            language_stats.record(None)
+            return LANGUAGE_ID_DEFAULT, None
+        language_stats.record(detected)
+        return detected, probability
+
+    def _transcribe_chunk(self, audio, chunk_idx: int, total_chunks: int, start_time: float,
+                          language: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Transcribe one chunk, given as a file path or a float32 16 kHz array.
+        Errors are recorded on the result so the chunk order is preserved.
+        """
+        resumed = self._resume_chunk(chunk_idx)
+        if resumed is not None:
+            return self._chunk_settled({**resumed, "resumed": True}, chunk_idx + 1, total_chunks)
+        try:
+            if chunk_idx % 5 == 0 or chunk_idx == total_chunks - 1:
+                logger.info(f"Transcribing chunk {chunk_idx+1}/{total_chunks} ({(chunk_idx+1)/total_chunks*100:.1f}%)")
+            
+            # Identify the language on a short prefix, then decode in it
+            chunk_language, probability = self._chunk_language(audio, language)
+            with self._model_lock:
+                result = self.model.transcribe(
+                    audio, 
+                    language=chunk_language,
+                    fp16=False,
+                    verbose=False
+                )
+            
+            # Periodic logging to show progress
+            if chunk_idx % 5 == 0 or chunk_idx == total_chunks - 1:
+                logger.info(f"Transcription successful for chunk {chunk_idx+1}. Length: {len(result['text'])}")
+            
+            entry = {
+                "chunk_index": chunk_idx,
+                "start_time": start_time,
+                "text": result["text"],
+                "metadata": {
+                    "language": chunk_language,
+                    "confidence": result.get("confidence", 0),
+                    **metadata
+                }
+            }
+            if probability is not None:
+                entry["metadata"]["language_probability"] = round(probability, 3)
+        except Exception as e:
+            logger.error(f"Error transcribing chunk {chunk_idx+1}/{total_chunks}: {e}")
+            # Add an empty result to maintain order
+            entry = {
+                "chunk_index": chunk_idx,
+                "start_time": start_time,
+                "text": "",
+                "error": str(e)
+            }
+        # Free memory after each chunk processing
+        import gc
+        gc.collect()
+        return self._chunk_settled(entry, chunk_idx + 1, total_chunks)
+
+    def _transcribe_parallel(self, chunks, total_chunks: int, language: str) -> List[Dict[str, Any]]:
+        """
+        Transcribe chunks in the worker process pool and reassemble them in
+        chunk_index order.
+        
+        Args:
+            chunks: Iterable of (chunk_index, audio, start_time, metadata)
+            total_chunks: Expected number of chunks, for progress reporting
+            language: Language code
+        """
+        chunk_info = {}
+        entries = {}
+
+        def items():
+            for chunk_idx, audio, start_time, metadata in chunks:
+                resumed = self._resume_chunk(chunk_idx)
+                if resumed is not None:
+                    # Finished before an interruption: no need for Whisper
+                    entries[chunk_idx] = {**resumed, "resumed": True}
+                    self._chunk_settled(entries[chunk_idx], len(entries), max(total_chunks, len(entries)))
+                    continue
+                chunk_info[chunk_idx] = (start_time, metadata)
+                yield chunk_idx, audio
+
+        def on_done(chunk_idx, result):
+            start_time, metadata = chunk_info.pop(chunk_idx)
+            if "error" in result:
+                entry = {
+                    "chunk_index": chunk_idx,
+                    "start_time": start_time,
+                    "text": "",
+                    "error": result["error"]
+                }
+            else:
+                entry = {
+                    "chunk_index": chunk_idx,
+                    "start_time": start_time,
+                    "text": result["text"],
+                    "metadata": {
+                        "language": result.get("language", language),
+                        "confidence": result.get("confidence", 0),
+                        "worker_pid": result.get("worker_pid"),
+                        **metadata
+                    }
+                }
+                if language == AUTO_LANGUAGE:
+                    probability = result.get("language_probability")
+                    language_stats.record(result.get("language") if probability is not None else None)
+                    if probability is not None:
+                        entry["metadata"]["language_probability"] = probability
+            entries[chunk_idx] = entry
+            done = len(entries)
+            if done % 5 == 0 or done == total_chunks:
+                logger.info(f"Transcribed {done}/{max(total_chunks, done)} chunks in parallel")
+            self._chunk_settled(entry, done, max(total_chunks, done))
+
+        transcription_pool.transcribe(self.model_size, language, items(), on_done)
+        return [entries[chunk_idx] for chunk_idx in sorted(entries)]
+
+    def transcribe_chunks(self, chunk_paths: List[str], language: str = TRANSCRIBE_LANGUAGE) -> List[Dict[str, Any]]:
         """
         Transcribe a list of audio chunks.
-        Optimized for handling a large number of chunks from long videos.
+        Chunks are fanned out to the worker process pool when parallel
+        transcription is enabled, and transcribed one by one otherwise.
         
         Args:
             chunk_paths: List of paths to audio chunks
-            language: Language code (default: ar for Arabic)
+            language: Language code, or "auto" to identify it per chunk
             
         Returns:
             List of transcription results with metadata
         """
-        self.load_model()
-        
         # Log total work to be done
         total_chunks = len(chunk_paths)
         logger.info(f"Beginning transcription of {total_chunks} audio chunks")
-        
-        # Process in batches of 10 chunks to reduce memory pressure and provide progress updates
-        batch_size = 10
+        chunk_seconds = self.chunk_size_ms / 1000
+        self._open_checkpoint(language, f"split-{chunk_seconds:g}")
+
+        if transcription_pool.enabled_for(self.model_size):
+            try:
+                return self._transcribe_parallel(
+                    (
+                        (chunk_idx, chunk_path, chunk_idx * chunk_seconds, {"chunk_path": chunk_path})
+                        for chunk_idx, chunk_path in enumerate(chunk_paths)
+                    ),
+                    total_chunks,
+                    language,
+                )
+            except BrokenProcessPool as e:
+                logger.error(f"Transcription workers unavailable, transcribing serially: {e}")
+
+        self.load_model()
         transcriptions = []
+        for chunk_idx, chunk_path in enumerate(chunk_paths):
+            transcriptions.append(self._transcribe_chunk(
+                chunk_path, chunk_idx, total_chunks, chunk_idx * chunk_seconds, language,
+                {"chunk_path": chunk_path}
+            ))
+        
+        return transcriptions
+
+    def _stream_chunks(self, audio_path: str, duration: Optional[float]):
+        """
+        Chunks of a streamed decode as (chunk_index, samples, start_time, metadata),
+        with the expected number of chunks (0 if the duration is unknown).
+        With VAD enabled, chunks end at pauses and long silences are dropped;
+        otherwise they are fixed chunk_size_ms windows.
+        """
+        if VAD_ENABLED:
+            expected_chunks = max(1, math.ceil(duration / speech_segmenter.target_seconds)) if duration else 0
+            chunks = (
+                (chunk.index, chunk.samples, chunk.start_time,
+                 {"end_time": chunk.end_time, "speech_seconds": round(chunk.speech_seconds, 2)})
+                for chunk in speech_segmenter.chunks(audio_decoder.windows(audio_path, VAD_READ_SECONDS))
+            )
+            return chunks, expected_chunks
+
+        window_seconds = self.chunk_size_ms / 1000
+        expected_chunks = max(1, math.ceil(duration / window_seconds)) if duration else 0
+        chunks = (
+            (window.index, window.samples, window.start_time,
+             {"end_time": window.start_time + window.duration})
+            for window in audio_decoder.windows(audio_path, window_seconds)
+        )
+        return chunks, expected_chunks
+
+    def transcribe_stream(self, audio_path: str, language: str = TRANSCRIBE_LANGUAGE) -> List[Dict[str, Any]]:
+        """
+        Decode the audio once with ffmpeg and transcribe it chunk by chunk,
+        without writing chunk files.
         
-        for batch_idx in range(0, len(chunk_paths), batch_size):
-            batch_end = min(batch_idx + batch_size, len(chunk_paths))
-            batch_chunks = chunk_paths[batch_idx:batch_end]
+        Args:
+            audio_path: Path to the audio or video file
+            language: Language code, or "auto" to identify it per chunk
             
-            logger.info(f"Processing batch {batch_idx//batch_size + 1} of {(len(chunk_paths)-1)//batch_size + 1} ({batch_idx+1}-{batch_end}/{len(chunk_paths)})")
+        Returns:
+            List of transcription results with metadata, as transcribe_chunks
             
-            for i, chunk_path in enumerate(batch_chunks):
-                chunk_idx = batch_idx + i
-                try:
-                    if chunk_idx % 5 == 0 or chunk_idx == len(chunk_paths) - 1:
-                        logger.info(f"Transcribing chunk {chunk_idx+1}/{len(chunk_paths)} ({(chunk_idx+1)/len(chunk_paths)*100:.1f}%)")
-                    
-                    # Attempt transcription with specified language
-                    result = self.model.transcribe(
-                        chunk_path, 
-                        language=language,
-                        fp16=False,
-                        verbose=False
-                    )
-                    
-                    # Create metadata
-                    chunk_time = chunk_idx * (self.chunk_size_ms / 1000)  # Convert to seconds
-                    
-                    # Add result to list
-                    transcriptions.append({
-                        "chunk_index": chunk_idx,
-                        "start_time": chunk_time,
-                        "text": result["text"],
-                        "metadata": {
-                            "language": language,
-                            "chunk_path": chunk_path,
-                            "confidence": result.get("confidence", 0)
-                        }
-                    })
-                    
-                    # Periodic logging to show progress
-                    if chunk_idx % 5 == 0 or chunk_idx == len(chunk_paths) - 1:
-                        logger.info(f"Transcription successful for chunk {chunk_idx+1}. Length: {len(result['text'])}")
-                    
-                    # Free memory after each chunk processing
-                    import gc
-                    gc.collect()
-                    
-                except Exception as e:
-                    logger.error(f"Error transcribing chunk {chunk_idx+1}/{len(chunk_paths)}: {e}")
-                    # Add an empty result to maintain order
-                    transcriptions.append({
-                        "chunk_index": chunk_idx,
-                        "start_time": chunk_idx * (self.chunk_size_ms / 1000),
-                        "text": "",
-                        "error": str(e)
-                    })
+        Raises:
+            AudioDecodeError: if ffmpeg cannot decode the file
+        """
+        duration = probe_duration(audio_path)
+        if VAD_ENABLED:
+            self._open_checkpoint(
+                language, f"vad-{speech_segmenter.target_seconds:g}-{speech_segmenter.max_seconds:g}"
+            )
+        else:
+            self._open_checkpoint(language, f"window-{self.chunk_size_ms / 1000:g}")
+        chunks, expected_chunks = self._stream_chunks(audio_path, duration)
+        logger.info(f"Streaming transcription of {audio_path} (~{expected_chunks or '?'} chunks, VAD {'on' if VAD_ENABLED else 'off'})")
+
+        if transcription_pool.enabled_for(self.model_size):
+            try:
+                # Only as many chunks as there are workers are decoded ahead
+                return self._transcribe_parallel(chunks, expected_chunks, language)
+            except BrokenProcessPool as e:
+                logger.error(f"Transcription workers unavailable, transcribing serially: {e}")
+                # The failed attempt consumed the stream; decode again
+                chunks, expected_chunks = self._stream_chunks(audio_path, duration)
+        
+        self.load_model()
+        transcriptions = []
+        for chunk_idx, samples, start_time, metadata in chunks:
+            # The duration is only an estimate; never report more than 100%
+            total_chunks = max(expected_chunks, chunk_idx + 1)
+            transcriptions.append(self._transcribe_chunk(
+                samples, chunk_idx, total_chunks, start_time, language, metadata
+            ))
         
         return transcriptions
     
@@ -373,6 +536,7 @@ class AudioProcessor:
     def clean_transcription(self, text: str) -> str:
         """
         Clean the transcription by removing noise and irrelevant content and correct common recognition errors.
+        The correction tables are compiled once (see transcript_corrections).
         
         Args:
             text: Raw transcription text
@@ -384,138 +548,17 @@ class AudioProcessor:
             return text
     
         logger.info("Starting transcription cleaning and correction")
-        
-        # Remove filler words and audio artifacts
-        text = re.sub(r'\b(um|uh|ah|like|you know)\b', '', text, flags=re.IGNORECASE)
-        
-        # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text).strip()
-        
-        # Remove any timestamps
-        text = re.sub(r'\[[\d:.]+\]', '', text)
-        
-        # Dictionary of common Arabic word corrections (misrecognized -> correct)
-        arabic_corrections = {
-            # Basic corrections for commonly misrecognized words
-            "دلس": "درس",
-            "سلى": "صلى",
-            "سلاة": "صلاة",
-            "سلام": "صلاة",  # Only when referring to prayer
-            "الله على": "الله عليه",
-            "أللة": "الله",
-            "اللة": "الله",
-            "هدا": "هذا",
-            "دالك": "ذلك",
-            "دلك": "ذلك",
-            "الدي": "الذي",
-            "هاده": "هذه",
-            "هادا": "هذا",
-            "طالب العلم": "طالب العلم",  # Ensure common phrases are preserved
-            "عن النبى": "عن النبي",
-            "صلى اللة علية وسلم": "صلى الله عليه وسلم",
-            "صلى الله علية": "صلى الله عليه",
-            "صلى الله على وسلم": "صلى الله عليه وسلم",
-            "صلى اللة": "صلى الله",
-            "السلة": "الصلاة",
-            "كدا": "كذا",
-            "كدلك": "كذلك",
-            
-            # Common religious terms
-            "الزكه": "الزكاة",
-            "زكه": "زكاة",
-            "حج": "حج",
-            "الرمدان": "رمضان",
-            "رمدان": "رمضان",
-            "رمظان": "رمضان",
-            "الرمظان": "رمضان",
-            "قرآن": "قرآن",
-            "القرأن": "القرآن",
-            "قرأن": "قرآن",
-            "سره": "سورة",
-            "الفاطحة": "الفاتحة",
-            "فاطحة": "فاتحة",
-            
-            # Grammatical corrections
-            "من هاده": "من هذه",
-            "إنه": "إنه",
-            "انه": "أنه",
-            "لاكن": "لكن",
-            "الاسلم": "الإسلام",
-            "اسلم": "إسلام",
-        }
-        
-        # Phrases that should always be corrected as a whole
-        arabic_phrases = {
-            "صلى الله عليه و سلم": "صلى الله عليه وسلم",
-            "صلى الله عليه وسلم": "صلى الله عليه وسلم",
-            "صلى الله عليه": "صلى الله عليه",
-            "عليه السلام": "عليه السلام",
-            "رضي الله عنه": "رضي الله عنه",
-            "رضي الله عنهما": "رضي الله عنهما",
-            "رضي الله عنها": "رضي الله عنها",
-            "الحمد لله": "الحمد لله",
-            "بسم الله": "بسم الله",
-            "بسم الله الرحمن الرحيم": "بسم الله الرحمن الرحيم",
-            "لا إله إلا الله": "لا إله إلا الله",
-            "الله أكبر": "الله أكبر",
-            "سبحان الله": "سبحان الله",
-            "استغفر الله": "استغفر الله",
-        }
-        
-        # First correct whole phrases (longer matches first)
-        for phrase, correction in sorted(arabic_phrases.items(), key=lambda x: len(x[0]), reverse=True):
-            text = text.replace(phrase, correction)
-        
-        # Then correct individual words
-        # We'll use word boundaries to avoid partial replacements
-        for error, correction in arabic_corrections.items():
-            pattern = r'\b' + re.escape(error) + r'\b'
-            text = re.sub(pattern, correction, text)
-        
-        # Contextual corrections
-        # For example, context-specific corrections for words that might be correct in some contexts 
-        # but incorrect in others
-        
-        # Correct "سلام" only when it should be "صلاة" (prayer context)
-        # (but preserve as "سلام" when it means "peace")
-        prayer_contexts = ["فرض", "أداء", "أوقات", "صلوات", "الفجر", "الظهر", "العصر", "المغرب", "العشاء", "الصبح"]
-        for context in prayer_contexts:
-            if context in text:
-                # Version simple et sûre sans lambda
-                pattern = r'\b(سلام)\b(?=[^\n.،؟!]*\b' + re.escape(context) + r'\b)'
-                text = re.sub(pattern, "صلاة", text)
-                
-                # Recherche de contexte suivi de سلام et remplacement direct
-                if context in text and "سلام" in text:
-                    # On recherche et on remplace sans utiliser lambda
-                    before_pattern = context + r'[^\n.،؟!]*سلام'
-                    matches = re.findall(before_pattern, text)
-                    for match in matches:
-                        fixed = match.replace("سلام", "صلاة")
-                        text = text.replace(match, fixed)
-        
-        # Fix "صلى الله على" to "صلى الله عليه" but only in prophet context
-        prophet_contexts = ["النبي", "محمد", "الرسول", "صلى", "وسلم"]
-        for context in prophet_contexts:
-            if context in text:
-                text = text.replace("صلى الله على", "صلى الله عليه")
-        
-        # Fix specific diacritical marks
-        text = text.replace("أُمة", "أمة")
-        
-        # Final cleaning for any double spaces created during corrections
-        text = re.sub(r'\s+', ' ', text).strip()
-        
+        text = clean_transcription(text)
         logger.info("Completed transcription cleaning and correction")
         return text
     
-    def process_audio_file(self, audio_path: str, language: str = "ar") -> Tuple[str, List[Dict]]:
+    def process_audio_file(self, audio_path: str, language: str = TRANSCRIBE_LANGUAGE) -> Tuple[str, List[Dict]]:
         """
-        Process an audio file: split, transcribe, and combine.
+        Process an audio file: decode (streamed, or split into chunk files), transcribe, and combine.
         
         Args:
             audio_path: Path to the audio file
-            language: Language code
+            language: Language code, or "auto" to identify it per chunk
             
         Returns:
             Tuple of (combined transcription, list of chunk transcriptions)
@@ -523,55 +566,88 @@ class AudioProcessor:
         # Log the start of processing
         logger.info(f"Starting audio processing for {audio_path} with language={language}")
         
-        # Split audio into chunks
-        try:
-            chunk_paths = self.split_audio(audio_path)
-        except DiskSpaceError as e:
-            logger.error(f"Disk space error processing {audio_path}: {e}")
-            # Re-raise to be caught by the API layer for a specific response
-            raise
-        except AudioSplittingError as e:
-            logger.error(f"Audio splitting error for {audio_path}: {e}")
-            # Re-raise to be caught by the API layer
-            raise
-        except Exception as e: # Catch any other unexpected errors during splitting
-            logger.error(f"Unexpected error during audio splitting for {audio_path}: {e}")
-            import traceback
-            logger.error(traceback.format_exc())
-            # Re-raise as a generic AudioProcessorError or a more specific one if identifiable
-            raise AudioSplittingError(f"An unexpected error occurred during audio splitting: {e}") from e
+        # Chunks finished by an interrupted run over the same source are reused
+        self._source_fingerprint = None
+        if transcription_checkpoints.enabled:
+            try:
+                self._source_fingerprint = source_fingerprint(audio_path)
+            except OSError as e:
+                logger.warning(f"Could not fingerprint {audio_path}; transcribing without checkpoints: {e}")
+        
+        # Decode once and stream PCM windows straight into Whisper; chunk
+        # files are only written if ffmpeg cannot stream the source
+        transcriptions = None
+        if AUDIO_STREAMING_DECODE:
+            try:
+                transcriptions = self.transcribe_stream(audio_path, language)
+            except AudioDecodeError as e:
+                logger.warning(f"Streaming decode failed for {audio_path}, falling back to chunk files: {e}")
+        
+        if transcriptions is None:
+            # Split audio into chunks
+            try:
+                chunk_paths = self.split_audio(audio_path)
+            except DiskSpaceError as e:
+                logger.error(f"Disk space error processing {audio_path}: {e}")
+                # Re-raise to be caught by the API layer for a specific response
+                raise
+            except AudioSplittingError as e:
+                logger.error(f"Audio splitting error for {audio_path}: {e}")
+                # Re-raise to be caught by the API layer
+                raise
+            except Exception as e: # Catch any other unexpected errors during splitting
+                logger.error(f"Unexpected error during audio splitting for {audio_path}: {e}")
+                import traceback
+                logger.error(traceback.format_exc())
+                # Re-raise as a generic AudioProcessorError or a more specific one if identifiable
+                raise AudioSplittingError(f"An unexpected error occurred during audio splitting: {e}") from e
 
-        if not chunk_paths: # Should ideally not be reached if errors are raised
-            logger.error(f"Audio splitting returned no chunks for {audio_path}, and no exception was raised. This indicates an unexpected state.")
-            # This case should be rare if exceptions are handled correctly above.
-            # However, to maintain a similar structure to before for this unlikely path:
-            return "Error: Failed to split audio file (unknown reason, no chunks produced)", []
+            if not chunk_paths: # Should ideally not be reached if errors are raised
+                logger.error(f"Audio splitting returned no chunks for {audio_path}, and no exception was raised. This indicates an unexpected state.")
+                # This case should be rare if exceptions are handled correctly above.
+                # However, to maintain a similar structure to before for this unlikely path:
+                return "Error: Failed to split audio file (unknown reason, no chunks produced)", []
         
-        logger.info(f"Split audio into {len(chunk_paths)} chunks")
+            logger.info(f"Split audio into {len(chunk_paths)} chunks")
         
-        # Transcribe each chunk
-        transcriptions = self.transcribe_chunks(chunk_paths, language)
+            # Transcribe each chunk
+            transcriptions = self.transcribe_chunks(chunk_paths, language)
         
         # Check if we got any valid transcriptions
         valid_transcriptions = [t for t in transcriptions if t.get("text", "").strip()]
         if not valid_transcriptions:
             logger.error("No valid transcriptions found in any chunks")
             
+            # Whisper's own loader decodes the whole file into memory, so the
+            # direct fallback is only worth it (and affordable) for short files
+            duration = probe_duration(audio_path)
+            if duration is None or duration > 2 * self.chunk_size_ms / 1000:
+                return "Error: Failed to transcribe audio", []
+            
             # Try direct transcription as a fallback
             try:
                 logger.info("Attempting direct transcription as fallback...")
                 self.load_model()
-                result = self.model.transcribe(
-                    audio_path, 
-                    language=language,
-                    fp16=False,
-                    verbose=True
-                )
+                with self._model_lock:
+                    result = self.model.transcribe(
+                        audio_path, 
+                        # None lets Whisper identify the language itself
+                        language=None if language == AUTO_LANGUAGE else language,
+                        fp16=False,
+                        verbose=True
+                    )
                 return result["text"], [{"text": result["text"], "direct": True}]
             except Exception as e:
                 logger.error(f"Direct transcription failed: {e}")
                 return "Error: Failed to transcribe audio", []
         
+        if self._checkpoint is not None and not any(t.get("error") for t in transcriptions):
+            # Complete: a retry of this source has nothing left to resume
+            self._checkpoint.discard()
+        return self._finish_transcription(transcriptions)
+
+    def _finish_transcription(self, transcriptions: List[Dict[str, Any]]) -> Tuple[str, List[Dict]]:
+        """Combine and clean chunk transcriptions into the final text."""
         # Combine and clean transcriptions
         combined_text = self.combine_transcriptions(transcriptions)
         cleaned_text = self.clean_transcription(combined_text)
@@ -586,8 +662,9 @@ class AudioProcessor:
         return cleaned_text, transcriptions
     
     def cleanup(self):
-        """Clean up temporary files and directories."""
+        """Clean up temporary files and directories and release the model."""
         import shutil
+        self.release_model()
         if self.temp_dir and os.path.exists(self.temp_dir):
             logger.info(f"Cleaning up temporary directory: {self.temp_dir}")
             shutil.rmtree(self.temp_dir, ignore_errors=True)
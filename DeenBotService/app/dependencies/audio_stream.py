@@ -0,0 +1,406 @@
+"""audio_stream.py - Decode audio with ffmpeg straight into Whisper-ready windows.
+
+The file-based path in ``AudioProcessor`` writes every 5-minute chunk to a
+WAV file and ``model.transcribe(path)`` then runs ffmpeg a second time to
+decode it again.  Here a single ffmpeg process decodes the source once to
+16 kHz mono PCM on stdout; a pump thread copies it into a bounded ring
+buffer and the consumer takes fixed-size float32 windows out of it, which
+``model.transcribe`` accepts directly.  Nothing touches the disk, and the
+ring buffer applies back-pressure to ffmpeg so memory stays bounded to the
+buffer plus the window being transcribed.
+
+Typical usage::
+
+    from app.dependencies.audio_stream import audio_decoder
+
+    for window in audio_decoder.windows(path, window_seconds=300):
+        result = model.transcribe(window.samples, language="ar", fp16=False)
+"""
+from __future__ import annotations
+
+import functools
+import hashlib
+import logging
+import os
+import shutil
+import subprocess
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Constants
+# Whisper models are trained on 16 kHz mono audio (whisper.audio.SAMPLE_RATE)
+SAMPLE_RATE = 16000
+AUDIO_STREAMING_DECODE = os.getenv("AUDIO_STREAMING_DECODE", "1").lower() not in ("0", "false", "no")
+AUDIO_STREAM_BUFFER_SECONDS = float(os.getenv("AUDIO_STREAM_BUFFER_SECONDS", "600"))
+# Trailing audio shorter than this is not worth a Whisper call
+MIN_WINDOW_SECONDS = 0.5
+DURATION_CACHE_SIZE = 256
+_READ_SIZE = 64 * 1024
+
+
+class AudioDecodeError(Exception):
+    """Raised when ffmpeg cannot decode the source audio."""
+    pass
+
+
+def _executable(env_var: str, name: str) -> str:
+    configured = os.environ.get(env_var)
+    if configured and os.path.exists(configured):
+        return configured
+    return shutil.which(name) or name
+
+
+def ffmpeg_executable() -> str:
+    """The ffmpeg binary configured for pydub, else the one on ``PATH``."""
+    return _executable("FFMPEG_BINARY", "ffmpeg")
+
+
+class DurationCache:
+    """Caches one ffprobe duration per file, keyed by path, size and mtime.
+
+    The streaming decoder, the chunk splitter and progress reporting all
+    need the duration of the same source; only the first asks ffprobe.
+    """
+
+    def __init__(self, max_entries: int = DURATION_CACHE_SIZE) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, int, int], float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.probes = 0
+        self.hits = 0
+
+    @staticmethod
+    def _key(audio_path: str) -> Tuple[str, int, int]:
+        stat = os.stat(audio_path)
+        return os.path.realpath(audio_path), stat.st_size, stat.st_mtime_ns
+
+    def _probe(self, audio_path: str) -> float:
+        result = subprocess.run(
+            [
+                _executable("FFPROBE_BINARY", "ffprobe"),
+                "-v", "error",
+                "-show_entries", "format=duration",
+                "-of", "default=noprint_wrappers=1:nokey=1",
+                audio_path,
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        return float(result.stdout.strip())
+
+    def get(self, audio_path: str) -> Optional[float]:
+        """Duration of ``audio_path`` in seconds, or ``None`` if ffprobe fails."""
+        try:
+            key = self._key(audio_path)
+        except OSError as e:
+            logger.warning(f"Could not stat {audio_path}: {e}")
+            return None
+        with self._lock:
+            duration = self._entries.get(key)
+            if duration is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return duration
+        try:
+            duration = self._probe(audio_path)
+        except (OSError, ValueError, subprocess.CalledProcessError) as e:
+            logger.warning(f"Could not probe duration of {audio_path}: {e}")
+            return None
+        with self._lock:
+            self.probes += 1
+            self._entries[key] = duration
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        logger.info(f"Audio duration from ffprobe: {duration} seconds ({audio_path})")
+        return duration
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "probes": self.probes, "hits": self.hits}
+
+
+durations = DurationCache()
+
+
+def probe_duration(audio_path: str) -> Optional[float]:
+    """Duration of ``audio_path`` in seconds according to ffprobe, if known."""
+    return durations.get(audio_path)
+
+
+@functools.lru_cache(maxsize=DURATION_CACHE_SIZE)
+def _file_sha256(realpath: str, size: int, mtime_ns: int, block_size: int) -> str:
+    digest = hashlib.sha256()
+    with open(realpath, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_fingerprint(path: str, block_size: int = 1024 * 1024) -> str:
+    """SHA-256 of the bytes of the media file at ``path``.
+
+    Memoised per path, size and mtime: the transcription id and the chunk
+    checkpoints of one job hash the same multi-hour file only once.
+    """
+    return _file_sha256(*DurationCache._key(path), block_size)
+
+
+class PCMRingBuffer:
+    """Bounded single-producer/single-consumer ring of int16 samples.
+
+    ``write`` blocks while the buffer is full and ``read`` blocks until the
+    requested number of samples is available or the producer has closed.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self._data = np.zeros(capacity, dtype=np.int16)
+        self._start = 0
+        self._size = 0
+        self._closed = False
+        self._cancelled = False
+        self._cond = threading.Condition()
+        self.high_water = 0
+
+    def __len__(self) -> int:
+        with self._cond:
+            return self._size
+
+    def write(self, samples: np.ndarray) -> bool:
+        """Append ``samples``; ``False`` if the consumer cancelled the stream."""
+        offset = 0
+        while offset < len(samples):
+            with self._cond:
+                while self._size == self.capacity and not self._cancelled:
+                    self._cond.wait()
+                if self._cancelled:
+                    return False
+                count = min(len(samples) - offset, self.capacity - self._size)
+                end = (self._start + self._size) % self.capacity
+                first = min(count, self.capacity - end)
+                self._data[end:end + first] = samples[offset:offset + first]
+                if count > first:
+                    self._data[:count - first] = samples[offset + first:offset + count]
+                self._size += count
+                self.high_water = max(self.high_water, self._size)
+                offset += count
+                self._cond.notify_all()
+        return True
+
+    def read(self, count: int) -> np.ndarray:
+        """Take up to ``count`` samples; fewer only once the producer closed."""
+        with self._cond:
+            while self._size < count and not self._closed:
+                self._cond.wait()
+            count = min(count, self._size)
+            first = min(count, self.capacity - self._start)
+            out = np.empty(count, dtype=np.int16)
+            out[:first] = self._data[self._start:self._start + first]
+            if count > first:
+                out[first:] = self._data[:count - first]
+            self._start = (self._start + count) % self.capacity
+            self._size -= count
+            self._cond.notify_all()
+            return out
+
+    def close(self) -> None:
+        """Producer is done; pending and future reads drain what is left."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def cancel(self) -> None:
+        """Consumer is done; unblocks and stops the producer."""
+        with self._cond:
+            self._cancelled = True
+            self._closed = True
+            self._cond.notify_all()
+
+
+@dataclass
+class AudioWindow:
+    index: int
+    start_time: float
+    samples: np.ndarray
+
+    @property
+    def duration(self) -> float:
+        return len(self.samples) / SAMPLE_RATE
+
+
+class StreamingDecoder:
+    """Runs ffmpeg decodes into ``PCMRingBuffer`` and yields float32 windows."""
+
+    def __init__(self, buffer_seconds: float = AUDIO_STREAM_BUFFER_SECONDS) -> None:
+        self.buffer_seconds = buffer_seconds
+        self._lock = threading.Lock()
+        self.streams = 0
+        self.failures = 0
+        self.windows_emitted = 0
+        self.seconds_decoded = 0.0
+        self.stream_seconds = 0.0
+        self.splits = 0
+        self.segments_written = 0
+        self.split_seconds = 0.0
+
+    def _command(self, audio_path: str) -> list:
+        return [
+            ffmpeg_executable(),
+            "-nostdin",
+            "-loglevel", "error",
+            "-i", audio_path,
+            "-vn",
+            "-ac", "1",
+            "-ar", str(SAMPLE_RATE),
+            "-f", "s16le",
+            "-acodec", "pcm_s16le",
+            "-",
+        ]
+
+    def _pump(self, process: subprocess.Popen, ring: PCMRingBuffer, errors: list) -> None:
+        leftover = b""
+        try:
+            while True:
+                data = process.stdout.read(_READ_SIZE)
+                if not data:
+                    break
+                data = leftover + data
+                usable = len(data) - len(data) % 2
+                leftover = data[usable:]
+                if not ring.write(np.frombuffer(data[:usable], dtype=np.int16)):
+                    break
+        except Exception as e:
+            errors.append(str(e))
+        finally:
+            ring.close()
+
+    def windows(self, audio_path: str, window_seconds: float) -> Iterator[AudioWindow]:
+        """Decode ``audio_path`` once and yield consecutive windows of audio.
+
+        Raises ``AudioDecodeError`` if ffmpeg fails before producing audio.
+        """
+        window_samples = int(window_seconds * SAMPLE_RATE)
+        capacity = max(int(self.buffer_seconds * SAMPLE_RATE), window_samples)
+        ring = PCMRingBuffer(capacity)
+        errors: list = []
+        started = time.perf_counter()
+        try:
+            process = subprocess.Popen(
+                self._command(audio_path),
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            )
+        except OSError as e:
+            with self._lock:
+                self.failures += 1
+            raise AudioDecodeError(f"Could not start ffmpeg: {e}") from e
+
+        pump = threading.Thread(
+            target=self._pump, args=(process, ring, errors), name="ffmpeg-pcm-pump", daemon=True
+        )
+        pump.start()
+        # Drain stderr concurrently so a noisy decode can never stall stdout
+        stderr_chunks: list = []
+        drain = threading.Thread(
+            target=lambda: stderr_chunks.extend(iter(lambda: process.stderr.read(4096), b"")),
+            name="ffmpeg-stderr-drain",
+            daemon=True,
+        )
+        drain.start()
+        with self._lock:
+            self.streams += 1
+
+        index = 0
+        total_samples = 0
+        try:
+            while True:
+                pcm = ring.read(window_samples)
+                if len(pcm) < MIN_WINDOW_SECONDS * SAMPLE_RATE:
+                    break
+                window = AudioWindow(
+                    index=index,
+                    start_time=total_samples / SAMPLE_RATE,
+                    samples=pcm.astype(np.float32) / 32768.0,
+                )
+                total_samples += len(pcm)
+                index += 1
+                with self._lock:
+                    self.windows_emitted += 1
+                    self.seconds_decoded += window.duration
+                yield window
+                if len(pcm) < window_samples:
+                    break
+
+            pump.join()
+            returncode = process.wait()
+            drain.join(timeout=5)
+            stderr = b"".join(stderr_chunks)[-2000:].decode(errors="replace").strip()
+            if returncode != 0 and index == 0:
+                raise AudioDecodeError(
+                    f"ffmpeg exited with code {returncode}: {stderr or '; '.join(errors)}"
+                )
+            if returncode != 0:
+                logger.warning(
+                    f"ffmpeg exited with code {returncode} after {index} windows of {audio_path}: {stderr}"
+                )
+        except AudioDecodeError:
+            with self._lock:
+                self.failures += 1
+            raise
+        finally:
+            ring.cancel()
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            pump.join(timeout=5)
+            for stream in (process.stdout, process.stderr):
+                if stream:
+                    stream.close()
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.stream_seconds += elapsed
+            logger.info(
+                f"Streamed {total_samples / SAMPLE_RATE:.1f}s of audio from {audio_path} "
+                f"in {index} windows ({elapsed:.1f}s, ring high-water "
+                f"{ring.high_water / SAMPLE_RATE:.1f}s of {capacity / SAMPLE_RATE:.0f}s)"
+            )
+
+    def record_split(self, segments: int, seconds: float) -> None:
+        """Account for a single-pass split into chunk files (see AudioProcessor)."""
+        with self._lock:
+            self.splits += 1
+            self.segments_written += segments
+            self.split_seconds += seconds
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": AUDIO_STREAMING_DECODE,
+                "buffer_seconds": self.buffer_seconds,
+                "streams": self.streams,
+                "failures": self.failures,
+                "windows": self.windows_emitted,
+                "audio_seconds": round(self.seconds_decoded, 1),
+                "wall_seconds": round(self.stream_seconds, 1),
+                "splits": self.splits,
+                "segments_written": self.segments_written,
+                "segments_per_second": (
+                    round(self.segments_written / self.split_seconds, 2)
+                    if self.split_seconds else None
+                ),
+                "durations": durations.stats(),
+            }
+
+
+audio_decoder = StreamingDecoder()
@@ -2,6 +2,7 @@ from fastapi import Request, Depends, HTTPException, status
 from jose import JWTError, jwt
 from pydantic import BaseModel
 import logging
+import os
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -10,6 +11,10 @@ logger = logging.getLogger(__name__)
 SECRET_KEY = "YOUR_SECRET_KEY_CHANGE_THIS_IN_PRODUCTION"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_COOKIE_NAME = "access_token"
+# User ids allowed on the admin endpoints (comma separated); empty = any signed-in user
+ADMIN_USER_IDS = {
+    user_id.strip() for user_id in os.getenv("ADMIN_USER_IDS", "").split(",") if user_id.strip()
+}
 
 class TokenData(BaseModel):
     sub: str
@@ -44,3 +49,13 @@ async def get_current_user(request: Request):
     except JWTError as e:
         logger.error(f"Authentication failed: JWT could not be decoded. Error: {e}")
         raise credentials_exception
+
+async def get_admin_user(current_user: TokenData = Depends(get_current_user)):
+    """
+    Dependency for the server-wide operations (bulk ingestion...): the signed-in
+    user must be listed in ADMIN_USER_IDS when that list is set.
+    """
+    if ADMIN_USER_IDS and current_user.sub not in ADMIN_USER_IDS:
+        logger.warning(f"Admin access denied to user {current_user.sub}")
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return current_user
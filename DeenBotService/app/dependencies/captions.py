@@ -0,0 +1,329 @@
+"""captions.py - YouTube subtitles as a transcript, without Whisper.
+
+Many lectures already carry captions, uploaded by the channel or generated
+by YouTube's own speech recognition.  ``YouTubeProcessor.fetch_captions``
+picks a track from the subtitle and automatic-caption listings of the
+yt-dlp info dict; this module parses it (WebVTT, or the srv1/srv3 XML
+timed-text formats) while it is being read, into timed ``CaptionSegment``
+objects.  WebVTT auto-captions repeat the previous line at the top of every
+cue to produce the roll-up effect; those repeats are dropped.
+
+``assess_captions`` decides whether a track is good enough to skip speech
+recognition: uploaded subtitles only need to cover part of the video,
+automatic captions must cover most of it, with a plausible speaking rate,
+little repetition or ``[Music]`` markers and text in the expected script.
+``caption_chunks`` groups accepted segments into the timed chunk entries
+``StreamingIngestor`` embeds, like Whisper's chunk transcriptions.
+
+Typical usage::
+
+    from app.dependencies.captions import (
+        assess_captions, caption_chunks, parse_captions, select_caption_track,
+    )
+
+    track = select_caption_track(info_dict)
+    segments = list(parse_captions(response, track["ext"]))
+    quality = assess_captions(segments, duration, automatic=True, language="ar")
+    if quality.accepted:
+        for entry in caption_chunks(segments, "ar"):
+            ingestor.submit(entry)
+"""
+from __future__ import annotations
+
+import codecs
+import html
+import logging
+import os
+import re
+import threading
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Constants
+# "0" never uses captions, "manual" only subtitles uploaded by the channel
+CAPTIONS_MODE = os.getenv("CAPTIONS_MODE", "auto").lower()
+CAPTION_LANGUAGES = [code.strip() for code in os.getenv("CAPTION_LANGUAGES", "ar,fr").split(",") if code.strip()]
+# Fraction of the video an automatic caption track has to cover
+CAPTION_MIN_COVERAGE = float(os.getenv("CAPTION_MIN_COVERAGE", "0.6"))
+CAPTION_MIN_MANUAL_COVERAGE = float(os.getenv("CAPTION_MIN_MANUAL_COVERAGE", "0.3"))
+CAPTION_MIN_WORDS_PER_MINUTE = float(os.getenv("CAPTION_MIN_WORDS_PER_MINUTE", "40"))
+CAPTION_MAX_WORDS_PER_MINUTE = 300.0
+CAPTION_MIN_DISTINCT_RATIO = 0.5
+CAPTION_MAX_MARKER_RATIO = 0.2
+CAPTION_MIN_SCRIPT_RATIO = 0.6
+# Seconds of captions per ingested chunk (as the VAD chunks of a transcription)
+CAPTION_CHUNK_SECONDS = 240.0
+# Track formats in order of preference
+CAPTION_FORMATS = ("vtt", "srv3", "srv1")
+
+_READ_SIZE = 64 * 1024
+_TIMING_RE = re.compile(r"((?:\d+:)?\d+:\d+[.,]\d+)\s+-->\s+((?:\d+:)?\d+:\d+[.,]\d+)")
+_TAG_RE = re.compile(r"<[^>]*>")
+_MARKER_RE = re.compile(r"^\s*[\[(][^\])]*[\])]\s*$")
+_ARABIC_LETTER_RE = re.compile(r"[ء-يٱ-ۓ]")
+_LATIN_LETTER_RE = re.compile(r"[A-Za-zÀ-ÿ]")
+_SCRIPTS = {"ar": _ARABIC_LETTER_RE, "fr": _LATIN_LETTER_RE, "en": _LATIN_LETTER_RE}
+
+
+class CaptionError(Exception):
+    """Raised when a caption track cannot be parsed."""
+
+
+@dataclass
+class CaptionSegment:
+    start: float
+    end: float
+    text: str
+
+
+@dataclass
+class CaptionTrack:
+    language: str
+    automatic: bool
+    ext: str
+    segments: List[CaptionSegment]
+    duration: Optional[float] = None
+
+
+@dataclass
+class CaptionQuality:
+    accepted: bool
+    reason: str
+    metrics: Dict[str, float] = field(default_factory=dict)
+
+
+def select_caption_track(
+    info: Dict[str, Any], languages: Iterable[str] = CAPTION_LANGUAGES, allow_automatic: bool = True
+) -> Optional[Dict[str, Any]]:
+    """The best caption track of a yt-dlp info dict, with its ``language`` and ``automatic`` flag.
+
+    Uploaded subtitles win over automatic captions, then ``languages`` order.
+    Automatic captions machine-translated from another language are skipped.
+    """
+    listings = [(False, info.get("subtitles") or {})]
+    if allow_automatic:
+        listings.append((True, info.get("automatic_captions") or {}))
+    for automatic, tracks in listings:
+        for language in languages:
+            keys = [key for key in tracks if key == language or key.startswith(language + "-")]
+            # The original-language recognition ("ar-orig") before regional variants
+            keys.sort(key=lambda key: (not key.endswith("-orig"), key != language, key))
+            for key in keys:
+                formats = [f for f in tracks[key] or [] if "tlang=" not in (f.get("url") or "")]
+                for ext in CAPTION_FORMATS:
+                    for track in formats:
+                        if track.get("ext") == ext and track.get("url"):
+                            return {**track, "language": language, "automatic": automatic}
+    return None
+
+
+def iter_lines(stream: Any, read_size: int = _READ_SIZE) -> Iterator[str]:
+    """Decoded lines of a binary stream, read in blocks."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending = ""
+    while True:
+        block = stream.read(read_size)
+        if not block:
+            break
+        pending += decoder.decode(block)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+def _seconds(timestamp: str) -> float:
+    parts = timestamp.replace(",", ".").split(":")
+    seconds = 0.0
+    for part in parts:
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+
+def _cue_text(line: str) -> str:
+    return html.unescape(_TAG_RE.sub("", line)).strip()
+
+
+def parse_vtt(lines: Iterable[str]) -> Iterator[CaptionSegment]:
+    """Segments of a WebVTT track, without the roll-up repeats of auto-captions."""
+    start = end = None
+    cue_lines: List[str] = []
+    previous_line = None
+
+    def flush() -> Optional[CaptionSegment]:
+        nonlocal previous_line
+        new_lines = []
+        for text in cue_lines:
+            if text and text != previous_line:
+                new_lines.append(text)
+                previous_line = text
+        if start is None or not new_lines:
+            return None
+        return CaptionSegment(start, end, " ".join(new_lines))
+
+    for line in lines:
+        timing = _TIMING_RE.search(line)
+        if timing:
+            segment = flush()
+            if segment is not None:
+                yield segment
+            start, end = _seconds(timing.group(1)), _seconds(timing.group(2))
+            cue_lines = []
+        elif not line:
+            # Only an empty line ends a cue; auto-captions pad cues with " "
+            segment = flush()
+            if segment is not None:
+                yield segment
+            start, cue_lines = None, []
+        elif start is not None:
+            cue_lines.append(_cue_text(line))
+    segment = flush()
+    if segment is not None:
+        yield segment
+
+
+def parse_srv(stream: Any) -> Iterator[CaptionSegment]:
+    """Segments of a YouTube timed-text XML track (srv1 seconds or srv3 milliseconds)."""
+    try:
+        for _, element in ET.iterparse(stream, events=("end",)):
+            if element.tag == "text":
+                start = float(element.get("start", 0))
+                end = start + float(element.get("dur", 0))
+            elif element.tag == "p":
+                start = float(element.get("t", 0)) / 1000
+                end = start + float(element.get("d", 0)) / 1000
+            else:
+                continue
+            text = html.unescape(" ".join("".join(element.itertext()).split()))
+            element.clear()
+            if text:
+                yield CaptionSegment(start, end, text)
+    except ET.ParseError as e:
+        raise CaptionError(f"Invalid timed-text XML: {e}") from e
+
+
+def parse_captions(stream: Any, ext: str) -> Iterator[CaptionSegment]:
+    """Segments of a caption track read from a binary ``stream``."""
+    if ext == "vtt":
+        return parse_vtt(iter_lines(stream))
+    if ext in ("srv1", "srv2", "srv3"):
+        return parse_srv(stream)
+    raise CaptionError(f"Unsupported caption format: {ext}")
+
+
+def _covered_seconds(segments: List[CaptionSegment]) -> float:
+    covered, reach = 0.0, 0.0
+    for segment in sorted(segments, key=lambda s: s.start):
+        start = max(segment.start, reach)
+        if segment.end > start:
+            covered += segment.end - start
+        reach = max(reach, segment.end)
+    return covered
+
+
+def assess_captions(
+    segments: List[CaptionSegment],
+    duration: Optional[float],
+    *,
+    automatic: bool,
+    language: str,
+) -> CaptionQuality:
+    """Whether a caption track is good enough to skip speech recognition."""
+    if not segments:
+        return CaptionQuality(False, "empty")
+    duration = duration or max(segment.end for segment in segments)
+    texts = [segment.text for segment in segments]
+    words = sum(len(text.split()) for text in texts)
+    joined = "".join(texts)
+    letters = len(re.findall(r"\w", joined))
+    script = _SCRIPTS.get(language.split("-")[0])
+    metrics = {
+        "coverage": round(min(1.0, _covered_seconds(segments) / duration), 3) if duration else 0.0,
+        "words_per_minute": round(words / (duration / 60), 1) if duration else 0.0,
+        "distinct_ratio": round(len(set(texts)) / len(texts), 3),
+        "marker_ratio": round(sum(1 for text in texts if _MARKER_RE.match(text)) / len(texts), 3),
+        "script_ratio": round(len(script.findall(joined)) / letters, 3) if script and letters else 1.0,
+    }
+    min_coverage = CAPTION_MIN_COVERAGE if automatic else CAPTION_MIN_MANUAL_COVERAGE
+    if metrics["coverage"] < min_coverage:
+        return CaptionQuality(False, "coverage", metrics)
+    if metrics["script_ratio"] < CAPTION_MIN_SCRIPT_RATIO:
+        return CaptionQuality(False, "script", metrics)
+    if automatic:
+        if not CAPTION_MIN_WORDS_PER_MINUTE <= metrics["words_per_minute"] <= CAPTION_MAX_WORDS_PER_MINUTE:
+            return CaptionQuality(False, "speaking_rate", metrics)
+        if metrics["distinct_ratio"] < CAPTION_MIN_DISTINCT_RATIO:
+            return CaptionQuality(False, "repetition", metrics)
+        if metrics["marker_ratio"] > CAPTION_MAX_MARKER_RATIO:
+            return CaptionQuality(False, "markers", metrics)
+    return CaptionQuality(True, "ok", metrics)
+
+
+def caption_chunks(
+    segments: Iterable[CaptionSegment], language: str, chunk_seconds: float = CAPTION_CHUNK_SECONDS
+) -> Iterator[Dict[str, Any]]:
+    """Chunk entries (as ``AudioProcessor`` produces them) of about ``chunk_seconds`` each."""
+    chunk_index = 0
+    texts: List[str] = []
+    start = end = None
+    for segment in segments:
+        if _MARKER_RE.match(segment.text):
+            continue
+        if start is None:
+            start = segment.start
+        texts.append(segment.text)
+        end = segment.end
+        if end - start >= chunk_seconds:
+            yield _entry(chunk_index, start, end, texts, language)
+            chunk_index, texts, start = chunk_index + 1, [], None
+    if texts:
+        yield _entry(chunk_index, start, end, texts, language)
+
+
+def _entry(chunk_index: int, start: float, end: float, texts: List[str], language: str) -> Dict[str, Any]:
+    return {
+        "chunk_index": chunk_index,
+        "start_time": start,
+        "text": " ".join(texts),
+        "metadata": {"end_time": end, "language": language, "source": "captions"},
+    }
+
+
+class CaptionStats:
+    """How many YouTube jobs were served from captions instead of Whisper."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.jobs = 0
+        self.served = 0
+        self.unavailable = 0
+        self.rejected: Dict[str, int] = {}
+
+    def record(self, served: bool, reason: str = "ok") -> None:
+        with self._lock:
+            self.jobs += 1
+            if served:
+                self.served += 1
+            elif reason == "unavailable":
+                self.unavailable += 1
+            else:
+                self.rejected[reason] = self.rejected.get(reason, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "mode": CAPTIONS_MODE,
+                "jobs": self.jobs,
+                "served_without_whisper": self.served,
+                "served_ratio": round(self.served / self.jobs, 3) if self.jobs else 0.0,
+                "unavailable": self.unavailable,
+                "rejected": dict(self.rejected),
+            }
+
+
+caption_stats = CaptionStats()
@@ -6,11 +6,14 @@ import nltk
 import numpy as np
 from typing import List, Dict, Any, Optional, Tuple, Union
 from pathlib import Path
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import Chroma
 from sklearn.metrics.pairwise import cosine_similarity
 from collections import Counter
 
+from app.dependencies.embedding_registry import get_embeddings
+from app.dependencies.lexical_index import bm25_rank
+from app.dependencies.retrieval import search_transcription
+from app.dependencies.vector_store import CHROMA_DIR, vector_store
+
 # Initialiser NLTK (télécharger si nécessaire)
 try:
     nltk.data.find("tokenizers/punkt")
@@ -70,15 +73,13 @@ def get_context_by_id(
         # Si le fichier n'existe pas directement, interroger ChromaDB
         logger.info("Initialisation des embeddings pour la recherche")
         try:
-            embeddings = HuggingFaceEmbeddings(
-                model_name="sentence-transformers/all-MiniLM-L6-v2"
-            )
+            embeddings = get_embeddings()
         except Exception as e:
             logger.error(f"Erreur lors de l'initialisation des embeddings: {e}")
             # Essayer une alternative avec un modèle plus léger si disponible
             try:
-                embeddings = HuggingFaceEmbeddings(
-                    model_name="sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+                embeddings = get_embeddings(
+                    "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
                 )
             except Exception as e2:
                 logger.error(f"Erreur avec le modèle alternatif d'embeddings: {e2}")
@@ -89,17 +90,13 @@ def get_context_by_id(
         )
         try:
             # Vérifier si le répertoire existe
-            chroma_dir = Path("chroma_index")
+            chroma_dir = Path(CHROMA_DIR)
             if not chroma_dir.exists():
                 logger.error(f"Répertoire ChromaDB inexistant: {chroma_dir}")
                 return ""
 
-            # Charger la collection Chroma
-            store = Chroma(
-                persist_directory=str(chroma_dir),
-                collection_name="media_transcripts",
-                embedding_function=embeddings,
-            )
+            # Réutiliser la collection Chroma partagée
+            store = vector_store.get_store(embeddings=embeddings)
 
             # Effectuer une recherche avec filtre sur le context_id
             results = store.get(
@@ -309,99 +306,19 @@ def semantic_chunking(
     return chunks
 
 
-def calculate_keyword_score(
-    text: str, keywords: List[str], lang_code: str = "fr"
-) -> float:
-    """
-    Calcule un score basé sur la présence de mots-clés dans le texte.
-    Utilise une pondération avancée avec des bonus pour les mots adjacents.
-    """
-    if not text or not keywords:
-        return 0
-
-    text_lower = text.lower()
-    score = 0
-
-    # Score pour chaque occurrence de mot-clé
-    for keyword in keywords:
-        count = text_lower.count(keyword.lower())
-        if count > 0:
-            # Pondération logarithmique pour éviter qu'un seul mot très fréquent domine le score
-            score += 1 + 0.5 * np.log1p(count)
-
-    # Bonus pour les mots consécutifs (phrases ou expressions complètes)
-    for i in range(len(keywords) - 1):
-        bigram = f"{keywords[i]} {keywords[i+1]}".lower()
-        if bigram in text_lower:
-            score += 2  # Bonus important pour les bigrammes exacts
-
-    # Normaliser le score par la longueur du texte (pour éviter de favoriser les textes très longs)
-    # Mais utiliser une racine carrée pour que cette normalisation ne soit pas trop sévère
-    words_count = len(text.split())
-    if words_count > 0:
-        normalization_factor = (
-            np.sqrt(words_count) / 10
-        )  # Division par 10 pour garder des scores raisonnables
-        score = score / normalization_factor
-
-    return score
-
-
-def extract_keywords_from_question(question: str, lang_code: str = "fr") -> List[str]:
-    """
-    Extrait les mots-clés importants d'une question en filtrant les mots vides.
-    """
-    if not question:
-        return []
-
-    # Normaliser la question
-    question = question.lower()
-
-    # Récupérer les stopwords pour la langue
-    stopwords = get_stopwords(lang_code)
-
-    # Tokeniser et filtrer
-    question_words = question.split()
-    # Nettoyer les mots (enlever ponctuation) et filtrer les stopwords
-    keywords = []
-    for word in question_words:
-        cleaned_word = re.sub(r'[?,.!;:()\[\]{}"\'-_]', "", word).strip()
-        if (
-            cleaned_word
-            and len(cleaned_word) > 1
-            and cleaned_word.lower() not in stopwords
-        ):
-            keywords.append(cleaned_word)
-
-    return keywords
-
-
 def rank_chunks_by_relevance(
     question: str, chunks: List[str], lang_code: str = "fr"
 ) -> List[Tuple[float, str]]:
     """
-    Classe les chunks de texte par pertinence par rapport à la question.
+    Classe les chunks de texte par pertinence (score BM25) par rapport à la question.
+    Réservé aux petites listes de passages : pour une transcription complète,
+    utiliser `retrieval.search_transcription` qui s'appuie sur l'index lexical persistant.
     """
     if not question or not chunks:
         return []
 
-    # Extraire les mots-clés de la question
-    keywords = extract_keywords_from_question(question, lang_code)
-    if not keywords:
-        # Si aucun mot-clé n'est extrait, utiliser tous les mots de la question
-        keywords = [w for w in question.lower().split() if len(w) > 1]
-
-    # Calculer le score pour chaque chunk
-    scored_chunks = []
-    for chunk in chunks:
-        if chunk:
-            score = calculate_keyword_score(chunk, keywords, lang_code)
-            scored_chunks.append((score, chunk))
-
-    # Trier par score décroissant
-    scored_chunks.sort(reverse=True)
-
-    return scored_chunks
+    texts = [chunk for chunk in chunks if chunk]
+    return [(score, texts[position]) for score, position in bm25_rank(question, texts)]
 
 
 def answer_from_context_only(
@@ -660,22 +577,21 @@ def get_answer_from_context(
         Réponse générée à partir du contexte, ou un tuple (réponse, sources) si return_sources=True
     """
     try:
-        # 1. Récupérer le contexte complet
-        context = get_context_by_id(context_id)
-        if not context:
-            return "Désolé, je n'ai pas pu trouver de contexte pour cette question."
-
-        # 2. Découper le contexte en chunks sémantiques
-        chunks = semantic_chunking(context)
-        if not chunks:
-            chunks = [context]  # Fallback si le chunking échoue
-
-        # 3. Trouver les chunks les plus pertinents
-        scored_chunks = rank_chunks_by_relevance(question, chunks, lang_code)
-        relevant_chunks = [chunk for score, chunk in scored_chunks if score > 0][:3]
+        # 1. Trouver les chunks les plus pertinents en un seul appel
+        #    (recherche hybride dense + BM25 fusionnée par RRF)
+        relevant_chunks = [
+            doc.page_content
+            for doc in search_transcription(question, context_id, k=3, engine="hybrid")
+            if doc.page_content
+        ]
 
         if not relevant_chunks:
-            relevant_chunks = chunks[:2]  # Fallback
+            # 2. Contexte non indexé : se rabattre sur le début de la transcription
+            context = get_context_by_id(context_id)
+            if not context:
+                return "Désolé, je n'ai pas pu trouver de contexte pour cette question."
+            chunks = semantic_chunking(context)
+            relevant_chunks = chunks[:2] if chunks else [context]
 
         # 4. Générer une réponse
         if use_llm:
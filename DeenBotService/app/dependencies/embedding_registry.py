@@ -0,0 +1,271 @@
+"""embedding_registry.py - Process-wide registry of sentence-embedding models.
+
+Every retrieval path (vectorisation, passage retrieval, context lookup and
+the RAG retriever) used to build its own ``HuggingFaceEmbeddings`` instance,
+paying the model load on every question.  This module keeps a single,
+lazily-initialised instance per ``(model_name, device)`` pair and wraps it so
+that load time and per-call encode latency are recorded.  Query embeddings go
+through a bounded LRU keyed by the normalised question text, since repeated
+and suggested questions are common.
+
+Typical usage::
+
+    from app.dependencies.embedding_registry import get_embeddings
+
+    embeddings = get_embeddings()
+    vector = embeddings.embed_query("ما هي أركان الإسلام؟")
+"""
+from __future__ import annotations
+
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+from langchain_community.embeddings import HuggingFaceEmbeddings
+
+logger = logging.getLogger(__name__)
+
+# Constants
+EMBEDDING_MODEL_NAME = os.getenv(
+    "EMBEDDING_MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2"
+)
+EMBEDDING_DEVICE = os.getenv("EMBEDDING_DEVICE", "cpu")
+QUERY_CACHE_SIZE = int(os.getenv("EMBEDDING_QUERY_CACHE_SIZE", "2048"))
+QUERY_CACHE_TTL_SECONDS = float(os.getenv("EMBEDDING_QUERY_CACHE_TTL_SECONDS", "3600"))
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+class LatencyStats:
+    """Thread-safe running statistics for a timed operation."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.items = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.last_seconds = 0.0
+
+    def record(self, seconds: float, items: int = 1) -> None:
+        with self._lock:
+            self.calls += 1
+            self.items += items
+            self.total_seconds += seconds
+            self.last_seconds = seconds
+            if seconds > self.max_seconds:
+                self.max_seconds = seconds
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            mean_ms = (self.total_seconds / self.calls * 1000) if self.calls else 0.0
+            return {
+                "calls": self.calls,
+                "items": self.items,
+                "mean_ms": round(mean_ms, 3),
+                "max_ms": round(self.max_seconds * 1000, 3),
+                "last_ms": round(self.last_seconds * 1000, 3),
+            }
+
+
+def normalize_query(text: str) -> str:
+    """Cache key for a question: NFKC form with collapsed whitespace."""
+    return _WHITESPACE_RE.sub(" ", unicodedata.normalize("NFKC", text or "")).strip()
+
+
+class QueryEmbeddingCache:
+    """Thread-safe LRU of normalised query text -> embedding vector.
+
+    Entries older than ``ttl_seconds`` are treated as misses; a size of 0
+    disables the cache.
+    """
+
+    def __init__(
+        self, max_size: int = QUERY_CACHE_SIZE, ttl_seconds: float = QUERY_CACHE_TTL_SECONDS
+    ) -> None:
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, List[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return list(entry[1])
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, vector: List[float]) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), list(vector))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+class InstrumentedEmbeddings(Embeddings):
+    """LangChain ``Embeddings`` wrapper that times every encode call.
+
+    It is a drop-in replacement for the wrapped model, so it can be handed to
+    ``Chroma`` or any other LangChain component expecting an embedding
+    function.  ``embed_query`` is answered from ``query_cache`` when possible;
+    only cache misses reach the model and are timed.
+    """
+
+    def __init__(
+        self,
+        inner: Embeddings,
+        *,
+        model_name: str,
+        device: str,
+        load_seconds: float,
+    ) -> None:
+        self.inner = inner
+        self.model_name = model_name
+        self.device = device
+        self.load_seconds = load_seconds
+        self.document_stats = LatencyStats()
+        self.query_stats = LatencyStats()
+        self.query_cache = QueryEmbeddingCache()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        start = time.perf_counter()
+        vectors = self.inner.embed_documents(texts)
+        self.document_stats.record(time.perf_counter() - start, len(texts))
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        key = normalize_query(text)
+        vector = self.query_cache.get(key)
+        if vector is not None:
+            return vector
+
+        start = time.perf_counter()
+        vector = self.inner.embed_query(key)
+        self.query_stats.record(time.perf_counter() - start)
+        self.query_cache.put(key, vector)
+        return vector
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "model_name": self.model_name,
+            "device": self.device,
+            "load_ms": round(self.load_seconds * 1000, 3),
+            "embed_documents": self.document_stats.as_dict(),
+            "embed_query": self.query_stats.as_dict(),
+            "query_cache": self.query_cache.as_dict(),
+        }
+
+
+class EmbeddingRegistry:
+    """Lazily loads and caches one embedding model per ``(name, device)``.
+
+    Loading is guarded by a per-key lock so that concurrent first requests
+    for the same model trigger a single load, while requests for an already
+    loaded model never block.
+    """
+
+    def __init__(self) -> None:
+        self._models: Dict[Tuple[str, str], InstrumentedEmbeddings] = {}
+        self._key_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _key_lock(self, key: Tuple[str, str]) -> threading.Lock:
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = self._key_locks[key] = threading.Lock()
+            return lock
+
+    def get(
+        self, model_name: Optional[str] = None, device: Optional[str] = None
+    ) -> InstrumentedEmbeddings:
+        """Return the shared embedding model, loading it on first use."""
+        key = (model_name or EMBEDDING_MODEL_NAME, device or EMBEDDING_DEVICE)
+        model = self._models.get(key)
+        if model is not None:
+            return model
+
+        with self._key_lock(key):
+            model = self._models.get(key)
+            if model is not None:
+                return model
+
+            logger.info(f"Loading embedding model {key[0]} on {key[1]}...")
+            start = time.perf_counter()
+            inner = HuggingFaceEmbeddings(
+                model_name=key[0], model_kwargs={"device": key[1]}
+            )
+            load_seconds = time.perf_counter() - start
+            logger.info(f"Embedding model {key[0]} loaded in {load_seconds:.2f}s")
+
+            model = InstrumentedEmbeddings(
+                inner, model_name=key[0], device=key[1], load_seconds=load_seconds
+            )
+            self._models[key] = model
+            return model
+
+    def warm(
+        self, model_name: Optional[str] = None, device: Optional[str] = None
+    ) -> InstrumentedEmbeddings:
+        """Load the model and run one encode so the first request is hot."""
+        model = self.get(model_name, device)
+        model.inner.embed_query("warmup")
+        return model
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [model.stats() for model in list(self._models.values())]
+
+
+registry = EmbeddingRegistry()
+
+
+def get_embeddings(
+    model_name: Optional[str] = None, device: Optional[str] = None
+) -> InstrumentedEmbeddings:
+    """Shortcut for ``registry.get`` used by the retrieval code paths."""
+    return registry.get(model_name, device)
+
+
+def warm_embeddings() -> None:
+    """Load the default embedding model; called once at application startup."""
+    registry.warm()
+
+
+def embedding_stats() -> List[Dict[str, Any]]:
+    """Load-time and encode-latency statistics for every loaded model."""
+    return registry.stats()
@@ -24,7 +24,6 @@ from langchain_groq import ChatGroq
 # NEW IMPORTS
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.docstore.document import Document
-from langchain_community.embeddings import HuggingFaceEmbeddings
 from pathlib import Path
 
 
@@ -37,6 +36,22 @@ except Exception as e:
 
 # Import custom exceptions from audio_processor
 from app.dependencies.audio_processor import AudioProcessorError, AudioSplittingError, DiskSpaceError
+from app.dependencies.embedding_registry import get_embeddings
+from app.dependencies.vector_store import vector_store
+from app.dependencies.language_id import TRANSCRIBE_LANGUAGE
+from app.dependencies.ingestion import (
+    TRANSCRIPTIONS_DIR,
+    caption_transcription_id,
+    content_transcription_id,
+    delete_transcription,
+    ingest_transcription,
+    is_transcription_indexed,
+    iter_text_chunks,
+    source_transcription_id,
+    transcription_path,
+)
+from app.dependencies.lexical_index import bm25_rank
+from app.dependencies.retrieval import RETRIEVAL_ENGINE, search_transcription
 
 # Try to import Chroma, fall back to DocArrayInMemorySearch if dependencies are missing
 try:
@@ -282,16 +297,17 @@ def detect_video_id_from_question(question: str) -> str:
     
     return ""
 
-def transcribe_uploaded_audio(file_path: str, fast_mode: bool = True) -> str:
+def whisper_model_size(fast_mode: bool = True) -> str:
+    """Whisper model size used by `transcribe_uploaded_audio` for ``fast_mode``."""
+    return "tiny" if fast_mode else "base"
+
+def _transcribe_audio(file_path: str, fast_mode: bool = True, progress_callback=None,
+                      ingestor=None) -> Tuple[Optional[str], Optional[str]]:
     """
-    Transcribe an uploaded audio file.
+    Transcribe an audio file, handing each chunk to ``ingestor`` if given.
     
-    Args:
-        file_path: Path to the audio file
-        fast_mode: If True, use faster transcription settings (for YouTube)
-        
     Returns:
-        Transcribed text
+        (transcription, None) on success, (None, user-facing error message) otherwise
     """
     try:
         logger.info(f"Transcribing audio file: {file_path} with fast_mode={fast_mode}")
@@ -299,57 +315,224 @@ def transcribe_uploaded_audio(file_path: str, fast_mode: bool = True) -> str:
         # Check if file exists
         if not os.path.exists(file_path):
             logger.error(f"Audio file not found: {file_path}")
-            return "تعذر العثور على الملف الصوتي."
+            return None, "تعذر العثور على الملف الصوتي."
             
         # Check file size
         file_size = os.path.getsize(file_path)
         if file_size < 1000:  # Less than 1KB
             logger.error(f"Audio file too small: {file_path}, size: {file_size} bytes")
-            return "الملف الصوتي صغير جدًا أو فارغ."
+            return None, "الملف الصوتي صغير جدًا أو فارغ."
         
         # Import the AudioProcessor here to avoid circular imports
         from app.dependencies.audio_processor import AudioProcessor
         
         # Initialize audio processor with tiny model for speed in fast mode
         # or base model for better quality in normal mode
-        model_size = "tiny" if fast_mode else "base"
-        audio_processor = AudioProcessor(model_size=model_size)
+        model_size = whisper_model_size(fast_mode)
+        audio_processor = AudioProcessor(
+            model_size=model_size,
+            progress_callback=progress_callback,
+            chunk_callback=ingestor.submit if ingestor is not None else None,
+        )
+        if ingestor is not None:
+            ingestor.clean = audio_processor.clean_transcription
         
-        # Process the audio file using Whisper with language hint
-        transcription, _ = audio_processor.process_audio_file(file_path, language="ar")
+        # Process the audio file using Whisper; by default the language of
+        # every chunk is identified (mixed French/Arabic lessons)
+        transcription, _ = audio_processor.process_audio_file(file_path, language=TRANSCRIBE_LANGUAGE)
         
         # Clean up temporary files
         audio_processor.cleanup()
         
         if not transcription or len(transcription.strip()) < 20:
             logger.error("Transcription failed or returned empty result")
-            return "تعذر تحويل الملف الصوتي إلى نص. يرجى المحاولة مرة أخرى باستخدام ملف آخر."
+            return None, "تعذر تحويل الملف الصوتي إلى نص. يرجى المحاولة مرة أخرى باستخدام ملف آخر."
         
         logger.info(f"Transcription completed successfully. Length: {len(transcription)}")
-        return transcription
+        return transcription, None
     except DiskSpaceError as e:
         logger.error(f"Disk space error transcribing audio {file_path}: {e}")
         # Also ensure cleanup is attempted if it hasn't run due to early exit
         if 'audio_processor' in locals() and hasattr(audio_processor, 'cleanup'):
             audio_processor.cleanup()
-        return "تعذر تحويل الملف الصوتي بسبب عدم وجود مساحة كافية على القرص. يرجى تفريغ بعض المساحة والمحاولة مرة أخرى."
+        return None, "تعذر تحويل الملف الصوتي بسبب عدم وجود مساحة كافية على القرص. يرجى تفريغ بعض المساحة والمحاولة مرة أخرى."
     except AudioSplittingError as e:
         logger.error(f"Audio splitting error transcribing audio {file_path}: {e}")
         if 'audio_processor' in locals() and hasattr(audio_processor, 'cleanup'):
             audio_processor.cleanup()
-        return "تعذر تحويل الملف الصوتي بسبب خطأ في تقسيم الملف. يرجى المحاولة مرة أخرى أو استخدام ملف مختلف."
+        return None, "تعذر تحويل الملف الصوتي بسبب خطأ في تقسيم الملف. يرجى المحاولة مرة أخرى أو استخدام ملف مختلف."
     except AudioProcessorError as e: # Catch other audio processing specific errors
         logger.error(f"Audio processing error for {file_path}: {e}")
         if 'audio_processor' in locals() and hasattr(audio_processor, 'cleanup'):
             audio_processor.cleanup()
-        return f"حدث خطأ أثناء معالجة الملف الصوتي: {str(e)}"
+        return None, f"حدث خطأ أثناء معالجة الملف الصوتي: {str(e)}"
     except Exception as e:
         logger.error(f"Unexpected error transcribing audio {file_path}: {e}")
         import traceback
         logger.error(traceback.format_exc())
         if 'audio_processor' in locals() and hasattr(audio_processor, 'cleanup'):
             audio_processor.cleanup()
-        return f"تعذر تحويل الملف الصوتي إلى نص لسبب غير متوقع: {str(e)}"
+        return None, f"تعذر تحويل الملف الصوتي إلى نص لسبب غير متوقع: {str(e)}"
+
+def transcribe_uploaded_audio(file_path: str, fast_mode: bool = True, progress_callback=None) -> str:
+    """
+    Transcribe an uploaded audio file.
+    
+    Args:
+        file_path: Path to the audio file
+        fast_mode: If True, use faster transcription settings (for YouTube)
+        progress_callback: Optional callable receiving (chunks_done, total_chunks)
+        
+    Returns:
+        Transcribed text
+    """
+    transcription, error = _transcribe_audio(file_path, fast_mode, progress_callback)
+    return transcription if error is None else error
+
+def transcribe_and_vectorize_audio(file_path: str, fast_mode: bool = True, progress_callback=None,
+                                   on_first_batch=None, force_refresh: bool = False) -> Tuple[str, Optional[str]]:
+    """
+    Transcribe an audio file and index it while it is being transcribed.
+    
+    Every chunk transcription is cleaned, split, embedded and upserted as soon
+    as Whisper produces it (see `transcription_pipeline.StreamingIngestor`), so
+    the lecture is searchable over its first chunks long before the end.  The
+    transcription ID is derived from the source file because the content ID
+    only exists once the whole text does; it also covers the Whisper model,
+    the language mode and the pipeline version, so a transcript made
+    differently is not reused.
+    
+    Args:
+        file_path: Path to the audio file
+        fast_mode: If True, use faster transcription settings (for YouTube)
+        progress_callback: Optional callable receiving (chunks_done, total_chunks)
+        on_first_batch: Optional callable receiving the transcription ID once the
+            first chunks are queryable (called from the ingest thread)
+        force_refresh: Transcribe and index again even if this transcript exists
+        
+    Returns:
+        (transcription, transcription_id), or (error message, None) on failure
+    """
+    if _VECTOR_BACKEND != "chroma" or not os.path.exists(file_path):
+        # The in-memory store is built in one go; keep the sequential path
+        transcription, error = _transcribe_audio(file_path, fast_mode, progress_callback)
+        if error is not None:
+            return error, None
+        return transcription, vectorize_transcription_with_chroma(transcription)
+
+    transcription_id = source_transcription_id(
+        file_path, whisper_model_size(fast_mode), TRANSCRIBE_LANGUAGE
+    )
+    transcript_path = transcription_path(transcription_id)
+    if force_refresh:
+        # Stale chunks past the end of the new transcript must not survive
+        delete_transcription(transcription_id)
+    elif os.path.exists(transcript_path) and is_transcription_indexed(transcription_id):
+        logger.info(f"{file_path} already transcribed and indexed as {transcription_id}")
+        if on_first_batch is not None:
+            on_first_batch(transcription_id)
+        with open(transcript_path, encoding="utf-8") as f:
+            return f.read(), transcription_id
+
+    from app.dependencies.transcription_pipeline import StreamingIngestor
+
+    ingestor = StreamingIngestor(transcription_id, on_first_batch=on_first_batch)
+    try:
+        transcription, error = _transcribe_audio(
+            file_path, fast_mode, progress_callback, ingestor=ingestor
+        )
+    finally:
+        report = ingestor.close()
+    if error is not None:
+        return error, None
+
+    Path(TRANSCRIPTIONS_DIR).mkdir(parents=True, exist_ok=True)
+    with open(transcript_path, "w", encoding="utf-8") as f:
+        f.write(transcription)
+
+    if ingestor.error is not None or not report.chunks:
+        # Chunk-level ingestion failed, or the text came from the direct
+        # (non-chunked) fallback: index the final text in one pass instead
+        logger.warning(f"Streamed ingestion of {transcription_id} incomplete; re-ingesting the full text")
+        try:
+            report = ingest_transcription(transcription, transcription_id)
+        except Exception as e:
+            logger.error(f"Error vectorizing transcription {transcription_id}: {e}")
+    logger.info(
+        f"Embedded and stored {report.chunks} chunks for transcription {transcription_id} "
+        f"while transcribing"
+    )
+    return transcription, transcription_id
+
+def vectorize_youtube_captions(youtube_processor, youtube_url: str, video_id: str,
+                               force_refresh: bool = False) -> Tuple[Optional[str], Optional[str], str]:
+    """
+    Index the captions of a YouTube video as its transcription, without Whisper.
+    
+    The caption track (see `YouTubeProcessor.fetch_captions`) is only used if
+    `captions.assess_captions` judges it good enough; its timed segments are
+    grouped into chunks and fed to the same streaming ingestion as Whisper's
+    chunk transcriptions.
+    
+    Args:
+        youtube_processor: The job's `YouTubeProcessor` (its info dict is reused)
+        youtube_url: YouTube URL
+        video_id: YouTube video ID
+        force_refresh: Index the captions again even if they already are
+        
+    Returns:
+        (transcription, transcription_id, "ok"), or (None, None, reason) when
+        the audio has to be transcribed instead
+    """
+    from app.dependencies.captions import assess_captions, caption_chunks
+    from app.dependencies.transcript_corrections import clean_transcription
+
+    try:
+        track = youtube_processor.fetch_captions(youtube_url)
+    except Exception as e:
+        logger.warning(f"Could not fetch captions of {youtube_url}: {e}")
+        return None, None, "error"
+    if track is None:
+        return None, None, "unavailable"
+
+    quality = assess_captions(
+        track.segments, track.duration, automatic=track.automatic, language=track.language
+    )
+    logger.info(
+        f"{'Automatic' if track.automatic else 'Uploaded'} {track.language} captions of {video_id}: "
+        f"{len(track.segments)} segments, {quality.reason} {quality.metrics}"
+    )
+    if not quality.accepted:
+        return None, None, quality.reason
+
+    entries = list(caption_chunks(track.segments, track.language))
+    transcription = clean_transcription(" ".join(entry["text"] for entry in entries))
+    if len(transcription) < 20:
+        return None, None, "empty"
+    if _VECTOR_BACKEND != "chroma":
+        return transcription, vectorize_transcription_with_chroma(transcription), "ok"
+
+    transcription_id = caption_transcription_id(video_id, track.language, track.automatic)
+    transcript_path = transcription_path(transcription_id)
+    if force_refresh or not (os.path.exists(transcript_path) and is_transcription_indexed(transcription_id)):
+        from app.dependencies.transcription_pipeline import StreamingIngestor
+
+        if force_refresh:
+            delete_transcription(transcription_id)
+
+        ingestor = StreamingIngestor(transcription_id, clean=clean_transcription)
+        try:
+            for entry in entries:
+                ingestor.submit(entry)
+        finally:
+            report = ingestor.close()
+        if ingestor.error is not None or not report.chunks:
+            logger.warning(f"Streamed ingestion of {transcription_id} incomplete; re-ingesting the full text")
+            ingest_transcription(transcription, transcription_id)
+        Path(TRANSCRIPTIONS_DIR).mkdir(parents=True, exist_ok=True)
+        with open(transcript_path, "w", encoding="utf-8") as f:
+            f.write(transcription)
+    return transcription, transcription_id, "ok"
 
 def extract_topic_from_transcription(transcription: str) -> str:
     """
@@ -451,76 +634,64 @@ def vectorize_transcription_with_chroma(transcription: str) -> str:
     """
     Vectorize a transcription using vector embeddings. This now splits the transcription into
     semantically coherent chunks, embeds them with a local HuggingFace model, and
-    stores them either in a persistent Chroma collection or in-memory store
+    stores them either in a persistent Chroma collection (streamed in bounded
+    batches, see `ingestion.ingest_transcription`) or in-memory store
     so that they can be retrieved later via similarity search.
     """
     try:
         logger.debug("=== Starting transcription vectorization ===")
         logger.debug(f"Input transcription length: {len(transcription)} characters")
         
-        # Generate a unique ID for the transcription
-        transcription_id = f"trans_{uuid.uuid4().hex[:8]}"
-        logger.debug(f"Generated transcription ID: {transcription_id}")
+        # Derive the ID from the normalised content so that re-processing the
+        # same lecture maps to the vectors that already exist
+        transcription_id = content_transcription_id(transcription)
+        logger.debug(f"Content-addressed transcription ID: {transcription_id}")
+
+        transcript_path = f"chroma_transcriptions/{transcription_id}.txt"
+        if os.path.exists(transcript_path):
+            if _VECTOR_BACKEND == "chroma":
+                already_indexed = is_transcription_indexed(transcription_id)
+            else:
+                already_indexed = transcription_id in getattr(
+                    vectorize_transcription_with_chroma, "docarray_stores", {}
+                )
+            if already_indexed:
+                logger.info(f"Transcription already indexed as {transcription_id}; skipping embedding")
+                return transcription_id
 
         # Ensure persistence directories exist
         Path("chroma_transcriptions").mkdir(parents=True, exist_ok=True)
         logger.debug("Created chroma_transcriptions directory if it didn't exist")
         
         # Always save raw transcription for debugging / fallback
-        transcript_path = f"chroma_transcriptions/{transcription_id}.txt"
         with open(transcript_path, "w", encoding="utf-8") as f:
             f.write(transcription)
         logger.debug(f"Saved raw transcription to {transcript_path}")
 
         # --- Create embeddings and store in vector DB ---
-        logger.debug("Starting text splitting process...")
-        splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=100)
-        chunks = splitter.split_text(transcription)
-        logger.debug(f"Split transcription into {len(chunks)} chunks")
-
-        if not chunks:
-            logger.warning("No text chunks produced; skipping embedding step")
-            return transcription_id
-
-        logger.debug("Creating Document objects with metadata...")
-        docs = [
-            Document(page_content=chunk, metadata={"transcription_id": transcription_id, "chunk_index": i})
-            for i, chunk in enumerate(chunks)
-        ]
-        logger.debug(f"Created {len(docs)} Document objects")
-
-        # Use a lightweight, freely available model; no external key required
-        logger.debug("Loading HuggingFace embedding model...")
-        try:
-            embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-            logger.debug("Embedding model loaded successfully")
-        except Exception as embed_error:
-            logger.error(f"Failed to load HuggingFace embedding model: {embed_error}")
-            raise embed_error
-
-        # Create / load vector store based on available backend
         if _VECTOR_BACKEND == "chroma":
-            # For Chroma backend with persistence
-            logger.debug("Using Chroma backend with persistence")
-            Path("chroma_index").mkdir(parents=True, exist_ok=True)
-            logger.debug("Created chroma_index directory if it didn't exist")
-            
-            logger.debug("Initializing Chroma store...")
-            store = Chroma(
-                persist_directory="chroma_index",
-                collection_name="media_transcripts",
-                embedding_function=embeddings,
-            )
-            
-            logger.debug(f"Adding {len(docs)} documents to Chroma store...")
-            store.add_documents(docs)
-            
-            logger.debug("Persisting Chroma store to disk...")
-            store.persist()
-            logger.debug("Chroma store persisted successfully")
+            # For Chroma backend with persistence: split lazily and embed /
+            # upsert in bounded batches instead of one huge call
+            logger.debug("Using Chroma backend with streaming batched ingestion")
+            report = ingest_transcription(transcription, transcription_id)
+            chunk_count = report.chunks
+            if not chunk_count:
+                logger.warning("No text chunks produced; skipping embedding step")
+                return transcription_id
         else:
             # For DocArrayInMemorySearch (pure Python, no persistence)
             logger.debug("Using DocArrayInMemorySearch (in-memory) backend")
+            docs = [
+                Document(page_content=chunk, metadata={"transcription_id": transcription_id, "chunk_index": i})
+                for i, chunk in enumerate(iter_text_chunks(transcription))
+            ]
+            chunk_count = len(docs)
+            logger.debug(f"Created {len(docs)} Document objects")
+
+            if not docs:
+                logger.warning("No text chunks produced; skipping embedding step")
+                return transcription_id
+
             # We'll store the in-memory instances in a global dict
             if not hasattr(vectorize_transcription_with_chroma, "docarray_stores"):
                 vectorize_transcription_with_chroma.docarray_stores = {}
@@ -529,13 +700,13 @@ def vectorize_transcription_with_chroma(transcription: str) -> str:
             logger.debug("Creating DocArrayInMemorySearch store...")
             store = DocArrayInMemorySearch.from_documents(
                 docs, 
-                embeddings
+                get_embeddings()
             )
             # Save reference to this store for later retrieval
             vectorize_transcription_with_chroma.docarray_stores[transcription_id] = store
             logger.debug(f"DocArrayInMemorySearch store created and saved with key {transcription_id}")
 
-        logger.info(f"Embedded and stored {len(docs)} chunks for transcription {transcription_id} using {_VECTOR_BACKEND} backend")
+        logger.info(f"Embedded and stored {chunk_count} chunks for transcription {transcription_id} using {_VECTOR_BACKEND} backend")
         logger.debug("=== Vectorization process completed successfully ===")
 
         return transcription_id
@@ -546,7 +717,7 @@ def vectorize_transcription_with_chroma(transcription: str) -> str:
 
         # Even if vectorization fails, we still need to return a valid transcription_id
         # so that the conversation gets properly categorized as a transcription
-        fallback_id = f"trans_{uuid.uuid4().hex[:8]}"
+        fallback_id = content_transcription_id(transcription)
         logger.warning(f"Vectorization failed, using fallback ID: {fallback_id}")
 
         # Save the raw transcription as fallback
@@ -570,27 +741,11 @@ def retrieve_passages(question: str, transcription_id: str, k: int = 5) -> str:
         logger.debug(f"=== Starting passage retrieval for question: '{question[:50]}...' ===")
         logger.debug(f"Looking for transcription_id: {transcription_id}, retrieving top {k} chunks")
         
-        logger.debug("Loading embedding model...")
-        embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-        logger.debug("Embedding model loaded successfully")
-        
         if _VECTOR_BACKEND == "chroma":
             # For Chroma backend with persistence
-            logger.debug("Using Chroma backend for retrieval")
-            logger.debug("Loading Chroma store from disk...")
-            store = Chroma(
-                persist_directory="chroma_index",
-                collection_name="media_transcripts",
-                embedding_function=embeddings,
-            )
-            logger.debug("Chroma store loaded successfully")
-            
+            logger.debug(f"Using {RETRIEVAL_ENGINE} retrieval engine on the Chroma collection")
             logger.debug(f"Performing similarity search with filter: transcription_id={transcription_id}")
-            results = store.similarity_search(
-                question,
-                k=k,
-                filter={"transcription_id": transcription_id} if transcription_id else None,
-            )
+            results = search_transcription(question, transcription_id, k)
             logger.debug(f"Search completed, found {len(results)} results")
         else:
             # For DocArrayInMemorySearch (in-memory)
@@ -1011,81 +1166,14 @@ def extract_answer_from_context(question: str, context: str = "", lang_code: str
         # Extract keywords from question (words with 3+ characters)
         question_words = re.findall(r'[\u0600-\u06FF\u0750-\u077F\u08A0-\u08FF]{3,}', question)
         
-        # Split context into chunks/paragraphs for better semantic search
-        # Arabic text often uses different paragraph markers
-        paragraphs = re.split(r'\n{2,}', context)
-        chunks = []
-        
-        # Create meaningful chunks from paragraphs
-        current_chunk = ""
-        for para in paragraphs:
-            para = para.strip()
-            if not para:
-                continue
-                
-            # If current chunk is getting too large, add it to chunks and start a new one
-            if len(current_chunk) + len(para) > 1000:
-                if current_chunk:
-                    chunks.append(current_chunk)
-                current_chunk = para
-            else:
-                current_chunk += " " + para if current_chunk else para
-                
-        # Add the final chunk if not empty
-        if current_chunk:
-            chunks.append(current_chunk)
-            
-        # If we couldn't identify paragraphs, split by sentences
-        if len(chunks) <= 1 and len(context) > 1000:
-            sentences = re.split(r'[.!?؟،\n]+', context)
-            chunks = []
-            current_chunk = ""
-            
-            for sentence in sentences:
-                sentence = sentence.strip()
-                if not sentence:
-                    continue
-                    
-                if len(current_chunk) + len(sentence) > 500:
-                    if current_chunk:
-                        chunks.append(current_chunk)
-                    current_chunk = sentence
-                else:
-                    current_chunk += " " + sentence if current_chunk else sentence
-                    
-            if current_chunk:
-                chunks.append(current_chunk)
-        
-        # Score chunks based on keyword matching and semantic relevance
-        chunk_scores = {}
-        
-        for i, chunk in enumerate(chunks):
-            # Basic keyword matching score
-            score = 0
-            for keyword in question_words:
-                if keyword in chunk:
-                    score += 1
-            
-            # Bonus for question words appearing close together
-            for j in range(len(question_words)):
-                for k in range(j+1, len(question_words)):
-                    if question_words[j] in chunk and question_words[k] in chunk:
-                        # Find positions of both keywords
-                        pos1 = chunk.find(question_words[j])
-                        pos2 = chunk.find(question_words[k])
-                        # If they're within 50 characters of each other, add bonus score
-                        if abs(pos1 - pos2) < 50:
-                            score += 0.5
-            
-            # Store score if positive
-            if score > 0:
-                chunk_scores[i] = score
-        
+        # Rank passages of the (already retrieved) context with BM25 instead
+        # of scanning every chunk for every keyword pair
+        chunks = list(iter_text_chunks(context, chunk_size=1000, chunk_overlap=100))
+        ranked = [(score, position) for score, position in bm25_rank(question, chunks) if score > 0]
+
         # If we found relevant chunks, get the best one
-        if chunk_scores:
-            # Sort chunks by score (highest first)
-            best_chunk_idx = sorted(chunk_scores.items(), key=lambda x: x[1], reverse=True)[0][0]
-            best_chunk = chunks[best_chunk_idx]
+        if ranked:
+            best_chunk = chunks[ranked[0][1]]
             
             # Try to use LLM for reformulation if available
             llm = get_llm_client()
@@ -1300,8 +1388,8 @@ def get_translated_answer_with_context(question: str, transcription_id: str = No
             return answer
         except Exception as rag_error:
             logger.error(f"Error in ask_question_with_rag: {rag_error}")
-            # Use fallback with context
-            return get_fallback_answer(question, transcription)
+            # Use fallback with the retrieved passages rather than the whole transcript
+            return get_fallback_answer(question, context)
             
     except Exception as e:
         logger.error(f"Error getting answer with context: {e}")
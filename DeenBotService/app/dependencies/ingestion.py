@@ -0,0 +1,325 @@
+"""ingestion.py - Batched, streaming embedding ingestion for transcripts.
+
+Splitting a 3-hour lecture and handing the whole document list to
+``add_documents`` produces one huge encode call and one huge insert.  This
+module splits lazily (a generator over bounded windows of the transcript),
+encodes fixed-size batches with the shared embedding model and upserts each
+batch into Chroma as soon as it is produced, so peak memory is bounded by the
+batch rather than by the transcript.  The transcription's BM25 index (see
+``lexical_index``) is extended and persisted alongside each batch.
+
+Typical usage::
+
+    from app.dependencies.ingestion import ingest_transcription
+
+    report = ingest_transcription(transcription, transcription_id)
+    logger.info(report.as_dict())
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import re
+import time
+import unicodedata
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from app.dependencies.audio_stream import source_fingerprint
+from app.dependencies.embedding_registry import get_embeddings
+from app.dependencies.lexical_index import BM25Index, lexical_indexes
+from app.dependencies.vector_store import COLLECTION_NAME, vector_store
+
+logger = logging.getLogger(__name__)
+
+# Constants
+# Bump whenever transcription cleaning, chunking or embedding changes in a
+# way that makes previously indexed transcripts stale:
+#   3: chunk boundaries placed at silences by voice activity detection
+#   4: single-pass compiled correction engine in clean_transcription
+#   5: per-chunk language identification instead of forced Arabic decoding
+PIPELINE_VERSION = "5"
+TRANSCRIPTIONS_DIR = "chroma_transcriptions"
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 100
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "64"))
+INGEST_MAX_BATCH_BYTES = int(os.getenv("INGEST_MAX_BATCH_BYTES", str(8 * 1024 * 1024)))
+
+# Arabic diacritics (tashkeel), superscript alef and tatweel, ignored when
+# hashing so that re-transcriptions differing only in vocalisation collapse
+_ARABIC_MARKS_RE = re.compile(r"[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED\u0640]")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# Transcript handed to the splitter at once, in chunks of chunk_size characters
+_SPLIT_WINDOW_CHUNKS = 20
+# Rough in-memory cost of one embedding returned as a list of Python floats
+# (384 dimensions for MiniLM, ~32 bytes per boxed float and list slot)
+_EMBEDDING_BYTES_ESTIMATE = 384 * 32
+
+
+@dataclass
+class IngestionReport:
+    """Summary of one ingestion run."""
+
+    transcription_id: str
+    chunks: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+    peak_batch_bytes: int = 0
+    batch_chunks_per_second: List[float] = field(default_factory=list)
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self.chunks / self.seconds if self.seconds else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["chunks_per_second"] = round(self.chunks_per_second, 2)
+        return data
+
+
+def normalize_transcription(text: str) -> str:
+    """Canonical form of a transcript used for content addressing."""
+    text = unicodedata.normalize("NFKC", text or "")
+    text = _ARABIC_MARKS_RE.sub("", text)
+    text = _WHITESPACE_RE.sub(" ", text)
+    return text.strip().lower()
+
+
+def content_transcription_id(text: str) -> str:
+    """Deterministic ``trans_`` id derived from the normalised transcript."""
+    digest = hashlib.sha256(normalize_transcription(text).encode("utf-8")).hexdigest()
+    return f"trans_{digest[:16]}"
+
+
+def source_transcription_id(path: str, model_size: str, language: str) -> str:
+    """``trans_`` id of the transcription of a source media file.
+
+    Used when chunks are indexed while the lecture is still being
+    transcribed, before the full text (and its content id) exists.  The
+    Whisper model, the language mode and ``PIPELINE_VERSION`` are part of
+    the id: the same file transcribed differently is a different transcript.
+    """
+    key = f"source:{source_fingerprint(path)}:{model_size}:{language}:{PIPELINE_VERSION}"
+    return f"trans_{hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]}"
+
+
+def caption_transcription_id(video_id: str, language: str, automatic: bool) -> str:
+    """``trans_`` id of a video's caption track (indexed instead of a transcription).
+
+    ``PIPELINE_VERSION`` is part of the id, so captions indexed by an older
+    pipeline are not reused.
+    """
+    kind = "auto" if automatic else "manual"
+    key = f"captions:{video_id}:{language}:{kind}:{PIPELINE_VERSION}"
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+    return f"trans_{digest[:16]}"
+
+
+def transcription_path(transcription_id: str) -> str:
+    return os.path.join(TRANSCRIPTIONS_DIR, f"{transcription_id}.txt")
+
+
+def delete_transcription(
+    transcription_id: str, collection_name: str = COLLECTION_NAME
+) -> None:
+    """Remove the vectors and BM25 index of ``transcription_id`` before it is re-ingested."""
+    from app.dependencies.numpy_index import numpy_index
+
+    try:
+        vector_store.get_collection(collection_name).delete(where={"transcription_id": transcription_id})
+    except Exception as e:
+        logger.warning(f"Could not delete the vectors of {transcription_id}: {e}")
+    lexical_indexes.delete(transcription_id)
+    numpy_index.invalidate(transcription_id)
+
+
+def is_transcription_indexed(
+    transcription_id: str, collection_name: str = COLLECTION_NAME
+) -> bool:
+    """Whether at least one vector exists for ``transcription_id``."""
+    try:
+        result = vector_store.get_collection(collection_name).get(
+            where={"transcription_id": transcription_id}, limit=1, include=[]
+        )
+        return bool(result and result.get("ids"))
+    except Exception as e:
+        logger.warning(f"Could not check index for {transcription_id}: {e}")
+        return False
+
+
+def iter_text_chunks(
+    text: str, chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP
+) -> Iterator[str]:
+    """Lazily split ``text`` into overlapping chunks.
+
+    The text is fed to ``RecursiveCharacterTextSplitter`` one bounded window
+    at a time.  The last chunk of each window may be cut by the window edge,
+    so the next window restarts at that chunk's offset; the output matches
+    what splitting the whole text at once would produce closely while never
+    materialising more than one window of chunks.
+    """
+    if not text:
+        return
+
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size, chunk_overlap=chunk_overlap, add_start_index=True
+    )
+    window_size = chunk_size * _SPLIT_WINDOW_CHUNKS
+    position = 0
+
+    while position < len(text):
+        window = text[position:position + window_size]
+        is_last_window = position + window_size >= len(text)
+        docs = splitter.create_documents([window])
+        if not docs:
+            break
+
+        if is_last_window:
+            for doc in docs:
+                yield doc.page_content
+            break
+
+        if len(docs) == 1:
+            # Defensive: always make progress through the transcript
+            yield docs[0].page_content
+            position += max(1, len(docs[0].page_content) - chunk_overlap)
+            continue
+
+        for doc in docs[:-1]:
+            yield doc.page_content
+        position += max(1, docs[-1].metadata.get("start_index", len(window)))
+
+
+def _upsert_batch(
+    collection: Any,
+    texts: List[str],
+    metadatas: List[Dict[str, Any]],
+    ids: List[str],
+) -> None:
+    embeddings = get_embeddings().embed_documents(texts)
+    collection.upsert(
+        ids=ids, embeddings=embeddings, documents=texts, metadatas=metadatas
+    )
+    vector_store.mark_dirty(len(texts))
+    # Make the new chunks visible to the in-memory retrieval engine
+    from app.dependencies.numpy_index import numpy_index
+
+    numpy_index.invalidate(metadatas[0]["transcription_id"])
+
+
+def ingest_chunks(
+    chunks: Iterable[Tuple[str, Dict[str, Any]]],
+    transcription_id: str,
+    *,
+    start_index: int = 0,
+    batch_size: int = INGEST_BATCH_SIZE,
+    max_batch_bytes: int = INGEST_MAX_BATCH_BYTES,
+    collection_name: str = COLLECTION_NAME,
+    report: Optional[IngestionReport] = None,
+    build_lexical_index: bool = True,
+    lexical_index: Optional[BM25Index] = None,
+) -> IngestionReport:
+    """Embed and upsert ``(text, metadata)`` pairs in bounded batches.
+
+    A batch is flushed when it reaches ``batch_size`` chunks or when its
+    estimated footprint (text plus embeddings) reaches ``max_batch_bytes``.
+    Chunk ids are ``{transcription_id}_{chunk_index}`` so re-ingesting the
+    same chunk overwrites it instead of adding a duplicate vector.  Ingesting
+    from ``start_index`` 0 starts a fresh lexical index; later start indexes
+    extend the existing one.  Every batch is searchable in the cached lexical
+    index at once; the index is written to disk once, at the end.  A caller
+    ingesting one transcription over several calls passes its own
+    ``lexical_index`` instead and persists it when it is done.
+    """
+    report = report or IngestionReport(transcription_id=transcription_id)
+    collection = vector_store.get_collection(collection_name)
+    persist_lexical_index = lexical_index is None
+    if lexical_index is None and build_lexical_index:
+        lexical_index = lexical_indexes.get_for_update(transcription_id, fresh=start_index == 0)
+    run_start = time.perf_counter()
+
+    texts: List[str] = []
+    metadatas: List[Dict[str, Any]] = []
+    ids: List[str] = []
+    batch_bytes = 0
+    chunk_index = start_index
+
+    def flush() -> None:
+        nonlocal texts, metadatas, ids, batch_bytes
+        if not texts:
+            return
+        batch_start = time.perf_counter()
+        _upsert_batch(collection, texts, metadatas, ids)
+        if lexical_index is not None:
+            lexical_index.add_many(
+                (metadata["chunk_index"], text) for metadata, text in zip(metadatas, texts)
+            )
+            lexical_indexes.remember(lexical_index)
+        elapsed = time.perf_counter() - batch_start
+        rate = len(texts) / elapsed if elapsed else 0.0
+
+        report.batches += 1
+        report.chunks += len(texts)
+        report.peak_batch_bytes = max(report.peak_batch_bytes, batch_bytes)
+        report.batch_chunks_per_second.append(round(rate, 2))
+        logger.info(
+            f"Ingested batch {report.batches} for {transcription_id}: "
+            f"{len(texts)} chunks in {elapsed:.2f}s ({rate:.1f} chunks/sec)"
+        )
+        texts, metadatas, ids, batch_bytes = [], [], [], 0
+
+    for text, extra_metadata in chunks:
+        if not text or not text.strip():
+            continue
+        metadata = {"transcription_id": transcription_id, "chunk_index": chunk_index}
+        metadata.update(extra_metadata or {})
+        chunk_bytes = len(text.encode("utf-8")) + _EMBEDDING_BYTES_ESTIMATE
+
+        if texts and batch_bytes + chunk_bytes > max_batch_bytes:
+            flush()
+
+        texts.append(text)
+        metadatas.append(metadata)
+        ids.append(f"{transcription_id}_{chunk_index}")
+        batch_bytes += chunk_bytes
+        chunk_index += 1
+
+        if len(texts) >= batch_size:
+            flush()
+
+    flush()
+    if lexical_index is not None and persist_lexical_index and report.chunks:
+        lexical_indexes.save(lexical_index)
+    report.seconds += time.perf_counter() - run_start
+    return report
+
+
+def ingest_transcription(
+    transcription: str,
+    transcription_id: str,
+    *,
+    batch_size: int = INGEST_BATCH_SIZE,
+    max_batch_bytes: int = INGEST_MAX_BATCH_BYTES,
+    chunk_size: int = CHUNK_SIZE,
+    chunk_overlap: int = CHUNK_OVERLAP,
+) -> IngestionReport:
+    """Split, embed and upsert a full transcript batch by batch."""
+    chunks = (
+        (chunk, {})
+        for chunk in iter_text_chunks(transcription, chunk_size, chunk_overlap)
+    )
+    report = ingest_chunks(
+        chunks,
+        transcription_id,
+        batch_size=batch_size,
+        max_batch_bytes=max_batch_bytes,
+    )
+    logger.info(
+        f"Ingested {report.chunks} chunks for {transcription_id} in "
+        f"{report.batches} batches ({report.chunks_per_second:.1f} chunks/sec)"
+    )
+    return report
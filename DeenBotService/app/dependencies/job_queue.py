@@ -0,0 +1,633 @@
+"""job_queue.py - Persistent background jobs for media ingestion.
+
+Transcribing an upload or a YouTube lecture takes minutes, so the media
+endpoints enqueue a job and return its id immediately.  Jobs are stored in
+the ``media_jobs`` table and executed by a bounded pool of asyncio workers;
+blocking stages (download, Whisper, embedding) run in a thread pool of the
+same size.  Handlers report ``(stage, percent)`` progress, which is kept in
+memory for polling and persisted to the job row on every stage change and at
+most every ``MEDIA_JOB_PROGRESS_FLUSH_SECONDS`` otherwise.  A handler may
+also ``publish`` a partial result while it runs; pollers see it as the
+``result`` of a job that is still ``running``.
+
+Before a job starts, its estimated peak memory is reserved against the
+node budget (see ``memory_budget``): a job that does not fit next to the
+running ones stays queued until memory is released, and one that could
+never fit is failed.
+
+A job submitted with ``submit_once`` and a key (e.g. the video id of a
+YouTube lesson) is coalesced with the job already queued or running under that key:
+the ``media_job_keys`` table maps each key to its in-flight job, so
+concurrent submitters, in this process or another one sharing the
+database, all receive the same job id and result.  That job runs in one
+process at a time (see the claim and lease below); if that process dies,
+the key keeps pointing at the job, which is re-queued once its lease
+expires.  The key is released when the job finishes or is given up.
+
+Several processes may share the ``media_jobs`` table.  A worker claims a
+job with a single conditional ``UPDATE ... WHERE status = 'queued'``, so
+only one process ever runs it, and holds a lease on it
+(``lease_expires_at``, renewed every third of ``MEDIA_JOB_LEASE_SECONDS``
+while the process is alive).  On startup, and then periodically, ``running``
+jobs whose lease has expired, because their process died, are re-queued (up
+to ``MEDIA_JOB_MAX_ATTEMPTS`` attempts), so a restart does not silently
+lose in-flight work and never re-runs a job that another live process is
+executing.  A process that lost its lease does not overwrite the outcome
+of the job.
+
+Typical usage::
+
+    from app.dependencies.job_queue import job_queue
+
+    async def run_upload(ctx, payload):
+        ctx.progress("transcribe", 10)
+        text = await ctx.run(transcribe_uploaded_audio, payload["file_path"])
+        return {"success": True, ...}
+
+    job_queue.register("upload", run_upload, whisper_model=lambda payload: "tiny")
+    # Jobs that transcribe only sometimes call ``await ctx.reserve_whisper(size)`` first
+    job_id = await job_queue.submit("upload", {"file_path": path})
+    job_id, attached = await job_queue.submit_once("youtube", payload, f"youtube:{video_id}")
+    status = await job_queue.get_status(job_id)
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, or_, select, text, update
+from sqlalchemy.dialects.postgresql import insert
+
+from app.database import SessionLocal
+from app.dependencies.memory_budget import JobTooLarge, memory_budget
+from app.models.media_job import MediaJob
+from app.models.media_job_key import MediaJobKey
+
+logger = logging.getLogger(__name__)
+
+# Constants
+MEDIA_JOB_WORKERS = int(os.getenv("MEDIA_JOB_WORKERS", "2"))
+MEDIA_JOB_MAX_ATTEMPTS = int(os.getenv("MEDIA_JOB_MAX_ATTEMPTS", "3"))
+MEDIA_JOB_PROGRESS_FLUSH_SECONDS = float(os.getenv("MEDIA_JOB_PROGRESS_FLUSH_SECONDS", "5"))
+# A running job whose process has not renewed its lease for this long is re-queued
+MEDIA_JOB_LEASE_SECONDS = float(os.getenv("MEDIA_JOB_LEASE_SECONDS", "60"))
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+
+class JobFailed(Exception):
+    """Raised by a handler to fail its job with a user-facing message."""
+
+
+class JobContext:
+    """Handed to job handlers to report progress and run blocking work."""
+
+    def __init__(self, queue: "JobQueue", job_id: str, payload: Dict[str, Any]) -> None:
+        self.queue = queue
+        self.job_id = job_id
+        self.payload = payload
+
+    def progress(self, stage: str, percent: float) -> None:
+        """Record progress; safe to call from worker threads."""
+        self.queue._record_progress(self.job_id, stage, percent)
+
+    def stage_progress(self, stage: str, start: float, end: float) -> Callable[[int, int], None]:
+        """Callback mapping ``(done, total)`` of a stage onto ``start..end`` percent."""
+
+        def report(done: int, total: int) -> None:
+            fraction = done / total if total else 1.0
+            self.progress(stage, start + (end - start) * fraction)
+
+        return report
+
+    async def publish(self, partial: Dict[str, Any]) -> None:
+        """Expose a partial result (e.g. an already queryable conversation) while running."""
+        await self.queue._publish(self.job_id, partial)
+
+    async def reserve_whisper(self, model_size: str) -> None:
+        """Grow the job's memory reservation before it falls back to Whisper."""
+        try:
+            await memory_budget.grow(self.job_id, whisper_model=model_size)
+        except JobTooLarge as e:
+            logger.error(f"Media job {self.job_id} cannot load Whisper {model_size}: {e}")
+            raise JobFailed("لا تتوفر ذاكرة كافية على الخادم لمعالجة هذا الملف.")
+
+    async def run(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run blocking ``func`` in the job thread pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.queue._executor, functools.partial(func, *args, **kwargs)
+        )
+
+
+Handler = Callable[[JobContext, Dict[str, Any]], Awaitable[Dict[str, Any]]]
+# Estimated peak memory (MB) of a job from its payload
+MemoryEstimate = Callable[[Dict[str, Any]], float]
+# Whisper model size a job transcribes with, from its payload
+WhisperModel = Callable[[Dict[str, Any]], str]
+
+
+class _LiveProgress:
+    def __init__(self, stage: str, percent: float) -> None:
+        self.stage = stage
+        self.percent = percent
+        self.started = time.monotonic()
+        self.persisted_at = 0.0
+
+
+class JobQueue:
+    """Bounded pool of workers executing persisted ``MediaJob`` rows."""
+
+    def __init__(
+        self,
+        *,
+        workers: int = MEDIA_JOB_WORKERS,
+        max_attempts: int = MEDIA_JOB_MAX_ATTEMPTS,
+        progress_flush_seconds: float = MEDIA_JOB_PROGRESS_FLUSH_SECONDS,
+        lease_seconds: float = MEDIA_JOB_LEASE_SECONDS,
+    ) -> None:
+        self.workers = max(1, workers)
+        self.lease_seconds = lease_seconds
+        # Identifies the jobs this process is running
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.max_attempts = max_attempts
+        self.progress_flush_seconds = progress_flush_seconds
+        self._handlers: Dict[str, Handler] = {}
+        self._memory: Dict[str, MemoryEstimate] = {}
+        self._whisper_models: Dict[str, WhisperModel] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="media-job"
+        )
+        self._live: Dict[str, _LiveProgress] = {}
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.recovered = 0
+        self.coalesced = 0
+        self.lost_leases = 0
+
+    def register(
+        self,
+        kind: str,
+        handler: Handler,
+        memory_mb: Optional[MemoryEstimate] = None,
+        *,
+        whisper_model: Optional[WhisperModel] = None,
+    ) -> None:
+        """Register ``handler`` for ``kind``.
+
+        ``memory_mb`` estimates a job's peak memory.  Transcription jobs give
+        ``whisper_model`` instead: the budget then charges the models (or
+        worker pool) they would load.
+        """
+        self._handlers[kind] = handler
+        if memory_mb is not None:
+            self._memory[kind] = memory_mb
+        if whisper_model is not None:
+            self._whisper_models[kind] = whisper_model
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    async def start(self) -> None:
+        """Start the workers and re-queue jobs interrupted by a restart."""
+        if self._tasks:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        memory_budget.start()
+        try:
+            await self._add_lease_columns()
+            for job_id in await self._recover(include_queued=True):
+                self._queue.put_nowait(job_id)
+        except Exception as e:
+            logger.error(f"Error recovering unfinished media jobs: {e}")
+        self._tasks = [
+            asyncio.create_task(self._worker(i), name=f"media-job-worker-{i}")
+            for i in range(self.workers)
+        ]
+        self._tasks.append(asyncio.create_task(self._lease_loop(), name="media-job-leases"))
+        logger.info(f"Media job queue started with {self.workers} workers ({self.owner})")
+
+    async def close(self) -> None:
+        """Stop the workers; unfinished jobs are resumed by the next process to look."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._executor.shutdown(wait=False)
+        memory_budget.close()
+        try:
+            # Give up the leases now rather than letting them run out
+            async with SessionLocal() as db:
+                await db.execute(
+                    update(MediaJob)
+                    .where(MediaJob.owner == self.owner, MediaJob.status == JOB_RUNNING)
+                    .values(lease_expires_at=datetime.now(timezone.utc))
+                )
+                await db.commit()
+        except Exception as e:
+            logger.warning(f"Could not release media job leases: {e}")
+
+    async def _add_lease_columns(self) -> None:
+        """Add the lease columns to a ``media_jobs`` table created before they existed.
+
+        An unversioned, idempotent migration (see ``startup_db_client`` in
+        ``main.py``): ``create_all`` does not alter existing tables.
+        """
+        async with SessionLocal() as db:
+            await db.execute(text(
+                "ALTER TABLE media_jobs "
+                "ADD COLUMN IF NOT EXISTS owner VARCHAR, "
+                "ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMP WITH TIME ZONE"
+            ))
+            await db.commit()
+
+    def _lease_deadline(self) -> datetime:
+        return datetime.fromtimestamp(time.time() + self.lease_seconds, timezone.utc)
+
+    async def _recover(self, include_queued: bool = False) -> List[str]:
+        """Re-queue running jobs whose lease expired (and list the queued ones)."""
+        job_ids: List[str] = []
+        expired = (MediaJob.status == JOB_RUNNING) & or_(
+            MediaJob.lease_expires_at.is_(None),
+            MediaJob.lease_expires_at < datetime.now(timezone.utc),
+        )
+        condition = or_(MediaJob.status == JOB_QUEUED, expired) if include_queued else expired
+        async with SessionLocal() as db:
+            result = await db.execute(
+                select(MediaJob)
+                .where(condition)
+                .order_by(MediaJob.created_at)
+                # Rows another process is recovering or claiming are left to it
+                .with_for_update(skip_locked=True)
+            )
+            requeued = 0
+            for job in result.scalars().all():
+                if job.status == JOB_RUNNING and job.attempts >= self.max_attempts:
+                    job.status = JOB_FAILED
+                    job.error = "تعذر إكمال المعالجة بعد عدة محاولات."
+                    job.finished_at = datetime.now(timezone.utc)
+                    job.owner = None
+                    await db.execute(delete(MediaJobKey).where(MediaJobKey.job_id == job.id))
+                    logger.warning(f"Giving up on interrupted media job {job.id}")
+                    continue
+                if job.status == JOB_RUNNING:
+                    logger.warning(f"Media job {job.id} lost its lease (owner {job.owner}), re-queuing it")
+                    job.status = JOB_QUEUED
+                    job.owner = None
+                    requeued += 1
+                job_ids.append(str(job.id))
+            await db.commit()
+        if requeued:
+            self.recovered += requeued
+            logger.info(f"Re-queued {requeued} interrupted media jobs")
+        return job_ids
+
+    async def _renew_leases(self) -> None:
+        """Push back the lease deadline of every job this process is running."""
+        async with SessionLocal() as db:
+            await db.execute(
+                update(MediaJob)
+                .where(MediaJob.owner == self.owner, MediaJob.status == JOB_RUNNING)
+                .values(lease_expires_at=self._lease_deadline())
+            )
+            await db.commit()
+
+    async def _lease_loop(self) -> None:
+        """Renew the leases of this process's jobs and recover expired ones."""
+        interval = max(1.0, self.lease_seconds / 3)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self._renew_leases()
+                for job_id in await self._recover():
+                    self._queue.put_nowait(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error renewing media job leases: {e}")
+
+    # ------------------------------------------------------------------
+    # Submission and status
+    # ------------------------------------------------------------------
+    async def _claim_key(self, db, dedup_key: str, job_uuid: uuid.UUID) -> Optional[str]:
+        """Bind ``dedup_key`` to ``job_uuid`` in the session's transaction.
+
+        Returns the id of the in-flight job that already holds the key instead,
+        if there is one.
+        """
+        # A concurrent transaction inserting the same key makes this wait
+        # for its commit, then do nothing
+        inserted = await db.execute(
+            insert(MediaJobKey)
+            .values(key=dedup_key, job_id=job_uuid)
+            .on_conflict_do_nothing(index_elements=[MediaJobKey.key])
+        )
+        if inserted.rowcount:
+            return None
+        holder = (
+            await db.execute(select(MediaJobKey).where(MediaJobKey.key == dedup_key).with_for_update())
+        ).scalar_one()
+        job = await db.get(MediaJob, holder.job_id)
+        if job is not None and job.status in (JOB_QUEUED, JOB_RUNNING):
+            return str(job.id)
+        # Left behind by a job that ended without releasing it
+        holder.job_id = job_uuid
+        return None
+
+    async def submit(self, kind: str, payload: Dict[str, Any]) -> str:
+        """Persist a new job and queue it; returns the job id."""
+        job_id, _ = await self.submit_once(kind, payload, None)
+        return job_id
+
+    async def submit_once(
+        self, kind: str, payload: Dict[str, Any], dedup_key: Optional[str]
+    ) -> Tuple[str, bool]:
+        """Submit a job unless one is already queued or running under ``dedup_key``.
+
+        Returns ``(job_id, attached)``; ``attached`` is true when the id is
+        that of the existing job.  The key is claimed in the same transaction
+        as the job row, and the job is claimed by a single worker across all
+        processes, so a key never leads to two runs of the same work.
+        """
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for job kind {kind!r}")
+        job_uuid = uuid.uuid4()
+        async with SessionLocal() as db:
+            if dedup_key is not None:
+                holder = await self._claim_key(db, dedup_key, job_uuid)
+                if holder is not None:
+                    await db.rollback()
+                    self.coalesced += 1
+                    logger.info(f"Attached {kind} request to in-flight job {holder} ({dedup_key})")
+                    return holder, True
+            db.add(
+                MediaJob(
+                    id=job_uuid,
+                    kind=kind,
+                    status=JOB_QUEUED,
+                    stage=JOB_QUEUED,
+                    percent=0.0,
+                    payload=payload,
+                )
+            )
+            await db.commit()
+        job_id = str(job_uuid)
+        self.submitted += 1
+        if self._queue is None:
+            # Not started (e.g. scripts): it will be picked up on next start
+            logger.warning(f"Media job {job_id} queued before the job queue was started")
+        else:
+            self._queue.put_nowait(job_id)
+        logger.info(f"Queued {kind} job {job_id}")
+        return job_id, False
+
+    async def get_status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Status of ``job_id`` with stage, percent and ETA, or ``None``."""
+        try:
+            job_uuid = uuid.UUID(str(job_id))
+        except ValueError:
+            return None
+        async with SessionLocal() as db:
+            job = await db.get(MediaJob, job_uuid)
+            if job is None:
+                return None
+            status = {
+                "job_id": str(job.id),
+                "kind": job.kind,
+                "status": job.status,
+                "stage": job.stage,
+                "percent": round(job.percent or 0.0, 1),
+                "eta_seconds": None,
+                "attempts": job.attempts,
+                "created_at": job.created_at.isoformat() if job.created_at else None,
+                "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+                "result": job.result,
+                "error": job.error,
+            }
+
+        with self._lock:
+            live = self._live.get(status["job_id"])
+            if live is not None and status["status"] == JOB_RUNNING:
+                status["stage"] = live.stage
+                status["percent"] = round(live.percent, 1)
+                elapsed = time.monotonic() - live.started
+                if 0 < live.percent < 100:
+                    status["eta_seconds"] = round(elapsed * (100 - live.percent) / live.percent, 1)
+        memory = memory_budget.job_usage(status["job_id"])
+        if memory is not None and status["status"] == JOB_RUNNING:
+            status["memory"] = memory
+        if status["status"] == JOB_QUEUED and self._queue is not None:
+            status["queue_length"] = self._queue.qsize()
+        return status
+
+    # ------------------------------------------------------------------
+    # Execution
+    # ------------------------------------------------------------------
+    def _record_progress(self, job_id: str, stage: str, percent: float) -> None:
+        percent = max(0.0, min(100.0, float(percent)))
+        now = time.monotonic()
+        with self._lock:
+            live = self._live.get(job_id)
+            if live is None:
+                live = self._live[job_id] = _LiveProgress(stage, percent)
+            stage_changed = live.stage != stage
+            live.stage = stage
+            live.percent = max(live.percent, percent) if not stage_changed else percent
+            should_persist = stage_changed or now - live.persisted_at >= self.progress_flush_seconds
+            if should_persist:
+                live.persisted_at = now
+        if should_persist and self._loop is not None:
+            asyncio.run_coroutine_threadsafe(
+                self._persist_progress(job_id, stage, percent), self._loop
+            )
+
+    async def _persist_progress(self, job_id: str, stage: str, percent: float) -> None:
+        try:
+            async with SessionLocal() as db:
+                job = await db.get(MediaJob, uuid.UUID(job_id))
+                if job is not None and job.status == JOB_RUNNING and job.owner == self.owner:
+                    job.stage = stage
+                    job.percent = percent
+                    await db.commit()
+        except Exception as e:
+            logger.warning(f"Could not persist progress of media job {job_id}: {e}")
+
+    async def _publish(self, job_id: str, partial: Dict[str, Any]) -> None:
+        try:
+            async with SessionLocal() as db:
+                job = await db.get(MediaJob, uuid.UUID(job_id))
+                if job is not None and job.status == JOB_RUNNING and job.owner == self.owner:
+                    job.result = partial
+                    await db.commit()
+        except Exception as e:
+            logger.warning(f"Could not publish partial result of media job {job_id}: {e}")
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._execute(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Media job worker {index} crashed on {job_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _finish(self, job_id: str, *, claimed: bool = True, **fields: Any) -> bool:
+        """Record the outcome of a job; ``False`` if this process no longer owns it."""
+        async with SessionLocal() as db:
+            job = await db.get(MediaJob, uuid.UUID(job_id), with_for_update=True)
+            if job is None:
+                return False
+            if not claimed and job.status != JOB_QUEUED:
+                return False
+            if claimed and (job.status != JOB_RUNNING or job.owner != self.owner):
+                # Re-queued after our lease expired: the new run decides
+                self.lost_leases += 1
+                logger.warning(f"Media job {job_id} is no longer owned by this process, dropping its outcome")
+                return False
+            job.owner = None
+            for name, value in fields.items():
+                setattr(job, name, value)
+            job.finished_at = datetime.now(timezone.utc)
+            # Later submissions with the same key start a new job
+            await db.execute(delete(MediaJobKey).where(MediaJobKey.job_id == job.id))
+            await db.commit()
+            return True
+
+    async def _reserve_memory(self, job_id: str) -> bool:
+        """Wait for the job's memory reservation; fails the job if it can never fit."""
+        async with SessionLocal() as db:
+            job = await db.get(MediaJob, uuid.UUID(job_id))
+            if job is None or job.status != JOB_QUEUED:
+                return False
+            kind, payload = job.kind, dict(job.payload or {})
+        estimate = self._memory.get(kind)
+        whisper_model = self._whisper_models.get(kind)
+        try:
+            mb = estimate(payload) if estimate is not None else memory_budget.job_mb
+            model_size = whisper_model(payload) if whisper_model is not None else None
+        except Exception as e:
+            logger.warning(f"Could not estimate memory of media job {job_id}: {e}")
+            mb, model_size = memory_budget.job_mb, None
+        try:
+            await memory_budget.acquire(job_id, mb, whisper_model=model_size)
+        except JobTooLarge as e:
+            await self._finish(
+                job_id,
+                claimed=False,
+                status=JOB_FAILED,
+                error="لا تتوفر ذاكرة كافية على الخادم لمعالجة هذا الملف.",
+            )
+            self.failed += 1
+            logger.error(f"Refused media job {job_id} ({kind}): {e}")
+            return False
+        return True
+
+    async def _execute(self, job_id: str) -> None:
+        if not await self._reserve_memory(job_id):
+            return
+        try:
+            await self._run(job_id)
+        finally:
+            peak_mb = await memory_budget.release(job_id)
+            if peak_mb is not None:
+                logger.info(f"Media job {job_id} peak memory growth: {peak_mb:.0f} MB")
+
+    async def _run(self, job_id: str) -> None:
+        # Atomic claim: of all the processes holding this id, one gets the row
+        async with SessionLocal() as db:
+            claimed = (
+                await db.execute(
+                    update(MediaJob)
+                    .where(MediaJob.id == uuid.UUID(job_id), MediaJob.status == JOB_QUEUED)
+                    .values(
+                        status=JOB_RUNNING,
+                        stage="starting",
+                        percent=0.0,
+                        attempts=MediaJob.attempts + 1,
+                        started_at=datetime.now(timezone.utc),
+                        owner=self.owner,
+                        lease_expires_at=self._lease_deadline(),
+                    )
+                    .returning(MediaJob.kind, MediaJob.payload)
+                )
+            ).first()
+            await db.commit()
+        if claimed is None:
+            return
+        kind, payload = claimed.kind, dict(claimed.payload or {})
+
+        handler = self._handlers.get(kind)
+        ctx = JobContext(self, job_id, payload)
+        self._record_progress(job_id, "starting", 0.0)
+        start = time.perf_counter()
+        try:
+            if handler is None:
+                raise JobFailed(f"Unknown job kind: {kind}")
+            result = await handler(ctx, payload)
+            if not await self._finish(
+                job_id, status=JOB_SUCCEEDED, stage="done", percent=100.0, result=result, error=None
+            ):
+                return
+            self.succeeded += 1
+            logger.info(f"Media job {job_id} ({kind}) finished in {time.perf_counter() - start:.1f}s")
+        except asyncio.CancelledError:
+            # Shutdown: the row stays running; close() expires its lease so
+            # it is resumed by the next process to recover it
+            raise
+        except JobFailed as e:
+            # A partial result published before the failure is withdrawn
+            if await self._finish(job_id, status=JOB_FAILED, error=str(e), result=None):
+                self.failed += 1
+            logger.error(f"Media job {job_id} ({kind}) failed: {e}")
+        except Exception as e:
+            import traceback
+
+            logger.error(traceback.format_exc())
+            if await self._finish(
+                job_id, status=JOB_FAILED, error=f"حدث خطأ أثناء المعالجة: {str(e)}", result=None
+            ):
+                self.failed += 1
+            logger.error(f"Media job {job_id} ({kind}) crashed: {e}")
+        finally:
+            with self._lock:
+                self._live.pop(job_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            running = len(self._live)
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "running": running,
+            "submitted": self.submitted,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "recovered": self.recovered,
+            "coalesced": self.coalesced,
+            "lost_leases": self.lost_leases,
+            "owner": self.owner,
+        }
+
+
+job_queue = JobQueue()
@@ -0,0 +1,134 @@
+"""language_id.py - Per-chunk spoken language identification with Whisper.
+
+Uploads used to be decoded with ``language="ar"`` forced, so the French
+parts of mixed French/Arabic lessons were transcribed as Arabic (slower,
+with hallucinated repeats, and wrong).  With ``TRANSCRIBE_LANGUAGE=auto``
+each chunk is identified once: Whisper's language head runs on the log-mel
+spectrogram of its first ``LANGUAGE_ID_SECONDS`` (a single encoder pass, no
+decoding) and the chunk is then decoded in the detected language.  The
+choice is restricted to ``LANGUAGE_ID_CANDIDATES`` (the languages the
+lessons are actually given in) and falls back to ``LANGUAGE_ID_DEFAULT``
+when no candidate is probable enough, e.g. on music or a silent prefix.
+
+The detected language is kept in the chunk metadata and stored with every
+vector indexed from that chunk (``language``).
+
+Typical usage::
+
+    from app.dependencies.language_id import detect_language
+
+    language, probability = detect_language(model, samples)
+    result = model.transcribe(samples, language=language, fp16=False)
+"""
+from __future__ import annotations
+
+import logging
+import os
+import subprocess
+import threading
+from collections import Counter
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from app.dependencies.audio_stream import SAMPLE_RATE, ffmpeg_executable
+
+logger = logging.getLogger(__name__)
+
+# Constants
+AUTO_LANGUAGE = "auto"
+# "auto" identifies the language of every chunk; a code forces it
+TRANSCRIBE_LANGUAGE = os.getenv("TRANSCRIBE_LANGUAGE", AUTO_LANGUAGE)
+LANGUAGE_ID_SECONDS = float(os.getenv("LANGUAGE_ID_SECONDS", "15"))
+LANGUAGE_ID_CANDIDATES = [
+    code.strip() for code in os.getenv("LANGUAGE_ID_CANDIDATES", "ar,fr,en").split(",") if code.strip()
+]
+LANGUAGE_ID_DEFAULT = os.getenv("LANGUAGE_ID_DEFAULT", "ar")
+LANGUAGE_ID_MIN_PROBABILITY = float(os.getenv("LANGUAGE_ID_MIN_PROBABILITY", "0.5"))
+# Whisper's original models use 80 mel bins (large-v3 uses 128)
+_DEFAULT_N_MELS = 80
+
+
+def choose_language(
+    probabilities: Dict[str, float],
+    candidates: Iterable[str] = LANGUAGE_ID_CANDIDATES,
+    default: str = LANGUAGE_ID_DEFAULT,
+    min_probability: float = LANGUAGE_ID_MIN_PROBABILITY,
+) -> Tuple[str, float]:
+    """Most probable candidate language (renormalised over the candidates), else ``default``."""
+    candidates = list(candidates)
+    if candidates:
+        probabilities = {code: probabilities.get(code, 0.0) for code in candidates}
+    total = sum(probabilities.values())
+    if total <= 0:
+        return default, 0.0
+    language = max(probabilities, key=probabilities.get)
+    probability = probabilities[language] / total
+    if probability < min_probability:
+        return default, probability
+    return language, probability
+
+
+def prefix_samples(audio: Any, seconds: float = LANGUAGE_ID_SECONDS) -> np.ndarray:
+    """The first ``seconds`` of a chunk (path or 16 kHz float32 array)."""
+    if not isinstance(audio, str):
+        return np.asarray(audio[: int(seconds * SAMPLE_RATE)], dtype=np.float32)
+    result = subprocess.run(
+        [
+            ffmpeg_executable(),
+            "-v", "error",
+            "-nostdin",
+            "-t", f"{seconds:.2f}",
+            "-i", audio,
+            "-ac", "1",
+            "-ar", str(SAMPLE_RATE),
+            "-f", "s16le",
+            "-",
+        ],
+        capture_output=True,
+        check=True,
+        timeout=60,
+    )
+    return np.frombuffer(result.stdout, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def detect_language(model: Any, audio: Any, seconds: float = LANGUAGE_ID_SECONDS) -> Tuple[str, float]:
+    """``(language, probability)`` of a chunk from Whisper's language head."""
+    import whisper
+
+    samples = whisper.pad_or_trim(prefix_samples(audio, seconds))
+    n_mels = getattr(model.dims, "n_mels", _DEFAULT_N_MELS)
+    if n_mels == _DEFAULT_N_MELS:
+        mel = whisper.log_mel_spectrogram(samples)
+    else:
+        mel = whisper.log_mel_spectrogram(samples, n_mels=n_mels)
+    _, probabilities = model.detect_language(mel.to(model.device))
+    return choose_language(probabilities)
+
+
+class LanguageStats:
+    """Counts the languages detected across transcribed chunks."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counts: Counter = Counter()
+        self.failures = 0
+
+    def record(self, language: Optional[str]) -> None:
+        with self._lock:
+            if language is None:
+                self.failures += 1
+            else:
+                self._counts[language] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "mode": TRANSCRIBE_LANGUAGE,
+                "candidates": LANGUAGE_ID_CANDIDATES,
+                "chunks": dict(self._counts),
+                "failures": self.failures,
+            }
+
+
+language_stats = LanguageStats()
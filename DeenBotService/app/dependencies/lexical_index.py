@@ -0,0 +1,314 @@
+"""lexical_index.py - Per-transcription BM25 inverted index.
+
+Dense retrieval misses exact terms (names of surahs, scholars, fiqh terms)
+that a lecture mentions verbatim, and the old answer paths compensated with
+keyword loops re-run over the whole transcript for every question.  This
+module builds a BM25 inverted index once per transcription while its chunks
+are ingested, persists it next to the Chroma files and answers lexical
+top-k queries from the postings lists.
+
+Tokens are normalised for Arabic (diacritics, tatweel and letter variants
+such as أ/إ/آ, ى/ي and ة/ه are folded, the definite article is stripped) so
+that spelling differences between the question and the Whisper output still
+match.
+
+Typical usage::
+
+    from app.dependencies.lexical_index import lexical_indexes
+
+    index = lexical_indexes.get(transcription_id)
+    for chunk_index, score in index.search(question, k=10):
+        text = index.texts[chunk_index]
+"""
+from __future__ import annotations
+
+import gzip
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, OrderedDict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.dependencies.vector_store import CHROMA_DIR, COLLECTION_NAME, vector_store
+
+logger = logging.getLogger(__name__)
+
+# Constants
+LEXICAL_INDEX_DIR = os.getenv("LEXICAL_INDEX_DIR", os.path.join(CHROMA_DIR, "lexical"))
+LEXICAL_INDEX_CACHE_SIZE = int(os.getenv("LEXICAL_INDEX_CACHE_SIZE", "64"))
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_ARABIC_MARKS_RE = re.compile(r"[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED\u0640]")
+_ARABIC_FOLDS = str.maketrans({"أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا", "ى": "ي", "ة": "ه", "ؤ": "و", "ئ": "ي"})
+
+# Function words that carry no retrieval signal in questions or lectures
+STOPWORDS = frozenset(
+    """
+    في من على الى إلى عن ان أن إن او أو ثم ما ماذا لا لم لن هل هو هي هم هذا هذه ذلك
+    تلك التي الذي الذين كان كانت يكون قد كل مع بين عند حتى اذا إذا لقد وهو وهي
+    le la les de du des un une et est à au aux que qui quoi dans sur pour par avec
+    the of and to in is are was what how why which does do for on with
+    """.split()
+)
+
+
+# Definite-article prefixes stripped by the light stemmer, longest first
+_ARABIC_PREFIXES = ("وال", "بال", "كال", "فال", "ال", "لل")
+
+
+def _light_stem(token: str) -> str:
+    for prefix in _ARABIC_PREFIXES:
+        if token.startswith(prefix) and len(token) - len(prefix) >= 2:
+            return token[len(prefix):]
+    return token
+
+
+_FOLDED_STOPWORDS = frozenset(
+    _ARABIC_MARKS_RE.sub("", word).translate(_ARABIC_FOLDS) for word in STOPWORDS
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case, Arabic-folded, lightly stemmed tokens of ``text``.
+
+    Stopwords and single characters are dropped.
+    """
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    text = _ARABIC_MARKS_RE.sub("", text).translate(_ARABIC_FOLDS)
+    return [
+        _light_stem(token)
+        for token in _TOKEN_RE.findall(text)
+        if len(token) > 1 and token not in _FOLDED_STOPWORDS
+    ]
+
+
+class BM25Index:
+    """Inverted index with BM25 scoring over the chunks of one transcription.
+
+    The cached index of a lecture being streamed is extended by the ingest
+    thread while questions are answered from it: updates and searches hold
+    the index's lock, so a search sees a batch entirely or not at all.
+    """
+
+    def __init__(self, transcription_id: str = "") -> None:
+        self.transcription_id = transcription_id
+        self.texts: Dict[int, str] = {}
+        self.lengths: Dict[int, int] = {}
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.total_length = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def add(self, chunk_index: int, text: str) -> None:
+        """Index ``text`` as chunk ``chunk_index`` (re-adding replaces it)."""
+        counts = Counter(tokenize(text))
+        with self._lock:
+            if chunk_index in self.texts:
+                self.remove(chunk_index)
+            self.texts[chunk_index] = text
+            self.lengths[chunk_index] = sum(counts.values())
+            self.total_length += self.lengths[chunk_index]
+            for term, tf in counts.items():
+                self.postings.setdefault(term, {})[chunk_index] = tf
+
+    def add_many(self, chunks: Iterable[Tuple[int, str]]) -> None:
+        chunks = list(chunks)
+        with self._lock:
+            for chunk_index, text in chunks:
+                self.add(chunk_index, text)
+
+    def remove(self, chunk_index: int) -> None:
+        with self._lock:
+            text = self.texts.pop(chunk_index, None)
+            if text is None:
+                return
+            self.total_length -= self.lengths.pop(chunk_index, 0)
+            for term in set(tokenize(text)):
+                postings = self.postings.get(term)
+                if postings is not None:
+                    postings.pop(chunk_index, None)
+                    if not postings:
+                        del self.postings[term]
+
+    def search(
+        self,
+        query: str,
+        k: int = 10,
+        chunk_indices: Optional[Sequence[int]] = None,
+    ) -> List[Tuple[int, float]]:
+        """Top-``k`` ``(chunk_index, bm25 score)`` pairs with a positive score."""
+        if k <= 0:
+            return []
+        allowed = set(chunk_indices) if chunk_indices is not None else None
+        terms = set(tokenize(query))
+
+        scores: Dict[int, float] = {}
+        with self._lock:
+            n = len(self.texts)
+            if not n:
+                return []
+            average_length = self.total_length / n or 1.0
+            for term in terms:
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                for chunk_index, tf in postings.items():
+                    if allowed is not None and chunk_index not in allowed:
+                        continue
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[chunk_index] / average_length)
+                    scores[chunk_index] = scores.get(chunk_index, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:k]
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            chunks = [[index, text] for index, text in sorted(self.texts.items())]
+        return {"transcription_id": self.transcription_id, "chunks": chunks}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "BM25Index":
+        index = cls(data.get("transcription_id", ""))
+        index.add_many((int(chunk_index), text) for chunk_index, text in data.get("chunks", []))
+        return index
+
+
+def bm25_rank(query: str, texts: Sequence[str]) -> List[Tuple[float, int]]:
+    """BM25 ``(score, position)`` of every text in ``texts``, best first.
+
+    For ad-hoc passage lists that are not backed by a persisted index.
+    """
+    index = BM25Index()
+    index.add_many(enumerate(texts))
+    scores = dict(index.search(query, k=len(texts)))
+    return sorted(
+        ((scores.get(position, 0.0), position) for position in range(len(texts))),
+        key=lambda item: (-item[0], item[1]),
+    )
+
+
+class LexicalIndexStore:
+    """Loads, caches and persists ``BM25Index`` files per transcription.
+
+    Indexes are stored as gzipped JSON (the chunk texts; postings are
+    rebuilt on load).  Transcriptions ingested before lexical indexing
+    existed are indexed lazily from their Chroma documents on first use.
+    """
+
+    def __init__(
+        self, directory: str = LEXICAL_INDEX_DIR, max_entries: int = LEXICAL_INDEX_CACHE_SIZE
+    ) -> None:
+        self.directory = directory
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, BM25Index]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.builds = 0
+
+    def path(self, transcription_id: str) -> str:
+        return os.path.join(self.directory, f"{transcription_id}.json.gz")
+
+    def _remember(self, index: BM25Index) -> None:
+        self._entries[index.transcription_id] = index
+        self._entries.move_to_end(index.transcription_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def remember(self, index: BM25Index) -> None:
+        """Serve ``index`` from the cache without persisting it (yet)."""
+        with self._lock:
+            self._remember(index)
+
+    def save(self, index: BM25Index) -> None:
+        """Persist ``index`` atomically and keep it cached."""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(index.transcription_id)
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(index.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._remember(index)
+
+    def _build_from_vectors(self, transcription_id: str) -> BM25Index:
+        start = time.perf_counter()
+        result = vector_store.get_collection(COLLECTION_NAME).get(
+            where={"transcription_id": transcription_id},
+            include=["documents", "metadatas"],
+        )
+        index = BM25Index(transcription_id)
+        for position, (text, metadata) in enumerate(
+            zip(result.get("documents") or [], result.get("metadatas") or [])
+        ):
+            index.add(int((metadata or {}).get("chunk_index", position)), text or "")
+        if len(index):
+            self.save(index)
+            self.builds += 1
+        logger.info(
+            f"Built lexical index for {transcription_id} from {len(index)} stored chunks "
+            f"in {(time.perf_counter() - start) * 1000:.1f}ms"
+        )
+        return index
+
+    def get(self, transcription_id: str) -> BM25Index:
+        """Return the index for ``transcription_id`` (empty if nothing is indexed)."""
+        with self._lock:
+            index = self._entries.get(transcription_id)
+            if index is not None:
+                self._entries.move_to_end(transcription_id)
+                self.hits += 1
+                return index
+            self.misses += 1
+
+            path = self.path(transcription_id)
+            if os.path.exists(path):
+                try:
+                    with gzip.open(path, "rt", encoding="utf-8") as f:
+                        index = BM25Index.from_dict(json.load(f))
+                    self._remember(index)
+                    return index
+                except Exception as e:
+                    logger.error(f"Error loading lexical index {path}, rebuilding: {e}")
+            return self._build_from_vectors(transcription_id)
+
+    def get_for_update(self, transcription_id: str, *, fresh: bool) -> BM25Index:
+        """Index to extend during ingestion; ``fresh`` starts from scratch."""
+        if fresh:
+            return BM25Index(transcription_id)
+        with self._lock:
+            index = self._entries.get(transcription_id)
+            if index is None and os.path.exists(self.path(transcription_id)):
+                index = self.get(transcription_id)
+            return index if index is not None else BM25Index(transcription_id)
+
+    def delete(self, transcription_id: str) -> None:
+        with self._lock:
+            self._entries.pop(transcription_id, None)
+        try:
+            os.remove(self.path(transcription_id))
+        except FileNotFoundError:
+            pass
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "lazy_builds": self.builds,
+            }
+
+
+lexical_indexes = LexicalIndexStore()
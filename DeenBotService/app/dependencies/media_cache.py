@@ -0,0 +1,324 @@
+"""media_cache.py - Managed on-disk cache of uploaded and downloaded media.
+
+Downloads used to land in fresh ``youtube_downloads_*`` temp directories and
+uploads stayed in ``temp_media/`` forever (their deletion was commented
+out), so the disk filled up while a re-processed video was downloaded again.
+All media now goes through one directory, ``MEDIA_CACHE_DIR``:
+
+* ``objects/<key>.<ext>`` holds the cached files.  Uploads are
+  content-addressed (``sha256-<digest>``, hashed while they are received);
+  YouTube audio is keyed by its video id (``youtube-<id>``), which names the
+  same content without downloading it first.
+* ``staging/`` holds uploads being received and downloads in progress.  A
+  finished file is moved into ``objects/`` atomically, so a crash never
+  leaves a truncated object behind.
+
+The objects stay under ``MEDIA_CACHE_MAX_MB``: when a file is added, the
+least recently used ones are evicted.  A file is pinned while a job uses it
+and is never evicted until it is unpinned.  At startup, ``reconcile``
+empties ``staging/`` (one server process owns the directory), removes
+objects that are not named by a key, and deletes the leftovers of the old
+temp directories older than ``MEDIA_CACHE_ORPHAN_HOURS``.
+
+Typical usage::
+
+    from app.dependencies.media_cache import media_cache
+
+    media_cache.reconcile()
+    path = media_cache.get("youtube-dQw4w9WgXcQ", pin=True)
+    if path is None:
+        path = media_cache.commit(staged_path, "youtube-dQw4w9WgXcQ", pin=True)
+    try:
+        ...
+    finally:
+        media_cache.unpin("youtube-dQw4w9WgXcQ")
+"""
+from __future__ import annotations
+
+import glob
+import hashlib
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Constants
+MEDIA_CACHE_DIR = os.getenv("MEDIA_CACHE_DIR", "media_cache")
+MEDIA_CACHE_MAX_MB = int(os.getenv("MEDIA_CACHE_MAX_MB", "20480"))
+# Age after which files left in the pre-cache temp directories are orphans
+MEDIA_CACHE_ORPHAN_HOURS = float(os.getenv("MEDIA_CACHE_ORPHAN_HOURS", "24"))
+# Directories media used to be written to before the cache
+LEGACY_UPLOAD_DIR = "temp_media"
+LEGACY_TEMP_PREFIXES = ("youtube_downloads_", "audio_chunks_")
+
+_KEY_RE = re.compile(r"^(sha256-[0-9a-f]{64}|youtube-[A-Za-z0-9_-]{11})$")
+_EXT_RE = re.compile(r"^\.[A-Za-z0-9]{1,8}$")
+_HASH_BLOCK = 1024 * 1024
+
+
+def upload_key(digest: str) -> str:
+    """Cache key of an upload from the sha256 hex digest of its bytes."""
+    return f"sha256-{digest}"
+
+
+def youtube_key(video_id: str) -> str:
+    """Cache key of the audio of a YouTube video."""
+    return f"youtube-{video_id}"
+
+
+def file_sha256(path: str) -> str:
+    """Hex sha256 of a file's bytes."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class _Entry:
+    def __init__(self, path: str, size: int, last_used: float) -> None:
+        self.path = path
+        self.size = size
+        self.last_used = last_used
+
+
+class MediaCache:
+    """Content-addressed media files under a byte budget, evicted LRU."""
+
+    def __init__(
+        self,
+        root: str = MEDIA_CACHE_DIR,
+        *,
+        max_mb: int = MEDIA_CACHE_MAX_MB,
+        orphan_hours: float = MEDIA_CACHE_ORPHAN_HOURS,
+    ) -> None:
+        self.root = root
+        self.objects_dir = os.path.join(root, "objects")
+        self.staging_dir = os.path.join(root, "staging")
+        self.max_bytes = max_mb * 1024 * 1024
+        self.orphan_seconds = orphan_hours * 3600
+        self._lock = threading.Lock()
+        self._entries: Dict[str, _Entry] = {}
+        self._pins: Counter = Counter()
+        self._loaded = False
+        self.hits = 0
+        self.misses = 0
+        self.added = 0
+        self.evicted = 0
+        self.evicted_bytes = 0
+        self.orphans_removed = 0
+
+    # ------------------------------------------------------------------
+    # Startup
+    # ------------------------------------------------------------------
+    def _load(self) -> None:
+        """Index the objects on disk (once); call with the lock held."""
+        if self._loaded:
+            return
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.staging_dir, exist_ok=True)
+        for entry in os.scandir(self.objects_dir):
+            key, ext = os.path.splitext(entry.name)
+            try:
+                stat = entry.stat()
+                valid = entry.is_file() and _KEY_RE.match(key) and _EXT_RE.match(ext) and stat.st_size > 0
+            except OSError:
+                continue
+            if not valid or key in self._entries:
+                self._remove_path(entry.path)
+                self.orphans_removed += 1
+                continue
+            self._entries[key] = _Entry(entry.path, stat.st_size, max(stat.st_atime, stat.st_mtime))
+        self._loaded = True
+
+    def reconcile(self, now: Optional[float] = None) -> int:
+        """Remove orphaned media and bring the cache under its budget.
+
+        Run once at startup, before any job uses the cache.  Returns the
+        number of orphans removed.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            before = self.orphans_removed
+            # Uploads and downloads interrupted by the last shutdown
+            shutil.rmtree(self.staging_dir, ignore_errors=True)
+            self._load()
+            legacy = [os.path.join(LEGACY_UPLOAD_DIR, name) for name in _listdir(LEGACY_UPLOAD_DIR)]
+            for prefix in LEGACY_TEMP_PREFIXES:
+                legacy.extend(glob.glob(os.path.join(tempfile.gettempdir(), f"{prefix}*")))
+            for path in legacy:
+                try:
+                    if now - os.path.getmtime(path) < self.orphan_seconds:
+                        continue
+                except OSError:
+                    continue
+                self._remove_path(path)
+                self.orphans_removed += 1
+            self._evict(0)
+            removed = self.orphans_removed - before
+        if removed:
+            logger.info(f"Media cache removed {removed} orphaned files")
+        logger.info(
+            f"Media cache {self.root}: {len(self._entries)} files, "
+            f"{self.total_bytes() / (1024 * 1024):.0f}/{self.max_bytes // (1024 * 1024)} MB"
+        )
+        return removed
+
+    # ------------------------------------------------------------------
+    # Files
+    # ------------------------------------------------------------------
+    def staging_path(self, prefix: str = "", suffix: str = "") -> str:
+        """A new path in the staging area for a file being written."""
+        os.makedirs(self.staging_dir, exist_ok=True)
+        fd, path = tempfile.mkstemp(prefix=prefix, suffix=suffix, dir=self.staging_dir)
+        os.close(fd)
+        return path
+
+    def staging_directory(self, prefix: str = "") -> str:
+        """A new directory in the staging area (removed by the caller or at startup)."""
+        os.makedirs(self.staging_dir, exist_ok=True)
+        return tempfile.mkdtemp(prefix=prefix, dir=self.staging_dir)
+
+    def get(self, key: str, *, pin: bool = False) -> Optional[str]:
+        """Path of the cached file for ``key`` (marked as used), or ``None``."""
+        with self._lock:
+            self._load()
+            entry = self._entries.get(key)
+            if entry is not None and not os.path.exists(entry.path):
+                # Removed behind the cache's back
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._touch(entry)
+            if pin:
+                self._pins[key] += 1
+            return entry.path
+
+    def commit(self, staged_path: str, key: str, *, pin: bool = False, replace: bool = False) -> str:
+        """Move a finished staged file into the cache under ``key``.
+
+        If ``key`` is already cached (the same upload again), the staged copy
+        is dropped and the cached file is used, unless ``replace`` is set (a
+        forced re-download).  Returns the cached path.
+        """
+        ext = os.path.splitext(staged_path)[1].lower()
+        if not _EXT_RE.match(ext):
+            ext = ".bin"
+        with self._lock:
+            self._load()
+            entry = self._entries.get(key)
+            if entry is not None and os.path.exists(entry.path) and not replace:
+                self._remove_path(staged_path)
+                self.hits += 1
+                self._touch(entry)
+            else:
+                path = os.path.join(self.objects_dir, f"{key}{ext}")
+                os.replace(staged_path, path)
+                if entry is not None and entry.path != path:
+                    self._remove_path(entry.path)
+                entry = _Entry(path, os.path.getsize(path), time.time())
+                self._entries[key] = entry
+                self.added += 1
+            if pin:
+                self._pins[key] += 1
+            self._evict(0)
+            return entry.path
+
+    def pin(self, key: str) -> None:
+        """Keep ``key`` from being evicted while a job uses it."""
+        with self._lock:
+            self._pins[key] += 1
+
+    def unpin(self, key: str) -> None:
+        """Release one pin of ``key``; it becomes evictable at zero."""
+        with self._lock:
+            if self._pins[key] > 1:
+                self._pins[key] -= 1
+            else:
+                # Last pin (or one lost with a restart)
+                self._pins.pop(key, None)
+            self._evict(0)
+
+    def make_room(self, size: int) -> None:
+        """Evict unpinned files until ``size`` more bytes fit the budget."""
+        with self._lock:
+            self._load()
+            self._evict(size)
+
+    # ------------------------------------------------------------------
+    # Internals (lock held)
+    # ------------------------------------------------------------------
+    def _touch(self, entry: _Entry) -> None:
+        entry.last_used = time.time()
+        try:
+            # Persists the recency across restarts (atime may not be updated)
+            os.utime(entry.path)
+        except OSError:
+            pass
+
+    def _evict(self, incoming: int) -> None:
+        total = sum(entry.size for entry in self._entries.values())
+        if total + incoming <= self.max_bytes:
+            return
+        for key, entry in sorted(self._entries.items(), key=lambda item: item[1].last_used):
+            if total + incoming <= self.max_bytes:
+                break
+            if self._pins.get(key):
+                continue
+            self._remove_path(entry.path)
+            del self._entries[key]
+            total -= entry.size
+            self.evicted += 1
+            self.evicted_bytes += entry.size
+            logger.info(f"Evicted {key} ({entry.size / (1024 * 1024):.1f} MB) from the media cache")
+
+    @staticmethod
+    def _remove_path(path: str) -> None:
+        if os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path, ignore_errors=True)
+            return
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(entry.size for entry in self._entries.values())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = sum(entry.size for entry in self._entries.values())
+            return {
+                "dir": self.root,
+                "files": len(self._entries),
+                "bytes": total,
+                "max_bytes": self.max_bytes,
+                "pinned": sum(1 for count in self._pins.values() if count),
+                "hits": self.hits,
+                "misses": self.misses,
+                "added": self.added,
+                "evicted": self.evicted,
+                "evicted_bytes": self.evicted_bytes,
+                "orphans_removed": self.orphans_removed,
+            }
+
+
+def _listdir(path: str):
+    try:
+        return os.listdir(path)
+    except OSError:
+        return []
+
+
+media_cache = MediaCache()
@@ -0,0 +1,391 @@
+"""memory_budget.py - Peak-memory admission control for media jobs.
+
+Every stage of a media job now streams (``split_audio`` no longer decodes
+files under 100MB into memory with pydub), so the working set of a job is
+bounded by its buffers rather than by the length of the lecture:
+``AUDIO_STREAM_BUFFER_SECONDS`` of 16 kHz PCM, one VAD segment per
+transcription worker in flight and an embedding batch.  What still grows
+with the work is the Whisper models a job may have to load.
+
+Before a job starts, the job queue reserves an estimate of its peak RSS
+(``MEDIA_JOB_MEMORY_MB`` plus the models that are not loaded yet) against
+the node budget ``NODE_MEMORY_BUDGET_MB``.  A job that does not fit next to
+the running ones waits; a job that could never fit is refused.  A job that
+only sometimes transcribes (a YouTube video without usable captions) starts
+with the base reservation and ``grow``s it to the Whisper estimate when it
+falls back to Whisper.  The worker
+processes of ``transcription_pool`` keep their model copies after the job
+that started them: a running pool holds a standing reservation (workers x
+(model + ``WORKER_OVERHEAD_MB``)) until it is shut down, except while the
+job that started it, whose own reservation covers the workers, runs.  A sampler
+thread measures the RSS of the server and its worker processes every
+``MEMORY_SAMPLE_SECONDS`` and records, per running job, the peak growth over
+the RSS when it started.  With concurrent jobs that growth is shared, so it
+is an upper bound of each job's own usage.
+
+Reservations are advisory: they decide when a job may start, but nothing
+stops a running job that outgrows its reservation.  Such a job is logged
+and counted (``over_budget`` in ``stats()``) so that ``MEDIA_JOB_MEMORY_MB``
+and the model estimates can be corrected; the kernel remains the only
+hard limit.
+
+Typical usage::
+
+    from app.dependencies.memory_budget import memory_budget
+
+    memory_budget.start()
+    await memory_budget.acquire(job_id, whisper_model="base")
+    try:
+        ...
+        await memory_budget.grow(job_id, whisper_model="base")  # falling back to Whisper
+    finally:
+        peak_mb = await memory_budget.release(job_id)
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from app.dependencies.transcription_pool import WORKER_OVERHEAD_MB, available_memory_mb, transcription_pool
+from app.dependencies.whisper_pool import MODEL_MEMORY_MB, whisper_pool
+
+logger = logging.getLogger(__name__)
+
+# Constants
+# Peak RSS budget of one job, models excluded
+MEDIA_JOB_MEMORY_MB = int(os.getenv("MEDIA_JOB_MEMORY_MB", "768"))
+# 0 derives it from the memory available when the job queue starts
+NODE_MEMORY_BUDGET_MB = int(os.getenv("NODE_MEMORY_BUDGET_MB", "0"))
+NODE_MEMORY_BUDGET_FRACTION = 0.8
+MEMORY_SAMPLE_SECONDS = float(os.getenv("MEMORY_SAMPLE_SECONDS", "1"))
+# Waiting jobs re-check the live available memory at least this often
+_RECHECK_SECONDS = 5.0
+_RECENT_PEAKS = 50
+
+
+class JobTooLarge(Exception):
+    """The job's memory estimate exceeds the whole node budget."""
+
+
+def process_rss_mb(pid: str = "self") -> Optional[float]:
+    """Resident set size of ``pid`` (Linux), if known."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        return None
+    return None
+
+
+def child_pids(parent: Optional[int] = None) -> List[int]:
+    """Direct children of ``parent`` (default: this process)."""
+    parent = os.getpid() if parent is None else parent
+    children = []
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return children
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The command name may contain spaces; fields resume after its ")"
+        fields = stat[stat.rfind(")") + 2:].split()
+        if len(fields) > 1 and fields[1] == str(parent):
+            children.append(int(entry))
+    return children
+
+
+def tree_rss_mb() -> Optional[float]:
+    """RSS of this process plus its children (Whisper workers, ffmpeg)."""
+    own = process_rss_mb()
+    if own is None:
+        return None
+    return own + sum(process_rss_mb(str(pid)) or 0.0 for pid in child_pids())
+
+
+class _Reservation:
+    def __init__(
+        self, reserved_mb: float, baseline_mb: Optional[float], pool_size: Optional[str] = None
+    ) -> None:
+        self.reserved_mb = reserved_mb
+        self.baseline_mb = baseline_mb
+        # Model size of the transcription pool this reservation starts (and covers)
+        self.pool_size = pool_size
+        self.peak_mb = 0.0
+        self.over_budget = False
+
+
+class MemoryBudget:
+    """Reserves estimated peak memory for jobs against a node-wide budget."""
+
+    def __init__(
+        self,
+        *,
+        job_mb: int = MEDIA_JOB_MEMORY_MB,
+        node_mb: int = NODE_MEMORY_BUDGET_MB,
+        sample_seconds: float = MEMORY_SAMPLE_SECONDS,
+    ) -> None:
+        self.job_mb = job_mb
+        self.node_mb = node_mb
+        self.sample_seconds = sample_seconds
+        self._jobs: Dict[str, _Reservation] = {}
+        self._waiting = 0
+        # Running jobs waiting in grow()
+        self._growing: set = set()
+        self._condition: Optional[asyncio.Condition] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._recent_peaks: Deque[float] = deque(maxlen=_RECENT_PEAKS)
+        self.admitted = 0
+        self.delayed = 0
+        self.refused = 0
+        self.over_budget = 0
+
+    # ------------------------------------------------------------------
+    # Estimates
+    # ------------------------------------------------------------------
+    def transcription_job_mb(self, model_size: str) -> float:
+        """Peak estimate of a transcription job: its buffers plus cold models."""
+        model_mb = MODEL_MEMORY_MB.get(model_size.split(".")[0], MODEL_MEMORY_MB["large"])
+        if transcription_pool.enabled_for(model_size):
+            if transcription_pool.is_running(model_size):
+                return self.job_mb
+            return self.job_mb + transcription_pool.worker_count(model_size) * (model_mb + WORKER_OVERHEAD_MB)
+        if whisper_pool.is_loaded(model_size):
+            return self.job_mb
+        return self.job_mb + model_mb
+
+    def _estimate(self, mb: Optional[float], whisper_model: Optional[str]):
+        """``(reserved MB, model size of the pool the job would start)``."""
+        if whisper_model is None:
+            return (self.job_mb if mb is None else mb), None
+        cold_pool = (
+            transcription_pool.enabled_for(whisper_model)
+            and not transcription_pool.is_running(whisper_model)
+        )
+        return self.transcription_job_mb(whisper_model), (whisper_model if cold_pool else None)
+
+    # ------------------------------------------------------------------
+    # Admission
+    # ------------------------------------------------------------------
+    def jobs_mb(self) -> float:
+        with self._lock:
+            return sum(job.reserved_mb for job in self._jobs.values())
+
+    def pools_mb(self) -> float:
+        """Standing reservation of the running transcription pools.
+
+        A pool is left out while the job that started it runs: that job's
+        reservation already includes its workers.
+        """
+        with self._lock:
+            covered = {job.pool_size for job in self._jobs.values() if job.pool_size}
+        return sum(
+            mb for size, mb in transcription_pool.resident_mb().items() if size not in covered
+        )
+
+    def reserved_mb(self) -> float:
+        return self.jobs_mb() + self.pools_mb()
+
+    def _fits(self, mb: float, own_mb: float = 0.0) -> bool:
+        """Whether ``mb`` more fits; ``own_mb`` is the reservation of the job asking, if running."""
+        if self.jobs_mb() - own_mb <= 0:
+            # A job that fits the node budget may always run alone (starting
+            # its pool shuts down the idle pools of other model sizes)
+            return True
+        if self.reserved_mb() + mb > self.node_mb:
+            return False
+        available = available_memory_mb()
+        return available is None or mb <= available
+
+    async def acquire(
+        self, job_id: str, mb: Optional[float] = None, *, whisper_model: Optional[str] = None
+    ) -> None:
+        """Wait until the job fits next to the running jobs, then reserve it.
+
+        The job needs ``mb``, or, if it transcribes with ``whisper_model``,
+        ``transcription_job_mb(whisper_model)`` (re-estimated while it waits,
+        as pools start and stop).  Raises ``JobTooLarge`` if it exceeds the
+        node budget on its own.
+        """
+        needed, _ = self._estimate(mb, whisper_model)
+        if self.node_mb > 0 and needed > self.node_mb:
+            self.refused += 1
+            raise JobTooLarge(f"needs ~{needed:.0f} MB, node budget is {self.node_mb} MB")
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        async with self._condition:
+            if self.node_mb > 0 and not self._fits(needed):
+                self.delayed += 1
+                self._waiting += 1
+                logger.info(f"Media job {job_id} waits for ~{needed:.0f} MB of memory")
+                try:
+                    while not self._fits(self._estimate(mb, whisper_model)[0]):
+                        try:
+                            await asyncio.wait_for(self._condition.wait(), timeout=_RECHECK_SECONDS)
+                        except asyncio.TimeoutError:
+                            pass
+                finally:
+                    self._waiting -= 1
+            needed, pool_size = self._estimate(mb, whisper_model)
+            with self._lock:
+                self._jobs[job_id] = _Reservation(needed, tree_rss_mb(), pool_size)
+            self.admitted += 1
+
+    async def grow(self, job_id: str, *, whisper_model: str) -> None:
+        """Raise a running job's reservation to ``transcription_job_mb(whisper_model)``.
+
+        For jobs that turn out to need Whisper after they started.  Waits
+        until the difference fits; it stops waiting if every other running
+        job is itself waiting to grow, since none of them would release
+        memory.  Raises ``JobTooLarge`` if the estimate exceeds the node
+        budget on its own.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            return
+        needed, _ = self._estimate(None, whisper_model)
+        if self.node_mb > 0 and needed > self.node_mb:
+            self.refused += 1
+            raise JobTooLarge(f"needs ~{needed:.0f} MB, node budget is {self.node_mb} MB")
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        async with self._condition:
+            self._growing.add(job_id)
+            try:
+                while True:
+                    needed, pool_size = self._estimate(None, whisper_model)
+                    extra = needed - job.reserved_mb
+                    if extra <= 0 or self.node_mb <= 0 or self._fits(extra, own_mb=job.reserved_mb):
+                        break
+                    with self._lock:
+                        deadlocked = self._growing >= set(self._jobs)
+                    if deadlocked:
+                        logger.warning(f"Media job {job_id} grows without waiting: every running job is growing")
+                        break
+                    logger.info(f"Media job {job_id} waits for ~{extra:.0f} MB more memory")
+                    try:
+                        await asyncio.wait_for(self._condition.wait(), timeout=_RECHECK_SECONDS)
+                    except asyncio.TimeoutError:
+                        pass
+            finally:
+                self._growing.discard(job_id)
+            with self._lock:
+                job.reserved_mb = max(job.reserved_mb, needed)
+                job.pool_size = job.pool_size or pool_size
+
+    async def release(self, job_id: str) -> Optional[float]:
+        """Free the job's reservation; returns its measured peak growth in MB."""
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+            if job is not None and job.baseline_mb is not None:
+                self._recent_peaks.append(job.peak_mb)
+        if self._condition is not None:
+            async with self._condition:
+                self._condition.notify_all()
+        if job is None or job.baseline_mb is None:
+            return None
+        return round(job.peak_mb, 1)
+
+    def job_usage(self, job_id: str) -> Optional[Dict[str, float]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            return {"reserved_mb": round(job.reserved_mb), "peak_mb": round(job.peak_mb, 1)}
+
+    # ------------------------------------------------------------------
+    # Measurement
+    # ------------------------------------------------------------------
+    def sample(self) -> None:
+        """Update the peak growth of every running job.
+
+        Going over the reservation is only reported (see the module notes).
+        """
+        with self._lock:
+            if not self._jobs:
+                return
+        rss = tree_rss_mb()
+        if rss is None:
+            return
+        with self._lock:
+            for job_id, job in self._jobs.items():
+                if job.baseline_mb is None:
+                    continue
+                job.peak_mb = max(job.peak_mb, rss - job.baseline_mb)
+                if job.peak_mb > job.reserved_mb and not job.over_budget:
+                    job.over_budget = True
+                    self.over_budget += 1
+                    logger.warning(
+                        f"Media job {job_id} grew {job.peak_mb:.0f} MB, "
+                        f"over its {job.reserved_mb:.0f} MB budget"
+                    )
+
+    def _sampler_loop(self) -> None:
+        while not self._stop.wait(self.sample_seconds):
+            try:
+                self.sample()
+            except Exception as e:
+                logger.error(f"Error sampling job memory: {e}")
+
+    def start(self) -> None:
+        """Fix the node budget and start the sampler thread (idempotent)."""
+        with self._lock:
+            if self._sampler and self._sampler.is_alive():
+                return
+            if self.node_mb <= 0:
+                # Measured after the preloaded models: the rest is for jobs
+                available = available_memory_mb()
+                if available is not None:
+                    self.node_mb = int(available * NODE_MEMORY_BUDGET_FRACTION)
+            logger.info(
+                f"Media job memory: {self.job_mb} MB per job, "
+                f"node budget {self.node_mb or 'unlimited'} MB"
+            )
+            self._stop.clear()
+            self._sampler = threading.Thread(target=self._sampler_loop, name="job-memory-sampler", daemon=True)
+            self._sampler.start()
+
+    def close(self) -> None:
+        self._stop.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            peaks = list(self._recent_peaks)
+            running = {
+                job_id: {"reserved_mb": round(job.reserved_mb), "peak_mb": round(job.peak_mb, 1)}
+                for job_id, job in self._jobs.items()
+            }
+        reserved = sum(job["reserved_mb"] for job in running.values())
+        pools = self.pools_mb()
+        return {
+            "job_budget_mb": self.job_mb,
+            "node_budget_mb": self.node_mb,
+            "reserved_mb": round(reserved + pools),
+            "pools_mb": round(pools),
+            "available_mb": available_memory_mb(),
+            "running": running,
+            "waiting": self._waiting,
+            "admitted": self.admitted,
+            "delayed": self.delayed,
+            "refused": self.refused,
+            "over_budget": self.over_budget,
+            "max_recent_peak_mb": round(max(peaks), 1) if peaks else None,
+        }
+
+
+memory_budget = MemoryBudget()
@@ -0,0 +1,223 @@
+"""numpy_index.py - Exact in-memory top-k search over one transcription.
+
+Nearly every question is scoped to a single ``transcription_id``, yet Chroma
+answers it through a filtered HNSW search over every lecture ever ingested.
+A lecture has at most a few thousand chunks, so an exact search is cheap:
+this module loads the chunk embeddings of a transcription once into a
+contiguous, row-normalised float32 matrix and answers top-k with one
+matrix-vector product and ``argpartition``.  Hot transcriptions are kept in
+an LRU bounded by entry count and total matrix bytes.
+
+Typical usage::
+
+    from app.dependencies.numpy_index import numpy_index
+
+    hits = numpy_index.search(transcription_id, query_vector, k=5)
+    for document, metadata, score in hits:
+        ...
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.dependencies.embedding_registry import LatencyStats
+from app.dependencies.vector_store import COLLECTION_NAME, vector_store
+
+logger = logging.getLogger(__name__)
+
+# Constants
+NUMPY_INDEX_CACHE_SIZE = int(os.getenv("NUMPY_INDEX_CACHE_SIZE", "32"))
+NUMPY_INDEX_MAX_MB = int(os.getenv("NUMPY_INDEX_MAX_MB", "512"))
+
+
+class TranscriptionMatrix:
+    """Chunk texts, metadata and normalised embeddings of one transcription."""
+
+    def __init__(
+        self,
+        transcription_id: str,
+        documents: List[str],
+        metadatas: List[Dict[str, Any]],
+        embeddings: Sequence[Sequence[float]],
+    ) -> None:
+        self.transcription_id = transcription_id
+        self.documents = documents
+        self.metadatas = metadatas
+        self.chunk_indices = np.array(
+            [int(m.get("chunk_index", i)) for i, m in enumerate(metadatas)],
+            dtype=np.int64,
+        )
+        matrix = np.ascontiguousarray(np.asarray(embeddings, dtype=np.float32))
+        if matrix.ndim != 2:
+            matrix = matrix.reshape(len(documents), -1)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self.matrix = matrix / norms
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.matrix.nbytes + self.chunk_indices.nbytes)
+
+    def top_k(
+        self,
+        query_vector: Sequence[float],
+        k: int,
+        chunk_indices: Optional[Sequence[int]] = None,
+    ) -> List[Tuple[int, float]]:
+        """Return ``(row, cosine similarity)`` of the ``k`` best rows."""
+        if not len(self) or k <= 0:
+            return []
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+
+        scores = self.matrix @ query
+        if chunk_indices is not None:
+            allowed = np.isin(self.chunk_indices, np.asarray(list(chunk_indices)))
+            scores = np.where(allowed, scores, -np.inf)
+
+        k = min(k, len(scores))
+        if k < len(scores):
+            rows = np.argpartition(-scores, k - 1)[:k]
+        else:
+            rows = np.arange(len(scores))
+        rows = rows[np.argsort(-scores[rows], kind="stable")]
+        return [(int(row), float(scores[row])) for row in rows if np.isfinite(scores[row])]
+
+
+class NumpyIndexCache:
+    """LRU of ``TranscriptionMatrix`` objects loaded from Chroma."""
+
+    def __init__(
+        self,
+        *,
+        max_entries: int = NUMPY_INDEX_CACHE_SIZE,
+        max_bytes: int = NUMPY_INDEX_MAX_MB * 1024 * 1024,
+        collection_name: str = COLLECTION_NAME,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.collection_name = collection_name
+        self._entries: "OrderedDict[str, TranscriptionMatrix]" = OrderedDict()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.load_stats = LatencyStats()
+        self.search_stats = LatencyStats()
+
+    def _load_lock(self, transcription_id: str) -> threading.Lock:
+        with self._lock:
+            lock = self._load_locks.get(transcription_id)
+            if lock is None:
+                lock = self._load_locks[transcription_id] = threading.Lock()
+            return lock
+
+    def _load(self, transcription_id: str) -> TranscriptionMatrix:
+        start = time.perf_counter()
+        result = vector_store.get_collection(self.collection_name).get(
+            where={"transcription_id": transcription_id},
+            include=["documents", "metadatas", "embeddings"],
+        )
+        embeddings = result.get("embeddings")
+        if embeddings is None:
+            embeddings = []
+        entry = TranscriptionMatrix(
+            transcription_id,
+            list(result.get("documents") or []),
+            [dict(m or {}) for m in (result.get("metadatas") or [])],
+            embeddings,
+        )
+        elapsed = time.perf_counter() - start
+        self.load_stats.record(elapsed, len(entry))
+        logger.info(
+            f"Loaded {len(entry)} chunk embeddings for {transcription_id} "
+            f"into numpy index in {elapsed * 1000:.1f}ms ({entry.nbytes} bytes)"
+        )
+        return entry
+
+    def _used_bytes(self) -> int:
+        return sum(entry.nbytes for entry in self._entries.values())
+
+    def get(self, transcription_id: str) -> TranscriptionMatrix:
+        """Return the matrix for ``transcription_id``, loading it on a miss."""
+        with self._lock:
+            entry = self._entries.get(transcription_id)
+            if entry is not None:
+                self._entries.move_to_end(transcription_id)
+                self.hits += 1
+                return entry
+
+        with self._load_lock(transcription_id):
+            with self._lock:
+                entry = self._entries.get(transcription_id)
+                if entry is not None:
+                    self._entries.move_to_end(transcription_id)
+                    self.hits += 1
+                    return entry
+                self.misses += 1
+
+            entry = self._load(transcription_id)
+            if not len(entry):
+                # Nothing indexed (yet); do not cache so that a later
+                # ingestion is picked up on the next query
+                return entry
+
+            with self._lock:
+                self._entries[transcription_id] = entry
+                while len(self._entries) > 1 and (
+                    len(self._entries) > self.max_entries
+                    or self._used_bytes() > self.max_bytes
+                ):
+                    evicted, _ = self._entries.popitem(last=False)
+                    self.evictions += 1
+                    logger.debug(f"Evicted {evicted} from numpy index")
+            return entry
+
+    def invalidate(self, transcription_id: str) -> None:
+        """Drop a cached matrix after its vectors changed."""
+        with self._lock:
+            self._entries.pop(transcription_id, None)
+
+    def search(
+        self,
+        transcription_id: str,
+        query_vector: Sequence[float],
+        k: int = 5,
+        chunk_indices: Optional[Sequence[int]] = None,
+    ) -> List[Tuple[str, Dict[str, Any], float]]:
+        """Exact top-k ``(document, metadata, score)`` within one transcription."""
+        entry = self.get(transcription_id)
+        start = time.perf_counter()
+        rows = entry.top_k(query_vector, k, chunk_indices)
+        self.search_stats.record(time.perf_counter() - start)
+        return [(entry.documents[row], entry.metadatas[row], score) for row, score in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self._used_bytes(),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "load": self.load_stats.as_dict(),
+                "search": self.search_stats.as_dict(),
+            }
+
+
+numpy_index = NumpyIndexCache()
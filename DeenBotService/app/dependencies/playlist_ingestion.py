@@ -0,0 +1,199 @@
+"""playlist_ingestion.py - Background ingestion of the curated YouTube playlists.
+
+Lessons of the Hasaniya playlists used to be transcribed only when a user
+opened one, and that user waited 10-30 minutes for it.  A bulk run takes the
+videos of every playlist (from the cached playlist data), skips those the
+YouTube index already has, and feeds the others to the ``youtube`` media job
+(captions first, Whisper otherwise) without opening conversations for them.
+The first user to open such a lesson then gets a conversation at once.
+
+Bulk jobs give way to users:
+
+* at most ``BULK_INGEST_CONCURRENCY`` of them are queued or running at once;
+* the next one is only submitted within the off-peak hours
+  ``BULK_INGEST_HOURS`` (server local time, e.g. ``1-7`` or ``22-6``; empty
+  means any time) and while no other media job waits in the queue.
+
+They are submitted under the same key as ``/process-youtube``, so a user who
+opens a lesson that is being ingested is attached to its job.  Stopping a
+run, or a restart, leaves the jobs already submitted to finish.
+
+Typical usage::
+
+    from app.dependencies.playlist_ingestion import playlist_ingestor
+
+    playlist_ingestor.start(jobs, skipped=len(indexed))
+    status = playlist_ingestor.status()
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from app.dependencies.job_queue import JOB_FAILED, JOB_SUCCEEDED, job_queue
+
+logger = logging.getLogger(__name__)
+
+# Constants
+BULK_INGEST_CONCURRENCY = int(os.getenv("BULK_INGEST_CONCURRENCY", "1"))
+# Hours (server local time) during which bulk jobs are submitted; empty = always
+BULK_INGEST_HOURS = os.getenv("BULK_INGEST_HOURS", "1-7")
+BULK_INGEST_POLL_SECONDS = float(os.getenv("BULK_INGEST_POLL_SECONDS", "30"))
+
+# (video id, job dedup key, youtube job payload)
+BulkJob = Tuple[str, Optional[str], Dict[str, Any]]
+
+
+def parse_hours(hours: str) -> Optional[Tuple[int, int]]:
+    """``"1-7"`` -> ``(1, 7)``; ``None`` (no restriction) for an empty value."""
+    hours = (hours or "").strip()
+    if not hours:
+        return None
+    start, _, end = hours.partition("-")
+    return int(start) % 24, int(end or start) % 24
+
+
+def in_window(hour: int, window: Optional[Tuple[int, int]]) -> bool:
+    """Whether ``hour`` falls in ``[start, end)``, which may wrap past midnight."""
+    if window is None:
+        return True
+    start, end = window
+    if start == end:
+        return True
+    if start < end:
+        return start <= hour < end
+    return hour >= start or hour < end
+
+
+class PlaylistIngestor:
+    """Feeds a list of videos to the job queue, a few at a time, off-peak."""
+
+    def __init__(
+        self,
+        *,
+        concurrency: int = BULK_INGEST_CONCURRENCY,
+        hours: str = BULK_INGEST_HOURS,
+        poll_seconds: float = BULK_INGEST_POLL_SECONDS,
+    ) -> None:
+        self.concurrency = max(1, concurrency)
+        self.hours = hours
+        self.window = parse_hours(hours)
+        self.poll_seconds = poll_seconds
+        self._task: Optional[asyncio.Task] = None
+        self._pending: Deque[BulkJob] = deque()
+        self._in_flight: Dict[str, str] = {}
+        self.waiting: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.total = 0
+        self.skipped = 0
+        self.submitted = 0
+        self.succeeded = 0
+        self.failed = 0
+
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, jobs: List[BulkJob], *, skipped: int = 0) -> bool:
+        """Start ingesting ``jobs`` in the background; ``False`` if a run is in progress."""
+        if self.is_running():
+            return False
+        self._pending = deque(jobs)
+        self._in_flight = {}
+        self.waiting = None
+        self.started_at, self.finished_at = time.time(), None
+        self.total = len(jobs)
+        self.skipped = skipped
+        self.submitted = self.succeeded = self.failed = 0
+        self._task = asyncio.create_task(self._run(), name="playlist-ingestion")
+        logger.info(f"Bulk ingestion of {len(jobs)} videos started ({skipped} already indexed)")
+        return True
+
+    def stop(self) -> bool:
+        """Stop submitting; the jobs already submitted still finish."""
+        if not self.is_running():
+            return False
+        self._task.cancel()
+        return True
+
+    def _throttled(self) -> Optional[str]:
+        """Why the next job must wait, or ``None``."""
+        if not in_window(datetime.now().hour, self.window):
+            return "off_peak_hours"
+        if job_queue.stats()["queued"] > 0:
+            return "queue_busy"
+        return None
+
+    async def _reap(self) -> None:
+        for job_id in list(self._in_flight):
+            status = await job_queue.get_status(job_id)
+            state = status["status"] if status else JOB_FAILED
+            if state not in (JOB_SUCCEEDED, JOB_FAILED):
+                continue
+            video_id = self._in_flight.pop(job_id)
+            if state == JOB_SUCCEEDED:
+                self.succeeded += 1
+            else:
+                self.failed += 1
+                logger.warning(f"Bulk ingestion of {video_id} failed: {(status or {}).get('error')}")
+
+    async def _run(self) -> None:
+        try:
+            while self._pending or self._in_flight:
+                await self._reap()
+                if self._pending and len(self._in_flight) < self.concurrency:
+                    self.waiting = self._throttled()
+                    if self.waiting is None:
+                        video_id, dedup_key, payload = self._pending.popleft()
+                        try:
+                            job_id, _ = await job_queue.submit_once("youtube", payload, dedup_key)
+                        except Exception as e:
+                            self.failed += 1
+                            logger.error(f"Could not queue bulk ingestion of {video_id}: {e}")
+                            continue
+                        self._in_flight[job_id] = video_id
+                        self.submitted += 1
+                        continue
+                await asyncio.sleep(self.poll_seconds)
+            logger.info(
+                f"Bulk ingestion finished: {self.succeeded} ingested, {self.failed} failed, "
+                f"{self.skipped} already indexed"
+            )
+        except asyncio.CancelledError:
+            logger.info(f"Bulk ingestion stopped with {len(self._pending)} videos left")
+            raise
+        except Exception as e:
+            logger.error(f"Bulk ingestion crashed: {e}")
+        finally:
+            self.waiting = None
+            self.finished_at = time.time()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "running": self.is_running(),
+            "total": self.total,
+            "skipped": self.skipped,
+            "pending": len(self._pending),
+            "in_flight": dict(self._in_flight),
+            "submitted": self.submitted,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "waiting": self.waiting,
+            "concurrency": self.concurrency,
+            "hours": self.hours if self.window else None,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        status = self.status()
+        status.pop("in_flight")
+        return status
+
+
+playlist_ingestor = PlaylistIngestor()
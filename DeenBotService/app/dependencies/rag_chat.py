@@ -13,36 +13,38 @@ import logging
 from typing import List, Tuple, Dict, Any
 
 from langchain.chains import RetrievalQA
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import Chroma
 from langchain.schema.document import Document
 
+from app.dependencies.embedding_registry import EMBEDDING_MODEL_NAME, get_embeddings
 from app.dependencies.fatwallm_rag import get_llm_client, get_fallback_answer
+from app.dependencies.retrieval import RETRIEVAL_ENGINE, TranscriptionRetriever
+from app.dependencies.vector_store import COLLECTION_NAME, vector_store
 
 logger = logging.getLogger(__name__)
 
-# Constants
-CHROMA_DIR = "chroma_index"
-COLLECTION_NAME = "media_transcripts"
-EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
-
 
 def _build_retriever(context_id: str | None, vector_ids: List[int] | None, top_k: int) -> Any:
-    """Internal helper that loads the Chroma collection and returns
+    """Internal helper that fetches the shared Chroma collection and returns
     a LangChain *retriever* configured with the appropriate metadata
     filters (on ``transcription_id`` and/or ``chunk_index``).
     """
-    # Load (or create) embedding model – using exactly the same model as
+    # Transcription-scoped questions can bypass Chroma's filtered HNSW
+    # search when an in-memory engine is configured (see `retrieval`).
+    if context_id and RETRIEVAL_ENGINE != "chroma":
+        logger.debug(f"Building {RETRIEVAL_ENGINE} retriever for context {context_id}")
+        return TranscriptionRetriever(
+            transcription_id=context_id,
+            chunk_indices=list(vector_ids) if vector_ids else None,
+            k=top_k,
+        )
+
+    # Shared embedding model – exactly the same instance as the one used
     # during the vectorisation step in `vectorize_transcription_with_chroma`.
-    embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL_NAME)
-
-    # Load persistent Chroma store.  The collection **must** have the same
-    # name that was used during vectorisation.
-    store = Chroma(
-        persist_directory=CHROMA_DIR,
-        collection_name=COLLECTION_NAME,
-        embedding_function=embeddings,
-    )
+    embeddings = get_embeddings(EMBEDDING_MODEL_NAME)
+
+    # Reuse the process-wide Chroma handle.  The collection **must** have the
+    # same name that was used during vectorisation.
+    store = vector_store.get_store(COLLECTION_NAME, embeddings)
 
     # Build metadata filter – Chroma supports a simple equality filter as a
     # dict.  For multiple conditions we supply them together in the dict.
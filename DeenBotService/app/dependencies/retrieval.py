@@ -0,0 +1,205 @@
+"""retrieval.py - Transcription-scoped passage search behind one entry point.
+
+``retrieve_passages`` and the RAG retriever in ``rag_chat`` both search the
+chunks of a single transcription.  ``search_transcription`` dispatches that
+search to the engine selected by ``RETRIEVAL_ENGINE``:
+
+* ``chroma`` - filtered similarity search on the shared Chroma collection;
+* ``numpy``  - exact top-k over an in-memory matrix of the transcription's
+  embeddings (see ``numpy_index``), falling back to Chroma when the
+  transcription has no vectors yet;
+* ``hybrid`` - dense candidates (from ``HYBRID_DENSE_ENGINE``) fused with
+  BM25 candidates from the transcription's lexical index using reciprocal
+  rank fusion.
+
+Typical usage::
+
+    from app.dependencies.retrieval import search_transcription
+
+    docs = search_transcription(question, transcription_id, k=5)
+"""
+from __future__ import annotations
+
+import logging
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from app.dependencies.embedding_registry import get_embeddings
+from app.dependencies.lexical_index import lexical_indexes
+from app.dependencies.vector_store import COLLECTION_NAME, vector_store
+
+logger = logging.getLogger(__name__)
+
+# Constants
+RETRIEVAL_ENGINE = os.getenv("RETRIEVAL_ENGINE", "hybrid").lower()
+RETRIEVAL_ENGINES = ("chroma", "numpy", "hybrid")
+HYBRID_DENSE_ENGINE = os.getenv("HYBRID_DENSE_ENGINE", "chroma").lower()
+# Candidates taken from each ranking before fusion, as a multiple of k
+HYBRID_CANDIDATES_FACTOR = int(os.getenv("HYBRID_CANDIDATES_FACTOR", "4"))
+# Standard RRF damping constant (Cormack et al., 2009)
+RRF_K = 60
+
+
+def _chroma_filter(
+    transcription_id: Optional[str], chunk_indices: Optional[Sequence[int]]
+) -> Optional[Dict[str, Any]]:
+    conditions: List[Dict[str, Any]] = []
+    if transcription_id:
+        conditions.append({"transcription_id": transcription_id})
+    if chunk_indices:
+        conditions.append({"chunk_index": {"$in": list(chunk_indices)}})
+    if not conditions:
+        return None
+    if len(conditions) == 1:
+        return conditions[0]
+    return {"$and": conditions}
+
+
+def search_chroma(
+    question: str,
+    transcription_id: Optional[str],
+    k: int = 5,
+    chunk_indices: Optional[Sequence[int]] = None,
+) -> List[Document]:
+    store = vector_store.get_store(COLLECTION_NAME, get_embeddings())
+    return store.similarity_search(
+        question, k=k, filter=_chroma_filter(transcription_id, chunk_indices)
+    )
+
+
+def search_numpy(
+    question: str,
+    transcription_id: str,
+    k: int = 5,
+    chunk_indices: Optional[Sequence[int]] = None,
+) -> Optional[List[Document]]:
+    """Exact in-memory search; ``None`` when the transcription is not indexed."""
+    from app.dependencies.numpy_index import numpy_index
+
+    if not len(numpy_index.get(transcription_id)):
+        return None
+    query_vector = get_embeddings().embed_query(question)
+    return [
+        Document(page_content=text, metadata={**metadata, "score": score})
+        for text, metadata, score in numpy_index.search(
+            transcription_id, query_vector, k, chunk_indices
+        )
+    ]
+
+
+def _dense_search(
+    question: str,
+    transcription_id: str,
+    k: int,
+    chunk_indices: Optional[Sequence[int]],
+) -> List[Document]:
+    if HYBRID_DENSE_ENGINE == "numpy":
+        try:
+            docs = search_numpy(question, transcription_id, k, chunk_indices)
+            if docs is not None:
+                return docs
+        except Exception as e:
+            logger.error(f"Numpy retrieval failed for {transcription_id}, using Chroma: {e}")
+    return search_chroma(question, transcription_id, k, chunk_indices)
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[int]], rrf_k: int = RRF_K
+) -> List[Tuple[int, float]]:
+    """Fuse ranked lists of chunk indexes into ``(chunk_index, score)`` pairs."""
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, chunk_index in enumerate(ranking, start=1):
+            scores[chunk_index] = scores.get(chunk_index, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+
+def search_hybrid(
+    question: str,
+    transcription_id: str,
+    k: int = 5,
+    chunk_indices: Optional[Sequence[int]] = None,
+) -> List[Document]:
+    """Dense and BM25 candidates of one transcription fused with RRF."""
+    candidates = max(k * HYBRID_CANDIDATES_FACTOR, k)
+    dense_docs = _dense_search(question, transcription_id, candidates, chunk_indices)
+    lexical_index = lexical_indexes.get(transcription_id)
+    lexical_hits = lexical_index.search(question, candidates, chunk_indices)
+
+    documents: Dict[int, Document] = {}
+    dense_ranking: List[int] = []
+    for doc in dense_docs:
+        chunk_index = doc.metadata.get("chunk_index")
+        if chunk_index is None or chunk_index in documents:
+            continue
+        documents[chunk_index] = doc
+        dense_ranking.append(chunk_index)
+    lexical_ranking = [chunk_index for chunk_index, _ in lexical_hits]
+
+    fused = []
+    for chunk_index, score in reciprocal_rank_fusion([dense_ranking, lexical_ranking])[:k]:
+        doc = documents.get(chunk_index)
+        if doc is None:
+            doc = Document(
+                page_content=lexical_index.texts[chunk_index],
+                metadata={"transcription_id": transcription_id, "chunk_index": chunk_index},
+            )
+        doc.metadata["rrf_score"] = score
+        fused.append(doc)
+    logger.debug(
+        f"Hybrid retrieval for {transcription_id}: {len(dense_ranking)} dense, "
+        f"{len(lexical_ranking)} lexical candidates -> {len(fused)} results"
+    )
+    return fused
+
+
+def search_transcription(
+    question: str,
+    transcription_id: Optional[str],
+    k: int = 5,
+    *,
+    chunk_indices: Optional[Sequence[int]] = None,
+    engine: Optional[str] = None,
+) -> List[Document]:
+    """Top-``k`` chunks of ``transcription_id`` for ``question``."""
+    engine = (engine or RETRIEVAL_ENGINE).lower()
+    if engine == "hybrid" and transcription_id:
+        try:
+            return search_hybrid(question, transcription_id, k, chunk_indices)
+        except Exception as e:
+            logger.error(f"Hybrid retrieval failed for {transcription_id}, using Chroma: {e}")
+    elif engine == "numpy" and transcription_id:
+        try:
+            docs = search_numpy(question, transcription_id, k, chunk_indices)
+            if docs is not None:
+                return docs
+            logger.debug(f"No vectors for {transcription_id} in numpy index; using Chroma")
+        except Exception as e:
+            logger.error(f"Numpy retrieval failed for {transcription_id}, using Chroma: {e}")
+    elif engine not in RETRIEVAL_ENGINES:
+        logger.warning(f"Unknown retrieval engine {engine!r}; using Chroma")
+    return search_chroma(question, transcription_id, k, chunk_indices)
+
+
+class TranscriptionRetriever(BaseRetriever):
+    """LangChain retriever over one transcription using ``search_transcription``."""
+
+    transcription_id: Optional[str] = None
+    chunk_indices: Optional[List[int]] = None
+    k: int = 5
+    engine: Optional[str] = None
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return search_transcription(
+            query,
+            self.transcription_id,
+            self.k,
+            chunk_indices=self.chunk_indices,
+            engine=self.engine,
+        )
@@ -0,0 +1,244 @@
+"""transcript_corrections.py - Single-pass correction of Whisper transcripts.
+
+``AudioProcessor.clean_transcription`` used to run one ``re.sub`` per entry
+of the correction table, one ``str.replace`` per phrase and a lookahead
+regex plus ``findall``/``replace`` passes per prayer context, each over the
+whole multi-hour transcript: O(patterns x text).  The tables are now
+compiled once at import:
+
+* the phrase and word corrections become one trie-shaped alternation regex
+  (longest key first) whose callback looks the match up in a table.  Words
+  that earlier corrections turn into part of a multi-word key are expanded
+  into extra keys, so one pass gives the same text as the sequential
+  substitutions did;
+* the contextual rules (``سلام`` after a prayer word in the same sentence,
+  ``صلى الله على``, ``أُمة``) are applied by a second single scan.
+
+Typical usage::
+
+    from app.dependencies.transcript_corrections import clean_transcription
+
+    text = clean_transcription(raw_text)
+"""
+from __future__ import annotations
+
+import itertools
+import re
+from typing import Dict, Iterable, List
+
+# Constants
+_FILLER_RE = re.compile(r'\b(um|uh|ah|like|you know)\b', flags=re.IGNORECASE)
+_WHITESPACE_RE = re.compile(r'\s+')
+_TIMESTAMP_RE = re.compile(r'\[[\d:.]+\]')
+
+# Dictionary of common Arabic word corrections (misrecognized -> correct),
+# applied in this order with word boundaries
+ARABIC_CORRECTIONS = {
+    # Basic corrections for commonly misrecognized words
+    "دلس": "درس",
+    "سلى": "صلى",
+    "سلاة": "صلاة",
+    "سلام": "صلاة",  # Only when referring to prayer
+    "الله على": "الله عليه",
+    "أللة": "الله",
+    "اللة": "الله",
+    "هدا": "هذا",
+    "دالك": "ذلك",
+    "دلك": "ذلك",
+    "الدي": "الذي",
+    "هاده": "هذه",
+    "هادا": "هذا",
+    "طالب العلم": "طالب العلم",  # Ensure common phrases are preserved
+    "عن النبى": "عن النبي",
+    "صلى اللة علية وسلم": "صلى الله عليه وسلم",
+    "صلى الله علية": "صلى الله عليه",
+    "صلى الله على وسلم": "صلى الله عليه وسلم",
+    "صلى اللة": "صلى الله",
+    "السلة": "الصلاة",
+    "كدا": "كذا",
+    "كدلك": "كذلك",
+
+    # Common religious terms
+    "الزكه": "الزكاة",
+    "زكه": "زكاة",
+    "حج": "حج",
+    "الرمدان": "رمضان",
+    "رمدان": "رمضان",
+    "رمظان": "رمضان",
+    "الرمظان": "رمضان",
+    "قرآن": "قرآن",
+    "القرأن": "القرآن",
+    "قرأن": "قرآن",
+    "سره": "سورة",
+    "الفاطحة": "الفاتحة",
+    "فاطحة": "فاتحة",
+
+    # Grammatical corrections
+    "من هاده": "من هذه",
+    "إنه": "إنه",
+    "انه": "أنه",
+    "لاكن": "لكن",
+    "الاسلم": "الإسلام",
+    "اسلم": "إسلام",
+}
+
+# Phrases that should always be corrected as a whole (no word boundaries,
+# applied before the word corrections)
+ARABIC_PHRASES = {
+    "صلى الله عليه و سلم": "صلى الله عليه وسلم",
+    "صلى الله عليه وسلم": "صلى الله عليه وسلم",
+    "صلى الله عليه": "صلى الله عليه",
+    "عليه السلام": "عليه السلام",
+    "رضي الله عنه": "رضي الله عنه",
+    "رضي الله عنهما": "رضي الله عنهما",
+    "رضي الله عنها": "رضي الله عنها",
+    "الحمد لله": "الحمد لله",
+    "بسم الله": "بسم الله",
+    "بسم الله الرحمن الرحيم": "بسم الله الرحمن الرحيم",
+    "لا إله إلا الله": "لا إله إلا الله",
+    "الله أكبر": "الله أكبر",
+    "سبحان الله": "سبحان الله",
+    "استغفر الله": "استغفر الله",
+}
+
+# "سلام" becomes "صلاة" when one of these words comes before it in the
+# same sentence (but is kept as "سلام" when it means "peace")
+PRAYER_CONTEXTS = ["فرض", "أداء", "أوقات", "صلوات", "الفجر", "الظهر", "العصر", "المغرب", "العشاء", "الصبح"]
+SENTENCE_DELIMITERS = "\n.،؟!"
+
+
+def apply_sequentially(text: str, corrections: Dict[str, str]) -> str:
+    """Reference semantics of the word table: one boundary-anchored ``re.sub`` per entry."""
+    for error, correction in corrections.items():
+        text = re.sub(r'\b' + re.escape(error) + r'\b', correction, text)
+    return text
+
+
+def trie_pattern(keys: Iterable[str]) -> str:
+    """Regex alternation of ``keys`` factored as a prefix trie, longest match first."""
+    trie: Dict[str, dict] = {}
+    for key in keys:
+        node = trie
+        for char in key:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            # A key ends here; the greedy ``?`` still tries the longer keys first
+            return ("(?:" + body + ")" if len(branches) == 1 else body) + "?"
+        return body
+
+    return build(trie)
+
+
+def expand_word_corrections(corrections: Dict[str, str]) -> Dict[str, str]:
+    """Single-pass table equivalent to applying ``corrections`` one after the other.
+
+    Sequentially, a multi-word key also matches text whose words earlier
+    entries rewrote into that key (``سلى اللة`` -> ``صلى الله``).  Those
+    spellings are added as keys of their own, and every key maps to what
+    the sequential substitutions make of it.
+    """
+    entries = list(corrections.items())
+    single_words = [error for error, _ in entries if " " not in error]
+    keys = set(corrections)
+    for position, (error, _) in enumerate(entries):
+        words = error.split(" ")
+        if len(words) < 2:
+            continue
+        earlier = dict(entries[:position])
+        # Spellings that the entries before this one turn into each word
+        spellings: List[List[str]] = [
+            [word] + [v for v in single_words if v != word and apply_sequentially(v, earlier) == word]
+            for word in words
+        ]
+        keys.update(" ".join(combination) for combination in itertools.product(*spellings))
+    table = {key: apply_sequentially(key, corrections) for key in keys}
+    return {key: value for key, value in table.items() if key != value}
+
+
+class CorrectionEngine:
+    """The correction tables compiled into two linear scans."""
+
+    def __init__(
+        self,
+        corrections: Dict[str, str] = ARABIC_CORRECTIONS,
+        phrases: Dict[str, str] = ARABIC_PHRASES,
+        prayer_contexts: List[str] = PRAYER_CONTEXTS,
+    ) -> None:
+        # Identity phrases are no-ops
+        self.phrases = {phrase: fixed for phrase, fixed in phrases.items() if phrase != fixed}
+        self.words = expand_word_corrections(corrections)
+        alternatives = []
+        if self.phrases:
+            alternatives.append(trie_pattern(self.phrases))
+        if self.words:
+            alternatives.append(r'(?<!\w)' + trie_pattern(self.words) + r'(?!\w)')
+        self._corrections_re = re.compile("|".join(alternatives)) if alternatives else None
+        self._context_re = re.compile(
+            "(?P<context>" + trie_pattern(prayer_contexts) + ")"
+            "|(?P<salam>سلام)"
+            "|(?P<prophet>صلى الله على)"
+            "|(?P<umma>أُمة)"
+            "|(?P<stop>[" + re.escape(SENTENCE_DELIMITERS) + "])"
+        )
+
+    def _replace(self, match: "re.Match[str]") -> str:
+        text = match.group(0)
+        return self.phrases.get(text) or self.words.get(text, text)
+
+    def correct_words(self, text: str) -> str:
+        """Phrase and word corrections in one pass."""
+        if self._corrections_re is None:
+            return text
+        return self._corrections_re.sub(self._replace, text)
+
+    def correct_context(self, text: str) -> str:
+        """Contextual corrections in one pass."""
+        parts = []
+        last = 0
+        after_context = False
+        for match in self._context_re.finditer(text):
+            kind = match.lastgroup
+            if kind == "context":
+                after_context = True
+                continue
+            if kind == "stop":
+                after_context = False
+                continue
+            if kind == "salam" and not after_context:
+                continue
+            parts.append(text[last:match.start()])
+            parts.append({"salam": "صلاة", "prophet": "صلى الله عليه", "umma": "أمة"}[kind])
+            last = match.end()
+        if not parts:
+            return text
+        parts.append(text[last:])
+        return "".join(parts)
+
+    def clean(self, text: str) -> str:
+        if not text:
+            return text
+        # Remove filler words and audio artifacts
+        text = _FILLER_RE.sub('', text)
+        # Remove extra whitespace
+        text = _WHITESPACE_RE.sub(' ', text).strip()
+        # Remove any timestamps
+        text = _TIMESTAMP_RE.sub('', text)
+        text = self.correct_words(text)
+        text = self.correct_context(text)
+        # Final cleaning for any double spaces created during corrections
+        return _WHITESPACE_RE.sub(' ', text).strip()
+
+
+correction_engine = CorrectionEngine()
+
+
+def clean_transcription(text: str) -> str:
+    """Remove noise from a transcription and correct common recognition errors."""
+    return correction_engine.clean(text)
@@ -0,0 +1,202 @@
+"""transcription_checkpoints.py - Durable per-chunk transcription results.
+
+``AudioProcessor`` used to keep every chunk transcription in memory only, so
+a worker crash or a restart two and a half hours into a three-hour lecture
+threw all the finished chunks away and the retried job started from zero.
+Each successful chunk is now also written to
+``TRANSCRIPTION_CHECKPOINT_DIR/<source sha256>/<run>/<chunk index>.json``
+where ``<run>`` names the model size, language and chunk layout (chunk
+boundaries differ between the VAD, fixed-window and chunk-file paths).  A
+re-run or retried job over the same source reuses the saved chunks and only
+sends the missing ones to Whisper.
+
+A run is discarded once its transcription completes; runs that are never
+resumed are expired by a janitor thread after
+``TRANSCRIPTION_CHECKPOINT_TTL_HOURS``.
+
+Typical usage::
+
+    from app.dependencies.transcription_checkpoints import transcription_checkpoints
+
+    checkpoint = transcription_checkpoints.open(fingerprint, "base", "ar", "vad-240")
+    entry = checkpoint.get(chunk_index) or transcribe(chunk_index)
+    checkpoint.save(entry)
+    ...
+    checkpoint.discard()
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Constants
+TRANSCRIPTION_CHECKPOINTS = os.getenv("TRANSCRIPTION_CHECKPOINTS", "1").lower() not in ("0", "false", "no")
+TRANSCRIPTION_CHECKPOINT_DIR = os.getenv("TRANSCRIPTION_CHECKPOINT_DIR", "transcription_checkpoints")
+TRANSCRIPTION_CHECKPOINT_TTL_HOURS = float(os.getenv("TRANSCRIPTION_CHECKPOINT_TTL_HOURS", "72"))
+
+_UNSAFE_RE = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+class ChunkCheckpoint:
+    """Saved chunk transcriptions of one (source, model, language, layout) run."""
+
+    def __init__(self, store: "CheckpointStore", directory: str) -> None:
+        self.store = store
+        self.directory = directory
+        self.resumed = 0
+        self.saved = 0
+
+    def _path(self, chunk_index: int) -> str:
+        return os.path.join(self.directory, f"{chunk_index:05d}.json")
+
+    def get(self, chunk_index: int) -> Optional[Dict[str, Any]]:
+        """The saved transcription of ``chunk_index``, or ``None``."""
+        try:
+            with open(self._path(chunk_index), encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable checkpoint {self._path(chunk_index)}: {e}")
+            return None
+        self.resumed += 1
+        self.store._count("resumed")
+        return entry
+
+    def save(self, entry: Dict[str, Any]) -> None:
+        """Persist a successful chunk transcription (failed chunks are retried)."""
+        if entry.get("error"):
+            return
+        path = self._path(entry["chunk_index"])
+        tmp_path = f"{path}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            # Atomic: a crash mid-write never leaves a truncated chunk behind
+            os.replace(tmp_path, path)
+            # The source directory's mtime is what the janitor expires on
+            os.utime(os.path.dirname(self.directory))
+        except OSError as e:
+            logger.warning(f"Could not checkpoint chunk {entry['chunk_index']} to {path}: {e}")
+            return
+        self.saved += 1
+        self.store._count("saved")
+
+    def discard(self) -> None:
+        """Remove the run once its transcription is complete."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+        source_dir = os.path.dirname(self.directory)
+        try:
+            os.rmdir(source_dir)
+        except OSError:
+            # Other runs of the same source are still in progress
+            pass
+        if self.resumed:
+            logger.info(f"Transcription resumed {self.resumed} checkpointed chunks from {self.directory}")
+
+
+class CheckpointStore:
+    """Opens checkpoint runs and expires abandoned ones."""
+
+    def __init__(
+        self,
+        root: str = TRANSCRIPTION_CHECKPOINT_DIR,
+        *,
+        ttl_hours: float = TRANSCRIPTION_CHECKPOINT_TTL_HOURS,
+        enabled: bool = TRANSCRIPTION_CHECKPOINTS,
+    ) -> None:
+        self.root = root
+        self.ttl_seconds = ttl_hours * 3600
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._janitor: Optional[threading.Thread] = None
+        self.saved = 0
+        self.resumed = 0
+        self.expired = 0
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def open(self, fingerprint: str, model_size: str, language: str, layout: str) -> Optional[ChunkCheckpoint]:
+        """The checkpoint run for a source, or ``None`` when checkpoints are disabled."""
+        if not self.enabled:
+            return None
+        run = _UNSAFE_RE.sub("_", f"{model_size}_{language}_{layout}")
+        return ChunkCheckpoint(self, os.path.join(self.root, fingerprint, run))
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """Delete sources whose checkpoints were not touched within the TTL."""
+        now = time.time() if now is None else now
+        removed = 0
+        try:
+            sources = list(os.scandir(self.root))
+        except FileNotFoundError:
+            return 0
+        for source in sources:
+            try:
+                if not source.is_dir() or now - source.stat().st_mtime < self.ttl_seconds:
+                    continue
+            except OSError:
+                continue
+            shutil.rmtree(source.path, ignore_errors=True)
+            removed += 1
+        if removed:
+            with self._lock:
+                self.expired += removed
+            logger.info(f"Expired checkpoints of {removed} abandoned transcriptions")
+        return removed
+
+    def _janitor_loop(self) -> None:
+        interval = max(60.0, min(3600.0, self.ttl_seconds / 4))
+        while True:
+            try:
+                self.expire()
+            except Exception as e:
+                logger.error(f"Error expiring transcription checkpoints: {e}")
+            if self._stop.wait(interval):
+                return
+
+    def start(self) -> None:
+        """Start the expiry thread (idempotent)."""
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._janitor and self._janitor.is_alive():
+                return
+            self._stop.clear()
+            self._janitor = threading.Thread(
+                target=self._janitor_loop, name="transcription-checkpoint-janitor", daemon=True
+            )
+            self._janitor.start()
+
+    def close(self) -> None:
+        self._stop.set()
+
+    def stats(self) -> Dict[str, Any]:
+        try:
+            sources = sum(1 for entry in os.scandir(self.root) if entry.is_dir())
+        except FileNotFoundError:
+            sources = 0
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "sources": sources,
+                "chunks_saved": self.saved,
+                "chunks_resumed": self.resumed,
+                "expired": self.expired,
+                "ttl_hours": round(self.ttl_seconds / 3600, 1),
+            }
+
+
+transcription_checkpoints = CheckpointStore()
@@ -0,0 +1,166 @@
+"""transcription_pipeline.py - Index a lecture while it is being transcribed.
+
+Previously ``transcribe_uploaded_audio`` had to finish the whole file before
+``vectorize_transcription_with_chroma`` split and embedded the combined
+string.  ``StreamingIngestor`` overlaps the stages: ``AudioProcessor`` hands
+it every chunk transcription as soon as Whisper settles it, and an ingest
+thread cleans and splits that chunk's text and embeds/upserts it (see
+``ingestion.ingest_chunks``) while Whisper works on the next chunks.  The
+transcription becomes queryable over the part already ingested long
+before the lecture is done.
+
+Chunks are ingested in ``chunk_index`` order (parallel transcription can
+finish them out of order) and each vector records the audio window its
+text came from (``audio_chunk_index``, ``audio_start``, ``audio_end`` in
+seconds of the source) and the language it was spoken in (``language``).
+
+Typical usage::
+
+    from app.dependencies.transcription_pipeline import StreamingIngestor
+
+    ingestor = StreamingIngestor(transcription_id, clean=processor.clean_transcription)
+    processor.chunk_callback = ingestor.submit
+    processor.process_audio_file(path)
+    report = ingestor.close()
+"""
+from __future__ import annotations
+
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from app.dependencies.ingestion import IngestionReport, ingest_chunks, iter_text_chunks
+from app.dependencies.lexical_index import BM25Index, lexical_indexes
+
+logger = logging.getLogger(__name__)
+
+# Constants
+# Transcribed chunks waiting for the ingest thread before Whisper blocks
+PIPELINE_QUEUE_CHUNKS = int(os.getenv("PIPELINE_QUEUE_CHUNKS", "4"))
+
+_STOP = object()
+
+
+class StreamingIngestor:
+    """Embeds and upserts chunk transcriptions on a background thread."""
+
+    def __init__(
+        self,
+        transcription_id: str,
+        *,
+        clean: Optional[Callable[[str], str]] = None,
+        on_first_batch: Optional[Callable[[str], None]] = None,
+        queue_size: int = PIPELINE_QUEUE_CHUNKS,
+    ) -> None:
+        self.transcription_id = transcription_id
+        self.clean = clean
+        self.on_first_batch = on_first_batch
+        self.report = IngestionReport(transcription_id=transcription_id)
+        # Searchable as it grows (see ``ingest_chunks``), persisted on close
+        self.lexical_index = BM25Index(transcription_id)
+        self.error: Optional[Exception] = None
+        self.first_batch_seconds: Optional[float] = None
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, queue_size))
+        self._waiting: Dict[int, Dict[str, Any]] = {}
+        self._next_chunk = 0
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(
+            target=self._run, name=f"ingest-{transcription_id}", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, entry: Dict[str, Any]) -> None:
+        """Queue a settled chunk transcription (any order; ingested in order).
+
+        Blocks when the ingest thread is ``queue_size`` chunks behind, so a
+        slow embedder applies back-pressure to transcription.
+        """
+        with self._lock:
+            if entry["chunk_index"] < self._next_chunk:
+                # Re-transcribed after a fallback; the first result is kept
+                return
+            self._waiting[entry["chunk_index"]] = entry
+            ready = []
+            while self._next_chunk in self._waiting:
+                ready.append(self._waiting.pop(self._next_chunk))
+                self._next_chunk += 1
+        for ready_entry in ready:
+            self._queue.put(ready_entry)
+
+    def _ingest(self, entry: Dict[str, Any]) -> None:
+        text = (entry.get("text") or "").strip()
+        if self.clean is not None:
+            text = self.clean(text)
+        if not text:
+            return
+        window = {"audio_chunk_index": entry["chunk_index"]}
+        if entry.get("start_time") is not None:
+            window["audio_start"] = round(float(entry["start_time"]), 2)
+        metadata = entry.get("metadata") or {}
+        end_time = metadata.get("end_time")
+        if end_time is not None:
+            window["audio_end"] = round(float(end_time), 2)
+        if metadata.get("language"):
+            # Spoken language of the chunk, identified once at transcription
+            window["language"] = metadata["language"]
+
+        ingested_before = self.report.chunks
+        ingest_chunks(
+            ((chunk, window) for chunk in iter_text_chunks(text)),
+            self.transcription_id,
+            start_index=ingested_before,
+            report=self.report,
+            lexical_index=self.lexical_index,
+        )
+        if ingested_before == 0 and self.report.chunks and self.first_batch_seconds is None:
+            self.first_batch_seconds = time.perf_counter() - self._started
+            logger.info(
+                f"First chunks of {self.transcription_id} queryable after "
+                f"{self.first_batch_seconds:.1f}s"
+            )
+            if self.on_first_batch is not None:
+                try:
+                    self.on_first_batch(self.transcription_id)
+                except Exception as e:
+                    logger.error(f"on_first_batch callback failed for {self.transcription_id}: {e}")
+
+    def _run(self) -> None:
+        while True:
+            entry = self._queue.get()
+            if entry is _STOP:
+                return
+            if self.error is not None:
+                continue
+            try:
+                self._ingest(entry)
+            except Exception as e:
+                # Keep draining so the transcriber never blocks on a dead consumer
+                logger.error(f"Streaming ingestion of {self.transcription_id} failed: {e}")
+                self.error = e
+
+    def close(self) -> IngestionReport:
+        """Ingest what is left and wait for the ingest thread to finish."""
+        with self._lock:
+            # Chunks after a gap (a chunk that never settled) are still ingested
+            leftovers = [self._waiting[index] for index in sorted(self._waiting)]
+            self._waiting.clear()
+        for entry in leftovers:
+            self._queue.put(entry)
+        self._queue.put(_STOP)
+        self._thread.join()
+        if self.report.chunks:
+            # Written once: rewriting it after every batch is quadratic
+            try:
+                lexical_indexes.save(self.lexical_index)
+            except Exception as e:
+                logger.error(f"Could not save the lexical index of {self.transcription_id}: {e}")
+        logger.info(
+            f"Streamed ingestion of {self.transcription_id}: {self.report.chunks} chunks in "
+            f"{self.report.batches} batches, first queryable after "
+            f"{self.first_batch_seconds if self.first_batch_seconds is not None else '-'}s"
+        )
+        return self.report
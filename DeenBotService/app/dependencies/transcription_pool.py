@@ -0,0 +1,426 @@
+"""transcription_pool.py - Parallel chunk transcription in worker processes.
+
+``AudioProcessor`` transcribes 5-minute chunks one after another in the
+request process, so a long lecture keeps one core busy while the rest of
+the node idles.  This module fans chunks out to a ``ProcessPoolExecutor``
+whose workers each load their own Whisper model once and keep it warm
+between jobs.
+
+The worker count is derived from the CPU cores (``TRANSCRIBE_THREADS_PER_WORKER``
+torch threads each) and from the memory currently available for one more
+model per worker.  Every chunk has a deadline, counted from the moment a
+worker starts it (workers report it on a queue), so the time a chunk waits
+behind other jobs' chunks on the shared pool does not count.  A chunk that
+overruns its deadline restarts the pool (a running task cannot be
+cancelled otherwise) and is retried, as are chunks whose worker raised.  Results are keyed by
+``chunk_index`` so callers can reassemble them in order.
+
+Typical usage::
+
+    from app.dependencies.transcription_pool import transcription_pool
+
+    if transcription_pool.enabled_for("base"):
+        results = transcription_pool.transcribe(
+            "base", "ar", enumerate(chunk_paths), on_done=callback
+        )
+"""
+from __future__ import annotations
+
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from app.dependencies.language_id import AUTO_LANGUAGE, LANGUAGE_ID_DEFAULT, detect_language
+from app.dependencies.whisper_pool import MODEL_MEMORY_MB
+
+logger = logging.getLogger(__name__)
+
+# Constants
+# "auto" parallelises when at least two workers fit, "1" always, "0" never
+TRANSCRIBE_PARALLEL = os.getenv("TRANSCRIBE_PARALLEL", "auto").lower()
+# 0 derives the worker count from cores and memory
+TRANSCRIBE_WORKERS = int(os.getenv("TRANSCRIBE_WORKERS", "0"))
+TRANSCRIBE_MAX_WORKERS = int(os.getenv("TRANSCRIBE_MAX_WORKERS", "4"))
+TRANSCRIBE_THREADS_PER_WORKER = int(os.getenv("TRANSCRIBE_THREADS_PER_WORKER", "2"))
+TRANSCRIBE_CHUNK_TIMEOUT_SECONDS = float(os.getenv("TRANSCRIBE_CHUNK_TIMEOUT_SECONDS", "900"))
+TRANSCRIBE_CHUNK_RETRIES = int(os.getenv("TRANSCRIBE_CHUNK_RETRIES", "1"))
+TRANSCRIBE_POOL_IDLE_SECONDS = float(os.getenv("TRANSCRIBE_POOL_IDLE_SECONDS", "900"))
+# Mel spectrogram, decoder caches and the audio window itself
+WORKER_OVERHEAD_MB = 500
+# How often chunks not yet started by a worker are checked for their start
+_START_POLL_SECONDS = 1.0
+
+
+def available_memory_mb() -> Optional[int]:
+    """Memory available for new processes (MemAvailable on Linux), if known."""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) // 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") // (1024 * 1024)
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+# ----------------------------------------------------------------------
+# Worker process side
+# ----------------------------------------------------------------------
+_worker_model = None
+_started_queue = None
+
+
+def _init_worker(model_size: str, threads: int, started_queue: Any) -> None:
+    global _worker_model, _started_queue
+    import torch
+    import whisper
+
+    torch.set_num_threads(max(1, threads))
+    _worker_model = whisper.load_model(model_size)
+    _started_queue = started_queue
+
+
+def _transcribe_in_worker(token: int, audio: Any, language: str) -> Dict[str, Any]:
+    # The chunk's deadline starts now, not when it was queued
+    _started_queue.put(token)
+    start = time.perf_counter()
+    probability = None
+    if language == AUTO_LANGUAGE:
+        try:
+            language, probability = detect_language(_worker_model, audio)
+        except Exception:
+            # Reported to the parent as an identification failure (no probability)
+            language = LANGUAGE_ID_DEFAULT
+    result = _worker_model.transcribe(audio, language=language, fp16=False, verbose=False)
+    return {
+        "text": result["text"],
+        "confidence": result.get("confidence", 0),
+        "language": language,
+        "language_probability": round(probability, 3) if probability is not None else None,
+        "worker_pid": os.getpid(),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+# ----------------------------------------------------------------------
+# Parent side
+# ----------------------------------------------------------------------
+class _Executor:
+    def __init__(self, model_size: str, workers: int, threads: int) -> None:
+        self.model_size = model_size
+        self.workers = workers
+        self.generation = 0
+        self.active = 0
+        self.last_used = time.monotonic()
+        self._threads = threads
+        self._tokens = itertools.count()
+        # token -> monotonic time a worker started the chunk
+        self.started: Dict[int, float] = {}
+        self.pool = self._spawn()
+
+    def _spawn(self) -> ProcessPoolExecutor:
+        # spawn, not fork: the API process runs threads and an event loop
+        context = multiprocessing.get_context("spawn")
+        # A fresh queue per generation: a killed worker may leave the old one locked
+        self.started_queue = context.Queue()
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(self.model_size, self._threads, self.started_queue),
+        )
+
+    def next_token(self) -> int:
+        return next(self._tokens)
+
+    def drain_started(self) -> None:
+        """Record the start of the chunks the workers reported since the last call."""
+        while True:
+            try:
+                token = self.started_queue.get_nowait()
+            except (queue.Empty, OSError, ValueError):
+                return
+            self.started[token] = time.monotonic()
+
+    def deadline(self, token: int, timeout: float) -> float:
+        started = self.started.get(token)
+        return float("inf") if started is None else started + timeout
+
+    def restart(self) -> None:
+        """Kill the workers (including a stuck one) and start fresh ones."""
+        self.shutdown(kill=True)
+        self.generation += 1
+        self.pool = self._spawn()
+
+    def shutdown(self, kill: bool = False) -> None:
+        if kill:
+            for process in list((getattr(self.pool, "_processes", None) or {}).values()):
+                process.terminate()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+class TranscriptionProcessPool:
+    """Process pools of warm Whisper models, one per model size."""
+
+    def __init__(
+        self,
+        *,
+        workers: int = TRANSCRIBE_WORKERS,
+        max_workers: int = TRANSCRIBE_MAX_WORKERS,
+        threads_per_worker: int = TRANSCRIBE_THREADS_PER_WORKER,
+        chunk_timeout: float = TRANSCRIBE_CHUNK_TIMEOUT_SECONDS,
+        retries: int = TRANSCRIBE_CHUNK_RETRIES,
+        idle_seconds: float = TRANSCRIBE_POOL_IDLE_SECONDS,
+    ) -> None:
+        self.workers = workers
+        self.max_workers = max_workers
+        self.threads_per_worker = max(1, threads_per_worker)
+        self.chunk_timeout = chunk_timeout
+        self.retries = retries
+        self.idle_seconds = idle_seconds
+        self._executors: Dict[str, _Executor] = {}
+        self._lock = threading.Lock()
+        self.chunks_completed = 0
+        self.chunks_failed = 0
+        self.retried = 0
+        self.timeouts = 0
+        self.restarts = 0
+        self.busy_seconds = 0.0
+
+    def _derived_workers(self, model_size: str) -> int:
+        if self.workers > 0:
+            return self.workers
+        by_cpu = (os.cpu_count() or 1) // self.threads_per_worker
+        per_worker_mb = MODEL_MEMORY_MB.get(model_size.split(".")[0], MODEL_MEMORY_MB["large"]) + WORKER_OVERHEAD_MB
+        memory_mb = available_memory_mb()
+        by_memory = int(memory_mb * 0.8) // per_worker_mb if memory_mb is not None else by_cpu
+        return max(1, min(by_cpu, by_memory, self.max_workers))
+
+    def worker_count(self, model_size: str) -> int:
+        """Workers for ``model_size``: fixed, or derived from cores and memory."""
+        with self._lock:
+            running = self._executors.get(model_size)
+            if running is not None:
+                return running.workers
+        return self._derived_workers(model_size)
+
+    def is_running(self, model_size: str) -> bool:
+        """Whether workers with ``model_size`` loaded are already up."""
+        with self._lock:
+            return model_size in self._executors
+
+    def resident_mb(self) -> Dict[str, float]:
+        """Estimated memory of the running workers (their model copies), per model size."""
+        with self._lock:
+            return {
+                size: executor.workers
+                * (MODEL_MEMORY_MB.get(size.split(".")[0], MODEL_MEMORY_MB["large"]) + WORKER_OVERHEAD_MB)
+                for size, executor in self._executors.items()
+            }
+
+    def enabled_for(self, model_size: str) -> bool:
+        if TRANSCRIBE_PARALLEL in ("0", "false", "no"):
+            return False
+        if TRANSCRIBE_PARALLEL in ("1", "true", "yes"):
+            return True
+        return self.worker_count(model_size) >= 2
+
+    def _executor(self, model_size: str) -> _Executor:
+        with self._lock:
+            now = time.monotonic()
+            for size, idle in list(self._executors.items()):
+                if (
+                    size != model_size
+                    and idle.active == 0
+                    and now - idle.last_used >= self.idle_seconds
+                ):
+                    logger.info(f"Shutting down idle {size} transcription pool")
+                    idle.shutdown()
+                    del self._executors[size]
+            executor = self._executors.get(model_size)
+            if executor is None:
+                workers = self._derived_workers(model_size)
+                logger.info(
+                    f"Starting {workers} {model_size} Whisper worker processes "
+                    f"({self.threads_per_worker} threads each)"
+                )
+                executor = self._executors[model_size] = _Executor(
+                    model_size, workers, self.threads_per_worker
+                )
+            executor.active += 1
+            executor.last_used = now
+            return executor
+
+    def _restart(self, executor: _Executor, generation: int) -> None:
+        with self._lock:
+            # Another caller may already have restarted this generation
+            if executor.generation == generation:
+                executor.restart()
+                self.restarts += 1
+
+    def transcribe(
+        self,
+        model_size: str,
+        language: str,
+        chunks: Iterable[Tuple[int, Any]],
+        on_done: Optional[Callable[[int, Dict[str, Any]], None]] = None,
+    ) -> Dict[int, Dict[str, Any]]:
+        """Transcribe ``(chunk_index, audio)`` pairs in parallel.
+
+        ``audio`` is a file path or a float32 16 kHz array.  Only as many
+        chunks as there are workers are in flight, so ``chunks`` may be a
+        lazy stream of windows.  Returns ``{chunk_index: result}`` where a
+        result has ``text`` (and worker details) or ``error`` after all
+        retries; ``on_done`` is called as each chunk settles.
+
+        Raises ``BrokenProcessPool`` if the workers cannot start at all.
+        """
+        executor = self._executor(model_size)
+        results: Dict[int, Dict[str, Any]] = {}
+        # future -> (chunk_index, audio, attempt, start token, generation)
+        pending: Dict[Future, Tuple[int, Any, int, int, int]] = {}
+        chunk_iter = iter(chunks)
+        exhausted = False
+
+        def submit(chunk_index: int, audio: Any, attempt: int) -> None:
+            for _ in range(2):
+                generation = executor.generation
+                token = executor.next_token()
+                try:
+                    future = executor.pool.submit(_transcribe_in_worker, token, audio, language)
+                except BrokenProcessPool:
+                    self._restart(executor, generation)
+                    continue
+                pending[future] = (chunk_index, audio, attempt, token, generation)
+                return
+            raise BrokenProcessPool(f"{model_size} transcription workers failed to start")
+
+        def settle(chunk_index: int, result: Dict[str, Any]) -> None:
+            results[chunk_index] = result
+            if on_done:
+                on_done(chunk_index, result)
+
+        def retry_or_fail(chunk_index: int, audio: Any, attempt: int, error: str) -> None:
+            if attempt <= self.retries:
+                logger.warning(f"Retrying chunk {chunk_index + 1} (attempt {attempt + 1}): {error}")
+                with self._lock:
+                    self.retried += 1
+                submit(chunk_index, audio, attempt + 1)
+            else:
+                logger.error(f"Chunk {chunk_index + 1} failed after {attempt} attempts: {error}")
+                with self._lock:
+                    self.chunks_failed += 1
+                settle(chunk_index, {"text": "", "error": error})
+
+        try:
+            while True:
+                while not exhausted and len(pending) < executor.workers:
+                    try:
+                        chunk_index, audio = next(chunk_iter)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    submit(chunk_index, audio, 1)
+                if not pending:
+                    break
+
+                executor.drain_started()
+                deadlines = {
+                    future: executor.deadline(entry[3], self.chunk_timeout)
+                    for future, entry in pending.items()
+                }
+                next_check = min(deadlines.values())
+                if len(deadlines) > sum(1 for d in deadlines.values() if d != float("inf")):
+                    # Some chunks are still waiting for a worker
+                    next_check = min(next_check, time.monotonic() + _START_POLL_SECONDS)
+                done, _ = wait(
+                    list(pending),
+                    timeout=max(0.0, next_check - time.monotonic()),
+                    return_when=FIRST_COMPLETED,
+                )
+                for future in done:
+                    chunk_index, audio, attempt, token, generation = pending.pop(future)
+                    executor.started.pop(token, None)
+                    try:
+                        result = future.result()
+                    except BrokenProcessPool as e:
+                        if generation < executor.generation:
+                            # Killed by a restart meant for another chunk
+                            submit(chunk_index, audio, attempt)
+                        else:
+                            self._restart(executor, generation)
+                            retry_or_fail(chunk_index, audio, attempt, f"worker died: {e}")
+                        continue
+                    except Exception as e:
+                        retry_or_fail(chunk_index, audio, attempt, str(e))
+                        continue
+                    with self._lock:
+                        self.chunks_completed += 1
+                        self.busy_seconds += result.get("seconds", 0.0)
+                    settle(chunk_index, result)
+
+                executor.drain_started()
+                now = time.monotonic()
+                expired = {
+                    f for f, entry in pending.items()
+                    if executor.deadline(entry[3], self.chunk_timeout) <= now
+                }
+                if expired:
+                    with self._lock:
+                        self.timeouts += len(expired)
+                    self._restart(executor, executor.generation)
+                    for future in list(pending):
+                        chunk_index, audio, attempt, token, _ = pending.pop(future)
+                        executor.started.pop(token, None)
+                        if future in expired:
+                            retry_or_fail(
+                                chunk_index, audio, attempt,
+                                f"timed out after {self.chunk_timeout:.0f}s",
+                            )
+                        else:
+                            submit(chunk_index, audio, attempt)
+        finally:
+            for future, entry in pending.items():
+                future.cancel()
+                executor.started.pop(entry[3], None)
+            with self._lock:
+                executor.active -= 1
+                executor.last_used = time.monotonic()
+        return results
+
+    def close(self) -> None:
+        with self._lock:
+            for executor in self._executors.values():
+                executor.shutdown()
+            self._executors.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "mode": TRANSCRIBE_PARALLEL,
+                "chunk_timeout_seconds": self.chunk_timeout,
+                "retries": self.retries,
+                "pools": {
+                    size: {"workers": executor.workers, "restarts": executor.generation}
+                    for size, executor in self._executors.items()
+                },
+                "chunks_completed": self.chunks_completed,
+                "chunks_failed": self.chunks_failed,
+                "retried": self.retried,
+                "timeouts": self.timeouts,
+                "restarts": self.restarts,
+                "worker_busy_seconds": round(self.busy_seconds, 1),
+            }
+
+
+transcription_pool = TranscriptionProcessPool()
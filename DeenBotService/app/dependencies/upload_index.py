@@ -0,0 +1,194 @@
+"""upload_index.py - Persistent audio fingerprint -> transcription id index.
+
+Users upload the same lecture again, under another filename or re-encoded,
+and every upload used to run Whisper from scratch.  Each transcribed upload
+is recorded in the ``upload_transcripts`` table with the fingerprint of its
+audio (see ``audio_fingerprint``), its duration, the Whisper model size and
+``PIPELINE_VERSION``.  A new upload whose duration is within
+``AUDIO_FINGERPRINT_DURATION_TOLERANCE`` seconds and whose fingerprint
+differs in at most ``AUDIO_FINGERPRINT_MAX_BER`` of its bits reuses the
+existing transcription instead.
+
+As for YouTube videos, an entry is only reused when the model size and
+pipeline version still match and the transcript is still indexed; among
+the current entries of the same audio, the closest fingerprint wins.  The
+audio has one entry per model size, refreshed when it is transcribed again.
+
+Typical usage::
+
+    from app.dependencies.upload_index import upload_index
+
+    fingerprint = upload_index.fingerprint(path)
+    async with SessionLocal() as db:
+        entry = await upload_index.lookup(db, fingerprint, model_size="tiny")
+        if entry is None:
+            ...
+            await upload_index.record(db, fingerprint, transcription_id, model_size="tiny")
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.dependencies.audio_fingerprint import (
+    AUDIO_FINGERPRINT_MAX_BER,
+    AudioFingerprint,
+    bit_error_rate,
+    compute_fingerprint,
+)
+from app.dependencies.ingestion import (
+    PIPELINE_VERSION,
+    is_transcription_indexed,
+    transcription_path,
+)
+from app.models.upload_transcript import UploadTranscript
+
+logger = logging.getLogger(__name__)
+
+# Constants
+AUDIO_FINGERPRINT_CACHE = os.getenv("AUDIO_FINGERPRINT_CACHE", "1").lower() not in ("0", "false", "no")
+# Re-encoding pads or trims at most a fraction of a second
+AUDIO_FINGERPRINT_DURATION_TOLERANCE = float(os.getenv("AUDIO_FINGERPRINT_DURATION_TOLERANCE", "2"))
+
+
+class UploadTranscriptIndex:
+    """Fingerprints uploads and finds earlier transcriptions of the same audio."""
+
+    def __init__(self, *, enabled: bool = AUDIO_FINGERPRINT_CACHE) -> None:
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.fingerprints = 0
+        self.fingerprint_failures = 0
+        self.fingerprint_seconds = 0.0
+
+    def _count(self, attribute: str, amount: float = 1) -> None:
+        with self._lock:
+            setattr(self, attribute, getattr(self, attribute) + amount)
+
+    def fingerprint(self, path: str) -> Optional[AudioFingerprint]:
+        """Fingerprint of the upload at ``path``, or ``None`` (disabled or undecodable)."""
+        if not self.enabled:
+            return None
+        start = time.perf_counter()
+        fingerprint = compute_fingerprint(path)
+        elapsed = time.perf_counter() - start
+        self._count("fingerprint_seconds", elapsed)
+        if fingerprint is None:
+            self._count("fingerprint_failures")
+            return None
+        self._count("fingerprints")
+        logger.info(f"Fingerprinted {path} ({fingerprint.duration:.0f}s of audio) in {elapsed:.2f}s")
+        return fingerprint
+
+    def is_current(self, entry: UploadTranscript, model_size: str) -> bool:
+        """Whether ``entry`` was produced by the current model and pipeline."""
+        return (
+            entry.model_size == model_size
+            and entry.pipeline_version == PIPELINE_VERSION
+            and os.path.exists(transcription_path(entry.transcription_id))
+            and is_transcription_indexed(entry.transcription_id)
+        )
+
+    async def _matches(
+        self, db: AsyncSession, fingerprint: AudioFingerprint
+    ) -> List[Tuple[float, UploadTranscript]]:
+        """Entries of the same audio as ``(bit error rate, entry)``, closest first."""
+        result = await db.execute(
+            select(UploadTranscript).where(
+                UploadTranscript.duration.between(
+                    fingerprint.duration - AUDIO_FINGERPRINT_DURATION_TOLERANCE,
+                    fingerprint.duration + AUDIO_FINGERPRINT_DURATION_TOLERANCE,
+                )
+            )
+        )
+        matches = []
+        for entry in result.scalars().all():
+            ber = bit_error_rate(
+                fingerprint.bits, AudioFingerprint.from_hex(entry.duration, entry.fingerprint).bits
+            )
+            if ber <= AUDIO_FINGERPRINT_MAX_BER:
+                matches.append((ber, entry))
+        matches.sort(key=lambda match: match[0])
+        return matches
+
+    async def lookup(
+        self, db: AsyncSession, fingerprint: AudioFingerprint, *, model_size: str
+    ) -> Optional[UploadTranscript]:
+        """Return the reusable entry for the same audio, or ``None``."""
+        matches = await self._matches(db, fingerprint)
+        for ber, entry in matches:
+            if self.is_current(entry, model_size):
+                self._count("hits")
+                logger.info(
+                    f"Upload matches {entry.filename or entry.transcription_id} "
+                    f"(bit error rate {ber:.3f}); reusing {entry.transcription_id}"
+                )
+                return entry
+        if matches:
+            _, closest = matches[0]
+            logger.info(
+                f"Ignoring stale transcript {closest.transcription_id} of the same audio: "
+                f"model={closest.model_size}, pipeline={closest.pipeline_version}"
+            )
+            self._count("stale")
+        self._count("misses")
+        return None
+
+    async def record(
+        self,
+        db: AsyncSession,
+        fingerprint: AudioFingerprint,
+        transcription_id: str,
+        *,
+        model_size: str,
+        title: Optional[str] = None,
+        filename: Optional[str] = None,
+    ) -> None:
+        """Insert or refresh the entry of the audio with ``fingerprint`` for ``model_size``."""
+        entry = next(
+            (entry for _, entry in await self._matches(db, fingerprint) if entry.model_size == model_size),
+            None,
+        )
+        if entry is None:
+            entry = UploadTranscript(
+                duration=fingerprint.duration,
+                fingerprint=fingerprint.hex,
+                model_size=model_size,
+                filename=filename,
+            )
+            db.add(entry)
+        entry.transcription_id = transcription_id
+        entry.pipeline_version = PIPELINE_VERSION
+        if title:
+            entry.title = title
+        await db.commit()
+        logger.info(f"Recorded upload fingerprint -> {transcription_id}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "pipeline_version": PIPELINE_VERSION,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "fingerprints": self.fingerprints,
+                "fingerprint_failures": self.fingerprint_failures,
+                "avg_fingerprint_seconds": (
+                    round(self.fingerprint_seconds / self.fingerprints, 3) if self.fingerprints else None
+                ),
+            }
+
+
+upload_index = UploadTranscriptIndex()
@@ -0,0 +1,232 @@
+"""vad.py - Energy-based voice activity detection and pause-aligned chunking.
+
+Fixed 5-minute slices cut through words and make Whisper decode the long
+silences of recorded lessons (pauses between speakers, the time before the
+lesson starts, prayer breaks).  ``SpeechSegmenter`` consumes the streamed
+PCM windows, classifies 30 ms frames as speech or non-speech from their RMS
+energy relative to an adaptive noise floor, and emits chunks of about
+``VAD_TARGET_SECONDS`` that end in a pause.  Inside a chunk, non-speech
+runs longer than ``VAD_MAX_PAUSE_SECONDS`` are cut out (keeping a short
+pad either side), and chunks with no speech at all are skipped.
+
+Typical usage::
+
+    from app.dependencies.vad import speech_segmenter
+
+    windows = audio_decoder.windows(path, window_seconds=30)
+    for chunk in speech_segmenter.chunks(windows):
+        result = model.transcribe(chunk.samples, language="ar", fp16=False)
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from app.dependencies.audio_stream import SAMPLE_RATE, AudioWindow
+
+logger = logging.getLogger(__name__)
+
+# Constants
+VAD_ENABLED = os.getenv("VAD_ENABLED", "1").lower() not in ("0", "false", "no")
+VAD_TARGET_SECONDS = float(os.getenv("VAD_TARGET_SECONDS", "240"))
+VAD_MAX_SECONDS = float(os.getenv("VAD_MAX_SECONDS", "300"))
+# Pauses at least this long are candidate chunk boundaries
+VAD_MIN_PAUSE_SECONDS = float(os.getenv("VAD_MIN_PAUSE_SECONDS", "0.3"))
+# Pauses longer than this are removed from the audio sent to Whisper
+VAD_MAX_PAUSE_SECONDS = float(os.getenv("VAD_MAX_PAUSE_SECONDS", "1.0"))
+# Speech threshold above the estimated noise floor, in dB
+VAD_MARGIN_DB = float(os.getenv("VAD_MARGIN_DB", "12"))
+# Window size read from the decoder while segmenting
+VAD_READ_SECONDS = 30.0
+FRAME_SECONDS = 0.03
+FRAME_SAMPLES = int(SAMPLE_RATE * FRAME_SECONDS)
+# Speech kept on each side of a detected speech run
+PAD_SECONDS = 0.2
+# Bounds for the adaptive threshold (dBFS); keeps all-speech or all-noise
+# buffers from producing an absurd noise floor
+MIN_THRESHOLD_DB = -55.0
+MAX_THRESHOLD_DB = -35.0
+
+
+def frame_energies_db(samples: np.ndarray) -> np.ndarray:
+    """RMS energy in dBFS of consecutive ``FRAME_SECONDS`` frames."""
+    frames = len(samples) // FRAME_SAMPLES
+    if not frames:
+        return np.zeros(0, dtype=np.float32)
+    shaped = samples[: frames * FRAME_SAMPLES].reshape(frames, FRAME_SAMPLES)
+    rms = np.sqrt(np.mean(np.square(shaped, dtype=np.float32), axis=1))
+    return 20.0 * np.log10(rms + 1e-10)
+
+
+def speech_mask(energies_db: np.ndarray, margin_db: float = VAD_MARGIN_DB) -> np.ndarray:
+    """Per-frame speech flags: above the noise floor, padded, short gaps bridged."""
+    if not len(energies_db):
+        return np.zeros(0, dtype=bool)
+    noise_floor = float(np.percentile(energies_db, 10))
+    threshold = min(max(noise_floor + margin_db, MIN_THRESHOLD_DB), MAX_THRESHOLD_DB)
+    mask = energies_db > threshold
+    pad = int(PAD_SECONDS / FRAME_SECONDS)
+    if pad and mask.any():
+        # Dilate speech frames so onsets and word tails are kept
+        mask = np.convolve(mask.astype(np.int8), np.ones(2 * pad + 1, dtype=np.int8), "same") > 0
+    return mask
+
+
+def pause_runs(mask: np.ndarray, min_frames: int) -> List[Tuple[int, int]]:
+    """``(start, end)`` frame ranges of non-speech runs at least ``min_frames`` long."""
+    runs = []
+    padded = np.concatenate(([True], mask, [True]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    for start, end in zip(edges[::2], edges[1::2]):
+        if end - start >= min_frames:
+            runs.append((int(start), int(end)))
+    return runs
+
+
+@dataclass
+class SpeechChunk:
+    index: int
+    start_time: float
+    end_time: float
+    samples: np.ndarray
+
+    @property
+    def speech_seconds(self) -> float:
+        return len(self.samples) / SAMPLE_RATE
+
+
+class SpeechSegmenter:
+    """Turns a stream of PCM windows into pause-aligned speech chunks."""
+
+    def __init__(
+        self,
+        target_seconds: float = VAD_TARGET_SECONDS,
+        max_seconds: float = VAD_MAX_SECONDS,
+        min_pause_seconds: float = VAD_MIN_PAUSE_SECONDS,
+        max_pause_seconds: float = VAD_MAX_PAUSE_SECONDS,
+    ) -> None:
+        self.target_seconds = target_seconds
+        self.max_seconds = max(max_seconds, target_seconds)
+        self.min_pause_frames = max(1, int(min_pause_seconds / FRAME_SECONDS))
+        self.max_pause_frames = max(1, int(max_pause_seconds / FRAME_SECONDS))
+        self._lock = threading.Lock()
+        self.audio_seconds = 0.0
+        self.speech_seconds = 0.0
+        self.chunks_emitted = 0
+        self.chunks_skipped = 0
+
+    def _cut_frame(self, energies: np.ndarray, mask: np.ndarray) -> int:
+        """Frame at which to end the next chunk: a pause near the target length."""
+        target = int(self.target_seconds / FRAME_SECONDS)
+        limit = min(len(mask), int(self.max_seconds / FRAME_SECONDS))
+        earliest = target // 2
+        best = None
+        for start, end in pause_runs(mask[:limit], self.min_pause_frames):
+            middle = (start + end) // 2
+            if middle < earliest:
+                continue
+            if best is None or abs(middle - target) < abs(best - target):
+                best = middle
+        if best is not None:
+            return best
+        # Continuous speech: cut at the quietest frame before the limit
+        search_from = min(int(target * 0.8), limit - 1)
+        return search_from + int(np.argmin(energies[search_from:limit]))
+
+    def _compact(self, samples: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        """Drop the long pauses from ``samples`` (short ones are kept)."""
+        keep = np.ones(len(mask), dtype=bool)
+        for start, end in pause_runs(mask, self.max_pause_frames):
+            keep[start:end] = False
+        if keep.all():
+            return samples
+        frames = len(mask) * FRAME_SAMPLES
+        kept = samples[:frames].reshape(len(mask), FRAME_SAMPLES)[keep].reshape(-1)
+        # The tail shorter than a frame follows the last frame's decision
+        if len(samples) > frames and keep[-1]:
+            kept = np.concatenate((kept, samples[frames:]))
+        return kept
+
+    def _emit(
+        self, index: int, start_time: float, samples: np.ndarray
+    ) -> Optional[SpeechChunk]:
+        energies = frame_energies_db(samples)
+        mask = speech_mask(energies)
+        duration = len(samples) / SAMPLE_RATE
+        with self._lock:
+            self.audio_seconds += duration
+        if not mask.any():
+            with self._lock:
+                self.chunks_skipped += 1
+            return None
+        speech = self._compact(samples, mask)
+        with self._lock:
+            self.speech_seconds += len(speech) / SAMPLE_RATE
+            self.chunks_emitted += 1
+        return SpeechChunk(index, start_time, start_time + duration, speech)
+
+    def chunks(self, windows: Iterable[AudioWindow]) -> Iterator[SpeechChunk]:
+        """Speech chunks of the audio in ``windows``, in order.
+
+        Chunk ``start_time``/``end_time`` refer to the source audio; the
+        samples exclude long pauses.
+        """
+        buffer = np.zeros(0, dtype=np.float32)
+        buffer_start = 0.0
+        index = 0
+        audio_in = 0.0
+        speech_out = 0.0
+        max_samples = int(self.max_seconds * SAMPLE_RATE)
+
+        for window in windows:
+            if not len(buffer):
+                buffer_start = window.start_time
+            buffer = np.concatenate((buffer, window.samples))
+            while len(buffer) >= max_samples:
+                head = buffer[:max_samples]
+                energies = frame_energies_db(head)
+                cut = max(1, self._cut_frame(energies, speech_mask(energies))) * FRAME_SAMPLES
+                chunk = self._emit(index, buffer_start, buffer[:cut])
+                audio_in += cut / SAMPLE_RATE
+                buffer = buffer[cut:]
+                buffer_start += cut / SAMPLE_RATE
+                if chunk is not None:
+                    speech_out += chunk.speech_seconds
+                    index += 1
+                    yield chunk
+
+        if len(buffer):
+            chunk = self._emit(index, buffer_start, buffer)
+            audio_in += len(buffer) / SAMPLE_RATE
+            if chunk is not None:
+                speech_out += chunk.speech_seconds
+                yield chunk
+
+        if audio_in:
+            logger.info(
+                f"VAD kept {speech_out:.1f}s of {audio_in:.1f}s of audio "
+                f"({100 * (1 - speech_out / audio_in):.1f}% skipped)"
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": VAD_ENABLED,
+                "target_seconds": self.target_seconds,
+                "audio_seconds": round(self.audio_seconds, 1),
+                "speech_seconds": round(self.speech_seconds, 1),
+                "skipped_fraction": (
+                    round(1 - self.speech_seconds / self.audio_seconds, 4)
+                    if self.audio_seconds else None
+                ),
+                "chunks": self.chunks_emitted,
+                "silent_chunks_skipped": self.chunks_skipped,
+            }
+
+
+speech_segmenter = SpeechSegmenter()
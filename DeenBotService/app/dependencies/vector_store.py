@@ -0,0 +1,160 @@
+"""vector_store.py - Long-lived Chroma client and collection handle pool.
+
+Opening ``Chroma(persist_directory=..., collection_name=...)`` per request
+re-opens the SQLite/HNSW files every time.  ``VectorStoreService`` opens the
+persistent client once per process, hands out cached LangChain ``Chroma``
+wrappers per collection and batches ``persist`` calls: writes only mark the
+store dirty, and a background thread flushes once a size threshold or a time
+interval is reached.
+
+Typical usage::
+
+    from app.dependencies.vector_store import vector_store
+
+    store = vector_store.get_store()
+    vector_store.add_documents(docs)
+    results = store.similarity_search(question, k=5)
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain.schema.document import Document
+
+from app.dependencies.embedding_registry import get_embeddings
+
+logger = logging.getLogger(__name__)
+
+# Constants
+CHROMA_DIR = os.getenv("CHROMA_DIR", "chroma_index")
+COLLECTION_NAME = "media_transcripts"
+PERSIST_INTERVAL_SECONDS = float(os.getenv("CHROMA_PERSIST_INTERVAL_SECONDS", "30"))
+PERSIST_BATCH_SIZE = int(os.getenv("CHROMA_PERSIST_BATCH_SIZE", "2000"))
+
+
+class VectorStoreService:
+    """Process-wide owner of the persistent Chroma client."""
+
+    def __init__(
+        self,
+        persist_directory: str = CHROMA_DIR,
+        *,
+        persist_interval: float = PERSIST_INTERVAL_SECONDS,
+        persist_batch_size: int = PERSIST_BATCH_SIZE,
+    ) -> None:
+        self.persist_directory = persist_directory
+        self.persist_interval = persist_interval
+        self.persist_batch_size = persist_batch_size
+        self._client = None
+        self._stores: Dict[Tuple[str, int], Any] = {}
+        self._lock = threading.RLock()
+        self._pending_writes = 0
+        self._stop = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+
+    @property
+    def client(self):
+        """The persistent Chroma client, opened on first use."""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    import chromadb
+
+                    Path(self.persist_directory).mkdir(parents=True, exist_ok=True)
+                    logger.info(f"Opening persistent Chroma client at {self.persist_directory}")
+                    self._client = chromadb.PersistentClient(path=self.persist_directory)
+        return self._client
+
+    def get_store(
+        self, collection_name: str = COLLECTION_NAME, embeddings: Any = None
+    ):
+        """Return the cached LangChain ``Chroma`` wrapper for ``collection_name``."""
+        embeddings = embeddings or get_embeddings()
+        key = (collection_name, id(embeddings))
+        store = self._stores.get(key)
+        if store is not None:
+            return store
+
+        with self._lock:
+            store = self._stores.get(key)
+            if store is None:
+                # Imported lazily so callers can fall back to an in-memory
+                # backend when Chroma's native dependencies are missing.
+                from langchain_community.vectorstores import Chroma
+
+                store = Chroma(
+                    client=self.client,
+                    collection_name=collection_name,
+                    embedding_function=embeddings,
+                )
+                self._stores[key] = store
+                logger.debug(f"Opened Chroma collection handle: {collection_name}")
+            return store
+
+    def get_collection(self, collection_name: str = COLLECTION_NAME):
+        """Return the raw ``chromadb`` collection behind the cached wrapper."""
+        return self.get_store(collection_name)._collection
+
+    def add_documents(
+        self, docs: List[Document], collection_name: str = COLLECTION_NAME, **kwargs
+    ) -> List[str]:
+        """Add documents and schedule a batched persist."""
+        ids = self.get_store(collection_name).add_documents(docs, **kwargs)
+        self.mark_dirty(len(docs))
+        return ids
+
+    def mark_dirty(self, count: int) -> None:
+        """Record ``count`` unpersisted writes, flushing past the threshold."""
+        with self._lock:
+            self._pending_writes += count
+            should_flush = self._pending_writes >= self.persist_batch_size
+        if should_flush:
+            self.flush()
+
+    def flush(self) -> None:
+        """Persist pending writes, if any."""
+        with self._lock:
+            if not self._pending_writes or self._client is None:
+                return
+            pending = self._pending_writes
+            self._pending_writes = 0
+            # Clients backed by chromadb >= 0.4 write through to SQLite and
+            # have no explicit persist step; older clients need one.
+            persist = getattr(self._client, "persist", None)
+            if callable(persist):
+                try:
+                    persist()
+                except Exception as e:
+                    self._pending_writes += pending
+                    logger.error(f"Error persisting Chroma store: {e}")
+                    return
+            logger.debug(f"Persisted {pending} pending vector store writes")
+
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(self.persist_interval):
+            self.flush()
+
+    def start(self) -> None:
+        """Start the background flusher (idempotent)."""
+        with self._lock:
+            if self._flusher and self._flusher.is_alive():
+                return
+            self._stop.clear()
+            self._flusher = threading.Thread(
+                target=self._flush_loop, name="chroma-flusher", daemon=True
+            )
+            self._flusher.start()
+
+    def close(self) -> None:
+        """Stop the flusher and persist anything still pending."""
+        self._stop.set()
+        if self._flusher:
+            self._flusher.join(timeout=5)
+        self.flush()
+
+
+vector_store = VectorStoreService()
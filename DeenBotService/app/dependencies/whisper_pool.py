@@ -0,0 +1,243 @@
+"""whisper_pool.py - Process-level pool of warm Whisper models.
+
+``whisper.load_model`` reads hundreds of MB from disk; doing it for every
+upload or YouTube job dominates short transcriptions.  The pool keeps one
+model per size (``tiny``, ``base``, ...), reference-counts borrowers and
+evicts idle models when they exceed an idle timeout or when loading a new
+size would go over the memory budget.
+
+Borrowers share the model object, and Whisper's decoding is not reentrant:
+every ``transcribe``/``detect_language`` installs KV-cache hooks on the
+shared decoder modules.  Calls on a pooled model must therefore hold its
+``inference_lock``; jobs that need parallel decoding use
+``transcription_pool``'s worker processes instead.
+
+Typical usage::
+
+    from app.dependencies.whisper_pool import whisper_pool
+
+    with whisper_pool.borrow("base") as model:
+        with whisper_pool.inference_lock("base"):
+            result = model.transcribe(path, language="ar", fp16=False)
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+import whisper
+
+logger = logging.getLogger(__name__)
+
+# Constants
+WHISPER_PRELOAD_MODELS = [
+    size.strip()
+    for size in os.getenv("WHISPER_PRELOAD_MODELS", "").split(",")
+    if size.strip()
+]
+WHISPER_POOL_MEMORY_MB = int(os.getenv("WHISPER_POOL_MEMORY_MB", "4096"))
+WHISPER_POOL_IDLE_SECONDS = float(os.getenv("WHISPER_POOL_IDLE_SECONDS", "900"))
+
+# Approximate resident size of each model once loaded on CPU (fp32 weights
+# plus runtime overhead), used for the memory budget.
+MODEL_MEMORY_MB = {
+    "tiny": 150,
+    "base": 290,
+    "small": 970,
+    "medium": 3050,
+    "large": 6200,
+}
+
+
+class _PooledModel:
+    def __init__(self, size: str, model: Any, load_seconds: float) -> None:
+        self.size = size
+        self.model = model
+        self.load_seconds = load_seconds
+        self.refcount = 0
+        self.last_used = time.monotonic()
+        self.memory_mb = MODEL_MEMORY_MB.get(size.split(".")[0], MODEL_MEMORY_MB["large"])
+
+
+class WhisperModelPool:
+    """Shares loaded Whisper models between ``AudioProcessor`` instances."""
+
+    def __init__(
+        self,
+        *,
+        memory_budget_mb: int = WHISPER_POOL_MEMORY_MB,
+        idle_seconds: float = WHISPER_POOL_IDLE_SECONDS,
+    ) -> None:
+        self.memory_budget_mb = memory_budget_mb
+        self.idle_seconds = idle_seconds
+        self._entries: Dict[str, _PooledModel] = {}
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._inference_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._janitor: Optional[threading.Thread] = None
+        self.loads = 0
+        self.hits = 0
+        self.evictions = 0
+
+    def _load_lock(self, size: str) -> threading.Lock:
+        with self._lock:
+            lock = self._load_locks.get(size)
+            if lock is None:
+                lock = self._load_locks[size] = threading.Lock()
+            return lock
+
+    def inference_lock(self, size: str) -> threading.Lock:
+        """Lock serialising the decoding calls on the pooled ``size`` model."""
+        with self._lock:
+            lock = self._inference_locks.get(size)
+            if lock is None:
+                lock = self._inference_locks[size] = threading.Lock()
+            return lock
+
+    def acquire(self, size: str) -> Any:
+        """Borrow the model for ``size``, loading it if needed.
+
+        Every ``acquire`` must be paired with a ``release``.
+        """
+        with self._lock:
+            entry = self._entries.get(size)
+            if entry is not None:
+                entry.refcount += 1
+                entry.last_used = time.monotonic()
+                self.hits += 1
+                return entry.model
+
+        with self._load_lock(size):
+            with self._lock:
+                entry = self._entries.get(size)
+                if entry is not None:
+                    entry.refcount += 1
+                    entry.last_used = time.monotonic()
+                    self.hits += 1
+                    return entry.model
+
+            needed_mb = MODEL_MEMORY_MB.get(size.split(".")[0], MODEL_MEMORY_MB["large"])
+            self._make_room(needed_mb)
+
+            logger.info(f"Loading {size} Whisper model into pool...")
+            start = time.perf_counter()
+            model = whisper.load_model(size)
+            load_seconds = time.perf_counter() - start
+            logger.info(f"Whisper model {size} loaded in {load_seconds:.2f}s")
+
+            entry = _PooledModel(size, model, load_seconds)
+            entry.refcount = 1
+            with self._lock:
+                self._entries[size] = entry
+                self.loads += 1
+            return model
+
+    def release(self, size: str) -> None:
+        """Return a model previously obtained with ``acquire``."""
+        with self._lock:
+            entry = self._entries.get(size)
+            if entry is None:
+                return
+            entry.refcount = max(0, entry.refcount - 1)
+            entry.last_used = time.monotonic()
+
+    def is_loaded(self, size: str) -> bool:
+        with self._lock:
+            return size in self._entries
+
+    @contextmanager
+    def borrow(self, size: str) -> Iterator[Any]:
+        model = self.acquire(size)
+        try:
+            yield model
+        finally:
+            self.release(size)
+
+    def _used_mb(self) -> int:
+        return sum(entry.memory_mb for entry in self._entries.values())
+
+    def _make_room(self, needed_mb: int) -> None:
+        """Evict idle models, least recently used first, until ``needed_mb`` fits."""
+        with self._lock:
+            idle = sorted(
+                (e for e in self._entries.values() if e.refcount == 0),
+                key=lambda e: e.last_used,
+            )
+            for entry in idle:
+                if self._used_mb() + needed_mb <= self.memory_budget_mb:
+                    break
+                self._evict(entry)
+            if self._used_mb() + needed_mb > self.memory_budget_mb:
+                logger.warning(
+                    f"Whisper pool over budget: {self._used_mb() + needed_mb} MB needed, "
+                    f"budget {self.memory_budget_mb} MB (all other models are in use)"
+                )
+
+    def _evict(self, entry: _PooledModel) -> None:
+        # Caller holds self._lock
+        del self._entries[entry.size]
+        self.evictions += 1
+        logger.info(f"Evicted idle Whisper model {entry.size} from pool")
+
+    def evict_idle(self) -> None:
+        """Drop models nobody has borrowed for ``idle_seconds``."""
+        now = time.monotonic()
+        with self._lock:
+            for entry in list(self._entries.values()):
+                if entry.refcount == 0 and now - entry.last_used >= self.idle_seconds:
+                    self._evict(entry)
+
+    def preload(self, sizes: Optional[List[str]] = None) -> None:
+        """Load ``sizes`` (default ``WHISPER_PRELOAD_MODELS``) ahead of time."""
+        for size in sizes if sizes is not None else WHISPER_PRELOAD_MODELS:
+            try:
+                self.acquire(size)
+                self.release(size)
+            except Exception as e:
+                logger.error(f"Error preloading Whisper model {size}: {e}")
+
+    def _janitor_loop(self) -> None:
+        interval = max(10.0, self.idle_seconds / 4)
+        while not self._stop.wait(interval):
+            self.evict_idle()
+
+    def start(self) -> None:
+        """Start the idle-eviction thread (idempotent)."""
+        with self._lock:
+            if self._janitor and self._janitor.is_alive():
+                return
+            self._stop.clear()
+            self._janitor = threading.Thread(
+                target=self._janitor_loop, name="whisper-pool-janitor", daemon=True
+            )
+            self._janitor.start()
+
+    def close(self) -> None:
+        self._stop.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "memory_budget_mb": self.memory_budget_mb,
+                "memory_used_mb": self._used_mb(),
+                "loads": self.loads,
+                "hits": self.hits,
+                "evictions": self.evictions,
+                "models": {
+                    size: {
+                        "refcount": entry.refcount,
+                        "memory_mb": entry.memory_mb,
+                        "load_ms": round(entry.load_seconds * 1000, 3),
+                        "idle_seconds": round(time.monotonic() - entry.last_used, 1),
+                    }
+                    for size, entry in self._entries.items()
+                },
+            }
+
+
+whisper_pool = WhisperModelPool()
@@ -0,0 +1,140 @@
+"""youtube_index.py - Persistent YouTube video id -> transcription id index.
+
+Downloading, transcribing and vectorising a lecture takes minutes; the same
+Hasaniya lesson is often submitted many times.  Each processed video is
+recorded in the ``youtube_transcripts`` table together with the Whisper model
+size and ``PIPELINE_VERSION`` that produced it, so a repeat request can bind a
+new conversation to the existing context instead of re-processing.
+
+An entry is only reused when the model size and pipeline version still match
+and the transcript is still present in the vector store.
+
+Typical usage::
+
+    from app.dependencies.youtube_index import youtube_index
+
+    async with SessionLocal() as db:
+        entry = await youtube_index.lookup(db, video_id, model_size="base")
+        if entry is None:
+            ...
+            await youtube_index.record(db, video_id, transcription_id, model_size="base")
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+from typing import Any, Dict, Iterable, Optional, Set
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.dependencies.ingestion import (
+    PIPELINE_VERSION,
+    is_transcription_indexed,
+    transcription_path,
+)
+from app.models.youtube_transcript import YouTubeTranscript
+
+logger = logging.getLogger(__name__)
+
+
+def job_key(video_id: str, model_size: str) -> str:
+    """Job queue key under which concurrent requests for a video share one job."""
+    return f"youtube:{video_id}:{model_size}"
+
+
+class YouTubeTranscriptIndex:
+    """Looks up and records processed videos, counting hits and misses."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    def _count(self, attribute: str) -> None:
+        with self._lock:
+            setattr(self, attribute, getattr(self, attribute) + 1)
+
+    def is_current(self, entry: YouTubeTranscript, model_size: str) -> bool:
+        """Whether ``entry`` was produced by the current model and pipeline."""
+        return (
+            entry.model_size == model_size
+            and entry.pipeline_version == PIPELINE_VERSION
+            and os.path.exists(transcription_path(entry.transcription_id))
+            and is_transcription_indexed(entry.transcription_id)
+        )
+
+    async def lookup(
+        self, db: AsyncSession, video_id: str, *, model_size: str
+    ) -> Optional[YouTubeTranscript]:
+        """Return the reusable entry for ``video_id``, or ``None``."""
+        entry = await db.get(YouTubeTranscript, video_id)
+        if entry is None:
+            self._count("misses")
+            return None
+        if not self.is_current(entry, model_size):
+            logger.info(
+                f"Ignoring stale transcript for video {video_id}: "
+                f"model={entry.model_size}, pipeline={entry.pipeline_version}"
+            )
+            self._count("stale")
+            self._count("misses")
+            return None
+        self._count("hits")
+        logger.info(f"Video {video_id} already transcribed as {entry.transcription_id}")
+        return entry
+
+    async def record(
+        self,
+        db: AsyncSession,
+        video_id: str,
+        transcription_id: str,
+        *,
+        model_size: str,
+        title: Optional[str] = None,
+    ) -> None:
+        """Insert or refresh the entry for ``video_id``."""
+        entry = await db.get(YouTubeTranscript, video_id)
+        if entry is None:
+            entry = YouTubeTranscript(video_id=video_id)
+            db.add(entry)
+        entry.transcription_id = transcription_id
+        entry.model_size = model_size
+        entry.pipeline_version = PIPELINE_VERSION
+        if title:
+            entry.title = title
+        await db.commit()
+        logger.info(f"Recorded video {video_id} -> {transcription_id}")
+
+    async def indexed_video_ids(
+        self, db: AsyncSession, video_ids: Iterable[str], *, model_size: str
+    ) -> Set[str]:
+        """Those of ``video_ids`` whose entry ``lookup`` would reuse (see ``is_current``)."""
+        result = await db.execute(
+            select(YouTubeTranscript).where(
+                YouTubeTranscript.video_id.in_(list(video_ids)),
+                YouTubeTranscript.model_size == model_size,
+                YouTubeTranscript.pipeline_version == PIPELINE_VERSION,
+            )
+        )
+        entries = result.scalars().all()
+        # One transcript file and vector store check per entry: off the event loop
+        current = await asyncio.get_running_loop().run_in_executor(
+            None, lambda: [entry.video_id for entry in entries if self.is_current(entry, model_size)]
+        )
+        return set(current)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "pipeline_version": PIPELINE_VERSION,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+            }
+
+
+youtube_index = YouTubeTranscriptIndex()
@@ -7,18 +7,207 @@ import yt_dlp
 import uuid
 import shutil
 import re
-from typing import Dict, Any, Optional, Tuple
+import threading
+import time
+from typing import Dict, Any, Iterable, Optional, Tuple
+
+from app.dependencies.audio_stream import ffmpeg_executable
+from app.dependencies.captions import (
+    CAPTION_LANGUAGES,
+    CAPTIONS_MODE,
+    CaptionTrack,
+    parse_captions,
+    select_caption_track,
+)
+from app.dependencies.media_cache import media_cache, youtube_key
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Constants
+# Whisper hears 16 kHz mono: audio-only streams from this bitrate up (YouTube's
+# ~50 kbps opus or 48 kbps AAC) carry everything it can use
+YTDLP_MIN_AUDIO_ABR = float(os.getenv("YTDLP_MIN_AUDIO_ABR", "40"))
+AUDIO_EXTENSIONS = (".webm", ".m4a", ".opus", ".ogg", ".mp4", ".mp3")
+
+
+def select_audio_format(formats: Optional[Iterable[Dict[str, Any]]],
+                        min_abr: float = YTDLP_MIN_AUDIO_ABR) -> Optional[Dict[str, Any]]:
+    """Smallest audio-only format of at least ``min_abr`` kbps (the best one if none is)."""
+    audio_formats = [
+        f for f in formats or []
+        if f.get('vcodec') == 'none' and f.get('acodec') not in (None, 'none')
+    ]
+    if not audio_formats:
+        return None
+
+    def bitrate(f: Dict[str, Any]) -> float:
+        return f.get('abr') or f.get('tbr') or 0
+
+    adequate = [f for f in audio_formats if bitrate(f) >= min_abr]
+    if adequate:
+        return min(adequate, key=lambda f: (bitrate(f), f.get('filesize') or f.get('filesize_approx') or 0))
+    return max(audio_formats, key=bitrate)
+
+
+def _downloaded_path(info: Optional[Dict[str, Any]], audio_path: str) -> Optional[str]:
+    for download in (info or {}).get('requested_downloads') or []:
+        path = download.get('filepath')
+        if path and os.path.exists(path):
+            return path
+    for ext in AUDIO_EXTENSIONS:
+        if os.path.exists(audio_path + ext):
+            return audio_path + ext
+    return None
+
+
+def _process_cpu_seconds(pid: int) -> Optional[float]:
+    """User + system CPU time of a live process (Linux ``/proc``), if readable."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # The command name may contain spaces; fields resume after its ")"
+    fields = stat[stat.rfind(")") + 2:].split()
+    try:
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (IndexError, ValueError):
+        return None
+
+
+def _ffmpeg_children(marker: str) -> Iterable[int]:
+    """Child processes of this process running ffmpeg on a path containing ``marker``."""
+    parent = str(os.getpid())
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return []
+    children = []
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                stat = f.read()
+            with open(f"/proc/{entry}/cmdline", "rb") as f:
+                argv = f.read().split(b"\0")
+        except OSError:
+            continue
+        fields = stat[stat.rfind(")") + 2:].split()
+        if len(fields) > 1 and fields[1] == parent and argv and b"ffmpeg" in os.path.basename(argv[0]) \
+                and any(marker.encode() in arg for arg in argv[1:]):
+            children.append(int(entry))
+    return children
+
+
+class FfmpegCpuMeter:
+    """CPU seconds of the ffmpeg postprocessors run for one download.
+
+    Registered as a yt-dlp ``postprocessor_hooks`` entry: while an FFmpeg
+    postprocessor runs, a thread samples the CPU time of the ffmpeg children
+    working on this download's files (recognised by ``marker``, a path
+    unique to the download), so concurrent downloads are not counted.  The
+    last sampling interval of a child may be missed.  Stays at 0.0 when no
+    FFmpeg postprocessor ran, which is the native-container path.
+    """
+
+    def __init__(self, marker: str, interval: float = 0.05) -> None:
+        self.marker = marker
+        self.interval = interval
+        self._seen: Dict[int, float] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def seconds(self) -> float:
+        return round(sum(self._seen.values()), 3)
+
+    def hook(self, status: Dict[str, Any]) -> None:
+        if not str(status.get('postprocessor') or '').startswith('FFmpeg'):
+            return
+        if status.get('status') == 'started' and self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._sample, name="ffmpeg-cpu", daemon=True)
+            self._thread.start()
+        elif status.get('status') == 'finished':
+            self.stop()
+
+    def stop(self) -> None:
+        """Stop sampling; also called when the download fails mid-postprocessing."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _sample(self) -> None:
+        while True:
+            for pid in _ffmpeg_children(self.marker):
+                seconds = _process_cpu_seconds(pid)
+                if seconds is not None:
+                    self._seen[pid] = max(self._seen.get(pid, 0.0), seconds)
+            if self._stop.wait(self.interval):
+                return
+
+
+class DownloadStats:
+    """Aggregates yt-dlp download measurements for /metrics."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.downloads = 0
+        self.failures = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.ttfb_seconds = 0.0
+        self.ttfb_samples = 0
+        self.reencode_cpu_seconds = 0.0
+        self.formats: Dict[str, int] = {}
+
+    def record(self, report: Dict[str, Any]) -> None:
+        with self._lock:
+            self.downloads += 1
+            self.bytes += report.get("bytes") or 0
+            self.seconds += report.get("seconds") or 0.0
+            if report.get("ttfb_seconds") is not None:
+                self.ttfb_seconds += report["ttfb_seconds"]
+                self.ttfb_samples += 1
+            self.reencode_cpu_seconds += report.get("reencode_cpu_seconds") or 0.0
+            ext = report.get("ext") or "unknown"
+            self.formats[ext] = self.formats.get(ext, 0) + 1
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "downloads": self.downloads,
+                "failures": self.failures,
+                "avg_mb": round(self.bytes / self.downloads / (1024 * 1024), 2) if self.downloads else 0.0,
+                "avg_seconds": round(self.seconds / self.downloads, 2) if self.downloads else 0.0,
+                "avg_ttfb_seconds": round(self.ttfb_seconds / self.ttfb_samples, 3) if self.ttfb_samples else None,
+                "reencode_cpu_seconds": round(self.reencode_cpu_seconds, 2),
+                "containers": dict(self.formats),
+            }
+
+
+download_stats = DownloadStats()
+
 class YouTubeProcessor:
     """Helper class for downloading and processing YouTube videos."""
     
     def __init__(self, buffer_percentage: float = 0.2):
         self.temp_dir = None
         self.buffer_percentage = buffer_percentage
+        # Measurements of the last yt-dlp download (format, bytes, timings)
+        self.last_download: Optional[Dict[str, Any]] = None
+        self._info: Optional[Dict[str, Any]] = None
+        self._info_url: Optional[str] = None
+        # Media cache keys pinned by this processor until cleanup()
+        self._pinned: list = []
 
     def _has_sufficient_disk_space(self, file_size: int, download_path: str) -> bool:
         """Check if there is enough disk space for the download plus a buffer."""
@@ -47,10 +236,23 @@ class YouTubeProcessor:
             # Fail open: assume there is space if the check fails
             return True
     
+    def extract_info(self, youtube_url: str) -> Dict[str, Any]:
+        """yt-dlp info dict of the video, extracted once per processor and URL."""
+        if self._info is None or self._info_url != youtube_url:
+            logger.info(f"Fetching video info for {youtube_url}...")
+            with yt_dlp.YoutubeDL({'quiet': True, 'noplaylist': True, 'socket_timeout': 600}) as ydl:
+                info_dict = ydl.extract_info(youtube_url, download=False)
+            if not info_dict:
+                raise Exception("Could not retrieve video information.")
+            self._info, self._info_url = info_dict, youtube_url
+        return self._info
+
     def setup_temp_directory(self):
         """Create a temporary directory for downloaded files if needed."""
         if self.temp_dir is None:
-            self.temp_dir = tempfile.mkdtemp(prefix="youtube_downloads_")
+            # In the media cache's staging area, so the finished audio is moved
+            # into the cache without a copy and a crash leaves nothing behind
+            self.temp_dir = media_cache.staging_directory(prefix="youtube_downloads_")
             logger.info(f"Created temporary directory: {self.temp_dir}")
         return self.temp_dir
     
@@ -149,19 +351,29 @@ class YouTubeProcessor:
             logger.error(f"Error downloading YouTube audio with pytube: {str(e)}")
             return None
     
-    def download_audio_ytdlp(self, youtube_url: str) -> Optional[str]:
+    def download_audio_ytdlp(self, youtube_url: str, force_refresh: bool = False) -> Optional[str]:
         """
-        Download audio from a YouTube video using yt-dlp.
+        Download the audio of a YouTube video using yt-dlp.
+        
+        The video is extracted once; that info dict serves the disk space
+        check, the format choice and the download.  The smallest adequate
+        audio-only format (see `select_audio_format`) is saved in its native
+        container (opus/webm or m4a) without an MP3 re-encode: the
+        transcription decoder reads it directly.  Download measurements are
+        kept in ``self.last_download``.
+        
+        The audio is kept in the media cache under the video id: a video
+        processed again is served from its local copy.  The cached file is
+        pinned until `cleanup`.
         
         Args:
             youtube_url: YouTube URL
+            force_refresh: Download again and replace the cached copy
             
         Returns:
             Path to downloaded audio file or None if download fails
         """
-        # Create a temporary directory for downloads
-        temp_dir = tempfile.mkdtemp(prefix="youtube_downloads_")
-        logger.info(f"Created temporary directory: {temp_dir}")
+        temp_dir = self.setup_temp_directory()
         
         # Extract video ID from URL
         video_id = self.extract_video_id(youtube_url)
@@ -169,139 +381,149 @@ class YouTubeProcessor:
             logger.error("Could not extract video ID from URL")
             return None
         
-        # Set output path for audio file
+        key = youtube_key(video_id)
+        cached_path = None if force_refresh else media_cache.get(key, pin=True)
+        if cached_path:
+            self._pinned.append(key)
+            self.last_download = {
+                "cached": True,
+                "ext": os.path.splitext(cached_path)[1].lstrip('.'),
+                "bytes": os.path.getsize(cached_path),
+            }
+            logger.info(f"Audio of YouTube video {video_id} served from the media cache: {cached_path}")
+            return cached_path
+
+        # Set output path for audio file; yt-dlp appends the native extension
         audio_path = os.path.join(temp_dir, f"youtube_{video_id}_{uuid.uuid4().hex[:8]}")
+        base_opts = {
+            'quiet': True,
+            'noplaylist': True,  # Ignore playlists
+            'socket_timeout': 600,  # Increased to 10 minutes
+            'retries': 5,         # Increased retries
+            'fragment_retries': 10, # Retry fragments for DASH/HLS
+            'skip_unavailable_fragments': True # Skip if fragments are missing
+        }
+        ffmpeg_path = shutil.which(ffmpeg_executable())
+        if ffmpeg_path:
+            # Only needed to join HLS/DASH fragments, never to re-encode
+            base_opts['ffmpeg_location'] = ffmpeg_path
 
-        # First, get video info to check filesize
+        # Extract once (shared with the caption lookup)
         try:
-            logger.info(f"Fetching video info for {youtube_url}...")
-            ydl_info_opts = {'quiet': True, 'noplaylist': True, 'ignoreerrors': True}
-            with yt_dlp.YoutubeDL(ydl_info_opts) as ydl:
-                info_dict = ydl.extract_info(youtube_url, download=False)
-                if not info_dict:
-                    raise Exception("Could not retrieve video information.")
-
-                # Find the best audio format and its filesize
-                best_audio = None
-                if 'formats' in info_dict:
-                    audio_formats = [f for f in info_dict['formats'] if f.get('acodec') != 'none' and f.get('vcodec') == 'none']
-                    if audio_formats:
-                        best_audio = max(audio_formats, key=lambda f: f.get('abr', 0))
-                
-                filesize = best_audio.get('filesize') or info_dict.get('filesize')
+            info_dict = self.extract_info(youtube_url)
+        except Exception as e:
+            logger.error(f"Could not fetch video info: {e}")
+            download_stats.record_failure()
+            return None
 
-                if not filesize:
-                     # Fallback for live streams or where filesize is not available in metadata
-                    logger.warning("Could not determine filesize from metadata. Skipping disk space check.")
-                elif not self._has_sufficient_disk_space(filesize, audio_path):
-                    return None # Not enough space
+        audio_format = select_audio_format(info_dict.get('formats'))
+        filesize = (audio_format or {}).get('filesize') or (audio_format or {}).get('filesize_approx') \
+            or info_dict.get('filesize')
+        if not filesize:
+            # Fallback for live streams or where filesize is not available in metadata
+            logger.warning("Could not determine filesize from metadata. Skipping disk space check.")
+        else:
+            # Older cached media gives way to this download
+            media_cache.make_room(filesize)
+            if not self._has_sufficient_disk_space(filesize, audio_path):
+                return None # Not enough space
 
-        except Exception as e:
-            logger.error(f"Could not fetch video info or check disk space: {e}")
-            # Proceed with download attempt if info fetch fails, as it might still work
-            pass
-        
-        try:
-            logger.info(f"Downloading YouTube video {video_id} using yt-dlp...")
-            
-            # Set FFmpeg path for yt-dlp
-            ffmpeg_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 
-                                     "ffmpeg", "ffmpeg-master-latest-win64-gpl", "bin", "ffmpeg.exe")
-            if os.path.exists(ffmpeg_path):
-                logger.info(f"FFmpeg found at: {ffmpeg_path}")
-            else:
-                logger.warning(f"FFmpeg not found at: {ffmpeg_path}. Audio extraction may fail.")
-                # Check if ffmpeg is in PATH
-                import shutil
-                if shutil.which("ffmpeg"):
-                    ffmpeg_path = shutil.which("ffmpeg")
-                    logger.info(f"FFmpeg found in PATH at: {ffmpeg_path}")
-                else:
-                    logger.warning("FFmpeg not found in PATH. Will attempt download without post-processing.")
-                    ffmpeg_path = None
-        
-            # yt-dlp options for audio download
-            ydl_opts = {
-                'format': 'bestaudio/best',
-                'outtmpl': audio_path,
-                'quiet': False,
-                'noplaylist': True,  # Ignore playlists
-                'ignoreerrors': True,  # Continue on errors
-                'socket_timeout': 600,  # Increased to 10 minutes
-                'retries': 5,         # Increased retries
-                'fragment_retries': 10, # Retry fragments for DASH/HLS
-                'skip_unavailable_fragments': True # Skip if fragments are missing
+        # The chosen format first; any audio the extractor offers otherwise
+        format_specs = ['bestaudio/best']
+        if audio_format:
+            format_specs.insert(0, audio_format['format_id'])
+            logger.info(
+                f"Downloading YouTube video {video_id} audio as format {audio_format['format_id']} "
+                f"({audio_format.get('acodec')}, {audio_format.get('abr') or '?'} kbps, {audio_format.get('ext')})"
+            )
+
+        for format_spec in format_specs:
+            started = time.perf_counter()
+            first_byte: Dict[str, float] = {}
+            ffmpeg_cpu = FfmpegCpuMeter(audio_path)
+
+            def progress_hook(status: Dict[str, Any]) -> None:
+                if not first_byte and status.get('status') == 'downloading' and status.get('downloaded_bytes'):
+                    first_byte['seconds'] = time.perf_counter() - started
+
+            opts = {
+                **base_opts,
+                'format': format_spec,
+                'outtmpl': audio_path + '.%(ext)s',
+                'progress_hooks': [progress_hook],
+                'postprocessor_hooks': [ffmpeg_cpu.hook],
             }
-            
-            if ffmpeg_path:
-                ydl_opts['postprocessors'] = [{
-                    'key': 'FFmpegExtractAudio',
-                    'preferredcodec': 'mp3',
-                    'preferredquality': '192',
-                }]
-                ydl_opts['ffmpeg_location'] = ffmpeg_path
-            else:
-                # If no ffmpeg, try to download a format that's already audio
-                ydl_opts['format'] = 'm4a/bestaudio/best'
-                logger.info("No FFmpeg available, attempting to download direct audio format")
-        
-            # Try download with full processing
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([youtube_url])
-                
-                # Check for the actual file with possible extensions
-                possible_extensions = [".mp3", ".m4a", ".webm", ".opus"]
-                final_path = audio_path
-                for ext in possible_extensions:
-                    if os.path.exists(audio_path + ext):
-                        final_path = audio_path + ext
-                        break
-                
-                # Verify the file was created and has content
-                if os.path.exists(final_path) and os.path.getsize(final_path) > 1000:
-                    logger.info(f"Audio downloaded to {final_path}")
-                    return final_path
-                else:
-                    logger.warning(f"Downloaded file missing or too small: {final_path}")
-                    raise Exception("Downloaded file is missing or too small")
-        except Exception as e:
-            logger.error(f"Error downloading with yt-dlp: {str(e)}")
-            
-            # Try a simpler approach without postprocessing
             try:
-                simple_opts = {
-                    'format': 'm4a/bestaudio/best',
-                    'outtmpl': audio_path + "_simple",
-                    'quiet': False,
-                    'noplaylist': True,
-                    'ignoreerrors': True,
-                    'socket_timeout': 600, # Increased to 10 minutes
-                    'retries': 5, # Increased retries
-                    'fragment_retries': 10,
-                    'skip_unavailable_fragments': True
-                }
-                logger.info("Trying simpler download without postprocessing...")
-                with yt_dlp.YoutubeDL(simple_opts) as ydl_simple:
-                    ydl_simple.download([youtube_url])
-                
-                # Check for any file that might have been downloaded
-                simple_path = audio_path + "_simple"
-                for ext in [".m4a", ".webm", ".mp3", ".opus"]:
-                    if os.path.exists(simple_path + ext):
-                        simple_path = simple_path + ext
-                        break
-                
-                # Verify the file was created and has content
-                if os.path.exists(simple_path) and os.path.getsize(simple_path) > 1000:
-                    logger.info(f"Audio downloaded with simple options to {simple_path}")
-                    return simple_path
-                else:
-                    logger.warning(f"Simple download file missing or too small: {simple_path}")
+                with yt_dlp.YoutubeDL(opts) as ydl:
+                    # Downloads from the info dict: no second extraction
+                    result = ydl.process_ie_result(dict(info_dict), download=True)
+                final_path = _downloaded_path(result, audio_path)
+                if not final_path or os.path.getsize(final_path) <= 1000:
                     raise Exception("Downloaded file is missing or too small")
-            except Exception as e2:
-                logger.error(f"Second attempt to download failed: {str(e2)}")
-                return None
+            except Exception as e:
+                logger.error(f"Error downloading format {format_spec} with yt-dlp: {str(e)}")
+                continue
+            finally:
+                ffmpeg_cpu.stop()
+
+            self.last_download = {
+                "format_id": (result or {}).get('format_id'),
+                "ext": os.path.splitext(final_path)[1].lstrip('.'),
+                "acodec": (result or {}).get('acodec'),
+                "abr": (result or {}).get('abr'),
+                "bytes": os.path.getsize(final_path),
+                "ttfb_seconds": round(first_byte['seconds'], 3) if first_byte else None,
+                "seconds": round(time.perf_counter() - started, 3),
+                "reencode_cpu_seconds": ffmpeg_cpu.seconds,
+            }
+            download_stats.record(self.last_download)
+            final_path = media_cache.commit(final_path, key, pin=True, replace=force_refresh)
+            self._pinned.append(key)
+            logger.info(f"Audio downloaded to {final_path}: {self.last_download}")
+            return final_path
+
+        download_stats.record_failure()
+        return None
     
+    def fetch_captions(self, youtube_url: str, languages: Optional[Iterable[str]] = None) -> Optional[CaptionTrack]:
+        """
+        Fetch the best caption track of a video with yt-dlp.
+        
+        Uploaded subtitles are preferred over YouTube's automatic captions
+        (unless ``CAPTIONS_MODE`` allows only the former); the track is
+        parsed into timed segments as it is downloaded.
+        
+        Args:
+            youtube_url: YouTube URL
+            languages: Caption languages in order of preference
+        
+        Returns:
+            The parsed track, or None if the video has no usable captions
+        """
+        info_dict = self.extract_info(youtube_url)
+        track = select_caption_track(
+            info_dict,
+            languages or CAPTION_LANGUAGES,
+            allow_automatic=CAPTIONS_MODE != "manual",
+        )
+        if track is None:
+            logger.info(f"No {'/'.join(languages or CAPTION_LANGUAGES)} captions for {youtube_url}")
+            return None
+        logger.info(
+            f"Fetching {'automatic' if track['automatic'] else 'uploaded'} {track['language']} "
+            f"captions ({track['ext']}) for {youtube_url}"
+        )
+        with yt_dlp.YoutubeDL({'quiet': True, 'socket_timeout': 120}) as ydl:
+            with ydl.urlopen(track['url']) as response:
+                segments = list(parse_captions(response, track['ext']))
+        return CaptionTrack(
+            language=track['language'],
+            automatic=track['automatic'],
+            ext=track['ext'],
+            segments=segments,
+            duration=info_dict.get('duration'),
+        )
+
     def extract_captions(self, youtube_url: str, language_code: str = "ar") -> Optional[str]:
         """
         Extract captions from a YouTube video.
@@ -315,63 +537,25 @@ class YouTubeProcessor:
         """
         try:
             logger.info(f"Attempting to extract {language_code} captions from YouTube video...")
-            
-            # Create a YouTube object
-            yt = YouTube(youtube_url)
-            
-            # Try different variations of language codes, especially for Arabic
-            language_variations = [language_code]
-            if language_code == "ar":
-                language_variations.extend(["ar-SA", "ar-EG", "ar-AE"])
-            
-            caption_track = None
-            for lang in language_variations:
-                try:
-                    logger.info(f"Trying language code: {lang}")
-                    caption_track = yt.captions.get_by_language_code(lang)
-                    if caption_track:
-                        logger.info(f"Found captions for language code: {lang}")
-                        break
-                except Exception as lang_error:
-                    logger.warning(f"Failed to get captions for {lang}: {str(lang_error)}")
-                    # If we get a 400 error, no point in trying other variations
-                    if "HTTP Error 400" in str(lang_error):
-                        logger.warning("YouTube API returned HTTP 400, likely a persistent issue. Skipping further caption attempts.")
-                        return None
-                    continue
-            
-            if not caption_track:
-                # Try to get any available caption if specific language not found
-                logger.warning(f"No {language_code} captions found, trying any available captions")
-                if yt.captions:
-                    caption_track = next(iter(yt.captions.values()), None)
-                    if caption_track:
-                        logger.info(f"Using alternative captions: {caption_track.code}")
-                if not caption_track:
-                    logger.warning("No captions available in any language")
-                    return None
-            
-            # Generate captions
-            caption_text = caption_track.generate_srt_captions()
-            
-            # Clean up the SRT format
-            import re
-            cleaned_text = re.sub(r'\d+\n\d+:\d+:\d+,\d+ --> \d+:\d+:\d+,\d+\n', '', caption_text)
-            cleaned_text = cleaned_text.replace('\n\n', ' ').strip()
-            
+            track = self.fetch_captions(youtube_url, [language_code])
+            if track is None or not track.segments:
+                return None
+            cleaned_text = " ".join(segment.text for segment in track.segments)
             logger.info(f"Successfully extracted {len(cleaned_text)} characters of captions")
             return cleaned_text
-            
         except Exception as e:
             logger.error(f"Error extracting captions: {str(e)}")
             return None
     
-    def process_youtube_url(self, youtube_url: str) -> Tuple[Optional[str], Dict[str, Any]]:
+    def process_youtube_url(self, youtube_url: str, use_captions: bool = True,
+                            force_refresh: bool = False) -> Tuple[Optional[str], Dict[str, Any]]:
         """
         Process a YouTube URL by extracting captions or downloading audio.
         
         Args:
             youtube_url: YouTube URL
+            use_captions: Return a caption text file when captions exist
+            force_refresh: Download the audio again even if it is cached
             
         Returns:
             Tuple of (file path, metadata)
@@ -385,7 +569,7 @@ class YouTubeProcessor:
         
         # First try to extract captions
         try:
-            captions = self.extract_captions(youtube_url, language_code="ar")
+            captions = self.extract_captions(youtube_url, language_code="ar") if use_captions else None
             if captions and len(captions.strip()) > 100:
                 logger.info("Successfully extracted Arabic captions")
                 
@@ -406,12 +590,13 @@ class YouTubeProcessor:
         # If captions extraction fails, download audio
         try:
             # Try downloading with yt-dlp first
-            audio_path = self.download_audio_ytdlp(youtube_url)
+            audio_path = self.download_audio_ytdlp(youtube_url, force_refresh=force_refresh)
             
             # Verify the downloaded file
             if audio_path and os.path.exists(audio_path) and os.path.getsize(audio_path) > 10000:
                 logger.info(f"Successfully downloaded audio using yt-dlp: {audio_path}")
                 metadata["download_method"] = "yt-dlp"
+                metadata["download"] = self.last_download
                 return audio_path, metadata
             else:
                 logger.warning("yt-dlp download failed or file is too small")
@@ -433,8 +618,10 @@ class YouTubeProcessor:
             return None, metadata
     
     def cleanup(self):
-        """Clean up temporary files and directories."""
+        """Clean up temporary files and directories and unpin cached audio."""
         import shutil
+        while self._pinned:
+            media_cache.unpin(self._pinned.pop())
         if self.temp_dir and os.path.exists(self.temp_dir):
             logger.info(f"Cleaning up temporary directory: {self.temp_dir}")
             shutil.rmtree(self.temp_dir, ignore_errors=True)
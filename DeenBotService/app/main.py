@@ -3,6 +3,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 import os
+import asyncio
 import logging
 from datetime import datetime
 
@@ -14,6 +15,24 @@ from app.api.v1.chat_routes import router as chat_router
 from app.api.v1.auth_routes import router as auth_router
 from pydantic import BaseModel # Added for GenerateTitleRequest
 from app.dependencies.fatwallm_rag import ask_question_with_video_auto
+from app.dependencies.embedding_registry import warm_embeddings, embedding_stats
+from app.dependencies.vector_store import vector_store
+from app.dependencies.whisper_pool import whisper_pool
+from app.dependencies.youtube_index import youtube_index
+from app.dependencies.upload_index import upload_index
+from app.dependencies.numpy_index import numpy_index
+from app.dependencies.lexical_index import lexical_indexes
+from app.dependencies.job_queue import job_queue
+from app.dependencies.audio_stream import audio_decoder
+from app.dependencies.transcription_pool import transcription_pool
+from app.dependencies.vad import speech_segmenter
+from app.dependencies.transcription_checkpoints import transcription_checkpoints
+from app.dependencies.memory_budget import memory_budget
+from app.dependencies.language_id import language_stats
+from app.dependencies.youtube_processor import download_stats
+from app.dependencies.captions import caption_stats
+from app.dependencies.media_cache import media_cache
+from app.dependencies.playlist_ingestion import playlist_ingestor
 
 # Import database for initialization
 from app.database import engine, Base
@@ -81,12 +100,60 @@ app.include_router(chat_router, prefix="/api/v1/chat", tags=["chat"])
 async def startup_db_client():
     """Create database tables on startup if they don't exist."""
     try:
+        # create_all only creates missing tables; it never alters existing
+        # ones. Columns added to an existing table are applied separately as
+        # unversioned migrations: JobQueue._add_lease_columns runs
+        # "ALTER TABLE media_jobs ADD COLUMN IF NOT EXISTS owner, lease_expires_at"
+        # when the job queue starts. There is no migration history, so keep
+        # such statements idempotent and list them here.
         async with engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
         logger.info("Database tables created successfully")
     except Exception as e:
         logger.error(f"Error creating database tables: {str(e)}")
 
+# Startup event to load shared models once, off the request path
+@app.on_event("startup")
+async def warm_shared_models():
+    """Load the shared embedding and Whisper models before the first request needs them."""
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.run_in_executor(None, warm_embeddings)
+        logger.info("Embedding model warmed up")
+    except Exception as e:
+        logger.error(f"Error warming embedding model: {str(e)}")
+    vector_store.start()
+    try:
+        await loop.run_in_executor(None, whisper_pool.preload)
+    except Exception as e:
+        logger.error(f"Error preloading Whisper models: {str(e)}")
+    whisper_pool.start()
+    transcription_checkpoints.start()
+
+# Startup event to resume queued media jobs and start the job workers
+@app.on_event("startup")
+async def start_job_queue():
+    """Start the media job workers once the media_jobs table exists."""
+    try:
+        # Before any job pins a cached file
+        await asyncio.get_running_loop().run_in_executor(None, media_cache.reconcile)
+    except Exception as e:
+        logger.error(f"Error reconciling the media cache: {str(e)}")
+    try:
+        await job_queue.start()
+    except Exception as e:
+        logger.error(f"Error starting media job queue: {str(e)}")
+
+@app.on_event("shutdown")
+async def flush_shared_stores():
+    """Persist any vector store writes still pending."""
+    playlist_ingestor.stop()
+    await job_queue.close()
+    vector_store.close()
+    whisper_pool.close()
+    transcription_pool.close()
+    transcription_checkpoints.close()
+
 # Add direct fatwaask endpoint for backward compatibility
 @app.post("/fatwaask")
 async def fatwaask_endpoint(
@@ -154,6 +221,30 @@ async def root():
 async def health_check():
     return {"status": "healthy", "timestamp": datetime.utcnow().isoformat()}
 
+# Performance metrics endpoint
+@app.get("/metrics")
+async def metrics():
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        "embeddings": embedding_stats(),
+        "whisper_pool": whisper_pool.stats(),
+        "youtube_index": youtube_index.stats(),
+        "upload_index": upload_index.stats(),
+        "numpy_index": numpy_index.stats(),
+        "lexical_index": lexical_indexes.stats(),
+        "jobs": job_queue.stats(),
+        "audio_decode": audio_decoder.stats(),
+        "transcription_pool": transcription_pool.stats(),
+        "vad": speech_segmenter.stats(),
+        "transcription_checkpoints": transcription_checkpoints.stats(),
+        "memory": memory_budget.stats(),
+        "language_id": language_stats.stats(),
+        "youtube_download": download_stats.stats(),
+        "captions": caption_stats.stats(),
+        "media_cache": media_cache.stats(),
+        "playlist_ingestion": playlist_ingestor.stats(),
+    }
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -161,9 +252,11 @@ if __name__ == "__main__":
         host="localhost",
         port=8006, 
         reload=True,
-        timeout_keep_alive=1800,  # Increased to 30 minutes for longer videos
+        # Media ingestion runs as background jobs, so no request stays open
+        # for the length of a video any more
+        timeout_keep_alive=75,
         h11_max_incomplete_event_size=1024*1024*1024*2,  # 2GB
         workers=1,
-        limit_concurrency=10,
+        limit_concurrency=100,
         limit_max_requests=25000
     )
\ No newline at end of file
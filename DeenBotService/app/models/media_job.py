@@ -0,0 +1,23 @@
+from sqlalchemy import Column, String, Text, Integer, Float, DateTime, JSON, func
+from sqlalchemy.dialects.postgresql import UUID
+import uuid
+from app.database import Base
+
+class MediaJob(Base):
+    __tablename__ = "media_jobs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    kind = Column(String, nullable=False)  # "upload" ou "youtube"
+    status = Column(String, nullable=False, default="queued", index=True)  # queued, running, succeeded, failed
+    stage = Column(String, nullable=True)  # Étape en cours (download, transcribe, ...)
+    percent = Column(Float, nullable=False, default=0.0)
+    payload = Column(JSON, nullable=False)  # Paramètres nécessaires pour (re)lancer le job
+    result = Column(JSON, nullable=True)  # Réponse renvoyée au client une fois terminé
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    owner = Column(String, nullable=True)  # Processus (hôte:pid:id) qui exécute le job
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)  # Bail renouvelé tant que ce processus est vivant
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,10 @@
+from sqlalchemy import Column, String, DateTime, func
+from sqlalchemy.dialects.postgresql import UUID
+from app.database import Base
+
+class MediaJobKey(Base):
+    __tablename__ = "media_job_keys"
+
+    key = Column(String, primary_key=True)  # Clé de déduplication (ex. "youtube:<video_id>:<modèle>")
+    job_id = Column(UUID(as_uuid=True), nullable=False, index=True)  # Job en file ou en cours qui détient la clé
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
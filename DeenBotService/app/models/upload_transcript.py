@@ -0,0 +1,17 @@
+from sqlalchemy import Column, String, Text, Float, DateTime, func
+from sqlalchemy.dialects.postgresql import UUID
+import uuid
+from app.database import Base
+
+class UploadTranscript(Base):
+    __tablename__ = "upload_transcripts"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    duration = Column(Float, nullable=False, index=True)  # Durée de l'audio en secondes
+    fingerprint = Column(Text, nullable=False)  # Empreinte audio (hex, voir audio_fingerprint)
+    transcription_id = Column(String, nullable=False)  # Contexte vectorisé associé
+    model_size = Column(String, nullable=False)  # Modèle Whisper utilisé
+    pipeline_version = Column(String, nullable=False)  # Version du pipeline d'ingestion
+    title = Column(String, nullable=True)
+    filename = Column(String, nullable=True)  # Nom du premier fichier envoyé
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
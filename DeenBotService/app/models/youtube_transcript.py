@@ -0,0 +1,13 @@
+from sqlalchemy import Column, String, DateTime, func
+from app.database import Base
+
+class YouTubeTranscript(Base):
+    __tablename__ = "youtube_transcripts"
+
+    video_id = Column(String(32), primary_key=True)  # Identifiant YouTube (11 caractères)
+    transcription_id = Column(String, nullable=False)  # Contexte vectorisé associé
+    model_size = Column(String, nullable=False)  # Modèle Whisper utilisé
+    pipeline_version = Column(String, nullable=False)  # Version du pipeline d'ingestion
+    title = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,165 @@
+"""dedupe_transcriptions.py - Collapse duplicate transcriptions onto content ids.
+
+Before transcription ids were content-addressed, every re-processing of the
+same lecture minted a random ``trans_xxxxxxxx`` id, re-embedded the text and
+added duplicate vectors to ``media_transcripts``.  This migration:
+
+1. groups ``chroma_transcriptions/*.txt`` by normalised content hash;
+2. re-keys one member's vectors under the content id ``trans_<hash>`` and
+   writes ``chroma_transcriptions/trans_<hash>.txt``;
+3. points ``conversations.context_id`` of every member at the content id;
+4. deletes the other members' vectors, lexical indexes and transcript files.
+
+Run from the directory holding ``chroma_index`` / ``chroma_transcriptions``::
+
+    python -m app.scripts.dedupe_transcriptions --dry-run
+    python -m app.scripts.dedupe_transcriptions
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from typing import Dict, List
+
+from app.dependencies.ingestion import (
+    TRANSCRIPTIONS_DIR,
+    content_transcription_id,
+    transcription_path,
+)
+from app.dependencies.lexical_index import lexical_indexes
+from app.dependencies.vector_store import vector_store
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def group_transcriptions(directory: str = TRANSCRIPTIONS_DIR) -> Dict[str, List[str]]:
+    """Map content id -> existing transcription ids with that content."""
+    groups: Dict[str, List[str]] = defaultdict(list)
+    if not os.path.isdir(directory):
+        return groups
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".txt"):
+            continue
+        transcription_id = name[: -len(".txt")]
+        with open(os.path.join(directory, name), "r", encoding="utf-8") as f:
+            groups[content_transcription_id(f.read())].append(transcription_id)
+    return groups
+
+
+def rekey_vectors(collection, source_id: str, target_id: str) -> int:
+    """Copy ``source_id``'s vectors under ``target_id``; returns the count."""
+    result = collection.get(
+        where={"transcription_id": source_id},
+        include=["documents", "metadatas", "embeddings"],
+    )
+    ids = result.get("ids") or []
+    if not ids:
+        return 0
+    metadatas = []
+    new_ids = []
+    for position, metadata in enumerate(result["metadatas"]):
+        metadata = dict(metadata or {})
+        metadata["transcription_id"] = target_id
+        metadata.setdefault("chunk_index", position)
+        metadatas.append(metadata)
+        new_ids.append(f"{target_id}_{metadata['chunk_index']}")
+    collection.upsert(
+        ids=new_ids,
+        embeddings=result["embeddings"],
+        documents=result["documents"],
+        metadatas=metadatas,
+    )
+    return len(new_ids)
+
+
+async def repoint_conversations(mapping: Dict[str, str]) -> int:
+    """Update ``conversations.context_id`` from old ids to content ids."""
+    from sqlalchemy import update
+
+    from app.database import SessionLocal
+    from app.models.conversation import Conversation
+
+    updated = 0
+    async with SessionLocal() as db:
+        for old_id, new_id in mapping.items():
+            result = await db.execute(
+                update(Conversation)
+                .where(Conversation.context_id == old_id)
+                .values(context_id=new_id)
+            )
+            updated += result.rowcount or 0
+        await db.commit()
+    return updated
+
+
+def migrate(dry_run: bool = False, skip_db: bool = False) -> None:
+    groups = group_transcriptions()
+    mapping = {
+        old_id: content_id
+        for content_id, members in groups.items()
+        for old_id in members
+        if old_id != content_id
+    }
+    duplicates = sum(len(members) - 1 for members in groups.values())
+    logger.info(
+        f"Found {sum(len(m) for m in groups.values())} transcriptions, "
+        f"{len(groups)} distinct contents, {duplicates} duplicates"
+    )
+    if dry_run:
+        for content_id, members in groups.items():
+            if members != [content_id]:
+                logger.info(f"{content_id} <- {', '.join(members)}")
+        return
+
+    collection = vector_store.get_collection()
+
+    # 1. Make sure every content id has its transcript and vectors
+    for content_id, members in groups.items():
+        if content_id in members:
+            continue
+        source_id = members[0]
+        with open(transcription_path(source_id), "r", encoding="utf-8") as f:
+            text = f.read()
+        with open(transcription_path(content_id), "w", encoding="utf-8") as f:
+            f.write(text)
+        copied = rekey_vectors(collection, source_id, content_id)
+        logger.info(f"Re-keyed {copied} vectors from {source_id} to {content_id}")
+
+    # 2. Point conversations at the content ids before anything is removed
+    if not skip_db:
+        updated = asyncio.run(repoint_conversations(mapping))
+        logger.info(f"Updated context_id of {updated} conversations")
+
+    # 3. Drop the now-redundant vectors and transcript files
+    for old_id in mapping:
+        collection.delete(where={"transcription_id": old_id})
+        lexical_indexes.delete(old_id)
+        try:
+            os.remove(transcription_path(old_id))
+        except FileNotFoundError:
+            pass
+        logger.info(f"Removed duplicate transcription {old_id} -> {mapping[old_id]}")
+
+    vector_store.mark_dirty(len(mapping))
+    vector_store.flush()
+    logger.info("Transcription deduplication complete")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dry-run", action="store_true", help="Only report the groups")
+    parser.add_argument(
+        "--skip-db",
+        action="store_true",
+        help="Do not update conversations.context_id (old ids will stop resolving)",
+    )
+    args = parser.parse_args()
+    migrate(dry_run=args.dry_run, skip_db=args.skip_db)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""ingest_playlists.py - Start and follow the bulk ingestion of the Hasaniya playlists.
+
+Media jobs run inside the API server (its job queue owns the workers and the
+memory budget), so this command does not process anything itself: it asks
+the running server to ingest every playlist video that is not indexed yet
+(``POST /api/v1/media/ingest-playlists``) and reports the progress until the
+run completes.  Interrupting the command leaves the run going; ``--stop``
+stops it.  The endpoint is for admins: the command signs in with
+``--email`` (default ``INGEST_ADMIN_EMAIL``) and ``INGEST_ADMIN_PASSWORD``,
+prompting for the password when it is not set.
+
+Run from ``DeenBotService`` while the server is up::
+
+    python -m app.scripts.ingest_playlists --dry-run
+    python -m app.scripts.ingest_playlists
+    python -m app.scripts.ingest_playlists --stop
+"""
+from __future__ import annotations
+
+import argparse
+import getpass
+import logging
+import os
+import time
+
+import httpx
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_SERVER = "http://localhost:8006"
+ENDPOINT = "/api/v1/media/ingest-playlists"
+LOGIN_ENDPOINT = "/api/v1/auth/login"
+
+
+def describe(status: dict) -> str:
+    return (
+        f"{status.get('succeeded', 0)} ingested, {status.get('failed', 0)} failed, "
+        f"{status.get('pending', 0)} pending, {len(status.get('in_flight') or {})} in flight, "
+        f"{status.get('skipped', 0)} already indexed"
+        + (f" (waiting: {status['waiting']})" if status.get("waiting") else "")
+    )
+
+
+def sign_in(client: httpx.Client, email: str) -> None:
+    """Log in as an admin; the client keeps the access token cookie for the next calls."""
+    password = os.getenv("INGEST_ADMIN_PASSWORD") or getpass.getpass(f"Password for {email}: ")
+    client.post(LOGIN_ENDPOINT, json={"email": email, "password": password}).raise_for_status()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--server", default=DEFAULT_SERVER, help=f"API base URL (default: {DEFAULT_SERVER})")
+    parser.add_argument("--playlist", action="append", dest="playlist_ids",
+                        help="Playlist id to ingest (repeatable; default: all Hasaniya playlists)")
+    parser.add_argument("--dry-run", action="store_true", help="Only list the videos to ingest")
+    parser.add_argument("--stop", action="store_true", help="Stop the running ingestion")
+    parser.add_argument("--no-follow", action="store_true", help="Return once the run is started")
+    parser.add_argument("--interval", type=float, default=60.0, help="Seconds between progress reports")
+    parser.add_argument("--email", default=os.getenv("INGEST_ADMIN_EMAIL"),
+                        help="Admin account to sign in with (default: INGEST_ADMIN_EMAIL)")
+    args = parser.parse_args()
+    if not args.email:
+        parser.error("an admin account is required: pass --email or set INGEST_ADMIN_EMAIL")
+
+    with httpx.Client(base_url=args.server, timeout=600) as client:
+        sign_in(client, args.email)
+        if args.stop:
+            status = client.delete(ENDPOINT).raise_for_status().json()
+            logger.info(f"Stopped: {status['stopped']}; {describe(status)}")
+            return
+
+        status = client.post(
+            ENDPOINT, json={"playlist_ids": args.playlist_ids, "dry_run": args.dry_run}
+        ).raise_for_status().json()
+        if args.dry_run:
+            logger.info(f"{status['total']} playlist videos, {status['skipped']} already indexed")
+            for video_id in status["video_ids"]:
+                print(video_id)
+            return
+        if not status["started"]:
+            logger.info("An ingestion is already running; following it")
+        logger.info(f"Ingesting {status['total']} videos: {describe(status)}")
+
+        while status["running"] and not args.no_follow:
+            time.sleep(args.interval)
+            status = client.get(ENDPOINT).raise_for_status().json()
+            logger.info(describe(status))
+
+
+if __name__ == "__main__":
+    main()
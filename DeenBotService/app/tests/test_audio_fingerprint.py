@@ -0,0 +1,53 @@
+import unittest
+import os
+import sys
+
+import numpy as np
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from dependencies.audio_fingerprint import (
+    AUDIO_FINGERPRINT_MAX_BER,
+    FINGERPRINT_RATE,
+    AudioFingerprint,
+    bit_error_rate,
+    fingerprint_bits,
+    sample_starts,
+)
+
+def _speech_like(seconds, seed):
+    # Harmonic "voice" with a gliding pitch, switched on and off in 200 ms syllables
+    rng = np.random.default_rng(seed)
+    n = int(seconds * FINGERPRINT_RATE)
+    syllables = int(seconds * 5)
+    envelope = np.repeat(rng.random(syllables) * (rng.random(syllables) > 0.4), n // syllables + 1)[:n]
+    pitch = 120 + 40 * np.sin(2 * np.pi * 0.3 * np.arange(n) / FINGERPRINT_RATE + seed)
+    phase = 2 * np.pi * np.cumsum(pitch) / FINGERPRINT_RATE
+    voice = sum(rng.random() / k * np.sin(k * phase) for k in range(1, 20))
+    return (0.3 * voice * envelope + 0.003 * rng.standard_normal(n)).astype(np.float32)
+
+class TestAudioFingerprint(unittest.TestCase):
+
+    def test_reencoded_copy_matches_and_other_audio_does_not(self):
+        original = _speech_like(20, seed=1)
+        # Quieter, slightly noisy and delayed by 25 ms, as after a re-encode
+        rng = np.random.default_rng(7)
+        copy = 0.5 * np.roll(original, int(0.025 * FINGERPRINT_RATE))
+        copy = (copy + 0.002 * rng.standard_normal(len(copy))).astype(np.float32)
+
+        bits = fingerprint_bits(original)
+        self.assertLess(bit_error_rate(bits, fingerprint_bits(copy)), AUDIO_FINGERPRINT_MAX_BER)
+        self.assertGreater(bit_error_rate(bits, fingerprint_bits(_speech_like(20, seed=2))), 0.4)
+
+    def test_hex_round_trip(self):
+        fingerprint = AudioFingerprint(20.0, fingerprint_bits(_speech_like(5, seed=3)))
+        restored = AudioFingerprint.from_hex(20.0, fingerprint.hex)
+        self.assertTrue(np.array_equal(restored.bits, fingerprint.bits))
+
+    def test_sample_starts(self):
+        self.assertEqual(sample_starts(45, seconds=20), [0.0])
+        self.assertEqual(sample_starts(3600, seconds=20), [350.0, 1790.0, 3230.0])
+
+if __name__ == '__main__':
+    unittest.main()
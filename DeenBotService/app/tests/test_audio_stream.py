@@ -0,0 +1,56 @@
+import unittest
+import os
+import sys
+import threading
+
+import numpy as np
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from dependencies.audio_stream import PCMRingBuffer
+
+class TestPCMRingBuffer(unittest.TestCase):
+
+    def test_reads_back_samples_in_order_across_wraparound(self):
+        ring = PCMRingBuffer(8)
+        ring.write(np.arange(6, dtype=np.int16))
+        np.testing.assert_array_equal(ring.read(4), [0, 1, 2, 3])
+        ring.write(np.arange(6, 12, dtype=np.int16))
+        ring.close()
+        np.testing.assert_array_equal(ring.read(10), [4, 5, 6, 7, 8, 9, 10, 11])
+        self.assertEqual(len(ring.read(4)), 0)
+
+    def test_writer_blocks_until_reader_makes_room(self):
+        """A producer larger than the buffer never holds more than capacity."""
+        ring = PCMRingBuffer(16)
+        samples = np.arange(100, dtype=np.int16)
+
+        def produce():
+            ring.write(samples)
+            ring.close()
+
+        producer = threading.Thread(target=produce)
+        producer.start()
+        received = []
+        while True:
+            window = ring.read(10)
+            if not len(window):
+                break
+            received.append(window)
+        producer.join(timeout=5)
+
+        np.testing.assert_array_equal(np.concatenate(received), samples)
+        self.assertLessEqual(ring.high_water, 16)
+
+    def test_cancel_unblocks_writer(self):
+        ring = PCMRingBuffer(4)
+        result = []
+        producer = threading.Thread(target=lambda: result.append(ring.write(np.zeros(10, dtype=np.int16))))
+        producer.start()
+        ring.cancel()
+        producer.join(timeout=5)
+        self.assertEqual(result, [False])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+import io
+import os
+import sys
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from dependencies.captions import (
+    CaptionSegment,
+    assess_captions,
+    caption_chunks,
+    parse_captions,
+    select_caption_track,
+)
+
+AUTO_VTT = """WEBVTT
+Kind: captions
+Language: ar
+
+00:00:00.000 --> 00:00:02.350 align:start position:0%
+ 
+بسم<00:00:00.560><c> الله</c><00:00:01.000><c> الرحمن</c>
+
+00:00:02.350 --> 00:00:02.360 align:start position:0%
+بسم الله الرحمن
+ 
+
+00:00:02.360 --> 00:00:05.000 align:start position:0%
+بسم الله الرحمن
+الرحيم<00:00:03.000><c> الحمد</c><00:00:03.500><c> لله</c>
+"""
+
+SRV3 = """<?xml version="1.0" encoding="utf-8" ?><timedtext format="3"><body>
+<p t="0" d="2500">بسم الله</p><p t="2500" d="1500">الحمد &amp; لله</p>
+</body></timedtext>"""
+
+class TestCaptions(unittest.TestCase):
+
+    def test_vtt_rollup_repeats_are_dropped(self):
+        stream = io.BytesIO(AUTO_VTT.encode("utf-8"))
+        segments = list(parse_captions(stream, "vtt"))
+        self.assertEqual([s.text for s in segments], ["بسم الله الرحمن", "الرحيم الحمد لله"])
+        self.assertEqual((segments[1].start, segments[1].end), (2.36, 5.0))
+
+    def test_srv3(self):
+        segments = list(parse_captions(io.BytesIO(SRV3.encode("utf-8")), "srv3"))
+        self.assertEqual([(s.start, s.end, s.text) for s in segments],
+                         [(0.0, 2.5, "بسم الله"), (2.5, 4.0, "الحمد & لله")])
+
+    def test_quality_gate(self):
+        words = "قال النبي صلى الله عليه وسلم إنما الأعمال بالنيات"
+        good = [CaptionSegment(i * 5.0, i * 5.0 + 5, f"{words} {i}") for i in range(120)]
+        self.assertTrue(assess_captions(good, 600, automatic=True, language="ar").accepted)
+        sparse = good[:30]
+        self.assertEqual(assess_captions(sparse, 600, automatic=True, language="ar").reason, "coverage")
+        music = [CaptionSegment(i * 5.0, i * 5.0 + 5, "[موسيقى]") for i in range(120)]
+        self.assertFalse(assess_captions(music, 600, automatic=True, language="ar").accepted)
+        # Uploaded subtitles only need partial coverage
+        self.assertTrue(assess_captions(good[:60], 600, automatic=False, language="ar").accepted)
+
+    def test_track_selection_skips_translations(self):
+        info = {
+            "subtitles": {},
+            "automatic_captions": {
+                "ar": [{"ext": "vtt", "url": "https://x/api/timedtext?lang=en&tlang=ar"}],
+                "ar-orig": [{"ext": "srv3", "url": "https://x/a3"}, {"ext": "vtt", "url": "https://x/av"}],
+            },
+        }
+        track = select_caption_track(info, ["ar"])
+        self.assertEqual((track["url"], track["language"], track["automatic"]), ("https://x/av", "ar", True))
+        self.assertIsNone(select_caption_track(info, ["ar"], allow_automatic=False))
+
+    def test_chunks(self):
+        segments = [CaptionSegment(i * 60.0, i * 60.0 + 60, f"s{i}") for i in range(9)]
+        chunks = list(caption_chunks(segments, "ar", chunk_seconds=240))
+        self.assertEqual([c["text"] for c in chunks], ["s0 s1 s2 s3", "s4 s5 s6 s7", "s8"])
+        self.assertEqual(chunks[1]["metadata"]["end_time"], 480.0)
+
+if __name__ == '__main__':
+    unittest.main()
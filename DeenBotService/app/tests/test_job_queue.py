@@ -0,0 +1,188 @@
+import asyncio
+import unittest
+import os
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import delete, update
+
+from app.database import Base, SessionLocal, engine
+from app.models.media_job import MediaJob
+from app.models.media_job_key import MediaJobKey
+from dependencies.job_queue import JOB_FAILED, JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED, JobQueue
+
+
+class JobQueueTestCase(unittest.IsolatedAsyncioTestCase):
+    """Runs against the application's PostgreSQL database; skipped when it is unreachable.
+
+    Every test uses its own job kind and keys and deletes its rows afterwards.
+    """
+
+    async def asyncSetUp(self):
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+        except Exception as e:
+            await engine.dispose()
+            self.skipTest(f"PostgreSQL is not reachable: {e}")
+        self.kind = f"test-{uuid.uuid4().hex[:8]}"
+        self.runs = []
+
+    async def asyncTearDown(self):
+        async with SessionLocal() as db:
+            await db.execute(delete(MediaJobKey).where(MediaJobKey.key.like(f"{self.kind}:%")))
+            await db.execute(delete(MediaJob).where(MediaJob.kind == self.kind))
+            await db.commit()
+        # Pooled connections belong to this test's event loop
+        await engine.dispose()
+
+    def make_queue(self, **kwargs):
+        queue = JobQueue(workers=1, **kwargs)
+
+        async def handler(ctx, payload):
+            self.runs.append(queue.owner)
+            await asyncio.sleep(0.1)
+            return {"success": True}
+
+        queue.register(self.kind, handler)
+        return queue
+
+    async def get_job(self, job_id):
+        async with SessionLocal() as db:
+            return await db.get(MediaJob, uuid.UUID(job_id))
+
+    async def get_key_holder(self, key):
+        async with SessionLocal() as db:
+            holder = await db.get(MediaJobKey, key)
+            return str(holder.job_id) if holder else None
+
+    async def set_job(self, job_id, **values):
+        async with SessionLocal() as db:
+            await db.execute(update(MediaJob).where(MediaJob.id == uuid.UUID(job_id)).values(**values))
+            await db.commit()
+
+
+class TestSubmitOnce(JobQueueTestCase):
+
+    async def test_second_submit_attaches_to_the_job(self):
+        queue = self.make_queue()
+        key = f"{self.kind}:video"
+        first, attached_first = await queue.submit_once(self.kind, {"n": 1}, key)
+        second, attached_second = await queue.submit_once(self.kind, {"n": 2}, key)
+        self.assertFalse(attached_first)
+        self.assertTrue(attached_second)
+        self.assertEqual(second, first)
+        self.assertEqual((queue.submitted, queue.coalesced), (1, 1))
+        self.assertEqual(await self.get_key_holder(key), first)
+
+    async def test_concurrent_submits_share_one_job(self):
+        queue = self.make_queue()
+        key = f"{self.kind}:video"
+        results = await asyncio.gather(*(queue.submit_once(self.kind, {}, key) for _ in range(5)))
+        self.assertEqual(len({job_id for job_id, _ in results}), 1)
+        self.assertEqual([attached for _, attached in results].count(False), 1)
+
+    async def test_finished_job_releases_its_key(self):
+        queue = self.make_queue()
+        key = f"{self.kind}:video"
+        first, _ = await queue.submit_once(self.kind, {}, key)
+        await queue._run(first)
+        self.assertEqual((await self.get_job(first)).status, JOB_SUCCEEDED)
+        self.assertIsNone(await self.get_key_holder(key))
+
+        second, attached = await queue.submit_once(self.kind, {}, key)
+        self.assertFalse(attached)
+        self.assertNotEqual(second, first)
+
+    async def test_stale_key_is_taken_over(self):
+        queue = self.make_queue()
+        key = f"{self.kind}:video"
+        first, _ = await queue.submit_once(self.kind, {}, key)
+        # The job ended without releasing its key (e.g. failed by hand)
+        await self.set_job(first, status=JOB_FAILED)
+
+        second, attached = await queue.submit_once(self.kind, {}, key)
+        self.assertFalse(attached)
+        self.assertNotEqual(second, first)
+        self.assertEqual(await self.get_key_holder(key), second)
+
+    async def test_submit_without_key_bypasses_the_job_in_flight(self):
+        # force_refresh submits without a key
+        queue = self.make_queue()
+        key = f"{self.kind}:video"
+        first, _ = await queue.submit_once(self.kind, {}, key)
+        refresh, attached = await queue.submit_once(self.kind, {"force_refresh": True}, None)
+        self.assertFalse(attached)
+        self.assertNotEqual(refresh, first)
+        # Later submitters still attach to the keyed job
+        self.assertEqual(await queue.submit_once(self.kind, {}, key), (first, True))
+
+
+class TestClaimAndLease(JobQueueTestCase):
+
+    async def test_only_one_process_claims_a_job(self):
+        first, second = self.make_queue(), self.make_queue()
+        job_id = await first.submit(self.kind, {})
+        await asyncio.gather(first._run(job_id), second._run(job_id))
+        self.assertEqual(len(self.runs), 1)
+        job = await self.get_job(job_id)
+        self.assertEqual((job.status, job.attempts, job.owner), (JOB_SUCCEEDED, 1, None))
+
+    async def test_running_job_renews_its_lease(self):
+        queue = self.make_queue(lease_seconds=60)
+        job_id = await queue.submit(self.kind, {})
+        soon = datetime.now(timezone.utc) + timedelta(seconds=1)
+        await self.set_job(job_id, status=JOB_RUNNING, owner=queue.owner, lease_expires_at=soon)
+
+        await queue._renew_leases()
+        job = await self.get_job(job_id)
+        self.assertGreater(job.lease_expires_at, datetime.now(timezone.utc) + timedelta(seconds=50))
+        # Another process leaves a job with a live lease alone
+        self.assertNotIn(job_id, await self.make_queue()._recover())
+        self.assertEqual((await self.get_job(job_id)).status, JOB_RUNNING)
+
+    async def test_expired_lease_is_recovered(self):
+        queue = self.make_queue()
+        job_id = await queue.submit(self.kind, {})
+        past = datetime.now(timezone.utc) - timedelta(seconds=5)
+        await self.set_job(job_id, status=JOB_RUNNING, owner="dead-host:1:x", lease_expires_at=past, attempts=1)
+
+        self.assertIn(job_id, await queue._recover())
+        job = await self.get_job(job_id)
+        self.assertEqual((job.status, job.owner), (JOB_QUEUED, None))
+        self.assertGreaterEqual(queue.recovered, 1)
+
+        # Any live process then runs it
+        await queue._run(job_id)
+        self.assertEqual((await self.get_job(job_id)).status, JOB_SUCCEEDED)
+
+    async def test_process_that_lost_its_lease_drops_its_outcome(self):
+        stalled, other = self.make_queue(), self.make_queue()
+        job_id = await stalled.submit(self.kind, {})
+        past = datetime.now(timezone.utc) - timedelta(seconds=5)
+        await self.set_job(job_id, status=JOB_RUNNING, owner=stalled.owner, lease_expires_at=past, attempts=1)
+        await other._recover()
+        await other._run(job_id)
+
+        self.assertFalse(await stalled._finish(job_id, status=JOB_FAILED, error="late"))
+        self.assertEqual(stalled.lost_leases, 1)
+        self.assertEqual((await self.get_job(job_id)).status, JOB_SUCCEEDED)
+
+    async def test_gives_up_after_max_attempts(self):
+        queue = self.make_queue(max_attempts=2)
+        key = f"{self.kind}:video"
+        job_id, _ = await queue.submit_once(self.kind, {}, key)
+        past = datetime.now(timezone.utc) - timedelta(seconds=5)
+        await self.set_job(job_id, status=JOB_RUNNING, owner="dead-host:1:x", lease_expires_at=past, attempts=2)
+
+        self.assertNotIn(job_id, await queue._recover())
+        self.assertEqual((await self.get_job(job_id)).status, JOB_FAILED)
+        self.assertIsNone(await self.get_key_holder(key))
+
+
+if __name__ == '__main__':
+    unittest.main()
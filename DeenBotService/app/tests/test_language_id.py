@@ -0,0 +1,30 @@
+import unittest
+import os
+import sys
+
+import numpy as np
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from dependencies.language_id import choose_language, prefix_samples
+
+class TestLanguageId(unittest.TestCase):
+
+    def test_restricted_to_candidates(self):
+        probabilities = {"ar": 0.3, "fr": 0.5, "fa": 0.2}
+        language, probability = choose_language(probabilities, ["ar", "fr"], "ar", 0.5)
+        self.assertEqual(language, "fr")
+        self.assertAlmostEqual(probability, 0.5 / 0.8)
+
+    def test_falls_back_to_default_when_unsure(self):
+        probabilities = {"ar": 0.2, "fr": 0.25, "en": 0.2}
+        self.assertEqual(choose_language(probabilities, ["ar", "fr", "en"], "ar", 0.5)[0], "ar")
+        self.assertEqual(choose_language({}, ["ar", "fr"], "ar", 0.5), ("ar", 0.0))
+
+    def test_prefix_of_samples(self):
+        samples = np.ones(16000 * 60, dtype=np.float32)
+        self.assertEqual(len(prefix_samples(samples, 15)), 16000 * 15)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+import os
+import sys
+import threading
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from dependencies.lexical_index import BM25Index, bm25_rank, tokenize
+
+class TestLexicalIndex(unittest.TestCase):
+
+    def test_tokenize_folds_arabic_variants(self):
+        """Diacritics, letter variants and the article do not prevent a match."""
+        self.assertEqual(tokenize("الصَّلاةُ"), tokenize("صلاه"))
+        self.assertEqual(tokenize("إيمان"), tokenize("ايمان"))
+        self.assertNotIn("في", tokenize("الصلاة في السفر"))
+
+    def test_search_ranks_matching_chunks_first(self):
+        index = BM25Index("trans_test")
+        index.add_many(enumerate([
+            "الزكاة واجبة على من ملك النصاب",
+            "قصر الصلاة في السفر سنة",
+            "صيام رمضان ركن من أركان الإسلام",
+        ]))
+
+        results = index.search("ما حكم قصر الصلاة في السفر؟", k=2)
+
+        self.assertEqual(results[0][0], 1)
+        self.assertTrue(all(score > 0 for _, score in results))
+
+    def test_search_respects_chunk_filter_and_replacement(self):
+        index = BM25Index("trans_test")
+        index.add(0, "الوضوء قبل الصلاة")
+        index.add(1, "الوضوء شرط لصحة الصلاة")
+        index.add(1, "الحج مرة في العمر")
+
+        self.assertEqual([i for i, _ in index.search("الوضوء", k=5)], [0])
+        self.assertEqual(index.search("الوضوء", k=5, chunk_indices=[1]), [])
+
+    def test_round_trip_through_dict(self):
+        index = BM25Index("trans_test")
+        index.add_many(enumerate(["first lecture on patience", "second on gratitude"]))
+
+        restored = BM25Index.from_dict(index.to_dict())
+
+        self.assertEqual(restored.search("gratitude"), index.search("gratitude"))
+
+    def test_search_while_a_stream_extends_the_index(self):
+        """Queries during streamed ingestion never see a half-applied batch."""
+        index = BM25Index("trans_test")
+        errors = []
+
+        def ingest():
+            for batch in range(200):
+                index.add_many(
+                    (batch * 4 + i, f"lecture {batch} term{batch}_{i} patience")
+                    for i in range(4)
+                )
+
+        writer = threading.Thread(target=ingest)
+        writer.start()
+        try:
+            while writer.is_alive():
+                # Every chunk mentions patience: a torn index would miss some
+                found = index.search("patience", k=10_000)
+                if len(found) % 4:
+                    errors.append(len(found))
+        except RuntimeError as e:
+            errors.append(e)
+        writer.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(index.search("patience", k=10_000)), 800)
+
+    def test_bm25_rank_returns_every_position(self):
+        ranked = bm25_rank("gratitude", ["patience", "gratitude", "prayer"])
+
+        self.assertEqual(ranked[0][1], 1)
+        self.assertEqual(sorted(position for _, position in ranked), [0, 1, 2])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+import os
+import sys
+import tempfile
+import time
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from dependencies.media_cache import MediaCache, upload_key, youtube_key
+
+class TestMediaCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        # 1 MB budget
+        self.cache = MediaCache(os.path.join(self.tmp.name, "cache"), max_mb=1)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def stage(self, size, suffix=".webm"):
+        path = self.cache.staging_path(suffix=suffix)
+        with open(path, "wb") as f:
+            f.write(b"\0" * size)
+        return path
+
+    def test_same_upload_is_stored_once(self):
+        key = upload_key("a" * 64)
+        first = self.cache.commit(self.stage(1000, ".mp3"), key)
+        second = self.cache.commit(self.stage(1000, ".mp3"), key)
+        self.assertEqual(first, second)
+        self.assertEqual(os.listdir(self.cache.staging_dir), [])
+        self.assertEqual(self.cache.get(key), first)
+        self.assertIsNone(self.cache.get(youtube_key("dQw4w9WgXcQ")))
+
+    def test_evicts_least_recently_used_unpinned(self):
+        old, used, pinned = (youtube_key(f"video{n:06d}") for n in range(3))
+        self.cache.commit(self.stage(400_000), old)
+        self.cache.commit(self.stage(400_000), used)
+        self.cache.commit(self.stage(400_000), pinned, pin=True)
+        # The oldest file went when the third one pushed past the budget
+        self.assertIsNone(self.cache.get(old))
+        self.cache.get(used)
+        self.cache.make_room(400_000)
+        # Nothing else fits, but the pinned file stays
+        self.assertIsNone(self.cache.get(used))
+        self.assertIsNotNone(self.cache.get(pinned))
+        self.cache.unpin(pinned)
+        self.cache.make_room(1024 * 1024)
+        self.assertEqual(self.cache.stats()["files"], 0)
+
+    def test_reconcile_removes_orphans(self):
+        key = youtube_key("dQw4w9WgXcQ")
+        self.cache.commit(self.stage(1000), key)
+        self.stage(1000)  # interrupted download
+        stray = os.path.join(self.cache.objects_dir, "notes.txt")
+        with open(stray, "w") as f:
+            f.write("x")
+
+        # (no leftover of the old temp directories is that old)
+        restarted = MediaCache(self.cache.root, max_mb=1, orphan_hours=1e6)
+        restarted.reconcile(now=time.time())
+        self.assertEqual(os.listdir(restarted.staging_dir), [])
+        self.assertFalse(os.path.exists(stray))
+        self.assertIsNotNone(restarted.get(key))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,174 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+import os
+import sys
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from dependencies.memory_budget import JobTooLarge, MemoryBudget
+from dependencies.transcription_pool import WORKER_OVERHEAD_MB
+from dependencies.whisper_pool import MODEL_MEMORY_MB
+
+
+class FakeTranscriptionPool:
+    """No worker pool for any model, unless ``resident`` says one is running."""
+
+    def __init__(self):
+        self.resident = {}
+
+    def enabled_for(self, model_size):
+        return False
+
+    def is_running(self, model_size):
+        return model_size in self.resident
+
+    def worker_count(self, model_size):
+        return 2
+
+    def resident_mb(self):
+        return dict(self.resident)
+
+
+class FakeWhisperPool:
+    def is_loaded(self, model_size):
+        return False
+
+
+class TestMemoryBudget(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.pool = FakeTranscriptionPool()
+        for target, value in (
+            ('dependencies.memory_budget.transcription_pool', self.pool),
+            ('dependencies.memory_budget.whisper_pool', FakeWhisperPool()),
+            ('dependencies.memory_budget.available_memory_mb', lambda: None),
+            ('dependencies.memory_budget.tree_rss_mb', lambda: None),
+        ):
+            patcher = patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.budget = MemoryBudget(job_mb=500, node_mb=1000)
+
+    async def admitted(self, task):
+        """Whether ``task`` gets admitted without anything being released."""
+        await asyncio.sleep(0.01)
+        return task.done()
+
+    async def test_admits_jobs_that_fit_and_delays_the_rest(self):
+        await self.budget.acquire("a")
+        await self.budget.acquire("b")
+        self.assertEqual(self.budget.reserved_mb(), 1000)
+
+        c = asyncio.create_task(self.budget.acquire("c"))
+        self.assertFalse(await self.admitted(c))
+        self.assertEqual(self.budget.stats()["waiting"], 1)
+
+        await self.budget.release("a")
+        await asyncio.wait_for(c, 1)
+        stats = self.budget.stats()
+        self.assertEqual(set(stats["running"]), {"b", "c"})
+        self.assertEqual((stats["admitted"], stats["delayed"], stats["waiting"]), (3, 1, 0))
+
+    async def test_waiting_jobs_are_admitted_in_order(self):
+        await self.budget.acquire("a")
+        await self.budget.acquire("b")
+        admitted = []
+
+        async def acquire(job_id):
+            await self.budget.acquire(job_id)
+            admitted.append(job_id)
+
+        c = asyncio.create_task(acquire("c"))
+        await asyncio.sleep(0.01)
+        d = asyncio.create_task(acquire("d"))
+        await asyncio.sleep(0.01)
+
+        await self.budget.release("a")
+        await asyncio.wait_for(c, 1)
+        self.assertFalse(await self.admitted(d))
+        self.assertEqual(admitted, ["c"])
+
+        await self.budget.release("b")
+        await asyncio.wait_for(d, 1)
+        self.assertEqual(admitted, ["c", "d"])
+
+    async def test_refuses_a_job_larger_than_the_node(self):
+        with self.assertRaises(JobTooLarge):
+            await self.budget.acquire("huge", 1500)
+        self.assertEqual(self.budget.stats()["refused"], 1)
+        self.assertEqual(self.budget.reserved_mb(), 0)
+
+    async def test_a_job_may_always_run_alone(self):
+        # The standing reservation of a pool does not block the only job
+        self.pool.resident = {"small": 900}
+        await asyncio.wait_for(self.budget.acquire("a"), 1)
+
+    async def test_resident_pool_holds_a_standing_reservation(self):
+        self.pool.resident = {"base": 400}
+        await self.budget.acquire("a")
+        self.assertEqual(self.budget.pools_mb(), 400)
+        self.assertEqual(self.budget.reserved_mb(), 900)
+
+        b = asyncio.create_task(self.budget.acquire("b"))
+        self.assertFalse(await self.admitted(b))
+
+        # Shutting the pool down lets the next job in
+        self.pool.resident = {}
+        await asyncio.wait_for(b, 10)
+        self.assertEqual(self.budget.reserved_mb(), 1000)
+
+    async def test_job_that_started_the_pool_covers_it(self):
+        self.budget.node_mb = 5000
+        self.pool.enabled_for = lambda model_size: True
+        await self.budget.acquire("a", whisper_model="base")
+        self.assertEqual(self.budget.jobs_mb(), 500 + 2 * (MODEL_MEMORY_MB["base"] + WORKER_OVERHEAD_MB))
+        # The pool the job started is charged once, to the job
+        self.pool.resident = {"base": 600}
+        self.assertEqual(self.budget.pools_mb(), 0)
+        await self.budget.release("a")
+        self.assertEqual(self.budget.pools_mb(), 600)
+
+    async def test_grow_reserves_whisper_only_when_asked(self):
+        self.budget.node_mb = 2000
+        await self.budget.acquire("a")
+        self.assertEqual(self.budget.jobs_mb(), 500)
+
+        await self.budget.grow("a", whisper_model="base")
+        self.assertEqual(self.budget.jobs_mb(), 500 + MODEL_MEMORY_MB["base"])
+
+    async def test_grow_waits_for_memory(self):
+        await self.budget.acquire("a")
+        await self.budget.acquire("b")
+        grow = asyncio.create_task(self.budget.grow("a", whisper_model="base"))
+        self.assertFalse(await self.admitted(grow))
+
+        await self.budget.release("b")
+        await asyncio.wait_for(grow, 1)
+        self.assertEqual(self.budget.jobs_mb(), 500 + MODEL_MEMORY_MB["base"])
+
+    async def test_jobs_growing_together_do_not_deadlock(self):
+        await self.budget.acquire("a")
+        await self.budget.acquire("b")
+        grow_a = asyncio.create_task(self.budget.grow("a", whisper_model="base"))
+        await asyncio.sleep(0.01)
+        grow_b = asyncio.create_task(self.budget.grow("b", whisper_model="base"))
+        # Neither would release memory while waiting: the last one goes on
+        await asyncio.wait_for(grow_b, 1)
+        self.assertFalse(await self.admitted(grow_a))
+        self.assertEqual(self.budget.jobs_mb(), 500 + 500 + MODEL_MEMORY_MB["base"])
+
+        await self.budget.release("b")
+        await asyncio.wait_for(grow_a, 1)
+        self.assertEqual(self.budget.jobs_mb(), 500 + MODEL_MEMORY_MB["base"])
+
+    async def test_grow_refuses_a_model_larger_than_the_node(self):
+        await self.budget.acquire("a")
+        with self.assertRaises(JobTooLarge):
+            await self.budget.grow("a", whisper_model="large")
+        self.assertEqual(self.budget.jobs_mb(), 500)
+
+
+if __name__ == '__main__':
+    unittest.main()
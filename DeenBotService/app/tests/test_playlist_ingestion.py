@@ -0,0 +1,140 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+import os
+import sys
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from dependencies.playlist_ingestion import PlaylistIngestor, in_window, parse_hours
+
+
+class FakeJobQueue:
+    """Job queue stub: jobs stay running until the test finishes them."""
+
+    def __init__(self):
+        self.queued = 0
+        self.jobs = {}
+        self.submitted = []
+        self.max_running = 0
+
+    async def submit_once(self, kind, payload, dedup_key):
+        job_id = f"job-{len(self.submitted)}"
+        self.submitted.append((kind, payload["video_id"], dedup_key))
+        self.jobs[job_id] = "running"
+        self.max_running = max(self.max_running, list(self.jobs.values()).count("running"))
+        return job_id, False
+
+    async def get_status(self, job_id):
+        return {"status": self.jobs[job_id], "error": None}
+
+    def stats(self):
+        return {"queued": self.queued}
+
+    def finish_all(self, state="succeeded"):
+        for job_id, status in self.jobs.items():
+            if status == "running":
+                self.jobs[job_id] = state
+
+
+def bulk_jobs(count):
+    return [(f"v{i}", f"key-{i}", {"video_id": f"v{i}"}) for i in range(count)]
+
+
+class TestBulkHours(unittest.TestCase):
+
+    def test_parse_hours(self):
+        self.assertEqual(parse_hours("1-7"), (1, 7))
+        self.assertEqual(parse_hours(" 22-6 "), (22, 6))
+        self.assertEqual(parse_hours("24-5"), (0, 5))
+        self.assertIsNone(parse_hours(""))
+        self.assertIsNone(parse_hours("  "))
+        self.assertIsNone(parse_hours(None))
+
+    def test_in_window(self):
+        self.assertTrue(in_window(1, (1, 7)))
+        self.assertTrue(in_window(6, (1, 7)))
+        self.assertFalse(in_window(7, (1, 7)))
+        self.assertFalse(in_window(0, (1, 7)))
+        # Wraps past midnight
+        self.assertTrue(in_window(23, (22, 6)))
+        self.assertTrue(in_window(0, (22, 6)))
+        self.assertTrue(in_window(5, (22, 6)))
+        self.assertFalse(in_window(6, (22, 6)))
+        self.assertFalse(in_window(12, (22, 6)))
+        # start == end and no window: any hour
+        for hour in (0, 3, 23):
+            self.assertTrue(in_window(hour, (3, 3)))
+            self.assertTrue(in_window(hour, parse_hours("")))
+
+
+class TestPlaylistIngestor(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.queue = FakeJobQueue()
+        patcher = patch('dependencies.playlist_ingestion.job_queue', self.queue)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def wait_for(self, predicate, timeout=2.0):
+        deadline = asyncio.get_running_loop().time() + timeout
+        while not predicate():
+            if asyncio.get_running_loop().time() > deadline:
+                self.fail("condition not reached")
+            await asyncio.sleep(0.005)
+
+    async def test_concurrency_cap(self):
+        ingestor = PlaylistIngestor(concurrency=2, hours="", poll_seconds=0.01)
+        self.assertTrue(ingestor.start(bulk_jobs(5), skipped=3))
+        self.assertFalse(ingestor.start(bulk_jobs(1)))
+
+        await self.wait_for(lambda: len(self.queue.submitted) == 2)
+        await asyncio.sleep(0.05)
+        # Nothing more is submitted while two jobs are in flight
+        self.assertEqual(len(self.queue.submitted), 2)
+        self.assertEqual(len(ingestor.status()["in_flight"]), 2)
+
+        self.queue.finish_all()
+        await self.wait_for(lambda: len(self.queue.submitted) == 4)
+        self.queue.finish_all("failed")
+        await self.wait_for(lambda: len(self.queue.submitted) == 5)
+        self.queue.finish_all()
+        await self.wait_for(lambda: not ingestor.is_running())
+
+        status = ingestor.status()
+        self.assertEqual(self.queue.max_running, 2)
+        self.assertEqual([video_id for _, video_id, _ in self.queue.submitted], ["v0", "v1", "v2", "v3", "v4"])
+        self.assertEqual((status["succeeded"], status["failed"], status["skipped"]), (3, 2, 3))
+        self.assertEqual(status["pending"], 0)
+
+    async def test_waits_while_other_jobs_are_queued(self):
+        self.queue.queued = 1
+        ingestor = PlaylistIngestor(concurrency=1, hours="", poll_seconds=0.01)
+        ingestor.start(bulk_jobs(1))
+        await self.wait_for(lambda: ingestor.status()["waiting"] == "queue_busy")
+        self.assertEqual(self.queue.submitted, [])
+
+        self.queue.queued = 0
+        await self.wait_for(lambda: len(self.queue.submitted) == 1)
+        self.queue.finish_all()
+        await self.wait_for(lambda: not ingestor.is_running())
+        self.assertEqual(ingestor.status()["succeeded"], 1)
+
+    async def test_waits_outside_the_off_peak_hours(self):
+        ingestor = PlaylistIngestor(concurrency=1, hours="3-4", poll_seconds=0.01)
+        with patch('dependencies.playlist_ingestion.in_window', return_value=False):
+            ingestor.start(bulk_jobs(1))
+            await self.wait_for(lambda: ingestor.status()["waiting"] == "off_peak_hours")
+            self.assertEqual(self.queue.submitted, [])
+        with patch('dependencies.playlist_ingestion.in_window', return_value=True):
+            await self.wait_for(lambda: len(self.queue.submitted) == 1)
+
+        # Stopping leaves the submitted job alone
+        self.assertTrue(ingestor.stop())
+        await self.wait_for(lambda: not ingestor.is_running())
+        self.assertEqual(self.queue.jobs, {"job-0": "running"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+import os
+import sys
+import tempfile
+import time
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from dependencies.transcription_checkpoints import CheckpointStore
+
+class TestTranscriptionCheckpoints(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = CheckpointStore(self.tmp.name, ttl_hours=1, enabled=True)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_resumes_saved_chunks_only(self):
+        checkpoint = self.store.open("abc123", "base", "ar", "vad-240-300")
+        checkpoint.save({"chunk_index": 0, "start_time": 0.0, "text": "بسم الله"})
+        checkpoint.save({"chunk_index": 1, "start_time": 240.0, "text": "", "error": "boom"})
+
+        # A new run over the same source, model and layout
+        resumed = self.store.open("abc123", "base", "ar", "vad-240-300")
+        self.assertEqual(resumed.get(0)["text"], "بسم الله")
+        # Failed chunks are transcribed again
+        self.assertIsNone(resumed.get(1))
+        # Another model or layout does not share chunk boundaries
+        self.assertIsNone(self.store.open("abc123", "tiny", "ar", "vad-240-300").get(0))
+        self.assertEqual(self.store.stats()["chunks_resumed"], 1)
+
+    def test_discard_and_expire(self):
+        done = self.store.open("done", "base", "ar", "split-300")
+        done.save({"chunk_index": 0, "start_time": 0.0, "text": "نص"})
+        done.discard()
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, "done")))
+
+        abandoned = self.store.open("abandoned", "base", "ar", "split-300")
+        abandoned.save({"chunk_index": 0, "start_time": 0.0, "text": "نص"})
+        self.assertEqual(self.store.expire(), 0)
+        self.assertEqual(self.store.expire(now=time.time() + 2 * 3600), 1)
+        self.assertIsNone(abandoned.get(0))
+
+if __name__ == '__main__':
+    unittest.main()
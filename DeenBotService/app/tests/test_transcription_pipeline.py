@@ -0,0 +1,120 @@
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+import os
+import sys
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from dependencies.transcription_pipeline import StreamingIngestor
+
+
+def chunk(index, text=None):
+    return {"chunk_index": index, "text": text or f"chunk {index}", "start_time": index * 30.0}
+
+
+class TestStreamingIngestor(unittest.TestCase):
+
+    def setUp(self):
+        self.ingested = []
+        self.fail_on = None
+        self.gate = threading.Event()
+        self.gate.set()
+        patches = (
+            patch('dependencies.transcription_pipeline.ingest_chunks', side_effect=self.fake_ingest),
+            # One text chunk per chunk transcription
+            patch('dependencies.transcription_pipeline.iter_text_chunks', side_effect=lambda text: [text]),
+            patch('dependencies.transcription_pipeline.lexical_indexes', MagicMock()),
+        )
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def fake_ingest(self, chunks, transcription_id, *, start_index, report, lexical_index):
+        self.gate.wait()
+        for text, window in chunks:
+            if text == self.fail_on:
+                raise RuntimeError("embedding service down")
+            self.ingested.append((text, window["audio_chunk_index"]))
+            report.chunks += 1
+        report.batches += 1
+        return report
+
+    def test_ingests_in_chunk_order(self):
+        ingestor = StreamingIngestor("t1")
+        for index in (2, 0, 3, 1):
+            ingestor.submit(chunk(index))
+        # A chunk re-transcribed after it was ingested keeps its first text
+        ingestor.submit(chunk(0, "late duplicate"))
+        report = ingestor.close()
+        self.assertEqual([index for _, index in self.ingested], [0, 1, 2, 3])
+        self.assertNotIn("late duplicate", [text for text, _ in self.ingested])
+        self.assertEqual(report.chunks, 4)
+        self.assertIsNone(ingestor.error)
+
+    def test_close_flushes_chunks_after_a_gap(self):
+        ingestor = StreamingIngestor("t1")
+        for index in (0, 2, 4):
+            ingestor.submit(chunk(index))
+        # Chunks 1 and 3 never settle
+        report = ingestor.close()
+        self.assertEqual([index for _, index in self.ingested], [0, 2, 4])
+        self.assertEqual(report.chunks, 3)
+
+    def test_submit_blocks_when_the_queue_is_full(self):
+        self.gate.clear()
+        ingestor = StreamingIngestor("t1", queue_size=2)
+        submitted = []
+
+        def transcribe():
+            for index in range(5):
+                ingestor.submit(chunk(index))
+                submitted.append(index)
+
+        transcriber = threading.Thread(target=transcribe)
+        transcriber.start()
+        time.sleep(0.1)
+        # One chunk held by the stalled ingest thread, two queued, the fourth blocks
+        self.assertEqual(submitted, [0, 1, 2])
+        self.assertTrue(transcriber.is_alive())
+
+        self.gate.set()
+        transcriber.join(2)
+        self.assertFalse(transcriber.is_alive())
+        self.assertEqual(ingestor.close().chunks, 5)
+
+    def test_on_first_batch_fires_once(self):
+        calls = []
+        ingestor = StreamingIngestor("t1", on_first_batch=calls.append)
+        for index in range(4):
+            ingestor.submit(chunk(index))
+        ingestor.close()
+        self.assertEqual(calls, ["t1"])
+        self.assertIsNotNone(ingestor.first_batch_seconds)
+
+    def test_on_first_batch_waits_for_text(self):
+        calls = []
+        ingestor = StreamingIngestor("t1", on_first_batch=calls.append)
+        ingestor.submit({"chunk_index": 0, "text": "   "})
+        ingestor.submit(chunk(1))
+        ingestor.close()
+        self.assertEqual(calls, ["t1"])
+        self.assertEqual(self.ingested, [("chunk 1", 1)])
+
+    def test_error_is_kept_for_the_full_ingest_fallback(self):
+        self.fail_on = "chunk 1"
+        ingestor = StreamingIngestor("t1", queue_size=1)
+        # The transcriber never blocks on the failed consumer
+        for index in range(6):
+            ingestor.submit(chunk(index))
+        report = ingestor.close()
+        self.assertIsInstance(ingestor.error, RuntimeError)
+        # Nothing is ingested after the failure: the caller re-ingests the full text
+        self.assertEqual(self.ingested, [("chunk 0", 0)])
+        self.assertEqual(report.chunks, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+import os
+import sys
+
+import numpy as np
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from dependencies.audio_stream import SAMPLE_RATE, AudioWindow
+from dependencies.vad import SpeechSegmenter, pause_runs
+
+def _tone(seconds):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+def _silence(seconds):
+    rng = np.random.default_rng(0)
+    return (0.0005 * rng.standard_normal(int(seconds * SAMPLE_RATE))).astype(np.float32)
+
+def _windows(samples, seconds=2.0):
+    size = int(seconds * SAMPLE_RATE)
+    for i, start in enumerate(range(0, len(samples), size)):
+        yield AudioWindow(i, start / SAMPLE_RATE, samples[start:start + size])
+
+class TestVAD(unittest.TestCase):
+
+    def test_pause_runs_finds_long_non_speech_runs(self):
+        mask = np.array([1, 0, 0, 0, 1, 0, 1, 0, 0], dtype=bool)
+        self.assertEqual(pause_runs(mask, 2), [(1, 4), (7, 9)])
+
+    def test_chunks_cut_at_pause_and_drop_long_silence(self):
+        audio = np.concatenate([_tone(10), _silence(5), _tone(10)])
+        segmenter = SpeechSegmenter(target_seconds=12, max_seconds=20)
+        chunks = list(segmenter.chunks(_windows(audio)))
+
+        self.assertEqual(len(chunks), 2)
+        # The boundary falls inside the silence, not in the middle of speech
+        self.assertGreater(chunks[0].end_time, 10)
+        self.assertLess(chunks[0].end_time, 15)
+        self.assertAlmostEqual(chunks[1].start_time, chunks[0].end_time, places=3)
+        # Most of the 5 s of silence is not sent to Whisper
+        speech = sum(c.speech_seconds for c in chunks)
+        self.assertLess(speech, 22)
+        self.assertGreater(speech, 19.5)
+        self.assertGreater(segmenter.stats()["skipped_fraction"], 0.1)
+
+    def test_silent_audio_produces_no_chunks(self):
+        segmenter = SpeechSegmenter(target_seconds=12, max_seconds=20)
+        self.assertEqual(list(segmenter.chunks(_windows(_silence(30)))), [])
+
+if __name__ == '__main__':
+    unittest.main()
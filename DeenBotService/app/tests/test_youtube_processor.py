@@ -2,14 +2,28 @@ import unittest
 from unittest.mock import patch, MagicMock
 import os
 import sys
+import tempfile
+import time
 
 # Add the project root to the Python path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from dependencies.youtube_processor import YouTubeProcessor
+from dependencies.media_cache import MediaCache
+from dependencies.youtube_processor import FfmpegCpuMeter, YouTubeProcessor, select_audio_format
 
 class TestYouTubeProcessor(unittest.TestCase):
 
+    def setUp(self):
+        # Downloads are staged in the media cache: keep them out of the tree
+        self.tmp = tempfile.TemporaryDirectory()
+        patcher = patch(
+            'dependencies.youtube_processor.media_cache',
+            MediaCache(os.path.join(self.tmp.name, "media_cache")),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmp.cleanup)
+
     @patch('shutil.disk_usage')
     def test_download_audio_pytube_insufficient_space(self, mock_disk_usage):
         """Test that pytube download is aborted if disk space is insufficient."""
@@ -18,6 +32,7 @@ class TestYouTubeProcessor(unittest.TestCase):
         mock_disk_usage.return_value = (1024*1024*500, 1024*1024*400, 1024*1024*100) 
         
         processor = YouTubeProcessor()
+        self.addCleanup(processor.cleanup)
         youtube_url = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
         
         # Mock the pytube.YouTube object and its streams
@@ -44,6 +59,7 @@ class TestYouTubeProcessor(unittest.TestCase):
         mock_disk_usage.return_value = (1024*1024*500, 1024*1024*400, 1024*1024*100)
 
         processor = YouTubeProcessor()
+        self.addCleanup(processor.cleanup)
         youtube_url = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
 
         # Mock the yt-dlp info extraction to return a filesize
@@ -59,8 +75,38 @@ class TestYouTubeProcessor(unittest.TestCase):
 
         # Assert
         self.assertIsNone(result)
-        # Ensure the download method was not called after the info extraction
-        mock_ydl_instance.download.assert_not_called()
+        # Ensure nothing was downloaded after the info extraction
+        mock_ydl_instance.extract_info.assert_called_once()
+        mock_ydl_instance.process_ie_result.assert_not_called()
+
+    def test_select_audio_format_prefers_smallest_adequate_audio(self):
+        formats = [
+            {'format_id': '18', 'acodec': 'mp4a.40.2', 'vcodec': 'avc1', 'abr': 96},
+            {'format_id': '139', 'acodec': 'mp4a.40.5', 'vcodec': 'none', 'abr': 30, 'ext': 'm4a'},
+            {'format_id': '140', 'acodec': 'mp4a.40.2', 'vcodec': 'none', 'abr': 128, 'ext': 'm4a'},
+            {'format_id': '249', 'acodec': 'opus', 'vcodec': 'none', 'abr': 50, 'ext': 'webm'},
+            {'format_id': '251', 'acodec': 'opus', 'vcodec': 'none', 'abr': 160, 'ext': 'webm'},
+        ]
+        self.assertEqual(select_audio_format(formats, min_abr=40)['format_id'], '249')
+        # Nothing adequate: the best audio-only format
+        self.assertEqual(select_audio_format(formats[:2], min_abr=40)['format_id'], '139')
+        self.assertIsNone(select_audio_format(formats[:1]))
+
+    def test_ffmpeg_cpu_meter_counts_only_ffmpeg_postprocessors(self):
+        meter = FfmpegCpuMeter("/tmp/job-1/audio", interval=0.01)
+        # Native container: no FFmpeg postprocessor, nothing measured
+        meter.hook({'status': 'started', 'postprocessor': 'MoveFiles'})
+        meter.hook({'status': 'finished', 'postprocessor': 'MoveFiles'})
+        self.assertEqual(meter.seconds, 0.0)
+
+        cpu = iter([0.5, 1.25, 1.25])
+        with patch('dependencies.youtube_processor._ffmpeg_children', return_value=[4242]) as children, \
+                patch('dependencies.youtube_processor._process_cpu_seconds', side_effect=lambda pid: next(cpu, 1.25)):
+            meter.hook({'status': 'started', 'postprocessor': 'FFmpegExtractAudio'})
+            time.sleep(0.05)
+            meter.hook({'status': 'finished', 'postprocessor': 'FFmpegExtractAudio'})
+        children.assert_called_with("/tmp/job-1/audio")
+        self.assertEqual(meter.seconds, 1.25)
 
 if __name__ == '__main__':
     unittest.main()
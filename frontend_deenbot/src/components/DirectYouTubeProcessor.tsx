@@ -14,6 +14,7 @@ import { useNavigate } from "react-router-dom";
 import { motion, AnimatePresence } from "framer-motion";
 import { Button } from "@/components/ui/button"; // Assuming shadcn/ui Button
 import { Input } from "@/components/ui/input"; // Assuming shadcn/ui Input
+import { resolveMediaJob } from "@/lib/mediaJobs";
 
 interface DirectYouTubeProcessorProps {
   onSuccess: (
@@ -152,6 +153,7 @@ const DirectYouTubeProcessor: React.FC<DirectYouTubeProcessorProps> = ({
       ];
       let responseOk = false;
       let resultData: any;
+      let earlyConversationId: string | null = null;
 
       for (const apiUrl of apiUrls) {
         try {
@@ -209,6 +211,38 @@ const DirectYouTubeProcessor: React.FC<DirectYouTubeProcessorProps> = ({
         }
       }
 
+      if (responseOk && resultData) {
+        // Processing runs as a background job; open its conversation as soon
+        // as the first part is indexed and wait for the final result (title)
+        resultData = await resolveMediaJob(resultData, {
+          onProgress: (job) =>
+            setProgress((prev) => Math.max(prev, Math.round(job.percent))),
+          onPartial: (partial) => {
+            earlyConversationId = partial.conversation_id;
+            toast.info(
+              getLocalizedMessage(
+                "ar:الجزء الأول من الفيديو جاهز، يمكنك طرح أسئلتك الآن|en:The first part of the video is ready: you can start asking questions"
+              )
+            );
+            onSuccess?.(
+              partial.transcription_id,
+              "",
+              partial.title ||
+                getLocalizedMessage("ar:درس جديد من يوتيوب|en:New YouTube Lesson"),
+              partial.conversation_id
+            );
+            navigate(`/chat/${partial.conversation_id}`);
+          },
+        });
+        if (!resultData.success) {
+          if (earlyConversationId) {
+            // The early conversation was deleted with the failed job
+            navigate("/chat");
+          }
+          throw new Error(resultData.error);
+        }
+      }
+
       clearInterval(progressInterval);
 
       if (responseOk && resultData) {
@@ -221,7 +255,11 @@ const DirectYouTubeProcessor: React.FC<DirectYouTubeProcessorProps> = ({
           resultData
         );
 
-        if (onSuccess && resultData.conversation_id) {
+        if (
+          onSuccess &&
+          resultData.conversation_id &&
+          resultData.conversation_id !== earlyConversationId
+        ) {
           // Use the intelligently generated title if available, fallback to topic, then default
           const title =
             resultData.title ||
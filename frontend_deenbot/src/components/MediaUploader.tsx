@@ -5,6 +5,7 @@ import { FileAudio, FileVideo, Upload, File } from 'lucide-react';
 import { useNavigate } from 'react-router-dom';
 
 import { Button } from '@/components/ui/button';
+import { resolveMediaJob } from '@/lib/mediaJobs';
 
 interface MediaUploaderProps {
   onUploadSuccess: (transcriptionId: string, preview: string, topic?: string, conversationId?: string) => void;
@@ -148,17 +149,35 @@ const MediaUploader: React.FC<MediaUploaderProps> = ({ onUploadSuccess }) => {
       });
 
       clearInterval(progressInterval);
-      clearTimeout(timeoutId);
-      
-      // Complete progress to 100%
-      setUploadProgress(100);
 
       if (!response.ok) {
+        clearTimeout(timeoutId);
         const errorText = await response.text();
         throw new Error(`Server responded with ${response.status}: ${errorText}`);
       }
 
-      const data = await response.json();
+      // The server transcribes in a background job; poll it for real progress.
+      // The conversation opens as soon as the first part is indexed; the job
+      // then gives it its final title
+      let earlyConversationId: string | null = null;
+      const data = await resolveMediaJob(await response.json(), {
+        signal: controller.signal,
+        onProgress: (job) => setUploadProgress((prev) => Math.max(prev, Math.round(job.percent))),
+        onPartial: (partial) => {
+          earlyConversationId = partial.conversation_id;
+          toast.info(
+            language === 'ar'
+              ? 'الجزء الأول من الملف جاهز، يمكنك طرح أسئلتك الآن'
+              : 'The first part of the file is ready: you can start asking questions'
+          );
+          onUploadSuccess(partial.transcription_id, '', undefined, partial.conversation_id);
+          navigate(`/chat/${partial.conversation_id}`);
+        },
+      });
+      clearTimeout(timeoutId);
+
+      // Complete progress to 100%
+      setUploadProgress(100);
 
       if (data.success) {
         toast.success('تم رفع الملف وتحويله بنجاح');
@@ -174,6 +193,10 @@ const MediaUploader: React.FC<MediaUploaderProps> = ({ onUploadSuccess }) => {
         
         // Delay callback to ensure it happens after current render cycle
         setTimeout(() => {
+          if (earlyConversationId && earlyConversationId === data.conversation_id) {
+            // Already opened from the partial result
+            return;
+          }
           // Call success handler with topic and conversationId
           onUploadSuccess(transcriptionId, transcriptionPreview, topic, data.conversation_id);
           if (data.conversation_id) {
@@ -183,6 +206,10 @@ const MediaUploader: React.FC<MediaUploaderProps> = ({ onUploadSuccess }) => {
         
         // Continue to finally block to reset the upload state
       } else {
+        if (earlyConversationId) {
+          // The early conversation was deleted with the failed job
+          navigate('/chat');
+        }
         setUploadError(data.error || 'حدث خطأ أثناء رفع الملف');
         toast.error(data.error || 'حدث خطأ أثناء رفع الملف');
       }
@@ -1,6 +1,7 @@
 import React, { useState } from 'react';
 import { toast } from 'sonner';
 import { ArrowRight } from 'lucide-react';
+import { resolveMediaJob } from '@/lib/mediaJobs';
 
 const TestYouTubeProcessor = () => {
   const [url, setUrl] = useState('');
@@ -27,7 +28,7 @@ const TestYouTubeProcessor = () => {
         throw new Error(`Server responded with ${response.status}`);
       }
 
-      const data = await response.json();
+      const data = await resolveMediaJob(await response.json());
 
       if (data.success) {
         alert('Video processed successfully!');
@@ -4,6 +4,7 @@ import { Youtube, Link, ArrowRight } from 'lucide-react';
 // Remove shadcn Button component as it may be causing issues
 // import { Button } from '@/components/ui/button';
 import { motion } from 'framer-motion';
+import { resolveMediaJob } from '@/lib/mediaJobs';
 
 interface YouTubeInputProps {
   onProcessSuccess: (transcriptionId: string, preview: string, topic?: string) => void;
@@ -59,13 +60,25 @@ const YouTubeInput: React.FC<YouTubeInputProps> = ({ onProcessSuccess }) => {
         throw new Error(`Server responded with ${response.status}: ${errorText}`);
       }
 
-      const data = await response.json();
+      // Processing runs as a background job; follow its real progress, and
+      // let the user ask questions as soon as the first part is indexed
+      let openedEarly = false;
+      const data = await resolveMediaJob(await response.json(), {
+        onProgress: (job) => setProgress(Math.max(10, Math.round(job.percent))),
+        onPartial: (partial) => {
+          openedEarly = true;
+          toast.info('The first part of the video is ready: you can start asking questions');
+          onProcessSuccess(partial.transcription_id, '');
+        },
+      });
 
       if (data.success) {
         setProgress(100);
         toast.success('Video processed and transcribed successfully');
         console.log(data);
-        onProcessSuccess(data.transcription_id, data.transcription_preview, data.topic);
+        if (!openedEarly) {
+          onProcessSuccess(data.transcription_id, data.transcription_preview, data.topic);
+        }
         setUrl('');
       } else {
         throw new Error(data.error || 'An error occurred while processing the video');
@@ -0,0 +1,133 @@
+// Media uploads and YouTube processing run as background jobs on the API:
+// the POST returns a job id straight away and the result is fetched from
+// /api/v1/media/jobs/{job_id} once the job has finished.  While a job is
+// still running, `result` may already hold a partial result
+// (`partial: true`) with a conversation over the part indexed so far:
+// `resolveMediaJob` hands it to `onPartial` so the user can start asking
+// questions, and keeps polling for the final result (title, preview).
+// Requests for a video that is already being processed are attached to the
+// running job (`attached: true`); they get their own conversation over its
+// transcription.
+
+export const MEDIA_API_BASE_URL = "http://localhost:8006";
+
+export interface MediaJobStatus {
+  job_id: string;
+  kind: string;
+  status: "queued" | "running" | "succeeded" | "failed";
+  stage: string | null;
+  percent: number;
+  eta_seconds: number | null;
+  result: any;
+  error: string | null;
+}
+
+const sleep = (ms: number) => new Promise((resolve) => setTimeout(resolve, ms));
+
+/**
+ * Replace the conversation of a shared job's result with a new one bound to
+ * the same transcription (falls back to the shared one on error).
+ */
+async function openOwnConversation(result: any, baseUrl: string): Promise<any> {
+  try {
+    const response = await fetch(`${baseUrl}/api/v1/chat/conversations`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({
+        title: result.title || result.topic,
+        context_id: result.transcription_id,
+      }),
+    });
+    if (!response.ok) {
+      return result;
+    }
+    const conversation = await response.json();
+    return { ...result, conversation_id: conversation.id };
+  } catch {
+    return result;
+  }
+}
+
+/** Delete a conversation opened for a job that then failed (best effort). */
+async function deleteConversation(conversationId: string, baseUrl: string): Promise<void> {
+  try {
+    await fetch(`${baseUrl}/api/v1/chat/conversations/${conversationId}`, { method: "DELETE" });
+  } catch {
+    // The conversation merely stays in the list
+  }
+}
+
+/**
+ * Wait for the job referenced by an ingestion response and return its result.
+ *
+ * Responses without a job id (errors, or videos that were already processed)
+ * are returned unchanged, so callers can keep checking `data.success`.
+ *
+ * `onPartial` is called once, as soon as the first part of the lecture is
+ * queryable, with a result holding its `conversation_id`; the final result
+ * then refers to the same conversation (attached requests reuse the one
+ * opened for them at that point).  If the job fails after that, the server
+ * deletes the early conversation, and so does an attached request with its
+ * own one; the failed result carries `conversation_id` so callers can leave it.
+ */
+export async function resolveMediaJob(
+  data: any,
+  options: {
+    baseUrl?: string;
+    intervalMs?: number;
+    onProgress?: (job: MediaJobStatus) => void;
+    onPartial?: (result: any) => void;
+    signal?: AbortSignal;
+  } = {}
+): Promise<any> {
+  if (!data || !data.job_id) {
+    return data;
+  }
+  const baseUrl = options.baseUrl ?? MEDIA_API_BASE_URL;
+  const statusUrl = `${baseUrl}${data.status_url || `/api/v1/media/jobs/${data.job_id}`}`;
+  // Conversation opened for this request from the partial result, if any
+  let partialConversationId: string | null = null;
+
+  while (true) {
+    const response = await fetch(statusUrl, { signal: options.signal });
+    if (!response.ok) {
+      const errorText = await response.text();
+      throw new Error(`Server responded with ${response.status}: ${errorText}`);
+    }
+    const job: MediaJobStatus = await response.json();
+    options.onProgress?.(job);
+
+    if (job.status === "succeeded") {
+      if (data.attached && job.result?.transcription_id) {
+        if (partialConversationId) {
+          return { ...job.result, conversation_id: partialConversationId };
+        }
+        return openOwnConversation(job.result, baseUrl);
+      }
+      return job.result;
+    }
+    if (
+      job.status === "running" &&
+      job.result?.partial &&
+      job.result.transcription_id &&
+      partialConversationId === null
+    ) {
+      const partial = data.attached
+        ? await openOwnConversation(job.result, baseUrl)
+        : job.result;
+      // An attached request never takes over the first submitter's
+      // conversation: it waits until its own one could be opened
+      if (partial.conversation_id && (!data.attached || partial !== job.result)) {
+        partialConversationId = partial.conversation_id;
+        options.onPartial?.(partial);
+      }
+    }
+    if (job.status === "failed") {
+      if (data.attached && partialConversationId) {
+        await deleteConversation(partialConversationId, baseUrl);
+      }
+      return { success: false, error: job.error, conversation_id: partialConversationId };
+    }
+    await sleep(options.intervalMs ?? 2000);
+  }
+}